@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark serial vs. concurrent batch generation against the local mock LLM server.
+
+The mock server answers every request after a fixed delay, so the wall time of a
+batch shows how many round trips it needed.
+
+Usage:
+    python benchmarks/bench_batch_generate.py --prompts 100 --latency 0.05 --concurrency 1 8 16
+"""
+
+import os
+import sys
+import math
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.http_pool import SessionPool
+from models.content_generator import ContentGenerator
+from utils.mock_llm_server import MockLLMServer
+
+
+def run_benchmark(num_prompts, latency, concurrency_levels):
+    """Run the benchmark and print one row per concurrency level"""
+    server = MockLLMServer(latency=latency, output_tokens=1).start()
+    base_url = server.messages_url
+    prompts = [f"Prompt number {i}" for i in range(num_prompts)]
+
+    print(f"{num_prompts} prompts, {latency * 1000:.0f} ms simulated latency\n")
+    print(f"{'mode':<8}{'limit':>7}{'wall (s)':>11}{'ideal (s)':>11}{'items/s':>10}{'reused':>8}")
+
+    for mode in ("thread", "asyncio"):
+        for limit in concurrency_levels:
+            pool = SessionPool(pool_maxsize=max(limit, 1))
+            generator = ContentGenerator(api_key="bench", session_pool=pool)
+            generator.base_url = base_url
+
+            start = time.perf_counter()
+            if mode == "thread":
+                results = generator.batch_generate(prompts, max_concurrency=limit)
+            else:
+                results = asyncio.run(generator.abatch_generate(prompts, max_concurrency=limit))
+            elapsed = time.perf_counter() - start
+
+            assert all(r["success"] for r in results)
+            ideal = math.ceil(num_prompts / limit) * latency
+            print(f"{mode:<8}{limit:>7}{elapsed:>11.2f}{ideal:>11.2f}"
+                  f"{num_prompts / elapsed:>10.1f}{pool.reused_connections:>8}")
+            pool.close()
+
+    server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark ContentGenerator.batch_generate")
+    parser.add_argument("--prompts", type=int, default=100, help="Number of prompts per batch")
+    parser.add_argument("--latency", type=float, default=0.05, help="Mock server latency in seconds")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16],
+                        help="Concurrency limits to compare")
+    args = parser.parse_args()
+
+    os.environ.pop("LLM_API_KEY", None)
+    run_benchmark(args.prompts, args.latency, args.concurrency)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark exact and IVF search of the memory-mapped dense vector index.
+
+Vectors are drawn around random cluster centres, as text embeddings cluster by
+topic, and queries are perturbed copies of stored vectors. For each corpus size
+the exact blocked search gives the ground truth; IVF search is reported as
+recall@k against it and queries per second for several nprobe values.
+
+Usage:
+    python benchmarks/bench_dense_retrieval.py --sizes 10000 100000 1000000 --dtype float16
+"""
+
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.retrieval.dense import DenseIndex
+
+
+def clustered_vectors(rng, centres, count, spread=1.0):
+    """Vectors scattered around randomly chosen centres"""
+    labels = rng.integers(0, len(centres), count)
+    return centres[labels] + spread * rng.standard_normal((count, centres.shape[1]), dtype=np.float32)
+
+
+def timed_search(index, queries, k, nprobe):
+    """Search one query at a time, returning (ids, queries per second)"""
+    start = time.perf_counter()
+    ids = np.vstack([index.search(query, k, nprobe=nprobe)[0] for query in queries])
+    return ids, len(queries) / (time.perf_counter() - start)
+
+
+def recall(found, truth):
+    """Share of the true top-k ids found"""
+    return np.mean([len(np.intersect1d(f, t)) / len(t) for f, t in zip(found, truth)])
+
+
+def run_benchmark(sizes, dim, dtype, num_queries, k, nprobes, directory):
+    """Run the benchmark and print one row per corpus size and search mode"""
+    rng = np.random.default_rng(0)
+    centres = rng.standard_normal((1000, dim), dtype=np.float32)
+
+    print(f"{dim}-d {dtype} vectors, {num_queries} single queries, k={k}\n")
+    print(f"{'vectors':>10}  {'mode':<14}{'recall@k':>9}{'QPS':>10}")
+
+    for size in sizes:
+        path = tempfile.mkdtemp(dir=directory)
+        index = DenseIndex(path, dim=dim, dtype=dtype, ivf_min_vectors=size + 1)
+        for start in range(0, size, 100000):
+            batch = min(100000, size - start)
+            index.add(np.arange(start, start + batch), clustered_vectors(rng, centres, batch))
+
+        queries = np.asarray(index._vectors[rng.integers(0, size, num_queries)], dtype=np.float32)
+        queries += 0.1 * rng.standard_normal(queries.shape, dtype=np.float32)
+
+        truth, qps = timed_search(index, queries, k, None)
+        print(f"{size:>10}  {'exact':<14}{1.0:>9.3f}{qps:>10.0f}")
+
+        start = time.perf_counter()
+        index.train_ivf()
+        print(f"{size:>10}  {'(train ivf)':<14}{'':>9}{'':>10}  {time.perf_counter() - start:.1f} s, "
+              f"{len(index._centroids)} lists")
+
+        for nprobe in nprobes:
+            found, qps = timed_search(index, queries, k, nprobe)
+            print(f"{size:>10}  {f'ivf nprobe={nprobe}':<14}{recall(found, truth):>9.3f}{qps:>10.0f}")
+
+        del index
+        shutil.rmtree(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DenseIndex exact and IVF search")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 500000], help="Corpus sizes")
+    parser.add_argument("--dim", type=int, default=256, help="Vector size")
+    parser.add_argument("--dtype", default="float32", choices=["float32", "float16"], help="Storage type")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries timed")
+    parser.add_argument("--k", type=int, default=10, help="Results per query")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 16, 64], help="IVF lists scanned per query")
+    parser.add_argument("--dir", default=None, help="Directory for the memory-mapped files")
+    args = parser.parse_args()
+
+    run_benchmark(args.sizes, args.dim, args.dtype, args.queries, args.k, args.nprobe, args.dir)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark prompt rendering with large few-shot example lists.
+
+Measures a cold render (empty section cache), a warm rerun with unchanged state
+(what Streamlit does on every widget interaction) and a rerun after editing a
+single field, next to the string-concatenating renderer the section cache
+replaced (legacy_prompt_renderer.py). The last column is the warm rerun time
+relative to that reference: above 1.0, caching costs more than it saves. With
+--specs, also measures headless PromptSpec rendering throughput in one process
+and across a process pool.
+
+Usage:
+    python benchmarks/bench_prompt_rendering.py --examples 100 1000 5000 --repeats 20
+    python benchmarks/bench_prompt_rendering.py --specs 20000 --workers 1 4
+"""
+
+import sys
+import time
+import argparse
+import dataclasses
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import streamlit as st
+
+from models.prompt_generator import generate_prompt, clear_section_cache
+from models.prompt_spec import PromptSpec, render_batch
+import legacy_prompt_renderer
+
+
+class BenchSessionState(dict):
+    """Dict with attribute access, standing in for st.session_state"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__dict__ = self
+
+
+def make_state(num_examples):
+    """Build a session state with every section enabled and a long example list"""
+    return BenchSessionState(
+        prompt_structure={section: True for section in (
+            "Context & Background", "Task Definition", "Input Data Format", "Output Requirements",
+            "Examples (Few-Shot Learning)", "Chain-of-Thought Instructions", "Self-Review Requirements",
+            "Fact Checking Instructions")},
+        context="You are an AI assistant with expertise in content creation.",
+        task="Create a comprehensive guide on implementing Agile methodology.",
+        input_format="Plain Text",
+        input_description="The user will provide information about their team size.",
+        output_format="Markdown",
+        output_tone="Professional",
+        output_requirements="Length: Comprehensive but concise",
+        few_shot_enabled=True,
+        examples=[{"input": f"Example input {i} " * 5, "output": f"Example output {i} " * 20}
+                  for i in range(num_examples)],
+        constraints="Focus on practical implementation",
+        thinking_steps_enabled=True,
+        chain_of_thought_steps=["Analyze requirements", "Research key concepts", "Draft", "Review"],
+        self_consistency_enabled=True,
+        fact_checker_enabled=True,
+    )
+
+
+def time_render(repeats, render=generate_prompt):
+    """Average wall time of a render over repeats, in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        render()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def run_benchmark(example_counts, repeats):
+    """Run the benchmark and print one row per example list size"""
+    print(f"{'examples':>9}{'chars':>11}{'legacy (ms)':>13}{'cold (ms)':>12}{'warm (ms)':>12}{'edit (ms)':>12}"
+          f"{'warm/legacy':>13}")
+
+    for num_examples in example_counts:
+        st.session_state = make_state(num_examples)
+        legacy = time_render(repeats, lambda: legacy_prompt_renderer.generate_prompt(st.session_state))
+
+        clear_section_cache()
+        start = time.perf_counter()
+        prompt = generate_prompt()
+        cold = (time.perf_counter() - start) * 1000
+
+        warm = time_render(repeats)
+
+        edit_start = time.perf_counter()
+        for i in range(repeats):
+            st.session_state["task"] = f"Create a guide, revision {i}."
+            generate_prompt()
+        edit = (time.perf_counter() - edit_start) / repeats * 1000
+
+        print(f"{num_examples:>9}{len(prompt):>11}{legacy:>13.2f}{cold:>12.2f}{warm:>12.2f}{edit:>12.2f}"
+              f"{warm / legacy:>13.2f}")
+
+
+def run_throughput(num_specs, worker_counts):
+    """Render distinct specs with render_batch and print specs/s per worker count"""
+    base = PromptSpec.from_session_state(make_state(5))
+    specs = [dataclasses.replace(base, task=f"Task number {i}") for i in range(num_specs)]
+
+    print(f"\n{num_specs} specs")
+    print(f"{'workers':>9}{'wall (s)':>11}{'specs/s':>11}")
+
+    for workers in worker_counts:
+        start = time.perf_counter()
+        render_batch(specs, max_workers=workers, chunksize=256)
+        elapsed = time.perf_counter() - start
+        print(f"{workers:>9}{elapsed:>11.2f}{num_specs / elapsed:>11.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark section-cached prompt rendering")
+    parser.add_argument("--examples", type=int, nargs="+", default=[100, 1000, 5000],
+                        help="Few-shot example list sizes to render")
+    parser.add_argument("--repeats", type=int, default=20, help="Reruns timed per measurement")
+    parser.add_argument("--specs", type=int, default=0, help="Specs rendered for the throughput run")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4], help="Process counts for render_batch")
+    args = parser.parse_args()
+
+    run_benchmark(args.examples, args.repeats)
+    if args.specs:
+        run_throughput(args.specs, args.workers)
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Benchmark indexing and querying the BM25 knowledge index.
+
+Documents are synthetic: sentences drawn from a Zipf-distributed vocabulary, so
+common words have long postings the way natural text does. Each document is a
+single chunk, so --chunks sets the index size directly.
+
+Usage:
+    python benchmarks/bench_retrieval.py --chunks 1000000 --queries 200 --path /tmp/bench.sqlite
+"""
+
+import os
+import sys
+import time
+import argparse
+from itertools import islice
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from models.retrieval import BM25Index
+
+
+def synthetic_documents(num_documents, words_per_document, vocabulary_size, seed=0):
+    """Yield (doc_id, text, source) tuples with Zipf-distributed words"""
+    rng = np.random.default_rng(seed)
+    vocabulary = np.array([f"w{i}" for i in range(vocabulary_size)])
+    for i in range(num_documents):
+        words = vocabulary[np.minimum(rng.zipf(1.2, words_per_document), vocabulary_size) - 1]
+        yield f"doc{i}", " ".join(words) + ".", "synthetic"
+
+
+def run_benchmark(num_chunks, num_queries, words_per_chunk, vocabulary_size, path):
+    """Build the index, then time queries of two to four words"""
+    if path and os.path.exists(path):
+        os.remove(path)
+    # Room for every token of a document, so each one is a single chunk
+    index = BM25Index(path=path, chunk_size=words_per_chunk * 4, overlap=0)
+
+    start = time.perf_counter()
+    documents = synthetic_documents(num_chunks, words_per_chunk, vocabulary_size)
+    for _ in range(0, num_chunks, 100000):
+        index.add_documents(islice(documents, 100000))
+    elapsed = time.perf_counter() - start
+    stats = index.stats()
+    print(f"indexed {stats['chunks']} chunks, {stats['terms']} terms in {elapsed:.1f} s "
+          f"({stats['chunks'] / elapsed:,.0f} chunks/s)")
+
+    if path:
+        # Reopen to time queries against postings read from disk
+        index.close()
+        start = time.perf_counter()
+        index = BM25Index(path=path)
+        print(f"reopened in {time.perf_counter() - start:.2f} s")
+
+    rng = np.random.default_rng(1)
+    queries = [" ".join(f"w{rng.integers(1, 2000)}" for _ in range(rng.integers(2, 5))) for _ in range(num_queries)]
+
+    for label in ("cold", "warm"):
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query, k=5)
+            timings.append(time.perf_counter() - start)
+        timings = np.array(timings) * 1000
+        print(f"{label:<5} p50 {np.percentile(timings, 50):6.2f} ms  p95 {np.percentile(timings, 95):6.2f} ms  "
+              f"max {timings.max():6.2f} ms")
+
+    index.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark BM25Index indexing and search")
+    parser.add_argument("--chunks", type=int, default=1000000, help="Number of chunks indexed")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries timed")
+    parser.add_argument("--words", type=int, default=40, help="Words per chunk")
+    parser.add_argument("--vocabulary", type=int, default=50000, help="Distinct words")
+    parser.add_argument("--path", default=None, help="SQLite file for the index (in memory by default)")
+    args = parser.parse_args()
+
+    run_benchmark(args.chunks, args.queries, args.words, args.vocabulary, args.path)
@@ -0,0 +1,155 @@
+"""
+The combined-prompt renderer the section cache replaced, kept as the reference
+for bench_prompt_rendering.py.
+
+It rebuilds the whole prompt by string concatenation on every call, reading
+the session state directly. Do not use it outside the benchmarks.
+"""
+
+
+def generate_prompt(state):
+    """
+    Generate a formatted prompt based on the selected components in session state
+
+    Args:
+        state: The session state
+
+    Returns:
+        str: The formatted prompt text
+    """
+    prompt = ""
+
+    # Context & Background
+    if state.prompt_structure["Context & Background"] and state.context:
+        prompt += "# Context & Background\n"
+        prompt += state.context + "\n\n"
+
+    # Task Definition
+    if state.prompt_structure["Task Definition"] and state.task:
+        prompt += "# Task Definition\n"
+        prompt += state.task + "\n\n"
+
+    # Content Intent & Guidelines (new section)
+    if state.prompt_structure.get("Content Intent & Guidelines", False):
+        prompt += "# Content Intent & Guidelines\n"
+        prompt += f"**Intent:** {state.content_intent}\n\n"
+        prompt += f"**Mission Statement:** {state.mission_statement}\n\n"
+        prompt += f"**Voice & Tone:** {state.voice_choice}\n\n"
+
+        if hasattr(state, "content_rules") and state.content_rules:
+            prompt += "**Content Rules (Do NOT include):**\n"
+            for rule in state.content_rules:
+                prompt += f"- {rule}\n"
+            prompt += "\n"
+
+    # Content Setup (new section)
+    if state.prompt_structure.get("Content Setup", False):
+        prompt += "# Content Setup\n"
+        prompt += f"**Content Description:** {state.content_description}\n\n"
+        prompt += "**Business Context:**\n"
+        prompt += f"- Name: {state.business_name}\n"
+        prompt += f"- Display Location: {state.business_where}\n"
+        prompt += f"- Target Audience: {state.business_who}\n"
+        prompt += f"- Content Format: {state.business_look}\n"
+        prompt += f"- Purpose: {state.business_why}\n\n"
+
+    # Design Requirements (new section)
+    if state.prompt_structure.get("Design Requirements", False):
+        prompt += "# Design Requirements\n"
+
+        if hasattr(state, "components") and state.components:
+            prompt += "**Content Components:**\n"
+            for component in state.components:
+                prompt += f"- {component['type']}: {component['description']}\n"
+                prompt += f"  Length: {component['min_chars']}-{component['max_chars']} chars, ~{component['sentences']} sentences\n"
+            prompt += "\n"
+
+        prompt += f"**Language & Locale:** {state.language_choice}\n\n"
+
+        if hasattr(state, "globalization_items") and state.globalization_items:
+            prompt += "**Globalization Considerations:**\n"
+            for item in state.globalization_items:
+                prompt += f"- {item}\n"
+            prompt += "\n"
+
+    # Data Sources & Examples (new section)
+    if state.prompt_structure.get("Data Sources & Examples", False):
+        prompt += "# Data Sources & Examples\n"
+
+        # Add file mappings if available
+        if hasattr(state, "file_mappings") and state.file_mappings:
+            prompt += "**Data Fields:**\n"
+            for mapping in state.file_mappings:
+                prompt += f"- {mapping['placeholder']}: Corresponds to {mapping['field']} in the provided data\n"
+            prompt += "\n"
+
+        # Add GraphQL mappings if available
+        if hasattr(state, "graphql_mappings") and state.graphql_mappings:
+            prompt += "**GraphQL Data Fields:**\n"
+            for mapping in state.graphql_mappings:
+                prompt += f"- {mapping['placeholder']}: Corresponds to {mapping['field']} in the GraphQL data\n"
+            prompt += "\n"
+
+        # Add manual examples if available
+        if hasattr(state, "manual_examples") and state.manual_examples:
+            prompt += "**Examples for Reference:**\n"
+            for i, example in enumerate(state.manual_examples):
+                prompt += f"Example {i + 1} ({example['comment']}):\n```\n{example['text']}\n```\n\n"
+
+    # Input Data Format
+    if state.prompt_structure["Input Data Format"] and state.input_description:
+        prompt += "# Input Data Format\n"
+        prompt += f"Format: {state.input_format}\n"
+        prompt += state.input_description + "\n\n"
+
+    # Output Requirements
+    if state.prompt_structure["Output Requirements"]:
+        prompt += "# Output Requirements\n"
+        prompt += f"Format: {state.output_format}\n"
+        prompt += f"Tone: {state.output_tone}\n"
+        if state.output_requirements:
+            prompt += state.output_requirements + "\n\n"
+        else:
+            prompt += "\n"
+
+    # Examples (Few-Shot Learning)
+    if state.prompt_structure["Examples (Few-Shot Learning)"] and state.few_shot_enabled:
+        prompt += "# Examples & Constraints\n"
+        for i, example in enumerate(state.examples):
+            if example["input"] or example["output"]:
+                prompt += f"[Example {i + 1}]\n"
+                prompt += f"Input: {example['input']}\n"
+                prompt += f"Output: {example['output']}\n\n"
+
+        # Constraints
+        if state.constraints:
+            prompt += "## Constraints\n"
+            prompt += state.constraints + "\n\n"
+
+    # Chain-of-Thought Instructions
+    if state.prompt_structure["Chain-of-Thought Instructions"] and state.thinking_steps_enabled:
+        prompt += "## Chain-of-Thought Instructions\n"
+        for i, step in enumerate(state.chain_of_thought_steps):
+            prompt += f"{i + 1}. {step}\n"
+        prompt += "\n"
+
+    # Self-Review Requirements
+    if state.prompt_structure["Self-Review Requirements"] and state.self_consistency_enabled:
+        prompt += "## Self-Review Requirements\n"
+        prompt += "After generating content, review it to ensure:\n"
+        prompt += "- All claims are factually accurate\n"
+        prompt += "- Content is well-organized and flows logically\n"
+        prompt += "- Advice is practical and actionable\n"
+        prompt += "- Language is clear and professional\n"
+        prompt += "- Content follows specified output requirements\n\n"
+
+    # Fact Checking Instructions
+    if state.prompt_structure["Fact Checking Instructions"] and state.fact_checker_enabled:
+        prompt += "## Fact Checking Instructions\n"
+        prompt += "Verify all factual claims and ensure accuracy of:\n"
+        prompt += "- Statistics and numerical data\n"
+        prompt += "- Historical information\n"
+        prompt += "- Technical specifications\n"
+        prompt += "- Citations and references\n\n"
+
+    return prompt
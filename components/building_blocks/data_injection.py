@@ -1,8 +1,12 @@
 import streamlit as st
 import pandas as pd
-import json
-import io
 from utils.ui_helpers import section_with_info, subsection_header
+from models.prompt_spec import mark_changed
+from utils.shared_resources import get_http_session_pool, get_graphql_cache, get_upload_cache
+from models.upload_cache import SUPPORTED_EXTENSIONS, content_key
+from models.ingestion import ChunkedUpload
+from models.frame_storage import memory_footprint, format_bytes
+from models.graphql_client import GraphQLClient, GraphQLFetchJob, DEFAULT_PAGE_SIZE, DEFAULT_MAX_RECORDS
 
 
 def render_data_injection_section():
@@ -40,11 +44,36 @@ def render_data_injection_section():
         else:
             render_manual_examples_section()
 
+        render_memory_footprint()
+
+
+def render_memory_footprint():
+    """Show how much memory this session's data sources hold"""
+    # Sizes are remembered per object, so large results are only measured once
+    measured = st.session_state.setdefault("data_footprints", {})
+    sizes = {}
+
+    for label, key in (("Uploaded data", "uploaded_file_data"), ("GraphQL results", "graphql_results")):
+        value = st.session_state.get(key)
+        if value is None:
+            continue
+        if key not in measured or measured[key][0] != id(value):
+            measured[key] = (id(value), memory_footprint(value))
+        sizes[label] = measured[key][1]
+
+    if not sizes:
+        return
+
+    parts = ", ".join(f"{label}: {format_bytes(size)}" for label, size in sizes.items())
+    spilled = isinstance(st.session_state.get("uploaded_file_data"), ChunkedUpload)
+    st.caption(f"Session memory: {format_bytes(sum(sizes.values()))} ({parts})"
+               + (" - uploaded rows are read from disk on demand" if spilled else ""))
+
 
 def render_file_upload_section():
     """Handle file upload functionality"""
     # Supported file types
-    supported_file_types = ["csv", "xlsx", "json", "txt"]
+    supported_file_types = list(SUPPORTED_EXTENSIONS)
 
     # Initialize file mappings if not present
     if "file_mappings" not in st.session_state:
@@ -52,7 +81,7 @@ def render_file_upload_section():
 
     # File uploader
     uploaded_file = st.file_uploader(
-        "Upload a data file (CSV, Excel, JSON, or text)",
+        "Upload a data file (CSV, Excel, JSON, JSONL, Parquet, Arrow, or text)",
         type=supported_file_types
     )
 
@@ -72,6 +101,12 @@ def render_file_upload_section():
                 st.dataframe(file_data.head(5))
                 fields = file_data.columns.tolist()
 
+            elif isinstance(file_data, ChunkedUpload):
+                # Large file: preview the first chunk, rows are streamed during batch injection
+                st.dataframe(file_data.preview(5))
+                st.caption("Large file: rows are read in chunks when prompts are generated.")
+                fields = file_data.columns.tolist()
+
             elif isinstance(file_data, dict) or isinstance(file_data, list):
                 # Show JSON preview
                 if isinstance(file_data, list) and len(file_data) > 0:
@@ -123,6 +158,7 @@ def render_file_upload_section():
                         if not any(m["field"] == selected_field and m["placeholder"] == placeholder_name for m in
                                    st.session_state.file_mappings):
                             st.session_state.file_mappings.append(new_mapping)
+                            mark_changed(st.session_state.file_mappings)
                             st.rerun()
 
             # Display current mappings
@@ -234,31 +270,54 @@ def render_graphql_section():
         on_change=lambda: setattr(st.session_state, "graphql_query", st.session_state.graphql_query_input)
     )
 
+    # Pagination settings
+    col1, col2, col3 = st.columns([2, 1, 1])
+
+    with col1:
+        connection = st.text_input(
+            "Connection Path (optional)",
+            key="graphql_connection",
+            help="Field path of a Relay connection to paginate, e.g. products or shop.products. "
+                 "The query must declare $first and $after and select pageInfo { hasNextPage endCursor }."
+        )
+
+    with col2:
+        page_size = st.number_input("Page Size", min_value=1, max_value=10000,
+                                    value=DEFAULT_PAGE_SIZE, key="graphql_page_size")
+
+    with col3:
+        max_records = st.number_input("Max Records", min_value=1, max_value=1000000,
+                                      value=DEFAULT_MAX_RECORDS, key="graphql_max_records")
+
     # Execute query button
     if st.button("Execute Query", key="execute_query_btn"):
         if st.session_state.graphql_endpoint:
-            with st.spinner("Executing query..."):
-                # Mock execution for demonstration
-                # In a real implementation, this would make an API request
-                st.session_state.graphql_results = {
-                    "data": {
-                        "example": [
-                            {"id": "1", "name": "Example 1", "description": "First example item"},
-                            {"id": "2", "name": "Example 2", "description": "Second example item"},
-                            {"id": "3", "name": "Example 3", "description": "Third example item"}
-                        ]
-                    }
-                }
-                st.success("Query executed successfully!")
+            client = GraphQLClient(
+                st.session_state.graphql_endpoint,
+                headers=st.session_state.graphql_headers,
+                session_pool=get_http_session_pool(),
+                cache=get_graphql_cache()
+            )
+            # The fetch runs in the background and survives reruns until it finishes
+            st.session_state.graphql_job = GraphQLFetchJob(
+                client,
+                st.session_state.graphql_query,
+                connection=connection.strip() or None,
+                page_size=int(page_size),
+                max_records=int(max_records)
+            )
         else:
             st.error("Please enter a GraphQL endpoint URL")
 
+    if st.session_state.get("graphql_job") is not None:
+        render_graphql_job_status()
+
     # Display query results
     if st.session_state.graphql_results:
         st.subheader("Query Results")
 
-        # Pretty-print the results
-        st.json(st.session_state.graphql_results)
+        # Pretty-print the results (long lists are cut short)
+        st.json(preview_graphql_results(st.session_state.graphql_results))
 
         # Extract fields for mapping
         fields = extract_graphql_fields(st.session_state.graphql_results)
@@ -295,6 +354,7 @@ def render_graphql_section():
                     if not any(m["field"] == selected_field and m["placeholder"] == placeholder_name for m in
                                st.session_state.graphql_mappings):
                         st.session_state.graphql_mappings.append(new_mapping)
+                        mark_changed(st.session_state.graphql_mappings)
                         st.rerun()
 
             # Display current mappings
@@ -311,6 +371,27 @@ def render_graphql_section():
                     st.rerun()
 
 
+@st.fragment(run_every=0.5)
+def render_graphql_job_status():
+    """Show the progress of the running GraphQL fetch, storing its result once finished"""
+    job = st.session_state.get("graphql_job")
+    if job is None:
+        return
+
+    if not job.done:
+        st.info(f"Executing query... {job.records:,} records fetched")
+        return
+
+    st.session_state.graphql_job = None
+    if job.error is not None:
+        st.error(f"Query failed: {job.error}")
+        return
+
+    st.session_state.graphql_results = job.result
+    st.success("Query executed successfully!")
+    st.rerun()
+
+
 def render_manual_examples_section():
     """Handle manual example entry functionality"""
     # Initialize examples list if not present
@@ -346,6 +427,7 @@ def render_manual_examples_section():
                 "comment": example_comment
             }
             st.session_state.manual_examples.append(new_example)
+            mark_changed(st.session_state.manual_examples)
             st.rerun()
         elif not example_text:
             st.warning("Please enter example content.")
@@ -372,6 +454,7 @@ def render_manual_examples_section():
                 # Remove example button
                 if st.button("Remove Example", key=f"remove_example_{i}"):
                     st.session_state.manual_examples.pop(i)
+                    mark_changed(st.session_state.manual_examples)
                     st.rerun()
 
         # Clear all examples button
@@ -394,27 +477,20 @@ def read_uploaded_file(uploaded_file):
     Returns:
         The file contents as a DataFrame, dict, list, or string depending on file type
     """
-    # Get file extension
-    file_extension = uploaded_file.name.split(".")[-1].lower()
-
-    try:
-        # Process based on file type
-        if file_extension == "csv":
-            return pd.read_csv(uploaded_file)
-
-        elif file_extension == "xlsx":
-            return pd.read_excel(uploaded_file)
-
-        elif file_extension == "json":
-            return json.load(uploaded_file)
+    data = uploaded_file.getvalue()
 
-        elif file_extension == "txt":
-            # Read text file
-            return uploaded_file.getvalue().decode("utf-8")
+    # Hash the content once per attached file rather than on every rerun
+    file_id = getattr(uploaded_file, "file_id", None)
+    cached_key = st.session_state.get("uploaded_file_key")
+    if file_id and cached_key and cached_key[0] == file_id:
+        key = cached_key[1]
+    else:
+        key = content_key(uploaded_file.name, data)
+        st.session_state.uploaded_file_key = (file_id, key)
 
-        else:
-            st.error(f"Unsupported file type: {file_extension}")
-            return None
+    try:
+        # Parsed once per distinct content, shared across reruns and sessions
+        return get_upload_cache().get_or_parse(uploaded_file.name, data, key=key)
     except Exception as e:
         st.error(f"Error reading file: {str(e)}")
         return None
@@ -440,6 +516,30 @@ def extract_keys_from_json(json_data):
     return []
 
 
+def preview_graphql_results(graphql_results, max_items=5):
+    """
+    Shorten GraphQL results for display
+
+    Args:
+        graphql_results: The GraphQL query results
+        max_items: Items kept from each list
+
+    Returns:
+        A copy of the results with long lists cut to max_items, followed by a note
+        of how many items were left out
+    """
+    if isinstance(graphql_results, dict):
+        return {key: preview_graphql_results(value, max_items) for key, value in graphql_results.items()}
+
+    if isinstance(graphql_results, list):
+        items = [preview_graphql_results(item, max_items) for item in graphql_results[:max_items]]
+        if len(graphql_results) > max_items:
+            items.append(f"... {len(graphql_results) - max_items:,} more items")
+        return items
+
+    return graphql_results
+
+
 def extract_graphql_fields(graphql_results):
     """
     Extract fields from GraphQL query results
@@ -448,7 +548,8 @@ def extract_graphql_fields(graphql_results):
         graphql_results: The GraphQL query results
 
     Returns:
-        List of field paths in dot notation
+        List of field paths in dot notation, with "[*]" marking lists (one prompt per item
+        in batch rendering, the first item otherwise)
     """
     fields = []
 
@@ -463,7 +564,11 @@ def extract_graphql_fields(graphql_results):
                         fields.append(new_prefix)
 
         elif isinstance(data, list) and len(data) > 0:
-            extract_fields_recursive(data[0], prefix)
+            if isinstance(data[0], (dict, list)):
+                extract_fields_recursive(data[0], f"{prefix}[*]")
+            elif prefix:
+                # List of scalar values
+                fields.append(f"{prefix}[*]")
 
     if graphql_results and "data" in graphql_results:
         extract_fields_recursive(graphql_results["data"])
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.ui_helpers import section_with_info, subsection_header
+from models.prompt_spec import mark_changed
 
 
 def render_content_intent_section():
@@ -83,6 +84,7 @@ def render_content_intent_section():
                 with col2:
                     if st.button("×", key=f"remove_rule_{i}"):
                         st.session_state.content_rules.pop(i)
+                        mark_changed(st.session_state.content_rules)
                         st.rerun()
 
         # Add new rule
@@ -94,6 +96,7 @@ def render_content_intent_section():
         if st.button("+ Add Rule", key="add_rule_btn"):
             if new_rule and new_rule not in st.session_state.content_rules:
                 st.session_state.content_rules.append(new_rule)
+                mark_changed(st.session_state.content_rules)
                 st.rerun()
 
 
@@ -260,6 +263,7 @@ def render_design_requirements_section():
                 "sentences": component_sentences
             }
             st.session_state.components.append(component)
+            mark_changed(st.session_state.components)
             st.rerun()
 
         # Display existing components
@@ -276,6 +280,7 @@ def render_design_requirements_section():
                     with col2:
                         if st.button("Remove", key=f"remove_component_{i}"):
                             st.session_state.components.pop(i)
+                            mark_changed(st.session_state.components)
                             st.rerun()
 
         # Language and Localization
@@ -318,6 +323,7 @@ def render_design_requirements_section():
         if st.button("+ Add Globalization Aspect", key="add_global_aspect_btn"):
             if globalization_item and globalization_item not in st.session_state.globalization_items:
                 st.session_state.globalization_items.append(globalization_item)
+                mark_changed(st.session_state.globalization_items)
                 st.rerun()
 
         # Display existing globalization items
@@ -330,6 +336,7 @@ def render_design_requirements_section():
                 with col2:
                     if st.button("×", key=f"remove_global_{i}"):
                         st.session_state.globalization_items.pop(i)
+                        mark_changed(st.session_state.globalization_items)
                         st.rerun()
 
 
@@ -354,7 +361,10 @@ def render_enhanced_building_blocks():
     if "prompt_structure" in st.session_state:
         if "Content Intent & Guidelines" not in st.session_state.prompt_structure:
             st.session_state.prompt_structure["Content Intent & Guidelines"] = True
+            mark_changed(st.session_state.prompt_structure)
         if "Content Setup" not in st.session_state.prompt_structure:
             st.session_state.prompt_structure["Content Setup"] = True
+            mark_changed(st.session_state.prompt_structure)
         if "Design Requirements" not in st.session_state.prompt_structure:
-            st.session_state.prompt_structure["Design Requirements"] = True
\ No newline at end of file
+            st.session_state.prompt_structure["Design Requirements"] = True
+            mark_changed(st.session_state.prompt_structure)
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.ui_helpers import section_with_info, subsection_header
+from models.prompt_spec import mark_changed
 
 
 def render_examples_section():
@@ -19,19 +20,23 @@ def render_examples_section():
                 ex_output = st.text_area("Output", value=example["output"], key=f"example_output_{i}")
 
                 # Update session state when values change
-                st.session_state.examples[i]["input"] = ex_input
-                st.session_state.examples[i]["output"] = ex_output
+                if (ex_input, ex_output) != (example["input"], example["output"]):
+                    st.session_state.examples[i]["input"] = ex_input
+                    st.session_state.examples[i]["output"] = ex_output
+                    mark_changed(st.session_state.examples)
 
         col_add, col_remove = st.columns([1, 1])
         with col_add:
             if st.button("Add Example", key="examples_add_example_btn"):
                 st.session_state.examples.append({"input": "", "output": ""})
+                mark_changed(st.session_state.examples)
                 st.rerun()
 
         with col_remove:
             if len(st.session_state.examples) > 1:
                 if st.button("Remove Last Example", key="examples_remove_example_btn"):
                     st.session_state.examples.pop()
+                    mark_changed(st.session_state.examples)
                     st.rerun()
 
         # Constraints
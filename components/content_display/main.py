@@ -1,8 +1,11 @@
 import streamlit as st
 import time
-from utils.ui_helpers import section_header
+from utils.ui_helpers import section_header, render_token_stream
 from models.prompt_generator import generate_prompt, simulate_content_generation, calculate_quality_metrics
 from models.content_generator import ContentGenerator, generate_content
+from models.single_flight import get_single_flight
+from models.tokenizer import count_tokens
+from utils.shared_resources import get_http_session_pool, get_response_cache
 from .metrics import render_quality_metrics
 from .feedback import render_feedback_section
 
@@ -15,57 +18,70 @@ def render_content_display():
 
     # Check if content is available or needs to be generated
     if "result_content" not in st.session_state or st.session_state.get("regenerate", False):
-        with st.spinner("Generating content..."):
-            # Reset regenerate flag if set
-            if st.session_state.get("regenerate", False):
-                st.session_state.regenerate = False
-
-            # Get the current prompt
-            prompt = generate_prompt()
-
-            # Check if we should use API or simulation
-            use_api = st.session_state.get("use_api", False)
-
-            if use_api and "api_key" in st.session_state and st.session_state.api_key:
-                # Use LLM API
-                try:
-                    generator = ContentGenerator(api_key=st.session_state.api_key)
-
-                    # Get model parameters
-                    model = st.session_state.get("model_selection", "claude-3-5-sonnet")
-                    temperature = st.session_state.get("temperature", 0.7)
-                    max_tokens = st.session_state.get("max_tokens", 1000)
-
-                    # Track generation time
-                    start_time = time.time()
-
-                    # Make API call
-                    result = generator.generate(
-                        prompt,
-                        model=model,
-                        temperature=temperature,
-                        max_tokens=max_tokens
+        # Reset regenerate flag if set
+        if st.session_state.get("regenerate", False):
+            st.session_state.regenerate = False
+
+        # Get the current prompt
+        prompt = generate_prompt()
+
+        # Check if we should use API or simulation
+        use_api = st.session_state.get("use_api", False)
+
+        if use_api and "api_key" in st.session_state and st.session_state.api_key:
+            # Use LLM API, rendering tokens as they arrive
+            try:
+                generator = ContentGenerator(
+                    api_key=st.session_state.api_key,
+                    session_pool=get_http_session_pool(),
+                    cache=get_response_cache()
+                )
+
+                # Get model parameters
+                model = st.session_state.get("model_selection", "claude-3-5-sonnet")
+                temperature = st.session_state.get("temperature", 0.7)
+                max_tokens = st.session_state.get("max_tokens", 1000)
+
+                # Track generation time
+                start_time = time.time()
+
+                # Stream the API response into a live preview
+                with st.container(border=True, height=400):
+                    result = render_token_stream(
+                        generator.generate_stream(
+                            prompt,
+                            model=model,
+                            temperature=temperature,
+                            max_tokens=max_tokens,
+                            use_cache=True if st.session_state.get("cache_sampled_responses", False) else None
+                        ),
+                        st.empty()
                     )
 
-                    # Calculate generation time
-                    generation_time = time.time() - start_time
-
-                    # Store results
-                    st.session_state.result_content = result["content"]
-                    st.session_state.generation_metadata = {
-                        "model": model,
-                        "temperature": temperature,
-                        "max_tokens": max_tokens,
-                        "generation_time": generation_time,
-                        "prompt_tokens": result.get("metadata", {}).get("prompt_tokens", 0),
-                        "completion_tokens": result.get("metadata", {}).get("completion_tokens", 0),
-                        "total_tokens": result.get("metadata", {}).get("total_tokens", 0)
-                    }
-                except Exception as e:
-                    st.error(f"Error generating content: {str(e)}")
-                    # Fall back to simulation
-                    st.session_state.result_content = simulate_content_generation()
-            else:
+                # Calculate generation time
+                generation_time = time.time() - start_time
+
+                # Store results
+                st.session_state.result_content = result["content"]
+                st.session_state.generation_metadata = {
+                    "model": model,
+                    "temperature": temperature,
+                    "max_tokens": max_tokens,
+                    "generation_time": generation_time,
+                    "time_to_first_token": result.get("metadata", {}).get("time_to_first_token"),
+                    "cache_hit": result.get("metadata", {}).get("cache_hit", False),
+                    "prompt_tokens": result.get("metadata", {}).get("prompt_tokens", 0),
+                    "completion_tokens": result.get("metadata", {}).get("completion_tokens", 0),
+                    "total_tokens": result.get("metadata", {}).get("total_tokens", 0),
+                    "cache_read_input_tokens": result.get("metadata", {}).get("cache_read_input_tokens", 0),
+                    "cache_creation_input_tokens": result.get("metadata", {}).get("cache_creation_input_tokens", 0)
+                }
+            except Exception as e:
+                st.error(f"Error generating content: {str(e)}")
+                # Fall back to simulation
+                st.session_state.result_content = simulate_content_generation()
+        else:
+            with st.spinner("Generating content..."):
                 # Simulate content generation
                 st.session_state.result_content = simulate_content_generation()
 
@@ -75,14 +91,14 @@ def render_content_display():
                     "temperature": 0.7,
                     "max_tokens": 1000,
                     "generation_time": 1.2,
-                    "prompt_tokens": len(prompt.split()),
-                    "completion_tokens": len(st.session_state.result_content.split()),
-                    "total_tokens": len(prompt.split()) + len(st.session_state.result_content.split()),
+                    "prompt_tokens": count_tokens(prompt),
+                    "completion_tokens": count_tokens(st.session_state.result_content),
+                    "total_tokens": count_tokens(prompt) + count_tokens(st.session_state.result_content),
                     "simulated": True
                 }
 
-            # Calculate quality metrics
-            st.session_state.quality_metrics = calculate_quality_metrics(st.session_state.result_content)
+        # Calculate quality metrics
+        st.session_state.quality_metrics = calculate_quality_metrics(st.session_state.result_content)
 
     # Display generation info
     if "generation_metadata" in st.session_state:
@@ -103,6 +119,38 @@ def render_content_display():
             with col4:
                 st.metric("Output Tokens", metadata.get("completion_tokens", 0))
 
+            if metadata.get("time_to_first_token") is not None:
+                st.caption(f"Time to first token: {metadata['time_to_first_token']:.2f}s")
+
+            # Provider-side prompt cache usage for this generation
+            if metadata.get("cache_read_input_tokens") or metadata.get("cache_creation_input_tokens"):
+                st.caption(
+                    f"Prompt cache: {metadata.get('cache_read_input_tokens', 0)} prompt tokens read, "
+                    f"{metadata.get('cache_creation_input_tokens', 0)} written"
+                )
+
+            # Response cache effectiveness across all sessions on this server
+            cache_stats = get_response_cache().stats()
+            st.caption(
+                f"Response cache: {'hit' if metadata.get('cache_hit') else 'miss'} for this generation · "
+                f"{cache_stats['hits']} hits / {cache_stats['misses']} misses "
+                f"({cache_stats['memory_hits']} memory, {cache_stats['disk_hits']} disk)"
+            )
+
+            # Duplicate concurrent requests collapsed across all sessions on this server
+            flight_stats = get_single_flight().stats()
+            st.caption(
+                f"Request coalescing: {flight_stats['coalesced']} of {flight_stats['calls']} calls "
+                f"shared an identical in-flight request"
+            )
+
+            # Connection reuse across all sessions on this server
+            pool_stats = get_http_session_pool().stats()
+            st.caption(
+                f"HTTP pool: {pool_stats['requests']} requests over {pool_stats['connections']} connections "
+                f"({pool_stats['reused_connections']} reused)"
+            )
+
             # Show full prompt option
             if st.checkbox("Show full prompt"):
                 st.code(generate_prompt(), language="markdown")
@@ -168,6 +216,13 @@ def render_content_display():
                 )
                 st.session_state.max_tokens = max_tokens
 
+                st.session_state.cache_sampled_responses = st.checkbox(
+                    "Reuse cached responses when temperature > 0",
+                    value=st.session_state.get("cache_sampled_responses", False),
+                    key="cache_sampled_responses_checkbox",
+                    help="Identical prompts at temperature 0 are always served from the cache"
+                )
+
     # Display the generated content in a markdown box
     with st.container(border=True, height=400):
         # Add edit option
@@ -1,7 +1,51 @@
 import streamlit as st
 import time
-from utils.ui_helpers import subsection_header
+from utils.ui_helpers import subsection_header, render_token_stream
 from models.content_generator import ContentGenerator, generate_content
+from models.providers import LocalHTTPAdapter
+from models.rate_limiter import RateLimiterRegistry
+from utils.shared_resources import get_http_session_pool, get_response_cache, get_mock_llm_server
+
+# Text the mock LLM server streams back when executing without an API key
+SIMULATED_CONTENT = """Based on your prompt, here is a comprehensive guide on implementing Agile methodology in software development teams:
+
+## Implementing Agile in Software Development
+
+Agile methodologies provide flexibility and efficiency for development teams by emphasizing:
+- Iterative development cycles
+- Continuous feedback
+- Team collaboration
+- Customer involvement
+
+### Key Frameworks
+
+1. **Scrum**
+   - Sprint planning and reviews
+   - Daily standups
+   - Defined roles (Product Owner, Scrum Master, Development Team)
+
+2. **Kanban**
+   - Visualized workflow
+   - Limited work in progress
+   - Continuous delivery
+
+### Implementation Steps
+
+Start with these practical steps:
+1. Train your team on Agile principles
+2. Select an appropriate framework
+3. Begin with a pilot project
+4. Establish regular ceremonies
+5. Iterate and improve based on retrospectives
+
+### Common Challenges
+
+- Resistance to change
+- Maintaining consistent velocity
+- Balancing technical debt with new features
+
+This guide provides a foundation for successful Agile implementation, tailored to your team's specific needs and context.
+"""
 
 
 def render_execution_controls():
@@ -67,13 +111,25 @@ def render_execution_controls():
         # API key input
         use_api = st.checkbox("Use API", value=False, key="execution_use_api")
 
+        api_key = ""
+        base_url = None
+
         if use_api:
             api_key = st.text_input(
                 "API Key",
                 type="password",
-                key="execution_api_key"
+                key="execution_api_key",
+                help="Optional for self-hosted endpoints" if selected_provider == "Custom" else None
             )
 
+            if selected_provider == "Custom":
+                base_url = st.text_input(
+                    "Endpoint URL",
+                    value=LocalHTTPAdapter.default_base_url,
+                    key="execution_base_url",
+                    help="OpenAI-compatible chat completions endpoint of your model server"
+                )
+
         # Advanced parameters toggle
         show_advanced = st.checkbox("Advanced Parameters", value=False, key="show_advanced_params")
 
@@ -155,6 +211,12 @@ def render_execution_controls():
         if not user_prompt:
             user_prompt = st.session_state.get("raw_user_prompt", "")
 
+        # Send the invariant opening of a generated system prompt as its own part, so
+        # providers with prompt caching cache it without the per-prompt sections
+        system_prefix = st.session_state.get("final_system_prompt_prefix", "")
+        if system_prefix and system_prompt.startswith(system_prefix):
+            system_prompt = (system_prefix, system_prompt[len(system_prefix):])
+
         # Show execution in progress
         with st.spinner("Generating content..."):
             # Create execution parameters dict
@@ -178,19 +240,31 @@ def render_execution_controls():
             execution_id = str(uuid.uuid4())[:8]
 
             # Prepare API Call
-            if use_api and api_key:
-                # Use real API
-                generator = ContentGenerator(api_key=api_key)
+            if use_api and (api_key or selected_provider == "Custom"):
+                # Use real API through the adapter for the selected provider
+                generator = ContentGenerator(
+                    api_key=api_key,
+                    provider=selected_provider,
+                    base_url=base_url,
+                    session_pool=get_http_session_pool(),
+                    cache=get_response_cache()
+                )
 
                 try:
                     start_time = time.time()
-                    result = generator.generate(
-                        prompt=user_prompt,
-                        system_prompt=system_prompt,
-                        model=selected_model,
-                        temperature=temperature,
-                        max_tokens=max_tokens
-                    )
+
+                    # Render tokens as they arrive
+                    with st.container(border=True):
+                        result = render_token_stream(
+                            generator.generate_stream(
+                                prompt=user_prompt,
+                                system_prompt=system_prompt,
+                                model=selected_model,
+                                temperature=temperature,
+                                max_tokens=max_tokens
+                            ),
+                            st.empty()
+                        )
                     generation_time = time.time() - start_time
 
                     content = result["content"]
@@ -201,61 +275,38 @@ def render_execution_controls():
                     content = f"Error: {str(e)}"
                     metadata = {"error": True}
             else:
-                # Use simulation
-                start_time = time.time()
-                # Pause for realistic effect
-                time.sleep(1.5)
-                content = f"""**Generated content using {selected_model}**
-
-Based on your prompt, here is a comprehensive guide on implementing Agile methodology in software development teams:
-
-## Implementing Agile in Software Development
-
-Agile methodologies provide flexibility and efficiency for development teams by emphasizing:
-- Iterative development cycles
-- Continuous feedback
-- Team collaboration
-- Customer involvement
-
-### Key Frameworks
-
-1. **Scrum**
-   - Sprint planning and reviews
-   - Daily standups
-   - Defined roles (Product Owner, Scrum Master, Development Team)
-
-2. **Kanban**
-   - Visualized workflow
-   - Limited work in progress
-   - Continuous delivery
-
-### Implementation Steps
-
-Start with these practical steps:
-1. Train your team on Agile principles
-2. Select an appropriate framework
-3. Begin with a pilot project
-4. Establish regular ceremonies
-5. Iterate and improve based on retrospectives
-
-### Common Challenges
-
-- Resistance to change
-- Maintaining consistent velocity
-- Balancing technical debt with new features
+                # Simulate through the bundled mock LLM server so the same HTTP,
+                # streaming and connection pooling path runs without a provider
+                mock_server = get_mock_llm_server(SIMULATED_CONTENT)
+                generator = ContentGenerator(
+                    api_key="mock",
+                    base_url=mock_server.messages_url,
+                    session_pool=get_http_session_pool(),
+                    rate_limiters=RateLimiterRegistry()
+                )
 
-This guide provides a foundation for successful Agile implementation, tailored to your team's specific needs and context.
-"""
+                start_time = time.time()
+                with st.container(border=True):
+                    result = render_token_stream(
+                        generator.generate_stream(
+                            prompt=user_prompt,
+                            system_prompt=system_prompt,
+                            model=selected_model,
+                            temperature=temperature,
+                            max_tokens=max_tokens
+                        ),
+                        st.empty()
+                    )
                 generation_time = time.time() - start_time
-                metadata = {
+
+                content = f"**Generated content using {selected_model}**\n\n{result['content']}"
+                metadata = dict(result.get("metadata", {}))
+                metadata.update({
                     "model": selected_model,
                     "provider": selected_provider,
-                    "prompt_tokens": len(system_prompt.split()) + len(user_prompt.split()),
-                    "completion_tokens": len(content.split()),
-                    "total_tokens": len(system_prompt.split()) + len(user_prompt.split()) + len(content.split()),
                     "generation_time": generation_time,
                     "simulated": True
-                }
+                })
 
             # Store execution in history
             execution_record = {
@@ -444,7 +495,9 @@ This guide provides a foundation for successful Agile implementation, tailored t
                     "Provider": exec_record["params"]["provider"],
                     "Temperature": exec_record["params"]["temperature"],
                     "Generation Time": f"{exec_record['metadata'].get('generation_time', 0):.2f}s",
-                    "Total Tokens": exec_record["metadata"].get("total_tokens", "N/A")
+                    "Total Tokens": exec_record["metadata"].get("total_tokens", "N/A"),
+                    "Prompt Cache Read": exec_record["metadata"].get("cache_read_input_tokens", "N/A"),
+                    "Prompt Cache Write": exec_record["metadata"].get("cache_creation_input_tokens", "N/A")
                 })
 
             history_df = pd.DataFrame(history_data)
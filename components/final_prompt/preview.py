@@ -1,6 +1,7 @@
 import streamlit as st
 from utils.ui_helpers import subsection_header
-from models.prompt_generator import generate_prompt, generate_system_prompt, generate_user_prompt
+from models.prompt_generator import generate_prompt, generate_role_prompt_parts
+from models.tokenizer import count_tokens
 
 
 def render_prompt_preview():
@@ -47,7 +48,7 @@ def render_prompt_preview():
                     st.code(prompt_text, language="markdown")
 
                 # Add token count and other statistics
-                prompt_tokens = len(prompt_text.split())
+                prompt_tokens = count_tokens(prompt_text)
                 col1, col2, col3 = st.columns(3)
 
                 with col1:
@@ -63,8 +64,8 @@ def render_prompt_preview():
                     st.metric("Active Workflows", f"{workflows_count}")
         else:
             # Get system and user prompts for role-based format
-            system_prompt = generate_system_prompt()
-            user_prompt = generate_user_prompt()
+            system_prefix, system_rest, user_prompt = generate_role_prompt_parts()
+            system_prompt = system_prefix + system_rest
 
             # Create tabs for system and user prompts
             prompt_role_tabs = st.tabs(["System Prompt", "User Prompt"])
@@ -92,7 +93,7 @@ def render_prompt_preview():
                         st.code(system_prompt, language="markdown")
 
                     # System prompt statistics
-                    system_tokens = len(system_prompt.split())
+                    system_tokens = count_tokens(system_prompt)
                     st.metric("System Prompt Tokens", f"{system_tokens}")
 
             with prompt_role_tabs[1]:
@@ -117,15 +118,16 @@ def render_prompt_preview():
                         st.code(user_prompt, language="markdown")
 
                     # User prompt statistics
-                    user_tokens = len(user_prompt.split())
+                    user_tokens = count_tokens(user_prompt)
                     st.metric("User Prompt Tokens", f"{user_tokens}")
 
             # Total token count for both prompts
-            total_tokens = len(system_prompt.split()) + len(user_prompt.split())
+            total_tokens = count_tokens(system_prompt) + count_tokens(user_prompt)
             st.metric("Total Tokens", f"{total_tokens}")
 
             # Store prompts in session state for execution
             st.session_state.final_system_prompt = system_prompt
+            st.session_state.final_system_prompt_prefix = system_prefix
             st.session_state.final_user_prompt = user_prompt
 
         # Add export option
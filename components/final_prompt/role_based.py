@@ -1,6 +1,7 @@
 import streamlit as st
 from utils.ui_helpers import subsection_header
-from models.prompt_generator import generate_system_prompt, generate_user_prompt
+from models.prompt_spec import mark_changed
+from models.prompt_generator import generate_system_prompt, generate_user_prompt, generate_role_prompt_parts
 
 
 def render_role_based_prompts():
@@ -44,11 +45,14 @@ def render_role_based_prompts():
 
         # System prompt sections
         for section, included in st.session_state.system_prompt_sections.items():
-            st.session_state.system_prompt_sections[section] = st.checkbox(
+            checked = st.checkbox(
                 section,
                 value=included,
                 key=f"system_{section}"
             )
+            if checked != included:
+                st.session_state.system_prompt_sections[section] = checked
+                mark_changed(st.session_state.system_prompt_sections)
 
         # System prompt preview
         with st.expander("System Prompt Preview", expanded=False):
@@ -61,11 +65,14 @@ def render_role_based_prompts():
 
         # User prompt sections
         for section, included in st.session_state.user_prompt_sections.items():
-            st.session_state.user_prompt_sections[section] = st.checkbox(
+            checked = st.checkbox(
                 section,
                 value=included,
                 key=f"user_{section}"
             )
+            if checked != included:
+                st.session_state.user_prompt_sections[section] = checked
+                mark_changed(st.session_state.user_prompt_sections)
 
         # User prompt preview
         with st.expander("User Prompt Preview", expanded=False):
@@ -87,15 +94,17 @@ def render_role_based_prompts():
             if custom_section:
                 if role_type == "System Prompt":
                     st.session_state.system_prompt_sections[custom_section] = True
+                    mark_changed(st.session_state.system_prompt_sections)
                 else:
                     st.session_state.user_prompt_sections[custom_section] = True
+                    mark_changed(st.session_state.user_prompt_sections)
                 st.rerun()
 
     # Combined preview
     with st.expander("Complete Prompt Preview", expanded=True):
         # Format the complete prompt
-        system_prompt = generate_system_prompt()
-        user_prompt = generate_user_prompt()
+        system_prefix, system_rest, user_prompt = generate_role_prompt_parts()
+        system_prompt = system_prefix + system_rest
 
         col_sys, col_user = st.columns(2)
 
@@ -109,4 +118,5 @@ def render_role_based_prompts():
 
         # Store in session state for other components to use
         st.session_state.final_system_prompt = system_prompt
+        st.session_state.final_system_prompt_prefix = system_prefix
         st.session_state.final_user_prompt = user_prompt
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.ui_helpers import subsection_header
+from models.prompt_spec import mark_changed
 
 
 def render_prompt_structure():
@@ -68,7 +69,9 @@ def render_prompt_structure():
                             value=st.session_state.prompt_structure.get(section, True),
                             key=f"section_toggle_system_{i}"
                         )
-                        st.session_state.prompt_structure[section] = is_included
+                        if is_included != st.session_state.prompt_structure.get(section):
+                            st.session_state.prompt_structure[section] = is_included
+                            mark_changed(st.session_state.prompt_structure)
 
                     with cols[1]:
                         # Move section up within its group
@@ -83,6 +86,7 @@ def render_prompt_structure():
                                 st.session_state.prompt_section_order[curr_idx] = st.session_state.prompt_section_order[
                                     prev_idx]
                                 st.session_state.prompt_section_order[prev_idx] = temp
+                                mark_changed(st.session_state.prompt_section_order)
                                 st.rerun()
 
                     with cols[2]:
@@ -98,12 +102,14 @@ def render_prompt_structure():
                                 st.session_state.prompt_section_order[curr_idx] = st.session_state.prompt_section_order[
                                     next_idx]
                                 st.session_state.prompt_section_order[next_idx] = temp
+                                mark_changed(st.session_state.prompt_section_order)
                                 st.rerun()
 
                     with cols[3]:
                         # Change role to User
                         if st.button("→ User", key=f"to_user_{i}"):
                             st.session_state.section_roles[section] = "User"
+                            mark_changed(st.session_state.section_roles)
                             st.rerun()
 
             st.markdown("### User Prompt Sections")
@@ -122,7 +128,9 @@ def render_prompt_structure():
                             value=st.session_state.prompt_structure.get(section, True),
                             key=f"section_toggle_user_{i}"
                         )
-                        st.session_state.prompt_structure[section] = is_included
+                        if is_included != st.session_state.prompt_structure.get(section):
+                            st.session_state.prompt_structure[section] = is_included
+                            mark_changed(st.session_state.prompt_structure)
 
                     with cols[1]:
                         # Move section up within its group
@@ -137,6 +145,7 @@ def render_prompt_structure():
                                 st.session_state.prompt_section_order[curr_idx] = st.session_state.prompt_section_order[
                                     prev_idx]
                                 st.session_state.prompt_section_order[prev_idx] = temp
+                                mark_changed(st.session_state.prompt_section_order)
                                 st.rerun()
 
                     with cols[2]:
@@ -152,12 +161,14 @@ def render_prompt_structure():
                                 st.session_state.prompt_section_order[curr_idx] = st.session_state.prompt_section_order[
                                     next_idx]
                                 st.session_state.prompt_section_order[next_idx] = temp
+                                mark_changed(st.session_state.prompt_section_order)
                                 st.rerun()
 
                     with cols[3]:
                         # Change role to System
                         if st.button("→ Sys", key=f"to_system_{i}"):
                             st.session_state.section_roles[section] = "System"
+                            mark_changed(st.session_state.section_roles)
                             st.rerun()
 
         else:
@@ -173,7 +184,9 @@ def render_prompt_structure():
                             value=st.session_state.prompt_structure.get(section, True),
                             key=f"section_toggle_{i}"
                         )
-                        st.session_state.prompt_structure[section] = is_included
+                        if is_included != st.session_state.prompt_structure.get(section):
+                            st.session_state.prompt_structure[section] = is_included
+                            mark_changed(st.session_state.prompt_structure)
 
                     with cols[1]:
                         # Role selector (System or User)
@@ -185,7 +198,9 @@ def render_prompt_structure():
                             key=f"role_select_{i}",
                             label_visibility="collapsed"
                         )
-                        st.session_state.section_roles[section] = new_role
+                        if new_role != st.session_state.section_roles.get(section):
+                            st.session_state.section_roles[section] = new_role
+                            mark_changed(st.session_state.section_roles)
 
                     with cols[2]:
                         # Move section up
@@ -195,6 +210,7 @@ def render_prompt_structure():
                                 temp = st.session_state.prompt_section_order[i]
                                 st.session_state.prompt_section_order[i] = st.session_state.prompt_section_order[i - 1]
                                 st.session_state.prompt_section_order[i - 1] = temp
+                                mark_changed(st.session_state.prompt_section_order)
                                 st.rerun()
 
                     with cols[3]:
@@ -205,6 +221,7 @@ def render_prompt_structure():
                                 temp = st.session_state.prompt_section_order[i]
                                 st.session_state.prompt_section_order[i] = st.session_state.prompt_section_order[i + 1]
                                 st.session_state.prompt_section_order[i + 1] = temp
+                                mark_changed(st.session_state.prompt_section_order)
                                 st.rerun()
 
                     with cols[4]:
@@ -213,11 +230,14 @@ def render_prompt_structure():
                             if st.button("×", key=f"delete_{i}"):
                                 # Remove this section
                                 section_name = st.session_state.prompt_section_order.pop(i)
+                                mark_changed(st.session_state.prompt_section_order)
                                 # Also remove from prompt structure and roles if present
                                 if section_name in st.session_state.prompt_structure:
                                     del st.session_state.prompt_structure[section_name]
+                                    mark_changed(st.session_state.prompt_structure)
                                 if section_name in st.session_state.section_roles:
                                     del st.session_state.section_roles[section_name]
+                                    mark_changed(st.session_state.section_roles)
                                 st.rerun()
 
         # Allow adding custom sections
@@ -230,4 +250,6 @@ def render_prompt_structure():
                     st.session_state.prompt_structure[custom_section] = True
                     st.session_state.prompt_section_order.append(custom_section)
                     st.session_state.section_roles[custom_section] = custom_role
+                    mark_changed(st.session_state.prompt_structure, st.session_state.prompt_section_order,
+                                 st.session_state.section_roles)
                     st.rerun()
\ No newline at end of file
@@ -1,5 +1,6 @@
 import streamlit as st
 from utils.ui_helpers import section_with_info, subsection_header
+from models.prompt_spec import mark_changed
 
 
 def render_chain_of_thought_section():
@@ -59,30 +60,36 @@ def render_chain_of_thought_section():
 
                 with cols[0]:
                     updated_step = st.text_input(f"Step {i + 1}", value=step, key=f"step_{i}")
-                    st.session_state.chain_of_thought_steps[i] = updated_step
+                    if updated_step != step:
+                        st.session_state.chain_of_thought_steps[i] = updated_step
+                        mark_changed(st.session_state.chain_of_thought_steps)
 
                 with cols[1]:
                     if i > 0 and st.button("↑", key=f"cot_move_up_{i}"):
                         # Swap with previous step
                         st.session_state.chain_of_thought_steps[i], st.session_state.chain_of_thought_steps[i - 1] = \
                             st.session_state.chain_of_thought_steps[i - 1], st.session_state.chain_of_thought_steps[i]
+                        mark_changed(st.session_state.chain_of_thought_steps)
                         st.rerun()
 
                     if i < len(st.session_state.chain_of_thought_steps) - 1 and st.button("↓", key=f"cot_move_down_{i}"):
                         # Swap with next step
                         st.session_state.chain_of_thought_steps[i], st.session_state.chain_of_thought_steps[i + 1] = \
                             st.session_state.chain_of_thought_steps[i + 1], st.session_state.chain_of_thought_steps[i]
+                        mark_changed(st.session_state.chain_of_thought_steps)
                         st.rerun()
 
                     if len(st.session_state.chain_of_thought_steps) > 1 and st.button("×", key=f"cot_delete_{i}"):
                         # Remove this step
                         st.session_state.chain_of_thought_steps.pop(i)
+                        mark_changed(st.session_state.chain_of_thought_steps)
                         st.rerun()
 
             # Add step button
             if st.button("+ Add Step", key="cot_add_step_btn"):
                 st.session_state.chain_of_thought_steps.append(
                     f"New step {len(st.session_state.chain_of_thought_steps) + 1}")
+                mark_changed(st.session_state.chain_of_thought_steps)
                 st.rerun()
 
         with col2:
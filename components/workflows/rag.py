@@ -1,5 +1,17 @@
 import streamlit as st
 from utils.ui_helpers import section_with_info, subsection_header
+from utils.shared_resources import get_dense_retriever, get_ingest_pool, get_retrieval_index
+from models.prompt_generator import retrieval_query, retrieve_chunks
+from models.prompt_spec import PromptSpec
+from models.retrieval import EMBEDDING_RETRIEVAL, KEYWORD_RETRIEVAL, RETRIEVAL_METHODS
+from models.retrieval.ingest import KNOWLEDGE_EXTENSIONS, INDEXED, SKIPPED, FAILED, IngestionJob
+
+# Knowledge file types ingested into the index (PDF and Word files need pypdf and python-docx)
+KNOWLEDGE_FILE_TYPES = list(KNOWLEDGE_EXTENSIONS)
+
+# Retrieval settings and their defaults
+RAG_SETTINGS = {"rag_num_chunks": 3, "rag_chunk_size": 512, "rag_relevance_threshold": 0.75,
+                "rag_retrieval_method": KEYWORD_RETRIEVAL}
 
 
 def render_rag_section():
@@ -36,6 +48,11 @@ def render_rag_section():
     )
 
     if rag_enabled:
+        # Slider settings are read by the prompt generator, so they outlive the widgets
+        for key, default in RAG_SETTINGS.items():
+            if key not in st.session_state:
+                st.session_state[key] = default
+
         col1, col2 = st.columns([2, 1])
 
         with col1:
@@ -98,29 +115,37 @@ def render_rag_section():
             # Retrieval configuration
             st.markdown("#### Retrieval Configuration")
 
+            st.selectbox(
+                "Retrieval Method",
+                RETRIEVAL_METHODS,
+                help="Keyword search ranks chunks by BM25; embedding search by cosine similarity of "
+                     "locally computed hashing embeddings, which also matches word pairs",
+                key="rag_retrieval_method"
+            )
+
             st.slider(
                 "Number of Chunks to Retrieve",
                 min_value=1,
                 max_value=10,
-                value=3,
-                help="Maximum number of text chunks to retrieve per query"
+                help="Maximum number of text chunks to retrieve per query",
+                key="rag_num_chunks"
             )
 
             st.slider(
                 "Chunk Size (tokens)",
                 min_value=256,
                 max_value=2048,
-                value=512,
                 step=128,
-                help="Size of each retrieved chunk in tokens"
+                help="Size of each indexed chunk in tokens (applies to files indexed afterwards)",
+                key="rag_chunk_size"
             )
 
             st.slider(
                 "Relevance Threshold",
                 min_value=0.5,
                 max_value=0.95,
-                value=0.75,
-                help="Minimum relevance score for retrieved chunks"
+                help="Minimum relevance of a retrieved chunk, relative to the best match",
+                key="rag_relevance_threshold"
             )
 
             # Integration settings
@@ -151,90 +176,28 @@ def render_rag_section():
                 help="Apply re-ranking to improve relevance of retrieved information"
             )
 
-        # Example of how this workflow would be used
+        # Example of how this workflow is implemented
         with st.expander("Example Implementation", expanded=False):
             st.code("""
-# Example Python implementation of RAG workflow
-def rag_workflow(input_text, knowledge_sources, num_chunks=3, relevance_threshold=0.75):
-    # Step 1: Generate retrieval queries based on input
-    query_generation_prompt = f\"\"\"
-    Generate specific search queries to retrieve information related to:
-
-    {input_text}
-
-    Return 1-3 search queries that would help answer this question.
-    \"\"\"
-
-    query_response = llm_call(query_generation_prompt)
-    search_queries = parse_queries(query_response)
-
-    # Step 2: Retrieve relevant information
-    retrieved_chunks = []
-    for query in search_queries:
-        for source in [s for s in knowledge_sources if s["enabled"]]:
-            # Perform vector search in the knowledge source
-            source_chunks = vector_search(
-                query=query,
-                source=source["type"],
-                num_results=num_chunks,
-                threshold=relevance_threshold
-            )
+# The RAG workflow as run by the prompt generator
+from models.retrieval import BM25Index, DenseIndex, DenseRetriever, context_entries
 
-            if source_chunks:
-                retrieved_chunks.extend([
-                    {
-                        "content": chunk["text"],
-                        "source": source["type"],
-                        "relevance": chunk["score"]
-                    }
-                    for chunk in source_chunks
-                ])
+index = BM25Index(path=".cache/knowledge.sqlite")
 
-    # Deduplicate and sort by relevance
-    unique_chunks = deduplicate_chunks(retrieved_chunks)
-    top_chunks = sorted(unique_chunks, key=lambda x: x["relevance"], reverse=True)[:num_chunks]
+# Step 1: Index knowledge files (chunked with overlap, re-adding a doc_id replaces it)
+index.add_document(doc_id, text, source="handbook.md", chunk_size=512)
 
-    # Step 3: Generate augmented response with retrieved information
-    augmented_prompt = f\"\"\"
-    Based on the following information and your knowledge, answer the question:
+# Step 2: Retrieve the best chunks for the prompt's task and content description,
+# by keyword or by embedding similarity (embeddings of the same chunks, memory-mapped)
+retriever = index if keyword_search else DenseRetriever(index, DenseIndex(".cache/knowledge_vectors"))
+results = retriever.search(query, k=num_chunks, threshold=relevance_threshold)
 
-    Question: {input_text}
-
-    Retrieved Information:
-    {format_retrieved_chunks(top_chunks)}
-
-    Provide a comprehensive answer that incorporates the retrieved information.
-    Include citations to the source when using retrieved information.
-    \"\"\"
-
-    augmented_response = llm_call(augmented_prompt)
-
-    return {
-        "response": augmented_response,
-        "retrieved_chunks": top_chunks,
-        "queries_used": search_queries
-    }
+# Step 3: Inject them as the "Retrieved Context" section of the prompt
+retrieved_context = tuple(tuple(entry.items()) for entry in context_entries(results))
+spec = dataclasses.replace(spec, retrieved_context=retrieved_context)
             """, language="python")
 
-        # File upload for knowledge sources
-        st.markdown("#### Upload Knowledge Source Files")
-
-        uploaded_files = st.file_uploader(
-            "Upload documents to use as knowledge sources",
-            accept_multiple_files=True,
-            type=["pdf", "txt", "docx", "csv", "json", "md"]
-        )
-
-        if uploaded_files:
-            st.success(f"Uploaded {len(uploaded_files)} files to use as knowledge sources!")
-
-            with st.expander("Processing Settings", expanded=False):
-                st.checkbox("Chunk documents automatically", value=True)
-                st.checkbox("Extract metadata from documents", value=True)
-                st.selectbox(
-                    "Document Embedding Model",
-                    ["Default Embedding", "OpenAI Embeddings", "Custom Embedding Model"]
-                )
+        render_knowledge_base()
 
         # Best practices
         with st.expander("When To Use This Workflow", expanded=False):
@@ -261,4 +224,114 @@ def rag_workflow(input_text, knowledge_sources, num_chunks=3, relevance_threshol
             It's particularly valuable for specialized topics or when factual accuracy is critical."*
 
             — Anthropic Engineering
-            """)
\ No newline at end of file
+            """)
+
+def render_knowledge_base():
+    """Render the knowledge file upload, the indexed documents and a retrieval test"""
+    index = get_retrieval_index()
+
+    st.markdown("#### Upload Knowledge Source Files")
+
+    uploaded_files = st.file_uploader(
+        "Upload documents to use as knowledge sources",
+        accept_multiple_files=True,
+        type=KNOWLEDGE_FILE_TYPES,
+        key="rag_uploaded_files"
+    )
+
+    # Files are ingested once per attachment; files attached while a job runs wait for the next one
+    if uploaded_files and st.session_state.get("rag_ingestion_job") is None:
+        ingested_files = st.session_state.setdefault("rag_indexed_files", set())
+        new_files = [uploaded_file for uploaded_file in uploaded_files
+                     if (getattr(uploaded_file, "file_id", None) or uploaded_file.name) not in ingested_files]
+
+        if new_files:
+            # Embedding the new chunks up front only pays off when embedding search is selected
+            retriever = (get_dense_retriever()
+                         if st.session_state.get("rag_retrieval_method") == EMBEDDING_RETRIEVAL else None)
+            st.session_state.rag_ingestion_job = IngestionJob(
+                index,
+                [(uploaded_file.name, uploaded_file.getvalue()) for uploaded_file in new_files],
+                chunk_size=st.session_state.get("rag_chunk_size"),
+                retriever=retriever,
+                executor=get_ingest_pool()
+            )
+            st.session_state.rag_last_ingestion = None
+            ingested_files.update(getattr(uploaded_file, "file_id", None) or uploaded_file.name
+                                  for uploaded_file in new_files)
+
+    if st.session_state.get("rag_ingestion_job") is not None:
+        render_ingestion_status()
+    elif st.session_state.get("rag_last_ingestion") is not None:
+        render_ingestion_report(st.session_state.rag_last_ingestion)
+
+    documents = index.documents()
+    if documents:
+        stats = index.stats()
+        duplicates = f", {stats['duplicates']} near-duplicates collapsed" if stats["duplicates"] else ""
+        st.markdown(f"#### Knowledge Base ({stats['documents']} documents, {stats['chunks']} chunks{duplicates})")
+
+        for document in documents:
+            cols = st.columns([4, 1, 1])
+            with cols[0]:
+                st.markdown(f"**{document['source'] or document['doc_id']}**")
+            with cols[1]:
+                st.caption(f"{document['chunks']} chunks"
+                           + (f" ({document['duplicates']} duplicates)" if document["duplicates"] else ""))
+            with cols[2]:
+                if st.button("Remove", key=f"rag_remove_doc_{document['doc_id']}"):
+                    index.delete_document(document["doc_id"])
+                    st.rerun()
+
+        query = st.text_input("Test retrieval", value=retrieval_query(PromptSpec.from_session_state(st.session_state)),
+                              key="rag_test_query",
+                              help="Chunks retrieved for this query (defaults to the prompt's task)")
+        if query:
+            results = retrieve_chunks(query)
+            if not results:
+                st.info("No chunk passes the relevance threshold.")
+            for result in results:
+                with st.container(border=True):
+                    st.caption(f"{result.source} · part {result.position + 1} · relevance {result.relevance:.2f}")
+                    st.markdown(result.text)
+    else:
+        st.info("Upload text, Markdown, CSV, JSON, PDF or Word files to build the knowledge base.")
+
+
+@st.fragment(run_every=0.5)
+def render_ingestion_status():
+    """Show the per-file progress of the running knowledge ingestion"""
+    job = st.session_state.get("rag_ingestion_job")
+    if job is None:
+        return
+
+    if not job.done:
+        total = len(job.files)
+        st.progress(job.processed / total, text=f"Ingesting knowledge files ({job.phase})... "
+                                                f"{job.processed}/{total} files")
+        for status in job.files:
+            st.caption(f"{status['name']}: {status['status']}")
+        return
+
+    # The finished job is reported by the full rerun, which also lists the new documents
+    st.session_state.rag_ingestion_job = None
+    st.session_state.rag_last_ingestion = job
+    st.rerun()
+
+
+def render_ingestion_report(job: IngestionJob):
+    """Summarize a finished knowledge ingestion"""
+    if job.error is not None:
+        st.error(f"Ingestion failed: {job.error}")
+        return
+
+    indexed = [status for status in job.files if status["status"] == INDEXED]
+    skipped = sum(1 for status in job.files if status["status"] == SKIPPED)
+    if indexed:
+        st.success(f"Indexed {len(indexed)} files ({sum(status['chunks'] for status in indexed)} chunks) "
+                   f"as knowledge sources!")
+    if skipped:
+        st.info(f"Skipped {skipped} files already in the knowledge base.")
+    for status in job.files:
+        if status["status"] == FAILED:
+            st.warning(f"Could not ingest {status['name']}: {status['error']}")
@@ -1,50 +1,172 @@
 import os
+import re
+import copy
+import time
+import asyncio
+import functools
+import inspect
 import requests
 import json
 import logging
-from typing import Dict, Any, Optional, List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Any, Optional, List, Callable, Iterator, Tuple
+
+from models.http_pool import SessionPool, get_session_pool
+from models.response_cache import ResponseCache, make_cache_key
+from models.single_flight import SingleFlight, get_single_flight
+from models.tokenizer import count_tokens
+from models.providers import ProviderAdapter, ProviderError, SystemPrompt, get_adapter, iter_sse_events
+from models.rate_limiter import (
+    RateLimiter,
+    RateLimiterRegistry,
+    RateLimitExceeded,
+    RETRYABLE_STATUS_CODES,
+    get_rate_limiters,
+    compute_backoff,
+    parse_retry_after
+)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Default number of requests batch_generate keeps in flight
+DEFAULT_BATCH_CONCURRENCY = int(os.environ.get("LLM_BATCH_CONCURRENCY", 8))
+
+# Default number of retries for rate-limited or transient failures
+DEFAULT_MAX_RETRIES = int(os.environ.get("LLM_MAX_RETRIES", 3))
+
+# Provider message-batch settings: requests per submitted job and status polling bounds
+DEFAULT_BATCH_JOB_SIZE = int(os.environ.get("LLM_BATCH_JOB_SIZE", 10000))
+DEFAULT_BATCH_POLL_INTERVAL = float(os.environ.get("LLM_BATCH_POLL_INTERVAL", 5))
+DEFAULT_BATCH_MAX_POLL_INTERVAL = float(os.environ.get("LLM_BATCH_MAX_POLL_INTERVAL", 120))
+
+# Whether to mark the system prompt for provider-side prompt caching
+DEFAULT_PROMPT_CACHING = os.environ.get("LLM_PROMPT_CACHING", "1").lower() not in ("0", "false", "no")
+
+# custom_id of a batch results line that is not valid JSON (e.g. truncated)
+_CUSTOM_ID_RE = re.compile(r'"custom_id"\s*:\s*"([^"]+)"')
+
+# custom_id given to each batch request by submit_batch
+_BATCH_ITEM_RE = re.compile(r"item-(\d+)")
+
 
 class ContentGenerator:
     """
     A class to handle content generation using LLM APIs
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self,
+                 api_key: Optional[str] = None,
+                 provider: str = "anthropic",
+                 base_url: Optional[str] = None,
+                 session_pool: Optional[SessionPool] = None,
+                 cache: Optional[ResponseCache] = None,
+                 rate_limiters: Optional[RateLimiterRegistry] = None,
+                 max_retries: int = DEFAULT_MAX_RETRIES,
+                 prompt_caching: bool = DEFAULT_PROMPT_CACHING,
+                 single_flight: Optional[SingleFlight] = None):
         """
         Initialize the content generator
         
         Args:
             api_key: API key for the LLM provider (defaults to env variable)
+            provider: Backend to send requests to ("anthropic", "openai" or "local")
+            base_url: Optional endpoint URL override for the provider
+            session_pool: Pooled HTTP sessions to send requests through
+                (defaults to the process-wide pool)
+            cache: Optional response cache consulted before calling the provider
+            rate_limiters: Per provider/model request and token budgets
+                (defaults to the process-wide registry)
+            max_retries: Number of retries for rate-limited or transient failures
+            prompt_caching: Mark the system prompt as a cacheable prefix on providers
+                that support prompt caching
+            single_flight: Registry used to coalesce identical in-flight requests
+                (defaults to the process-wide registry)
         """
-        # Try to get API key from environment if not provided
-        self.api_key = api_key or os.environ.get("LLM_API_KEY")
+        # Provider adapter that builds requests and parses responses
+        # (try to get API key from environment if not provided)
+        self.adapter: ProviderAdapter = get_adapter(
+            provider,
+            api_key=api_key or os.environ.get("LLM_API_KEY"),
+            base_url=base_url
+        )
+        
+        # Share keep-alive connections with every other generator in the process
+        self.session_pool = session_pool or get_session_pool()
+        self.cache = cache
+        
+        # Concurrent identical requests share one upstream call
+        self.single_flight = single_flight or get_single_flight()
+        
+        # Client-side throttling and retry policy
+        self.rate_limiters = rate_limiters or get_rate_limiters()
+        self.max_retries = max_retries
+        self.retry_base_delay = 1.0
+        self.retry_max_delay = 60.0
+        
+        # Provider-side caching of the stable system prompt prefix
+        self.prompt_caching = prompt_caching
         
         # Default settings
-        self.default_model = "claude-3-5-sonnet"
-        self.base_url = "https://api.anthropic.com/v1/messages"
+        self.default_model = self.adapter.default_model
         self.max_tokens = 4000
         self.temperature = 0.7
     
+    @property
+    def api_key(self) -> Optional[str]:
+        """API key sent to the provider"""
+        return self.adapter.api_key
+    
+    @api_key.setter
+    def api_key(self, value: Optional[str]):
+        self.adapter.api_key = value
+    
+    @property
+    def base_url(self) -> str:
+        """The provider endpoint requests are sent to"""
+        return self.adapter.base_url
+    
+    @base_url.setter
+    def base_url(self, value: str):
+        self.adapter.base_url = value
+    
+    @property
+    def capabilities(self) -> Dict[str, bool]:
+        """Optional features (streaming, batching, prompt caching) of the current provider"""
+        return self.adapter.capabilities()
+    
+    def _is_simulated(self) -> bool:
+        """Whether requests fall back to simulation because no API key is available"""
+        return self.adapter.requires_api_key and not self.api_key
+    
     def generate(self, 
                 prompt: str, 
+                system_prompt: Optional[SystemPrompt] = None,
                 model: Optional[str] = None,
                 max_tokens: Optional[int] = None,
                 temperature: Optional[float] = None,
-                additional_params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+                additional_params: Optional[Dict[str, Any]] = None,
+                use_cache: Optional[bool] = None,
+                wait_for_capacity: bool = True,
+                coalesce: bool = True) -> Dict[str, Any]:
         """
         Generate content using the LLM API
         
         Args:
-            prompt: The prompt to send to the LLM
-            model: The model to use (defaults to claude-3-5-sonnet)
+            prompt: The prompt to send to the LLM as the user message
+            system_prompt: Optional system prompt sent alongside the user message, or its
+                (invariant prefix, per-prompt rest) parts
+            model: The model to use (defaults to the provider's default model)
             max_tokens: Maximum tokens in the response
             temperature: Temperature parameter for generation
             additional_params: Any additional parameters to pass to the API
+            use_cache: True forces the response cache, False bypasses it and None
+                lets the cache decide (sampled runs with temperature > 0 bypass it)
+            wait_for_capacity: Queue until the rate limiter has capacity instead of
+                failing immediately when the budget is exhausted
+            coalesce: Share the result of an identical request already in flight
+                instead of sending a duplicate (metadata["coalesced"] marks shared results)
             
         Returns:
             Dict containing the response and metadata
@@ -52,61 +174,45 @@ class ContentGenerator:
         # Use default values if not specified
         model = model or self.default_model
         max_tokens = max_tokens or self.max_tokens
-        temperature = temperature or self.temperature
+        temperature = self.temperature if temperature is None else temperature
         
         # Check if API key is available
-        if not self.api_key:
+        if self._is_simulated():
             logger.warning("No API key available. Using simulated response.")
             return self._simulate_response(prompt)
         
         # Prepare API request
-        headers = {
-            "Content-Type": "application/json",
-            "x-api-key": self.api_key,
-            "anthropic-version": "2023-06-01"
-        }
-        
-        # Prepare request data
-        data = {
-            "model": model,
-            "messages": [{"role": "user", "content": prompt}],
-            "max_tokens": max_tokens,
-            "temperature": temperature
-        }
+        data = self._build_request(prompt, model, max_tokens, temperature, system_prompt, additional_params)
         
-        # Add any additional parameters
-        if additional_params:
-            data.update(additional_params)
+        # Serve identical requests from the response cache
+        cache_key = self._cache_key(data, temperature, use_cache)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving LLM response from cache")
+                cached["metadata"]["cache_hit"] = True
+                return cached
         
         try:
-            # Make API request
-            logger.info(f"Sending request to LLM API with {len(prompt)} chars")
-            response = requests.post(
-                self.base_url,
-                headers=headers,
-                json=data
-            )
-            
-            # Check if request was successful
-            response.raise_for_status()
+            if coalesce:
+                output, shared = self.single_flight.do(
+                    self._flight_key(data),
+                    lambda: self._request(data, model, wait_for_capacity)
+                )
+                # Every caller gets its own copy of a shared result
+                output = copy.deepcopy(output)
+                output["metadata"]["coalesced"] = shared
+            else:
+                output, shared = self._request(data, model, wait_for_capacity), False
             
-            # Parse response
-            result = response.json()
-            logger.info("Successfully received LLM API response")
+            if cache_key:
+                if not shared:
+                    self.cache.set(cache_key, output)
+                output["metadata"]["cache_hit"] = False
             
-            return {
-                "success": True,
-                "content": result.get("content", [{"text": "No content returned"}])[0]["text"],
-                "model": model,
-                "usage": result.get("usage", {}),
-                "metadata": {
-                    "prompt_tokens": result.get("usage", {}).get("input_tokens", 0),
-                    "completion_tokens": result.get("usage", {}).get("output_tokens", 0),
-                    "total_tokens": result.get("usage", {}).get("total_tokens", 0),
-                }
-            }
+            return output
         
-        except requests.exceptions.RequestException as e:
+        except (requests.exceptions.RequestException, RateLimitExceeded, ProviderError) as e:
             logger.error(f"API request failed: {str(e)}")
             return {
                 "success": False,
@@ -115,6 +221,412 @@ class ContentGenerator:
                 "model": model
             }
     
+    def _request(self, data: Dict[str, Any], model: str, wait_for_capacity: bool) -> Dict[str, Any]:
+        """
+        Send one non-streaming request and parse the response
+        
+        Args:
+            data: The request body
+            model: The model the request is for
+            wait_for_capacity: Queue for rate-limit capacity instead of failing
+            
+        Returns:
+            Dict containing the response and metadata
+        """
+        logger.info(f"Sending request to LLM API with {len(json.dumps(data))} bytes")
+        response = self._post(data, model, wait_for_capacity=wait_for_capacity)
+        
+        # Parse response
+        result = response.json()
+        logger.info("Successfully received LLM API response")
+        
+        content, usage = self.adapter.parse_response(result)
+        
+        return {
+            "success": True,
+            "content": content,
+            "model": model,
+            "usage": usage,
+            "metadata": self._usage_metadata(usage)
+        }
+    
+    def generate_stream(self,
+                        prompt: str,
+                        system_prompt: Optional[SystemPrompt] = None,
+                        model: Optional[str] = None,
+                        max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None,
+                        additional_params: Optional[Dict[str, Any]] = None,
+                        use_cache: Optional[bool] = None,
+                        wait_for_capacity: bool = True,
+                        coalesce: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Generate content using the LLM API, yielding text as it is produced
+        
+        The provider's server-sent-event stream is parsed incrementally. Each text
+        delta is yielded as {"type": "text", "text": ...}; the stream always ends
+        with a single {"type": "done", ...} event carrying the same fields as the
+        dict returned by generate() plus "time_to_first_token" in its metadata.
+        Identical streams already in flight are shared: every caller receives the
+        full sequence of deltas from the one upstream request.
+        
+        Args:
+            prompt: The prompt to send to the LLM as the user message
+            system_prompt: Optional system prompt sent alongside the user message, or its
+                (invariant prefix, per-prompt rest) parts
+            model: The model to use (defaults to the provider's default model)
+            max_tokens: Maximum tokens in the response
+            temperature: Temperature parameter for generation
+            additional_params: Any additional parameters to pass to the API
+            use_cache: True forces the response cache, False bypasses it and None
+                lets the cache decide (a cache hit is yielded as a single delta)
+            wait_for_capacity: Queue until the rate limiter has capacity instead of
+                failing immediately when the budget is exhausted
+            coalesce: Join an identical stream already in flight instead of sending
+                a duplicate request
+            
+        Yields:
+            Dicts describing text deltas and the final result
+        """
+        model = model or self.default_model
+        max_tokens = max_tokens or self.max_tokens
+        temperature = self.temperature if temperature is None else temperature
+        start_time = time.time()
+
+        # Stream the simulated response word by word when no API key is available
+        if self._is_simulated():
+            logger.warning("No API key available. Using simulated response.")
+            result = self._simulate_response(prompt)
+            for word in re.findall(r"\S+\s*", result["content"]):
+                yield {"type": "text", "text": word}
+            result["metadata"]["time_to_first_token"] = time.time() - start_time
+            yield {"type": "done", **result}
+            return
+
+        data = self._build_request(prompt, model, max_tokens, temperature, system_prompt, additional_params)
+
+        # Cached responses are keyed on the non-streaming request body
+        cache_key = self._cache_key(data, temperature, use_cache)
+        if cache_key:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info("Serving LLM response from cache")
+                cached["metadata"]["cache_hit"] = True
+                cached["metadata"]["time_to_first_token"] = time.time() - start_time
+                yield {"type": "text", "text": cached["content"]}
+                yield {"type": "done", **cached}
+                return
+
+        # Providers without streaming support return the whole response as one delta
+        if not self.adapter.supports_streaming:
+            result = self.generate(prompt, system_prompt, model, max_tokens, temperature, additional_params,
+                                   use_cache=False, wait_for_capacity=wait_for_capacity)
+            result.setdefault("metadata", {})["time_to_first_token"] = time.time() - start_time
+            yield {"type": "text", "text": result["content"]}
+            yield {"type": "done", **result}
+            return
+
+        data = self.adapter.enable_streaming(data)
+
+        if coalesce:
+            events, shared = self.single_flight.stream(
+                self._flight_key(data),
+                lambda: self._stream_events(data, model, prompt, cache_key, wait_for_capacity)
+            )
+        else:
+            events, shared = self._stream_events(data, model, prompt, cache_key, wait_for_capacity), False
+
+        time_to_first_token = None
+        for event in events:
+            if event["type"] == "text" and time_to_first_token is None:
+                time_to_first_token = time.time() - start_time
+
+            if event["type"] == "done":
+                # Timing is per caller; the rest of the result may be shared
+                event = copy.deepcopy(event)
+                event.setdefault("metadata", {})["time_to_first_token"] = time_to_first_token
+                event["metadata"]["coalesced"] = shared
+
+            yield event
+
+    def _stream_events(self,
+                       data: Dict[str, Any],
+                       model: str,
+                       prompt: str,
+                       cache_key: Optional[str],
+                       wait_for_capacity: bool) -> Iterator[Dict[str, Any]]:
+        """
+        Send one streaming request and translate the provider's events
+        
+        Args:
+            data: The streaming request body
+            model: The model the request is for
+            prompt: The user prompt (for the fallback response on failure)
+            cache_key: Response cache key to store the completed result under, if any
+            wait_for_capacity: Queue for rate-limit capacity instead of failing
+            
+        Yields:
+            Text delta events followed by one "done" event
+        """
+        chunks = []
+        usage: Dict[str, Any] = {}
+        stop_reason = None
+
+        try:
+            logger.info(f"Streaming request to LLM API with {len(prompt)} chars")
+            response = self._post(data, model, stream=True, wait_for_capacity=wait_for_capacity)
+
+            with response:
+                for event, payload in iter_sse_events(response.iter_lines(decode_unicode=True)):
+                    delta = self.adapter.parse_stream_event(event, payload)
+
+                    if delta.get("usage"):
+                        usage.update(delta["usage"])
+
+                    if delta.get("stop_reason"):
+                        stop_reason = delta["stop_reason"]
+
+                    text = delta.get("text")
+                    if text:
+                        chunks.append(text)
+                        yield {"type": "text", "text": text}
+
+                    if delta.get("done"):
+                        break
+
+            metadata = self._usage_metadata(usage)
+            metadata["stop_reason"] = stop_reason
+
+            output = {
+                "success": True,
+                "content": "".join(chunks),
+                "model": model,
+                "usage": usage,
+                "metadata": metadata
+            }
+
+            if stop_reason is None:
+                # The stream ended without the provider's stop event, so the content may be truncated
+                logger.warning("API stream ended without a stop reason; not caching the response")
+            elif cache_key:
+                self.cache.set(cache_key, output)
+                metadata["cache_hit"] = False
+
+            yield {"type": "done", **output}
+
+        except (requests.exceptions.RequestException, RateLimitExceeded, ProviderError, ValueError) as e:
+            # ValueError covers malformed JSON in an event's data
+            logger.error(f"API stream failed: {str(e)}")
+            yield {
+                "type": "done",
+                "success": False,
+                "error": str(e),
+                "content": "".join(chunks) or self._fallback_response(prompt),
+                "model": model,
+                "metadata": {}
+            }
+
+    def _post(self,
+              data: Dict[str, Any],
+              model: str,
+              stream: bool = False,
+              wait_for_capacity: bool = True) -> requests.Response:
+        """
+        Send a request to the provider within its rate limits, retrying transient failures
+        
+        Each attempt first takes capacity from the provider/model rate limiter.
+        Rate-limited (429/529), transient 5xx responses and connection errors are
+        retried with exponential backoff and jitter, honoring Retry-After; a 429
+        or 529 also pauses the limiter so concurrent callers back off together.
+        
+        Args:
+            data: The request body
+            model: The model the request is for
+            stream: Whether to stream the response body
+            wait_for_capacity: Queue for rate-limit capacity instead of failing
+            
+        Returns:
+            The successful HTTP response
+            
+        Raises:
+            requests.exceptions.RequestException: If the request still fails after all retries
+            RateLimitExceeded: If wait_for_capacity is False and the budget is exhausted
+        """
+        limiter = self.rate_limiters.get(self.adapter.name, model)
+        estimated_tokens = self._estimate_request_tokens(data)
+
+        return self._send("POST", self.base_url, json=data, stream=stream,
+                          limiter=limiter, tokens=estimated_tokens, wait_for_capacity=wait_for_capacity)
+
+    def _send(self,
+              method: str,
+              url: str,
+              limiter: Optional[RateLimiter] = None,
+              tokens: int = 0,
+              wait_for_capacity: bool = True,
+              **kwargs) -> requests.Response:
+        """
+        Send one HTTP request to the provider through the session pool with retries
+        
+        Args:
+            method: HTTP method
+            url: Request URL
+            limiter: Rate limiter to take capacity from before each attempt (None to skip)
+            tokens: Estimated tokens of the request for the limiter
+            wait_for_capacity: Queue for rate-limit capacity instead of failing
+            **kwargs: Additional arguments for the request (json, stream, ...)
+            
+        Returns:
+            The successful HTTP response
+        """
+        attempt = 0
+
+        while True:
+            if limiter is not None:
+                limiter.acquire(tokens, block=wait_for_capacity)
+
+            try:
+                response = self.session_pool.request(
+                    method,
+                    url,
+                    headers=self.adapter.build_headers(),
+                    **kwargs
+                )
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = compute_backoff(attempt, self.retry_base_delay, self.retry_max_delay)
+                logger.warning(f"LLM API connection failed ({str(e)}), retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            if response.status_code in RETRYABLE_STATUS_CODES and attempt < self.max_retries:
+                retry_after = parse_retry_after(response.headers.get("retry-after"))
+                delay = compute_backoff(attempt, self.retry_base_delay, self.retry_max_delay, retry_after)
+                response.close()
+
+                if limiter is not None and response.status_code in (429, 529):
+                    limiter.pause(delay)
+
+                logger.warning(f"LLM API returned {response.status_code}, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+            response.raise_for_status()
+            return response
+
+    def _build_request(self,
+                       prompt: str,
+                       model: str,
+                       max_tokens: int,
+                       temperature: float,
+                       system_prompt: Optional[SystemPrompt],
+                       additional_params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Build the provider request body, marking the system prompt for prompt caching
+        
+        Args:
+            prompt: The user message
+            model: The model to use
+            max_tokens: Maximum tokens in the response
+            temperature: Temperature parameter for generation
+            system_prompt: Optional system message, or its (invariant prefix, per-prompt rest) parts
+            additional_params: Any additional parameters to pass to the API
+            
+        Returns:
+            The request body
+        """
+        cache_system_prompt = self.prompt_caching and self.adapter.supports_prompt_caching
+        return self.adapter.build_request(prompt, model, max_tokens, temperature, system_prompt,
+                                          additional_params, cache_system_prompt=cache_system_prompt)
+
+    @staticmethod
+    def _estimate_request_tokens(data: Dict[str, Any]) -> int:
+        """
+        Estimate the tokens a request will consume against the tokens-per-minute budget
+        
+        Args:
+            data: The request body
+            
+        Returns:
+            Estimated input token count plus the requested max_tokens
+        """
+        system = data.get("system", "")
+        if isinstance(system, list):
+            # System prompt given as content blocks (e.g. with cache breakpoints)
+            system = "".join(block.get("text", "") for block in system)
+        
+        model = data.get("model")
+        input_tokens = count_tokens(system, model)
+        input_tokens += sum(count_tokens(str(m.get("content", "")), model) for m in data.get("messages", []))
+        return input_tokens + int(data.get("max_tokens", 0))
+
+    def _flight_key(self, request_data: Dict[str, Any]) -> str:
+        """
+        Get the key identifying duplicate in-flight requests
+        
+        The request headers are part of the key, so a request is only shared
+        with callers using the same credentials and never hands one session's
+        result (or authentication error) to another.
+        
+        Args:
+            request_data: The request body that will be sent to the provider
+            
+        Returns:
+            Hash of the endpoint, headers and request body
+        """
+        return make_cache_key({"body": request_data, "headers": self.adapter.build_headers()},
+                              namespace=self.base_url)
+
+    def _cache_key(self,
+                   request_data: Dict[str, Any],
+                   temperature: float,
+                   use_cache: Optional[bool]) -> Optional[str]:
+        """
+        Get the response cache key for a request, or None if the cache is bypassed
+        
+        Args:
+            request_data: The request body that would be sent to the provider
+            temperature: Sampling temperature of the request
+            use_cache: Per-call cache override passed to generate()
+            
+        Returns:
+            The cache key, or None when there is no cache or it should be skipped
+        """
+        if self.cache is None or self.cache.should_bypass(temperature, use_cache):
+            return None
+        # Keyed like in-flight requests, so responses are never served across credentials
+        return self._flight_key(request_data)
+
+    @staticmethod
+    def _usage_metadata(usage: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Convert a provider usage block into generation metadata
+        
+        Args:
+            usage: The usage dict returned by the provider
+            
+        Returns:
+            Dict with prompt, completion and total token counts, and how many
+            prompt tokens were written to or read from the provider's prompt cache
+        """
+        cache_creation_tokens = usage.get("cache_creation_input_tokens") or 0
+        cache_read_tokens = usage.get("cache_read_input_tokens") or 0
+        
+        # input_tokens only counts the uncached part of the prompt
+        prompt_tokens = usage.get("input_tokens", 0) + cache_creation_tokens + cache_read_tokens
+        completion_tokens = usage.get("output_tokens", 0)
+        
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": usage.get("total_tokens", prompt_tokens + completion_tokens),
+            "cache_creation_input_tokens": cache_creation_tokens,
+            "cache_read_input_tokens": cache_read_tokens,
+        }
+    
     def _simulate_response(self, prompt: str) -> Dict[str, Any]:
         """
         Simulate a response when API is not available
@@ -175,14 +687,17 @@ At its core, Agile is built on four key values from the Agile Manifesto:
 This is just a simulated response. Connect to a real LLM API for high-quality content generation.
 """
 
+        prompt_tokens = count_tokens(prompt)
+        completion_tokens = count_tokens(content)
+
         return {
             "success": True,
             "content": content,
             "model": "simulated-model",
             "metadata": {
-                "prompt_tokens": len(prompt.split()),
-                "completion_tokens": len(content.split()),
-                "total_tokens": len(prompt.split()) + len(content.split()),
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
                 "simulated": True
             }
         }
@@ -217,18 +732,357 @@ Please check your configuration and try again. In the meantime, you can:
 If the problem persists, you may want to use the simulated mode for testing.
 """
     
-    def batch_generate(self, prompts: List[str], **kwargs) -> List[Dict[str, Any]]:
+    def _generate_isolated(self, prompt: str, **kwargs) -> Dict[str, Any]:
+        """
+        Call generate() and turn any unexpected exception into a failed result
+
+        Args:
+            prompt: The prompt to send to the LLM
+            **kwargs: Additional parameters to pass to generate()
+
+        Returns:
+            Dict containing the response and metadata
         """
-        Generate content for multiple prompts
+        try:
+            return self.generate(prompt, **kwargs)
+        except Exception as e:
+            logger.error(f"Batch item failed: {str(e)}")
+            return {
+                "success": False,
+                "error": str(e),
+                "content": self._fallback_response(prompt),
+                "model": kwargs.get("model") or self.default_model
+            }
+
+    def batch_generate(self,
+                       prompts: List[str],
+                       max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+                       on_progress: Optional[Callable[[int, int, int, Dict[str, Any]], None]] = None,
+                       **kwargs) -> List[Dict[str, Any]]:
+        """
+        Generate content for multiple prompts with bounded parallelism
+        
+        Requests run on a thread pool with at most max_concurrency in flight, so
+        N prompts take roughly ceil(N / max_concurrency) round trips. A failure
+        in one item is returned as that item's result and never aborts the batch.
+        Keep max_concurrency at or below the session pool's pool_maxsize so every
+        worker gets a keep-alive connection.
         
         Args:
             prompts: List of prompts to process
+            max_concurrency: Maximum number of requests in flight at once
+            on_progress: Optional callback called as on_progress(completed, total, index, result)
+                each time an item finishes
             **kwargs: Additional parameters to pass to generate()
             
         Returns:
-            List of response dictionaries
+            List of response dictionaries in the same order as prompts
+        """
+        total = len(prompts)
+        results: List[Optional[Dict[str, Any]]] = [None] * total
+        if total == 0:
+            return []
+
+        workers = max(1, min(max_concurrency, total))
+        completed = 0
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-generate") as executor:
+            futures = {
+                executor.submit(self._generate_isolated, prompt, **kwargs): index
+                for index, prompt in enumerate(prompts)
+            }
+
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                completed += 1
+
+                if on_progress:
+                    on_progress(completed, total, index, results[index])
+
+        return results
+
+    async def abatch_generate(self,
+                              prompts: List[str],
+                              max_concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+                              on_progress: Optional[Callable[[int, int, int, Dict[str, Any]], None]] = None,
+                              **kwargs) -> List[Dict[str, Any]]:
+        """
+        Asyncio variant of batch_generate for callers running an event loop
+        
+        Each request runs on a dedicated worker thread while an asyncio.Semaphore
+        caps the number in flight, so the event loop is never blocked. Cancelling
+        the batch returns at once: requests already sent finish in the background.
+        
+        Args:
+            prompts: List of prompts to process
+            max_concurrency: Maximum number of requests in flight at once
+            on_progress: Optional callback called as on_progress(completed, total, index, result)
+                each time an item finishes
+            **kwargs: Additional parameters to pass to generate()
+            
+        Returns:
+            List of response dictionaries in the same order as prompts
+        """
+        total = len(prompts)
+        if total == 0:
+            return []
+
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+        completed = 0
+
+        executor = ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, total)),
+                                      thread_name_prefix="abatch-generate")
+
+        async def run_item(index: int, prompt: str) -> Dict[str, Any]:
+            nonlocal completed
+
+            async with semaphore:
+                result = await loop.run_in_executor(
+                    executor, functools.partial(self._generate_isolated, prompt, **kwargs)
+                )
+
+            completed += 1
+            if on_progress:
+                on_progress(completed, total, index, result)
+
+            return result
+
+        try:
+            return list(await asyncio.gather(*(run_item(i, p) for i, p in enumerate(prompts))))
+        finally:
+            # Shutting down without waiting keeps a cancelled batch from blocking the event
+            # loop on requests already running; queued ones are dropped
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit_batch(self,
+                     prompts: List[str],
+                     system_prompt: Optional[SystemPrompt] = None,
+                     model: Optional[str] = None,
+                     max_tokens: Optional[int] = None,
+                     temperature: Optional[float] = None,
+                     additional_params: Optional[Dict[str, Any]] = None,
+                     id_offset: int = 0) -> Dict[str, Any]:
+        """
+        Submit prompts to the provider as one asynchronous message-batch job
+        
+        Batch jobs are processed on the provider's batch capacity, so they do not
+        take from the interactive rate limiter. Each request gets the custom_id
+        "item-<index>" so results can be matched back to their prompt.
+        
+        Args:
+            prompts: List of prompts to include in the job
+            system_prompt: Optional system prompt shared by every request
+            model: The model to use (defaults to self.default_model)
+            max_tokens: Maximum tokens in each response
+            temperature: Temperature parameter for generation
+            additional_params: Any additional parameters to pass to the API
+            id_offset: Index of the first prompt, for jobs holding part of a larger run
+            
+        Returns:
+            The normalized batch status with the job "id"
+            
+        Raises:
+            NotImplementedError: If the provider has no message-batch mode
+            requests.exceptions.RequestException: If the submission fails
+        """
+        model = model or self.default_model
+        max_tokens = max_tokens or self.max_tokens
+        temperature = self.temperature if temperature is None else temperature
+        
+        batch = self.adapter.build_batch([
+            (f"item-{id_offset + i}",
+             self._build_request(prompt, model, max_tokens, temperature, system_prompt, additional_params))
+            for i, prompt in enumerate(prompts)
+        ])
+        
+        logger.info(f"Submitting batch job with {len(prompts)} requests")
+        response = self._send("POST", self.adapter.batch_url(), json=batch)
+        return self.adapter.parse_batch_status(response.json())
+
+    def get_batch(self, batch_id: str) -> Dict[str, Any]:
+        """
+        Get the current status of a batch job
+        
+        Args:
+            batch_id: The job id returned by submit_batch
+            
+        Returns:
+            The normalized batch status
+        """
+        response = self._send("GET", f"{self.adapter.batch_url()}/{batch_id}")
+        return self.adapter.parse_batch_status(response.json())
+
+    def wait_for_batch(self,
+                       batch_id: str,
+                       poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+                       max_poll_interval: float = DEFAULT_BATCH_MAX_POLL_INTERVAL,
+                       timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Poll a batch job until it ends, backing off between polls
+        
+        Args:
+            batch_id: The job id returned by submit_batch
+            poll_interval: Seconds before the first poll
+            max_poll_interval: Upper bound on the delay between polls
+            timeout: Maximum seconds to wait (None waits indefinitely)
+            
+        Returns:
+            The final batch status
+            
+        Raises:
+            TimeoutError: If the job has not ended within the timeout
         """
-        return [self.generate(prompt, **kwargs) for prompt in prompts]
+        start = time.monotonic()
+        delay = poll_interval
+        
+        while True:
+            status = self.get_batch(batch_id)
+            if status["ended"]:
+                return status
+            
+            elapsed = time.monotonic() - start
+            if timeout is not None and elapsed + delay > timeout:
+                raise TimeoutError(f"Batch {batch_id} still running after {elapsed:.0f}s")
+            
+            logger.info(f"Batch {batch_id} in progress {status['counts']}, next poll in {delay:.0f}s")
+            time.sleep(delay)
+            delay = min(delay * 2, max_poll_interval)
+
+    def iter_batch_results(self,
+                           status: Dict[str, Any],
+                           model: Optional[str] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Stream the results file of an ended batch job
+        
+        The file is read line by line, so large jobs never need to fit in memory.
+        Failed requests are reported with success False and no content, as are
+        malformed lines whose custom_id can still be read (others are skipped).
+        
+        Args:
+            status: The final batch status from wait_for_batch
+            model: The model the job was submitted with
+            
+        Yields:
+            Tuples of the custom_id and a result dictionary like generate() returns
+        """
+        model = model or self.default_model
+        response = self._send("GET", status["results_url"], stream=True)
+        
+        with response:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    continue
+                
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    match = _CUSTOM_ID_RE.search(line)
+                    logger.error(f"Malformed line in the results of batch {status['id']}: {str(e)}")
+                    if match:
+                        yield match.group(1), {"success": False, "error": f"Malformed batch result: {str(e)}",
+                                               "model": model}
+                    continue
+                
+                custom_id, message, error = self.adapter.parse_batch_result(record)
+                if message is None:
+                    yield custom_id, {"success": False, "error": error, "model": model}
+                    continue
+                
+                content, usage = self.adapter.parse_response(message)
+                metadata = self._usage_metadata(usage)
+                metadata["batch_id"] = status["id"]
+                
+                yield custom_id, {
+                    "success": True,
+                    "content": content,
+                    "model": message.get("model", model),
+                    "usage": usage,
+                    "metadata": metadata
+                }
+
+    def run_batch(self,
+                  prompts: List[str],
+                  on_progress: Optional[Callable[[int, int, int, Dict[str, Any]], None]] = None,
+                  job_size: int = DEFAULT_BATCH_JOB_SIZE,
+                  poll_interval: float = DEFAULT_BATCH_POLL_INTERVAL,
+                  timeout: Optional[float] = None,
+                  **kwargs) -> List[Dict[str, Any]]:
+        """
+        Generate content for many prompts through the provider's message-batch mode
+        
+        Meant for large offline jobs: prompts are packed into jobs of up to
+        job_size requests, all jobs are submitted up front, then each is polled
+        with backoff and its results are streamed back. Throughput is bound by
+        the provider's batch capacity instead of the interactive rate limits.
+        Providers without a batch mode (and simulation) fall back to batch_generate.
+        
+        Args:
+            prompts: List of prompts to process
+            on_progress: Optional callback called as on_progress(completed, total, index, result)
+                each time an item's result is read
+            job_size: Maximum number of requests per submitted job
+            poll_interval: Seconds before the first status poll of each job
+            timeout: Maximum seconds to wait for each job (None waits indefinitely)
+            **kwargs: Additional parameters for the requests (system_prompt, model, ...);
+                options only batch_generate understands (use_cache, ...) are ignored by jobs
+            
+        Returns:
+            List of response dictionaries in the same order as prompts
+        """
+        if self._is_simulated() or not self.adapter.supports_batching:
+            logger.info("Message batches unavailable, falling back to batch_generate")
+            return self.batch_generate(prompts, on_progress=on_progress, **kwargs)
+
+        job_params = inspect.signature(self.submit_batch).parameters
+        job_kwargs = {name: value for name, value in kwargs.items()
+                      if name in job_params and name not in ("prompts", "id_offset")}
+
+        total = len(prompts)
+        results: List[Optional[Dict[str, Any]]] = [None] * total
+        model = kwargs.get("model") or self.default_model
+        completed = 0
+
+        jobs = []
+        for start in range(0, total, max(1, job_size)):
+            try:
+                jobs.append(self.submit_batch(prompts[start:start + job_size], id_offset=start, **job_kwargs))
+            except requests.exceptions.RequestException as e:
+                logger.error(f"Batch submission for items {start}+ failed: {str(e)}")
+
+        for job in jobs:
+            try:
+                status = self.wait_for_batch(job["id"], poll_interval=poll_interval, timeout=timeout)
+                for custom_id, result in self.iter_batch_results(status, model=model):
+                    match = _BATCH_ITEM_RE.fullmatch(custom_id or "")
+                    index = int(match.group(1)) if match else -1
+                    # A result that matches no outstanding item is dropped; its
+                    # item, if any, is then reported as missing below
+                    if not 0 <= index < total or results[index] is not None:
+                        logger.warning(f"Batch job {job['id']} returned an unexpected custom_id: {custom_id!r}")
+                        continue
+                    if result.get("content") is None:
+                        result["content"] = self._fallback_response(prompts[index])
+                    results[index] = result
+                    completed += 1
+
+                    if on_progress:
+                        on_progress(completed, total, index, result)
+            except (requests.exceptions.RequestException, TimeoutError) as e:
+                logger.error(f"Batch job {job['id']} failed: {str(e)}")
+
+        # Items missing from the results (e.g. a job that timed out) are reported as failures
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = {
+                    "success": False,
+                    "error": "No result returned for batch item",
+                    "content": self._fallback_response(prompts[index]),
+                    "model": model
+                }
+
+        return results
 
 
 # Function for simpler API access
@@ -0,0 +1,153 @@
+import os
+import logging
+from itertools import chain, islice
+from typing import Any, Dict, IO, Iterable, Iterator, List, Sequence, Union
+
+import pandas as pd
+
+from models.templating import CompiledTemplate, compile_template
+
+logger = logging.getLogger(__name__)
+
+# Rows rendered per vectorized chunk (bounds memory while streaming)
+DEFAULT_CHUNK_SIZE = int(os.environ.get("DATA_INJECTION_CHUNK_SIZE", 10000))
+
+# Uploaded data: a DataFrame, a JSON object, a JSON list of objects, or an
+# iterable of DataFrame chunks (e.g. pd.read_csv(..., chunksize=n) or a ChunkedUpload)
+InjectionData = Union[pd.DataFrame, Dict[str, Any], List[Dict[str, Any]], Iterable[pd.DataFrame]]
+
+
+def _mapped_fields(file_mappings: Sequence[Dict[str, str]]) -> Dict[str, str]:
+    """Placeholder name to data field (the first mapping of a placeholder wins)"""
+    fields: Dict[str, str] = {}
+    for mapping in file_mappings:
+        fields.setdefault(mapping["placeholder"], mapping["field"])
+    return fields
+
+
+def _iter_frames(data: InjectionData, chunk_size: int) -> Iterator[pd.DataFrame]:
+    """Yield the data as DataFrame chunks of at most chunk_size rows"""
+    if data is None or isinstance(data, str):
+        # Text uploads have no fields: the prompt is rendered once, unchanged
+        yield pd.DataFrame(index=[0])
+
+    elif isinstance(data, pd.DataFrame):
+        for start in range(0, len(data), chunk_size):
+            yield data.iloc[start:start + chunk_size]
+
+    elif isinstance(data, dict):
+        # A single JSON object is one row
+        yield pd.DataFrame([data])
+
+    elif isinstance(data, list):
+        for start in range(0, len(data), chunk_size):
+            yield pd.DataFrame.from_records(data[start:start + chunk_size])
+
+    else:
+        # Iterable of DataFrames (a chunked reader or ChunkedUpload) or of JSON records
+        iterator = iter(data)
+        first = next(iterator, None)
+        if first is None:
+            return
+
+        if isinstance(first, pd.DataFrame):
+            # Frames are pulled one at a time and re-chunked, so each vectorized step stays bounded
+            yield from _iter_frames(first, chunk_size)
+            for frame in iterator:
+                yield from _iter_frames(frame, chunk_size)
+            return
+
+        records = chain([first], iterator)
+        while True:
+            batch = list(islice(records, chunk_size))
+            if not batch:
+                return
+            yield pd.DataFrame.from_records(batch)
+
+
+def _text_column(column: pd.Series) -> pd.Series:
+    """Convert a column to text, masking missing values first (astype(str) would turn NaN into "nan")"""
+    return column.astype(object).where(column.notna(), "").astype(str)
+
+
+def _render_frame(template: CompiledTemplate, fields: Dict[str, str], frame: pd.DataFrame) -> pd.Series:
+    """
+    Render one prompt per row by concatenating whole columns at once
+
+    Fields that are not columns of the data keep their placeholder text, as in
+    single-row injection. Missing values render as empty text.
+    """
+    columns = {name: _text_column(frame[field]) for name, field in fields.items()
+               if name in template.names and field in frame.columns}
+    rendered = template.render_columns(columns)
+
+    if isinstance(rendered, str):
+        return pd.Series([rendered] * len(frame), index=frame.index, dtype=object)
+    return rendered
+
+
+def iter_injected_prompts(prompt: str, data: InjectionData, file_mappings: Sequence[Dict[str, str]],
+                          chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Render the prompt once per data row, streaming the results
+
+    Rows are processed chunk_size at a time with column-wise string concatenation,
+    so memory stays bounded by one chunk however many rows the data has. Pass a
+    chunked reader (pd.read_csv(path, chunksize=n)) to expand files that do not
+    fit in memory.
+
+    Args:
+        prompt: The prompt template with {{placeholder}} markers
+        data: The uploaded data (DataFrame, JSON object, JSON list or DataFrame chunks)
+        file_mappings: Mappings of data fields to placeholder names
+        chunk_size: Rows rendered per vectorized step
+
+    Returns:
+        Iterator over the rendered prompts, in row order
+    """
+    template = compile_template(prompt)
+    fields = _mapped_fields(file_mappings)
+
+    for frame in _iter_frames(data, chunk_size):
+        yield from _render_frame(template, fields, frame).tolist()
+
+
+def write_injected_prompts_jsonl(prompt: str, data: InjectionData, file_mappings: Sequence[Dict[str, str]],
+                                 output: Union[str, IO[str]], chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Render the prompt once per data row into a JSONL file
+
+    Each line is {"row": index, "prompt": text}. Lines are written chunk by chunk,
+    so no more than chunk_size prompts are held in memory.
+
+    Args:
+        prompt: The prompt template with {{placeholder}} markers
+        data: The uploaded data (DataFrame, JSON object, JSON list or DataFrame chunks)
+        file_mappings: Mappings of data fields to placeholder names
+        output: File path or open text file to write to
+        chunk_size: Rows rendered per vectorized step
+
+    Returns:
+        Number of prompts written
+    """
+    if isinstance(output, str):
+        with open(output, "w", encoding="utf-8") as f:
+            return write_injected_prompts_jsonl(prompt, data, file_mappings, f, chunk_size)
+
+    template = compile_template(prompt)
+    fields = _mapped_fields(file_mappings)
+    count = 0
+
+    for frame in _iter_frames(data, chunk_size):
+        prompts = _render_frame(template, fields, frame)
+        if prompts.empty:
+            continue
+
+        # pandas' JSON writer encodes the whole chunk in C
+        lines = pd.DataFrame({"row": range(count, count + len(prompts)), "prompt": prompts.to_numpy()})
+        text = lines.to_json(orient="records", lines=True, force_ascii=False)
+        output.write(text if text.endswith("\n") else text + "\n")
+        count += len(prompts)
+
+    logger.info(f"Wrote {count} injected prompts")
+    return count
@@ -0,0 +1,136 @@
+import os
+import sys
+import logging
+from typing import Any, Optional
+
+import numpy as np
+import pandas as pd
+
+from models.ingestion import ChunkedUpload
+
+logger = logging.getLogger(__name__)
+
+# Default compaction settings (overridable through the environment)
+DEFAULT_CATEGORY_RATIO = float(os.environ.get("FRAME_CATEGORY_RATIO", 0.5))
+DEFAULT_SPILL_BYTES = int(os.environ.get("FRAME_SPILL_BYTES", 64 * 1024 * 1024))
+
+
+def _arrow_string_dtype() -> Optional[pd.StringDtype]:
+    """The Arrow-backed string dtype, or None without pyarrow"""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return None
+    return pd.StringDtype("pyarrow")
+
+
+def _compact_column(column: pd.Series, category_ratio: float, string_dtype) -> pd.Series:
+    """Return the most compact lossless representation of a column"""
+    dtype = column.dtype
+
+    if pd.api.types.is_bool_dtype(dtype):
+        return column
+
+    if pd.api.types.is_integer_dtype(dtype):
+        return pd.to_numeric(column, downcast="integer")
+
+    if pd.api.types.is_float_dtype(dtype) and dtype != np.float32:
+        # Only when every value survives the round trip, so rendered numbers do not change
+        narrow = column.astype(np.float32)
+        if ((narrow.astype(dtype) == column) | column.isna()).all():
+            return narrow
+        return column
+
+    is_text = pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype)
+    if is_text and pd.api.types.infer_dtype(column, skipna=True) in ("string", "empty"):
+        if len(column) and column.nunique(dropna=True) <= category_ratio * len(column):
+            return column.astype("category")
+        if dtype == object and string_dtype is not None:
+            return column.astype(string_dtype)
+
+    return column
+
+
+def compact_frame(frame: pd.DataFrame, category_ratio: float = DEFAULT_CATEGORY_RATIO) -> pd.DataFrame:
+    """
+    Shrink a frame's memory without changing its values
+
+    - text columns whose distinct values are at most category_ratio of the rows
+      become categoricals
+    - other text columns held as Python objects become Arrow-backed strings
+    - integers are downcast to the smallest type holding their range, and
+      floats to float32 when every value is exactly representable
+
+    Args:
+        frame: The frame to compact
+        category_ratio: Largest distinct-to-rows ratio encoded as a categorical
+
+    Returns:
+        A compacted copy of the frame
+    """
+    string_dtype = _arrow_string_dtype()
+    return pd.DataFrame({
+        column: _compact_column(frame[column], category_ratio, string_dtype) for column in frame.columns
+    }, index=frame.index)
+
+
+def spill_frame(frame: pd.DataFrame, path: str, name: Optional[str] = None) -> ChunkedUpload:
+    """
+    Write a frame to an uncompressed Arrow (Feather) file and return a handle on it
+
+    The handle reads the file through a memory map in record batches, so the
+    frame no longer has to be held in memory: pages are loaded by the OS as
+    chunks are read and can be dropped again under memory pressure.
+
+    Args:
+        frame: The frame to spill
+        path: Destination file (should end in .arrow)
+        name: Name reported by the handle (defaults to the file name)
+
+    Returns:
+        A ChunkedUpload reading the spilled file
+    """
+    temporary = f"{path}.tmp"
+    frame.reset_index(drop=True).to_feather(temporary, compression="uncompressed")
+    os.replace(temporary, path)
+    return ChunkedUpload(name or os.path.basename(path), path)
+
+
+def memory_footprint(value: Any) -> int:
+    """
+    Estimate the memory held by uploaded or fetched data
+
+    Args:
+        value: A DataFrame, ChunkedUpload, JSON-like value or text
+
+    Returns:
+        Approximate size in bytes (for a ChunkedUpload, only what it keeps in memory)
+    """
+    if value is None:
+        return 0
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, ChunkedUpload):
+        source = sys.getsizeof(value.source) if isinstance(value.source, bytes) else 0
+        return memory_footprint(value.preview()) + source
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(memory_footprint(k) + memory_footprint(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(memory_footprint(item) for item in value)
+    return sys.getsizeof(value)
+
+
+def format_bytes(size: float) -> str:
+    """
+    Format a byte count for display
+
+    Args:
+        size: Number of bytes
+
+    Returns:
+        The size with a binary unit, e.g. "12.5 MB"
+    """
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(size) < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
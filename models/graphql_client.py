@@ -0,0 +1,338 @@
+import os
+import queue
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from models.http_pool import SessionPool, get_session_pool
+from models.response_cache import ResponseCache, make_cache_key
+from models.graphql_paths import compile_path
+
+logger = logging.getLogger(__name__)
+
+# Default pagination and caching settings (overridable through the environment)
+DEFAULT_PAGE_SIZE = int(os.environ.get("GRAPHQL_PAGE_SIZE", 1000))
+DEFAULT_BUFFER_PAGES = int(os.environ.get("GRAPHQL_BUFFER_PAGES", 4))
+DEFAULT_MAX_RECORDS = int(os.environ.get("GRAPHQL_MAX_RECORDS", 100000))
+DEFAULT_CACHE_TTL = float(os.environ.get("GRAPHQL_CACHE_TTL", 600))
+
+# Marks the end of the page stream in the prefetch buffer
+_DONE = object()
+
+
+class GraphQLError(Exception):
+    """A GraphQL request that failed at the HTTP level or returned errors without data"""
+
+    def __init__(self, message: str, errors: Optional[List[Dict[str, Any]]] = None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def connection_nodes(connection: Any) -> List[Any]:
+    """
+    Get the items of a connection page
+
+    Args:
+        connection: A Relay connection ({"edges": [{"node": ...}]} or {"nodes": [...]}) or a plain list
+
+    Returns:
+        The page's nodes
+
+    Raises:
+        GraphQLError: If the value is not a connection
+    """
+    if isinstance(connection, list):
+        return connection
+    if isinstance(connection, dict):
+        if isinstance(connection.get("edges"), list):
+            return [edge.get("node") if isinstance(edge, dict) else edge for edge in connection["edges"]]
+        if isinstance(connection.get("nodes"), list):
+            return connection["nodes"]
+    raise GraphQLError("The connection path does not point to a list, edges or nodes")
+
+
+def _nest(path: str, value: Any) -> Dict[str, Any]:
+    """Wrap a value in dicts following a dot path, e.g. "shop.products" -> {"shop": {"products": value}}"""
+    for key in reversed(path.split(".")):
+        value = {key: value}
+    return value
+
+
+class GraphQLClient:
+    """
+    A GraphQL client sending queries through the shared HTTP session pool
+
+    Responses are cached per (endpoint, headers, query, variables) with a TTL, so
+    repeating a query (for instance on every Streamlit rerun) does not hit the
+    endpoint again. Connections are paginated Relay-style: the query declares
+    $first and $after variables and selects pageInfo { hasNextPage endCursor }.
+    """
+
+    def __init__(self,
+                 endpoint: str,
+                 headers: Optional[Dict[str, str]] = None,
+                 session_pool: Optional[SessionPool] = None,
+                 cache: Optional[ResponseCache] = None):
+        """
+        Initialize the client
+
+        Args:
+            endpoint: GraphQL endpoint URL
+            headers: Extra request headers (e.g. Authorization)
+            session_pool: HTTP session pool (defaults to the process-wide pool)
+            cache: Response cache (None disables caching)
+        """
+        self.endpoint = endpoint
+        self.headers = dict(headers or {})
+        self.session_pool = session_pool or get_session_pool()
+        self.cache = cache
+
+    def cache_key(self, query: str, variables: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Build the cache key of a request
+
+        Headers are part of the key so that responses fetched with one set of
+        credentials are never served to another.
+
+        Args:
+            query: GraphQL query text
+            variables: Query variables
+
+        Returns:
+            Hex digest identifying the request
+        """
+        return make_cache_key({"query": query, "variables": variables or {}, "headers": self.headers},
+                              namespace=f"graphql:{self.endpoint}")
+
+    def execute(self, query: str, variables: Optional[Dict[str, Any]] = None,
+                use_cache: bool = True) -> Dict[str, Any]:
+        """
+        Run a query
+
+        Args:
+            query: GraphQL query text
+            variables: Query variables
+            use_cache: Whether to read and write the response cache
+
+        Returns:
+            The GraphQL response ({"data": ..., "errors": [...]})
+
+        Raises:
+            GraphQLError: On an HTTP error, a non-JSON body, or errors without data
+        """
+        key = self.cache_key(query, variables) if self.cache is not None and use_cache else None
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        body = {"query": query}
+        if variables:
+            body["variables"] = variables
+
+        headers = {"Content-Type": "application/json", "Accept": "application/json", **self.headers}
+        response = self.session_pool.post(self.endpoint, json=body, headers=headers)
+
+        try:
+            result = response.json()
+        except ValueError:
+            raise GraphQLError(f"GraphQL endpoint returned HTTP {response.status_code} with a non-JSON body")
+
+        errors = result.get("errors") if isinstance(result, dict) else None
+        if response.status_code >= 400 or not isinstance(result, dict) or (errors and not result.get("data")):
+            message = errors[0].get("message") if errors and isinstance(errors[0], dict) else None
+            raise GraphQLError(message or f"GraphQL endpoint returned HTTP {response.status_code}", errors)
+
+        if key is not None and not errors:
+            self.cache.set(key, result)
+
+        return result
+
+    def iter_pages(self, query: str, connection: str, variables: Optional[Dict[str, Any]] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE, max_records: int = DEFAULT_MAX_RECORDS,
+                   use_cache: bool = True) -> Iterator[List[Any]]:
+        """
+        Fetch a connection page by page, following pageInfo.endCursor
+
+        Args:
+            query: GraphQL query declaring $first and $after variables
+            connection: Field path of the connection in the response (e.g. "shop.products")
+            variables: Other query variables
+            page_size: Items requested per page ($first)
+            max_records: Stop once this many items have been fetched
+            use_cache: Whether to read and write the response cache
+
+        Returns:
+            Iterator over the nodes of each page
+        """
+        path = compile_path(connection)
+        cursor = None
+        fetched = 0
+
+        while fetched < max_records:
+            page_variables = dict(variables or {}, first=min(page_size, max_records - fetched))
+            if cursor is not None:
+                page_variables["after"] = cursor
+
+            page = path.get(self.execute(query, page_variables, use_cache=use_cache))
+            nodes = connection_nodes(page)[:max_records - fetched]
+            if not nodes:
+                return
+
+            yield nodes
+            fetched += len(nodes)
+
+            page_info = page.get("pageInfo") if isinstance(page, dict) else None
+            cursor = (page_info or {}).get("endCursor")
+            if not (page_info or {}).get("hasNextPage") or not cursor:
+                return
+
+    def iter_nodes(self, query: str, connection: str, variables: Optional[Dict[str, Any]] = None,
+                   page_size: int = DEFAULT_PAGE_SIZE, max_records: int = DEFAULT_MAX_RECORDS,
+                   buffer_pages: int = DEFAULT_BUFFER_PAGES, use_cache: bool = True) -> Iterator[Any]:
+        """
+        Stream a paginated connection item by item
+
+        Pages are fetched on a background thread into a buffer of at most
+        buffer_pages pages, so the next requests overlap with processing the
+        current page while memory stays bounded when the consumer is slower
+        than the endpoint.
+
+        Args:
+            query: GraphQL query declaring $first and $after variables
+            connection: Field path of the connection in the response
+            variables: Other query variables
+            page_size: Items requested per page
+            max_records: Stop once this many items have been fetched
+            buffer_pages: Pages fetched ahead of the consumer
+            use_cache: Whether to read and write the response cache
+
+        Returns:
+            Iterator over the connection's nodes
+        """
+        buffer: "queue.Queue" = queue.Queue(maxsize=max(buffer_pages, 1))
+        stopped = threading.Event()
+
+        def put(item) -> bool:
+            # Wake up regularly so an abandoned stream does not leave the thread blocked
+            while not stopped.is_set():
+                try:
+                    buffer.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for nodes in self.iter_pages(query, connection, variables, page_size, max_records, use_cache):
+                    if not put(nodes):
+                        return
+                put(_DONE)
+            except BaseException as e:
+                put(e)
+
+        threading.Thread(target=produce, name="graphql-pages", daemon=True).start()
+
+        try:
+            while True:
+                item = buffer.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield from item
+        finally:
+            stopped.set()
+
+    def fetch_all(self, query: str, connection: str, variables: Optional[Dict[str, Any]] = None,
+                  page_size: int = DEFAULT_PAGE_SIZE, max_records: int = DEFAULT_MAX_RECORDS,
+                  use_cache: bool = True, on_progress: Optional[Callable[[int], None]] = None) -> Dict[str, Any]:
+        """
+        Fetch every page of a connection into a single result
+
+        The nodes are returned as a plain list at the connection path, e.g.
+        {"data": {"shop": {"products": [...]}}}, so field mappings such as
+        "shop.products[*].name" fan out over all of them.
+
+        Args:
+            query: GraphQL query declaring $first and $after variables
+            connection: Field path of the connection in the response
+            variables: Other query variables
+            page_size: Items requested per page
+            max_records: Stop once this many items have been fetched
+            use_cache: Whether to read and write the response cache
+            on_progress: Called with the number of items fetched so far
+
+        Returns:
+            A GraphQL-shaped result holding all fetched nodes
+        """
+        nodes: List[Any] = []
+        for page in self.iter_pages(query, connection, variables, page_size, max_records, use_cache):
+            nodes.extend(page)
+            if on_progress is not None:
+                on_progress(len(nodes))
+
+        path = connection[len("data."):] if connection.startswith("data.") else connection
+        return {"data": _nest(path, nodes)}
+
+
+class GraphQLFetchJob:
+    """
+    A query (or paginated fetch) running on a background thread
+
+    Streamlit stores the job in session state and polls it on reruns, so large
+    fetches do not block the script or get restarted by widget interactions.
+    """
+
+    def __init__(self, client: GraphQLClient, query: str, connection: Optional[str] = None,
+                 variables: Optional[Dict[str, Any]] = None, **fetch_kwargs):
+        """
+        Start the fetch
+
+        Args:
+            client: Client to run the query with
+            query: GraphQL query text
+            connection: Connection field path to paginate (None runs the query once)
+            variables: Query variables
+            **fetch_kwargs: Arguments passed to GraphQLClient.fetch_all
+        """
+        self.records = 0
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+
+        def run():
+            try:
+                if connection:
+                    self.result = client.fetch_all(query, connection, variables,
+                                                   on_progress=self._progress, **fetch_kwargs)
+                else:
+                    self.result = client.execute(query, variables)
+            except Exception as e:
+                logger.error(f"GraphQL fetch failed: {e}")
+                self.error = e
+            finally:
+                self._done.set()
+
+        threading.Thread(target=run, name="graphql-fetch", daemon=True).start()
+
+    def _progress(self, records: int):
+        self.records = records
+
+    @property
+    def done(self) -> bool:
+        """Whether the fetch has finished (successfully or not)"""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the fetch to finish
+
+        Args:
+            timeout: Seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the fetch has finished
+        """
+        return self._done.wait(timeout)
@@ -0,0 +1,192 @@
+import re
+import functools
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from models.templating import placeholder
+
+# Path tokens: a field name, an index "[2]" (negative counts from the end) or a wildcard "[*]"
+_TOKEN_RE = re.compile(r"([^.\[\]]+)|\[(-?\d+|\*)\]")
+
+# Sentinel for a path that does not resolve on a node
+MISSING = object()
+
+# A step maps one node to the next node, or to MISSING
+Step = Callable[[Any], Any]
+
+
+def _key_step(key: str) -> Step:
+    def step(node):
+        if isinstance(node, dict):
+            return node.get(key, MISSING)
+        if isinstance(node, list):
+            # Without an explicit index a list stands for its first item
+            if node and isinstance(node[0], dict):
+                return node[0].get(key, MISSING)
+        return MISSING
+    return step
+
+
+def _index_step(index: int) -> Step:
+    def step(node):
+        if isinstance(node, list) and -len(node) <= index < len(node):
+            return node[index]
+        return MISSING
+    return step
+
+
+def _fan_out(node) -> List[Any]:
+    return node if isinstance(node, list) else []
+
+
+class GraphQLPath:
+    """
+    A GraphQL result field path compiled into accessor closures
+
+    Paths use dot notation with optional list indexing, e.g. "products[0].name",
+    and "[*]" to fan out across every item of a list, e.g. "products[*].name".
+    Paths are resolved from the result root or, when the first field is not
+    there, from the result's "data" object (field lists shown in the UI are
+    relative to "data").
+    """
+
+    __slots__ = ("path", "_first_key", "_segments", "fan_out")
+
+    def __init__(self, path: str):
+        """
+        Compile a field path
+
+        Args:
+            path: Dot-notation path with optional [i] and [*] list selectors
+
+        Raises:
+            ValueError: If the path contains no fields or an invalid token
+        """
+        self.path = path
+        tokens: List[str] = []
+        # Runs of plain steps between fan-outs, so each wildcard expands the node list once
+        self._segments: List[List[Step]] = [[]]
+        position = 0
+        first_key = None
+
+        for match in _TOKEN_RE.finditer(path):
+            between = path[position:match.start()]
+            if between.strip("."):
+                raise ValueError(f"Invalid GraphQL field path: {path!r}")
+            position = match.end()
+
+            key, index = match.groups()
+            if key is not None:
+                if not tokens:
+                    first_key = key
+                self._segments[-1].append(_key_step(key))
+            elif index == "*":
+                self._segments.append([])
+            else:
+                self._segments[-1].append(_index_step(int(index)))
+            tokens.append(match.group())
+
+        if path[position:].strip(".") or not tokens:
+            raise ValueError(f"Invalid GraphQL field path: {path!r}")
+
+        self._first_key = first_key
+        self.fan_out = len(self._segments) > 1
+
+    def _root(self, results: Any) -> Any:
+        if (isinstance(results, dict) and self._first_key is not None and self._first_key not in results
+                and isinstance(results.get("data"), dict)):
+            return results["data"]
+        return results
+
+    @staticmethod
+    def _walk(node: Any, steps: List[Step]) -> Any:
+        for step in steps:
+            if node is MISSING or node is None:
+                return MISSING
+            node = step(node)
+        return node
+
+    def get_all(self, results: Any) -> List[Any]:
+        """
+        Resolve the path, expanding every wildcard
+
+        Items where the rest of the path does not resolve give None, so paths
+        fanning out over the same list stay aligned item by item.
+
+        Args:
+            results: The GraphQL response (or its "data" object)
+
+        Returns:
+            Resolved values: one per item for fan-out paths, otherwise a single value
+        """
+        nodes = [self._walk(self._root(results), self._segments[0])]
+
+        for steps in self._segments[1:]:
+            nodes = [self._walk(item, steps)
+                     for node in nodes if node is not MISSING and node is not None
+                     for item in _fan_out(node)]
+
+        return [None if node is MISSING else node for node in nodes]
+
+    def get(self, results: Any) -> Optional[Any]:
+        """
+        Resolve the path to a single value (the first item for fan-out paths)
+
+        Args:
+            results: The GraphQL response (or its "data" object)
+
+        Returns:
+            The value, or None if the path does not resolve
+        """
+        values = self.get_all(results)
+        return values[0] if values else None
+
+    def __repr__(self):
+        return f"GraphQLPath({self.path!r})"
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_path(path: str) -> GraphQLPath:
+    """
+    Compile a field path, reusing earlier compilations of the same path
+
+    Args:
+        path: Dot-notation path with optional [i] and [*] list selectors
+
+    Returns:
+        The compiled path
+    """
+    return GraphQLPath(path)
+
+
+def graphql_frame(results: Any, graphql_mappings: Sequence[Dict[str, str]]) -> pd.DataFrame:
+    """
+    Build one row per fanned-out item from GraphQL mappings
+
+    Each mapping becomes a column named after its placeholder. Fan-out paths give
+    one value per item; single-value paths are repeated on every row. Values that
+    do not resolve hold the {{placeholder}} text, so rendering leaves them
+    unresolved as single-value injection does.
+
+    Args:
+        results: The GraphQL response
+        graphql_mappings: Mappings of field paths to placeholder names
+
+    Returns:
+        DataFrame with a column per placeholder (a single row if no path fans out)
+    """
+    columns: Dict[str, List[Any]] = {}
+    for mapping in graphql_mappings:
+        name = mapping["placeholder"]
+        if name not in columns:
+            marker = placeholder(name)
+            columns[name] = [marker if value is None else value
+                             for value in compile_path(mapping["field"]).get_all(results)]
+
+    rows = max((len(values) for values in columns.values()), default=1)
+
+    return pd.DataFrame({
+        name: (values * rows if len(values) == 1 else values + [placeholder(name)] * (rows - len(values)))
+        for name, values in columns.items()
+    }, index=pd.RangeIndex(rows))
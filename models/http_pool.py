@@ -0,0 +1,205 @@
+import os
+import threading
+import logging
+from typing import Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Default pool settings (overridable through the environment)
+DEFAULT_POOL_CONNECTIONS = int(os.environ.get("LLM_POOL_CONNECTIONS", 10))
+DEFAULT_POOL_MAXSIZE = int(os.environ.get("LLM_POOL_MAXSIZE", 20))
+DEFAULT_CONNECT_TIMEOUT = float(os.environ.get("LLM_CONNECT_TIMEOUT", 10.0))
+DEFAULT_READ_TIMEOUT = float(os.environ.get("LLM_READ_TIMEOUT", 120.0))
+
+
+class SessionPool:
+    """
+    A thread-safe pool of keep-alive HTTP sessions, one per provider base URL
+
+    Every ContentGenerator shares the same pool so that TCP and TLS handshakes
+    are paid once per connection instead of once per request.
+    """
+
+    def __init__(self,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 connect_timeout: float = DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout: float = DEFAULT_READ_TIMEOUT):
+        """
+        Initialize the session pool
+
+        Args:
+            pool_connections: Number of per-host connection pools to cache
+            pool_maxsize: Maximum number of keep-alive connections per host
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait between bytes of the response
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        """The (connect, read) timeout applied to requests without an explicit timeout"""
+        return self.connect_timeout, self.read_timeout
+
+    @staticmethod
+    def pool_key(url: str) -> str:
+        """
+        Get the pool key for a URL
+
+        Args:
+            url: Any URL on the provider
+
+        Returns:
+            The scheme and host part of the URL (e.g. https://api.anthropic.com)
+        """
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}".lower()
+
+    def get_session(self, url: str) -> requests.Session:
+        """
+        Get the shared session for a provider, creating it on first use
+
+        Args:
+            url: Any URL on the provider
+
+        Returns:
+            A requests.Session with a keep-alive connection pool mounted
+        """
+        key = self.pool_key(url)
+
+        with self._lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    pool_block=False
+                )
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                self._sessions[key] = session
+                logger.info(f"Created pooled HTTP session for {key}")
+
+        return session
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Send a request through the pooled session for the URL's provider
+
+        Args:
+            method: HTTP method
+            url: Request URL
+            **kwargs: Additional arguments passed to requests.Session.request
+
+        Returns:
+            The HTTP response
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        return self.get_session(url).request(method, url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        """Send a POST request through the pool"""
+        return self.request("POST", url, **kwargs)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        """Send a GET request through the pool"""
+        return self.request("GET", url, **kwargs)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get connection usage counters for all pooled sessions
+
+        Returns:
+            Dict with the number of sessions, requests sent, connections opened
+            and requests that reused an existing keep-alive connection
+        """
+        num_requests = 0
+        num_connections = 0
+
+        with self._lock:
+            sessions = list(self._sessions.values())
+
+        for session in sessions:
+            for adapter in set(session.adapters.values()):
+                pool_manager = getattr(adapter, "poolmanager", None)
+                if pool_manager is None:
+                    continue
+                for key in list(pool_manager.pools.keys()):
+                    pool = pool_manager.pools.get(key)
+                    if pool is not None:
+                        num_requests += pool.num_requests
+                        num_connections += pool.num_connections
+
+        return {
+            "sessions": len(sessions),
+            "requests": num_requests,
+            "connections": num_connections,
+            "reused_connections": max(num_requests - num_connections, 0)
+        }
+
+    @property
+    def reused_connections(self) -> int:
+        """Number of requests that were served over an already open connection"""
+        return self.stats()["reused_connections"]
+
+    def close(self):
+        """Close every pooled session and drop its connections"""
+        with self._lock:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+
+        for session in sessions:
+            session.close()
+
+
+# Process-wide pool shared by all ContentGenerator instances
+_default_pool: Optional[SessionPool] = None
+_default_pool_lock = threading.Lock()
+
+
+def get_session_pool() -> SessionPool:
+    """
+    Get the process-wide session pool, creating it with default settings if needed
+
+    Returns:
+        The shared SessionPool
+    """
+    global _default_pool
+
+    with _default_pool_lock:
+        if _default_pool is None:
+            _default_pool = SessionPool()
+        return _default_pool
+
+
+def configure_session_pool(**kwargs) -> SessionPool:
+    """
+    Replace the process-wide session pool with one using the given settings
+
+    Args:
+        **kwargs: Arguments passed to SessionPool
+
+    Returns:
+        The new shared SessionPool
+    """
+    global _default_pool
+
+    with _default_pool_lock:
+        previous = _default_pool
+        _default_pool = SessionPool(**kwargs)
+
+    if previous is not None:
+        previous.close()
+
+    return _default_pool
@@ -0,0 +1,243 @@
+import io
+import os
+import logging
+from itertools import islice
+from typing import Any, Dict, Iterator, Optional, Union
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Default ingestion settings (overridable through the environment)
+DEFAULT_INGEST_CHUNK_SIZE = int(os.environ.get("INGEST_CHUNK_SIZE", 50000))
+DEFAULT_SAMPLE_ROWS = int(os.environ.get("INGEST_SAMPLE_ROWS", 1000))
+
+# File types that can be read chunk by chunk
+STREAMING_EXTENSIONS = ("csv", "jsonl", "ndjson", "parquet", "arrow", "feather", "xlsx")
+
+# A file path, or the file content already in memory
+Source = Union[str, bytes]
+
+
+def _open(source: Source):
+    """Open a source for reading from the start"""
+    return open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+
+
+def infer_csv_dtypes(source: Source, sample_rows: int = DEFAULT_SAMPLE_ROWS) -> Dict[str, Any]:
+    """
+    Infer column dtypes from the first rows of a CSV
+
+    Integer columns are widened to the nullable Int64 (and booleans to the
+    nullable boolean), so a missing value further down does not turn a chunk's
+    column into floats.
+
+    Args:
+        source: CSV file path or content
+        sample_rows: Rows read to infer the dtypes
+
+    Returns:
+        Column name to dtype
+    """
+    with _open(source) as f:
+        sample = pd.read_csv(f, nrows=sample_rows)
+
+    dtypes = {}
+    for column, dtype in sample.dtypes.items():
+        if pd.api.types.is_bool_dtype(dtype):
+            dtypes[column] = "boolean"
+        elif pd.api.types.is_integer_dtype(dtype):
+            dtypes[column] = "Int64"
+        else:
+            dtypes[column] = dtype
+
+    return dtypes
+
+
+def _conform(chunk: pd.DataFrame, dtypes: Dict[str, Any]) -> pd.DataFrame:
+    """
+    Cast a chunk's columns to the sampled dtypes
+
+    A column whose values do not fit its sampled dtype (e.g. text after a run
+    of numbers) keeps the dtype inferred for the chunk, and is no longer cast
+    in later chunks.
+    """
+    for column, dtype in list(dtypes.items()):
+        if column not in chunk.columns or chunk[column].dtype == dtype:
+            continue
+        try:
+            chunk[column] = chunk[column].astype(dtype)
+        except (TypeError, ValueError):
+            logger.info(f"Column {column!r} does not fit the sampled dtype {dtype}, keeping inferred types")
+            del dtypes[column]
+
+    return chunk
+
+
+def _iter_csv(source: Source, chunk_size: int, sample_rows: int) -> Iterator[pd.DataFrame]:
+    dtypes = infer_csv_dtypes(source, sample_rows)
+
+    with _open(source) as f:
+        for chunk in pd.read_csv(f, chunksize=chunk_size):
+            yield _conform(chunk, dtypes)
+
+
+def _iter_jsonl(source: Source, chunk_size: int) -> Iterator[pd.DataFrame]:
+    with _open(source) as f:
+        yield from pd.read_json(f, lines=True, chunksize=chunk_size)
+
+
+def _iter_parquet(source: Source, chunk_size: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Reading Parquet files requires pyarrow")
+
+    with _open(source) as f:
+        for batch in pq.ParquetFile(f).iter_batches(batch_size=chunk_size):
+            yield batch.to_pandas()
+
+
+def _iter_arrow(source: Source, chunk_size: int) -> Iterator[pd.DataFrame]:
+    try:
+        import pyarrow as pa
+    except ImportError:
+        raise ValueError("Reading Arrow files requires pyarrow")
+
+    # Files are memory-mapped, so record batches are paged in by the OS instead of read into memory
+    with (pa.memory_map(source) if isinstance(source, str) else pa.BufferReader(source)) as f:
+        reader = pa.ipc.open_file(f)
+        for index in range(reader.num_record_batches):
+            batch = reader.get_batch(index)
+            for start in range(0, batch.num_rows, chunk_size):
+                yield batch.slice(start, chunk_size).to_pandas()
+
+
+def _iter_excel(source: Source, chunk_size: int) -> Iterator[pd.DataFrame]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Reading Excel files requires openpyxl")
+
+    with _open(source) as f:
+        # Read-only mode streams rows from the sheet XML instead of loading the workbook
+        workbook = load_workbook(f, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = next(rows, None)
+            if header is None:
+                return
+
+            columns = [str(name) if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+            width = len(columns)
+
+            while True:
+                batch = [tuple(row[:width]) + (None,) * (width - len(row)) for row in islice(rows, chunk_size)]
+                if not batch:
+                    return
+                yield pd.DataFrame.from_records(batch, columns=columns)
+        finally:
+            workbook.close()
+
+
+def iter_chunks(name: str, source: Source, chunk_size: int = DEFAULT_INGEST_CHUNK_SIZE,
+                sample_rows: int = DEFAULT_SAMPLE_ROWS) -> Iterator[pd.DataFrame]:
+    """
+    Read a tabular file as DataFrame chunks
+
+    Args:
+        name: File name (its extension selects the reader)
+        source: File path or content
+        chunk_size: Rows per chunk
+        sample_rows: Rows used to infer CSV column dtypes
+
+    Returns:
+        Iterator over DataFrames of at most chunk_size rows
+
+    Raises:
+        ValueError: If the file type cannot be streamed
+    """
+    extension = name.rsplit(".", 1)[-1].lower()
+
+    if extension == "csv":
+        return _iter_csv(source, chunk_size, sample_rows)
+    if extension in ("jsonl", "ndjson"):
+        return _iter_jsonl(source, chunk_size)
+    if extension == "parquet":
+        return _iter_parquet(source, chunk_size)
+    if extension in ("arrow", "feather"):
+        return _iter_arrow(source, chunk_size)
+    if extension == "xlsx":
+        return _iter_excel(source, chunk_size)
+
+    raise ValueError(f"Unsupported file type for streaming: {extension}")
+
+
+class ChunkedUpload:
+    """
+    A tabular upload read lazily, one chunk at a time
+
+    Iterating yields DataFrame chunks from the start of the file, so batch
+    injection can stream every row while memory stays bounded by one chunk.
+    Only the preview (the head of the first chunk) is kept in memory.
+    """
+
+    def __init__(self, name: str, source: Source, chunk_size: int = DEFAULT_INGEST_CHUNK_SIZE,
+                 sample_rows: int = DEFAULT_SAMPLE_ROWS, preview_rows: int = 100):
+        """
+        Open an upload for chunked reading
+
+        Args:
+            name: File name (its extension selects the reader)
+            source: File path or content
+            chunk_size: Rows per chunk
+            sample_rows: Rows used to infer CSV column dtypes
+            preview_rows: Rows of the first chunk kept for previews
+
+        Raises:
+            ValueError: If the file type cannot be streamed
+        """
+        self.name = name
+        self.source = source
+        self.chunk_size = chunk_size
+        self.sample_rows = sample_rows
+
+        chunks = iter_chunks(name, source, chunk_size=max(preview_rows, 1), sample_rows=sample_rows)
+        try:
+            first = next(chunks, None)
+        finally:
+            chunks.close()
+        self._preview = first if first is not None else pd.DataFrame()
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        return iter_chunks(self.name, self.source, self.chunk_size, self.sample_rows)
+
+    @property
+    def columns(self) -> pd.Index:
+        """Column names of the upload"""
+        return self._preview.columns
+
+    def preview(self, rows: Optional[int] = None) -> pd.DataFrame:
+        """
+        Get the first rows of the upload
+
+        Args:
+            rows: Number of rows (None for every preview row)
+
+        Returns:
+            DataFrame with the leading rows
+        """
+        return self._preview if rows is None else self._preview.head(rows)
+
+    def count_rows(self) -> int:
+        """
+        Count the rows by reading the whole file once
+
+        Returns:
+            Total number of rows
+        """
+        return sum(len(chunk) for chunk in self)
+
+    def __repr__(self):
+        return f"ChunkedUpload({self.name!r})"
+
@@ -0,0 +1,761 @@
+import json
+import functools
+import threading
+from collections import OrderedDict
+from collections.abc import Mapping as MappingABC
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+# Frozen form of a dict: its (key, value) pairs in insertion order
+Pairs = Tuple[Tuple[str, Any], ...]
+
+# Rendered sections keyed by (renderer, identity of its inputs), shared by every spec rendered in the process
+_SECTION_CACHE_SIZE = 1024
+_section_cache: "OrderedDict[Tuple[str, tuple], Tuple[tuple, str]]" = OrderedDict()
+_section_cache_lock = threading.Lock()
+_section_cache_stats = {"hits": 0, "misses": 0}
+_SCALARS = (str, int, float, type(None))
+
+# Frozen copies of session state lists and dicts, keyed by the identity of the live object
+_FROZEN_CACHE_SIZE = 256
+_frozen_cache: "OrderedDict[int, Tuple[Any, Any]]" = OrderedDict()
+_frozen_cache_lock = threading.Lock()
+
+# Layout styles: the combined prompt, sections placed by the prompt structure editor
+# (order and System/User role), and the system/user prompt section checkboxes
+COMBINED = "combined"
+STRUCTURE = "structure"
+SYSTEM = "system"
+USER = "user"
+
+# Sections of the combined prompt, in order
+COMBINED_PROMPT_SECTIONS = ["Context & Background", "Task Definition", "Content Intent & Guidelines",
+                            "Content Setup", "Design Requirements", "Data Sources & Examples",
+                            "Retrieved Context", "Input Data Format", "Output Requirements",
+                            "Examples (Few-Shot Learning)", "Chain-of-Thought Instructions",
+                            "Self-Review Requirements", "Fact Checking Instructions"]
+
+# Sections included unless a layout excludes them explicitly (they render nothing when empty)
+DEFAULT_INCLUDED_SECTIONS = frozenset({"Retrieved Context"})
+
+# Built-in sections of the system and user prompt layouts (anything else is a custom section)
+SYSTEM_PROMPT_SECTIONS = ["Context & Background", "Persona Definition", "Tone & Voice",
+                          "Domain Expertise", "Constraints & Limitations",
+                          "Evaluation Criteria", "Self-Review Requirements"]
+USER_PROMPT_SECTIONS = ["Task Definition", "Retrieved Context", "Input Data Format", "Output Requirements",
+                        "Examples (Few-Shot Learning)", "Chain-of-Thought Instructions",
+                        "Fact Checking Instructions"]
+
+
+def _freeze(value: Any) -> Any:
+    """Convert a state value into an immutable, hashable equivalent (dicts become pairs)"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, MappingABC):
+        items = tuple(value.items())
+        try:
+            hash(items)
+            return items
+        except TypeError:
+            return tuple((key, _freeze(item)) for key, item in items)
+    if isinstance(value, (list, tuple)):
+        return tuple(map(_freeze, value))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(map(_freeze, value))
+
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    return value
+
+
+def _freeze_field(value: Any) -> Any:
+    """
+    Freeze a session state value, reusing the frozen copy of an unchanged list or dict
+
+    Copies are keyed by the identity of the live object, so a rerun only freezes
+    the collections that were replaced or passed to mark_changed since the last.
+    """
+    if not isinstance(value, (list, dict)):
+        return _freeze(value)
+
+    key = id(value)
+    with _frozen_cache_lock:
+        entry = _frozen_cache.get(key)
+        # The entry holds the object itself, so its id cannot have been reused
+        if entry is not None and entry[0] is value:
+            _frozen_cache.move_to_end(key)
+            return entry[1]
+
+    frozen = _freeze(value)
+    with _frozen_cache_lock:
+        _frozen_cache[key] = (value, frozen)
+        _frozen_cache.move_to_end(key)
+        if len(_frozen_cache) > _FROZEN_CACHE_SIZE:
+            _frozen_cache.popitem(last=False)
+    return frozen
+
+
+def mark_changed(*values: Any):
+    """
+    Declare session state lists or dicts edited in place
+
+    PromptSpec.from_session_state reuses its frozen copy of a collection for as
+    long as the same object is in the state, so code that appends to, pops from
+    or assigns into one must call this afterwards. Replacing the value with a
+    new object needs no call.
+
+    Args:
+        *values: The edited collections
+    """
+    with _frozen_cache_lock:
+        for value in values:
+            _frozen_cache.pop(id(value), None)
+
+
+@dataclass(frozen=True, slots=True)
+class PromptSpec:
+    """
+    Immutable description of everything the prompt renderers read
+
+    A spec is a snapshot of the prompt-related session state (or of a saved
+    template) with lists frozen to tuples and dicts to tuples of (key, value)
+    pairs. It is hashable, picklable and safe to share between threads, so
+    prompts can be rendered in worker processes and batch jobs without a
+    Streamlit session.
+    """
+
+    # Core building blocks
+    context: str = ""
+    task: str = ""
+    input_format: str = ""
+    input_description: str = ""
+    output_format: str = ""
+    output_tone: str = ""
+    output_requirements: str = ""
+    examples: Tuple[Pairs, ...] = ()
+    constraints: str = ""
+    evaluation_criteria: str = ""
+    chain_of_thought_steps: Tuple[str, ...] = ()
+
+    # Workflow switches
+    few_shot_enabled: bool = False
+    thinking_steps_enabled: bool = False
+    self_consistency_enabled: bool = False
+    fact_checker_enabled: bool = False
+
+    # Content intent and setup
+    content_intent: str = ""
+    mission_statement: str = ""
+    voice_choice: Optional[str] = None
+    content_rules: Tuple[str, ...] = ()
+    content_description: str = ""
+    business_name: str = ""
+    business_where: str = ""
+    business_who: str = ""
+    business_look: str = ""
+    business_why: str = ""
+
+    # Design requirements and data sources
+    components: Tuple[Pairs, ...] = ()
+    language_choice: str = ""
+    globalization_items: Tuple[str, ...] = ()
+    file_mappings: Tuple[Pairs, ...] = ()
+    graphql_mappings: Tuple[Pairs, ...] = ()
+    manual_examples: Tuple[Pairs, ...] = ()
+
+    # Knowledge chunks retrieved for the prompt (doc_id, source, position, text, relevance)
+    retrieved_context: Tuple[Pairs, ...] = ()
+
+    # Layout: which sections are included, their order and prompt role
+    prompt_structure: Pairs = ()
+    system_prompt_sections: Pairs = ()
+    user_prompt_sections: Pairs = ()
+    prompt_section_order: Tuple[str, ...] = ()
+    section_roles: Optional[Pairs] = None
+
+    @classmethod
+    def from_mapping(cls, data: Mapping[str, Any]) -> "PromptSpec":
+        """
+        Build a spec from session state or template data
+
+        Keys that are not spec fields are ignored and missing ones keep their defaults.
+
+        Args:
+            data: Mapping such as st.session_state or a loaded template
+
+        Returns:
+            The frozen spec
+        """
+        return cls(**{field.name: _freeze(data[field.name]) for field in fields(cls) if field.name in data})
+
+    @classmethod
+    def from_session_state(cls, session_state: Mapping[str, Any]) -> "PromptSpec":
+        """
+        Snapshot a Streamlit session state
+
+        Lists and dicts that are still the objects frozen by an earlier snapshot
+        (and were not passed to mark_changed) reuse that frozen copy, so their
+        values keep their identity and the section cache finds them cheaply.
+
+        Args:
+            session_state: The session state (st.session_state)
+
+        Returns:
+            The frozen spec
+        """
+        return cls(**{field.name: _freeze_field(session_state[field.name])
+                      for field in fields(cls) if field.name in session_state})
+
+    @classmethod
+    def from_template(cls, file_path: str) -> "PromptSpec":
+        """
+        Load a spec from a saved template JSON file
+
+        Args:
+            file_path: Path to the template file
+
+        Returns:
+            The frozen spec
+        """
+        with open(file_path, 'r') as f:
+            return cls.from_mapping(json.load(f))
+
+
+def _render_section(renderer: Callable[..., str], *args) -> str:
+    """
+    Render a section through the section cache
+
+    Renderers are pure functions of their arguments, which are exactly the spec
+    fields the section reads, so a section is only rebuilt when one of them changes.
+    Collections are keyed on their identity rather than their value: snapshots
+    of an unchanged session state share them (see PromptSpec.from_session_state),
+    so a lookup never hashes or compares large values such as long example lists.
+
+    Args:
+        renderer: Pure function returning the section text
+        *args: The spec values the section depends on
+
+    Returns:
+        The rendered section text
+    """
+    # Scalars (widget values come back as new objects each rerun) key by value;
+    # the entry holds the other arguments, so their ids cannot be reused while it lives
+    key = (renderer.__name__, tuple(arg if isinstance(arg, _SCALARS) else id(arg) for arg in args))
+
+    with _section_cache_lock:
+        entry = _section_cache.get(key)
+        if entry is not None:
+            _section_cache.move_to_end(key)
+            _section_cache_stats["hits"] += 1
+            return entry[1]
+        _section_cache_stats["misses"] += 1
+
+    text = renderer(*args)
+
+    with _section_cache_lock:
+        _section_cache[key] = (args, text)
+        _section_cache.move_to_end(key)
+        if len(_section_cache) > _SECTION_CACHE_SIZE:
+            _section_cache.popitem(last=False)
+
+    return text
+
+
+def section_cache_info() -> Dict[str, int]:
+    """
+    Get section cache counters
+
+    Returns:
+        Dict with hits, misses and the number of cached sections
+    """
+    with _section_cache_lock:
+        return dict(_section_cache_stats, size=len(_section_cache))
+
+
+def clear_section_cache():
+    """Drop all cached section renders"""
+    with _section_cache_lock:
+        _section_cache.clear()
+        _section_cache_stats["hits"] = 0
+        _section_cache_stats["misses"] = 0
+
+
+# Section renderers: pure functions of the layout style and the spec values they read.
+# A renderer returns "" when its section has nothing to contribute.
+
+def _heading(style: str, title: str) -> str:
+    """Heading for workflow sections, which are nested one level in the combined prompt"""
+    return ("## " if style == COMBINED else "# ") + title + "\n"
+
+
+def _render_context(style: str, context: str) -> str:
+    if not context:
+        return ""
+    return "# Context & Background\n" + context + "\n\n"
+
+
+def _render_task(style: str, task: str) -> str:
+    if not task:
+        return ""
+    return "# Task Definition\n" + task + "\n\n"
+
+
+def _render_content_intent(style, content_intent, mission_statement, voice_choice, content_rules) -> str:
+    parts = [
+        "# Content Intent & Guidelines\n",
+        f"**Intent:** {content_intent}\n\n",
+        f"**Mission Statement:** {mission_statement}\n\n",
+        f"**Voice & Tone:** {voice_choice}\n\n"
+    ]
+
+    if content_rules:
+        parts.append("**Content Rules (Do NOT include):**\n")
+        parts.extend(f"- {rule}\n" for rule in content_rules)
+        parts.append("\n")
+
+    return "".join(parts)
+
+
+def _render_content_setup(style, content_description, business_name, business_where, business_who,
+                          business_look, business_why) -> str:
+    return "".join([
+        "# Content Setup\n",
+        f"**Content Description:** {content_description}\n\n",
+        "**Business Context:**\n",
+        f"- Name: {business_name}\n",
+        f"- Display Location: {business_where}\n",
+        f"- Target Audience: {business_who}\n",
+        f"- Content Format: {business_look}\n",
+        f"- Purpose: {business_why}\n\n"
+    ])
+
+
+def _render_design_requirements(style, components, language_choice, globalization_items) -> str:
+    parts = ["# Design Requirements\n"]
+
+    if components:
+        parts.append("**Content Components:**\n")
+        for component in map(dict, components):
+            parts.append(f"- {component['type']}: {component['description']}\n")
+            parts.append(f"  Length: {component['min_chars']}-{component['max_chars']} chars, "
+                         f"~{component['sentences']} sentences\n")
+        parts.append("\n")
+
+    parts.append(f"**Language & Locale:** {language_choice}\n\n")
+
+    if globalization_items:
+        parts.append("**Globalization Considerations:**\n")
+        parts.extend(f"- {item}\n" for item in globalization_items)
+        parts.append("\n")
+
+    return "".join(parts)
+
+
+def _render_data_sources(style, file_mappings, graphql_mappings, manual_examples) -> str:
+    parts = ["# Data Sources & Examples\n"]
+
+    # Add file mappings if available
+    if file_mappings:
+        parts.append("**Data Fields:**\n")
+        parts.extend(f"- {mapping['placeholder']}: Corresponds to {mapping['field']} in the provided data\n"
+                     for mapping in map(dict, file_mappings))
+        parts.append("\n")
+
+    # Add GraphQL mappings if available
+    if graphql_mappings:
+        parts.append("**GraphQL Data Fields:**\n")
+        parts.extend(f"- {mapping['placeholder']}: Corresponds to {mapping['field']} in the GraphQL data\n"
+                     for mapping in map(dict, graphql_mappings))
+        parts.append("\n")
+
+    # Add manual examples if available
+    if manual_examples:
+        parts.append("**Examples for Reference:**\n")
+        parts.extend(f"Example {i + 1} ({example['comment']}):\n```\n{example['text']}\n```\n\n"
+                     for i, example in enumerate(map(dict, manual_examples)))
+
+    return "".join(parts)
+
+
+def _render_retrieved_context(style, retrieved_context) -> str:
+    if not retrieved_context:
+        return ""
+
+    parts = ["# Retrieved Context\n",
+             "Ground the response in the passages below and cite them by number when you use them.\n\n"]
+    parts.extend(f"[{i + 1}] {chunk['source'] or chunk['doc_id']} (part {chunk['position'] + 1})\n{chunk['text']}\n\n"
+                 for i, chunk in enumerate(map(dict, retrieved_context)))
+    return "".join(parts)
+
+
+def _render_input_format(style, input_format, input_description) -> str:
+    if not input_description:
+        return ""
+    return "# Input Data Format\n" + f"Format: {input_format}\n" + input_description + "\n\n"
+
+
+def _render_output_requirements(style, output_format, output_tone, output_requirements) -> str:
+    ending = output_requirements + "\n\n" if output_requirements else "\n"
+    return "# Output Requirements\n" + f"Format: {output_format}\n" + f"Tone: {output_tone}\n" + ending
+
+
+def _render_examples(style, few_shot_enabled, examples, constraints) -> str:
+    if not few_shot_enabled:
+        return ""
+
+    parts = ["# Examples & Constraints\n"]
+    parts.extend(f"[Example {i + 1}]\nInput: {example['input']}\nOutput: {example['output']}\n\n"
+                 for i, example in enumerate(map(dict, examples or ()))
+                 if example["input"] or example["output"])
+
+    # The combined prompt has no Constraints & Limitations section, so constraints go here
+    if style == COMBINED and constraints:
+        parts.append("## Constraints\n" + constraints + "\n\n")
+
+    return "".join(parts)
+
+
+def _render_chain_of_thought(style, thinking_steps_enabled, chain_of_thought_steps) -> str:
+    if not thinking_steps_enabled:
+        return ""
+
+    parts = [_heading(style, "Chain-of-Thought Instructions")]
+    if style == USER:
+        parts.append("Please follow these steps when addressing my request:\n")
+    parts.extend(f"{i + 1}. {step}\n" for i, step in enumerate(chain_of_thought_steps or ()))
+    parts.append("\n")
+    return "".join(parts)
+
+
+def _render_self_review(style, self_consistency_enabled) -> str:
+    # Checking the section in the system prompt layout includes it regardless of the workflow switch
+    if style == SYSTEM:
+        return ("# Self-Review Requirements\n"
+                "Before providing your final response, review your content to ensure:\n"
+                "- All information is factually accurate and current\n"
+                "- Content is well-organized with clear sections and logical flow\n"
+                "- Advice is practical and actionable for the intended audience\n"
+                "- Language is clear, professional, and free of errors\n"
+                "- All aspects of the user's query have been addressed thoroughly\n\n")
+
+    if not self_consistency_enabled:
+        return ""
+
+    return (_heading(style, "Self-Review Requirements") +
+            "After generating content, review it to ensure:\n"
+            "- All claims are factually accurate\n"
+            "- Content is well-organized and flows logically\n"
+            "- Advice is practical and actionable\n"
+            "- Language is clear and professional\n"
+            "- Content follows specified output requirements\n\n")
+
+
+def _render_fact_checking(style, fact_checker_enabled) -> str:
+    if not fact_checker_enabled:
+        return ""
+
+    return (_heading(style, "Fact Checking Instructions") +
+            "Verify all factual claims and ensure accuracy of:\n"
+            "- Statistics and numerical data\n"
+            "- Historical information\n"
+            "- Technical specifications\n"
+            "- Citations and references\n\n")
+
+
+def _render_persona(style) -> str:
+    return ("# Persona Definition\n"
+            "You are an AI assistant with expertise in content creation, specializing in software development "
+            "methodologies and project management approaches. You provide comprehensive, well-structured, and "
+            "actionable information tailored to the user's specific needs.\n\n")
+
+
+def _render_tone(style, voice_choice) -> str:
+    if voice_choice is None:
+        voice_choice = "Professional"
+
+    if voice_choice == "Professional":
+        guidance = ("Maintain a professional, authoritative tone while remaining approachable. Use clear, precise "
+                    "language without unnecessary jargon. Be thorough but concise.")
+    elif voice_choice == "Conversational":
+        guidance = ("Adopt a friendly, conversational tone as if speaking directly to the user. Use natural "
+                    "language, occasional contractions, and a warm, helpful demeanor.")
+    elif voice_choice == "Academic":
+        guidance = ("Use a formal, academic tone with proper citations and structured arguments. Provide thorough "
+                    "analysis and consider multiple perspectives.")
+    elif voice_choice == "Technical":
+        guidance = ("Employ a technical tone with precise terminology relevant to the domain. Include specific "
+                    "details, examples, and implementation considerations.")
+    else:
+        guidance = (f"Use a {voice_choice} tone that balances clarity with engagement. Be informative while "
+                    f"keeping the reader's attention.")
+
+    return "# Tone & Voice\n" + guidance + "\n\n"
+
+
+def _render_domain_expertise(style) -> str:
+    return ("# Domain Expertise\n"
+            "Demonstrate expertise in modern software development practices, particularly Agile methodologies. "
+            "Draw upon knowledge of Scrum, Kanban, XP, and other frameworks. Provide practical insights based on "
+            "industry best practices and common implementation challenges.\n\n")
+
+
+def _render_constraints_limitations(style, constraints) -> str:
+    if constraints:
+        return "# Constraints & Limitations\n" + constraints + "\n\n"
+
+    return ("# Constraints & Limitations\n"
+            "Focus on practical implementation rather than theoretical background. Avoid making specific promises "
+            "about outcomes or timelines. Acknowledge that approaches may need to be adapted to specific "
+            "organizational contexts.\n\n")
+
+
+def _render_evaluation_criteria(style, evaluation_criteria) -> str:
+    if not evaluation_criteria:
+        return ""
+    return "# Evaluation Criteria\n" + evaluation_criteria + "\n\n"
+
+
+def _render_custom_section(style, section) -> str:
+    description = "Instructions for" if style == STRUCTURE else "Custom instructions for"
+    return f"# {section}\n" + f"{description} {section}.\n\n"
+
+
+@dataclass(frozen=True, slots=True)
+class Section:
+    """A registered prompt section: its renderer and the spec fields passed to it"""
+
+    render: Callable[..., str]
+    fields: Tuple[str, ...] = ()
+
+
+# Every built-in section, by name. Names missing from the registry render as custom sections.
+SECTIONS: Dict[str, Section] = {
+    "Context & Background": Section(_render_context, ("context",)),
+    "Task Definition": Section(_render_task, ("task",)),
+    "Content Intent & Guidelines": Section(
+        _render_content_intent, ("content_intent", "mission_statement", "voice_choice", "content_rules")),
+    "Content Setup": Section(
+        _render_content_setup, ("content_description", "business_name", "business_where", "business_who",
+                                "business_look", "business_why")),
+    "Design Requirements": Section(
+        _render_design_requirements, ("components", "language_choice", "globalization_items")),
+    "Data Sources & Examples": Section(
+        _render_data_sources, ("file_mappings", "graphql_mappings", "manual_examples")),
+    "Retrieved Context": Section(_render_retrieved_context, ("retrieved_context",)),
+    "Input Data Format": Section(_render_input_format, ("input_format", "input_description")),
+    "Output Requirements": Section(
+        _render_output_requirements, ("output_format", "output_tone", "output_requirements")),
+    "Examples (Few-Shot Learning)": Section(_render_examples, ("few_shot_enabled", "examples", "constraints")),
+    "Chain-of-Thought Instructions": Section(
+        _render_chain_of_thought, ("thinking_steps_enabled", "chain_of_thought_steps")),
+    "Self-Review Requirements": Section(_render_self_review, ("self_consistency_enabled",)),
+    "Fact Checking Instructions": Section(_render_fact_checking, ("fact_checker_enabled",)),
+    "Persona Definition": Section(_render_persona),
+    "Tone & Voice": Section(_render_tone, ("voice_choice",)),
+    "Domain Expertise": Section(_render_domain_expertise),
+    "Constraints & Limitations": Section(_render_constraints_limitations, ("constraints",)),
+    "Evaluation Criteria": Section(_render_evaluation_criteria, ("evaluation_criteria",)),
+}
+
+# Plan targets: the invariant opening of the system prompt, the user prompt and the per-prompt rest of the system prompt
+SYSTEM_PREFIX = 0
+USER_PROMPT = 1
+SYSTEM_REST = 2
+
+# A compiled layout: (target, section, style) entries
+Plan = Tuple[Tuple[int, str, str], ...]
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_combined(prompt_structure: Pairs) -> Tuple[str, ...]:
+    """Compile the ordered section list of the combined prompt"""
+    structure = dict(prompt_structure)
+    return tuple(section for section in COMBINED_PROMPT_SECTIONS
+                 if structure.get(section, section in DEFAULT_INCLUDED_SECTIONS))
+
+
+@functools.lru_cache(maxsize=256)
+def _compile_roles(system_prompt_sections: Pairs, user_prompt_sections: Pairs, prompt_structure: Pairs,
+                   prompt_section_order: Tuple[str, ...], section_roles: Optional[Pairs]) -> Plan:
+    """
+    Compile the system and user prompt layouts into a single ordered plan
+
+    Only the layout fields are inputs, so the plan is rebuilt only when sections
+    are toggled, reordered or moved between roles. A section appears at most once
+    per prompt, at its first position.
+
+    Returns:
+        The plan, in emission order
+    """
+    system_sections = dict(system_prompt_sections)
+    user_sections = dict(user_prompt_sections)
+    plan = []
+    seen = set()
+
+    def add(target, section, style):
+        # Both system targets belong to the same prompt
+        key = (target == USER_PROMPT, section)
+        if key not in seen:
+            seen.add(key)
+            plan.append((target, section, style))
+
+    # Invariant sections (persona, tone, expertise, constraints) come first: providers
+    # cache prompts by prefix, so a stable opening is reused across executions
+    for section in SYSTEM_PROMPT_SECTIONS[1:]:
+        if system_sections.get(section, False):
+            add(SYSTEM_PREFIX, section, SYSTEM)
+    for section, included in system_sections.items():
+        if included and section not in SYSTEM_PROMPT_SECTIONS:
+            add(SYSTEM_PREFIX, section, SYSTEM)
+
+    # Per-prompt sections (context, task, data...) change between runs, so they come
+    # after the invariant sections above to keep the cacheable prefix as long as possible
+    if section_roles is not None:
+        # Sections placed by the prompt structure editor, in its order
+        roles = dict(section_roles)
+        structure = dict(prompt_structure)
+        for section in prompt_section_order:
+            if structure.get(section, False):
+                if roles.get(section, "System") == "System":
+                    add(SYSTEM_REST, section, STRUCTURE)
+                if roles.get(section, "User") == "User":
+                    add(USER_PROMPT, section, STRUCTURE)
+    else:
+        if system_sections.get("Context & Background", False):
+            add(SYSTEM_REST, "Context & Background", SYSTEM)
+        if user_sections.get("Task Definition", False):
+            add(USER_PROMPT, "Task Definition", USER)
+
+    for section in USER_PROMPT_SECTIONS[1:]:
+        if user_sections.get(section, section in DEFAULT_INCLUDED_SECTIONS):
+            add(USER_PROMPT, section, USER)
+    for section, included in user_sections.items():
+        if included and section not in USER_PROMPT_SECTIONS:
+            add(USER_PROMPT, section, USER)
+
+    return tuple(plan)
+
+
+def _render_named(spec: PromptSpec, section: str, style: str) -> str:
+    """Render a section by name through the registry and the section cache"""
+    entry = SECTIONS.get(section)
+    if entry is None:
+        return _render_section(_render_custom_section, style, section)
+    return _render_section(entry.render, style, *(getattr(spec, field) for field in entry.fields))
+
+
+def render_prompt(spec: PromptSpec) -> str:
+    """
+    Render the combined prompt
+
+    Args:
+        spec: The prompt spec
+
+    Returns:
+        str: The formatted prompt text
+    """
+    return "".join(_render_named(spec, section, COMBINED) for section in _compile_combined(spec.prompt_structure))
+
+
+def render_role_prompt_parts(spec: PromptSpec) -> Tuple[str, str, str]:
+    """
+    Render the role-based prompts with the system prompt split at its cacheable prefix
+
+    The prefix holds the invariant sections (persona, tone, expertise,
+    constraints); the per-prompt sections placed in the system prompt (context,
+    retrieved passages...) follow it in the rest.
+
+    Args:
+        spec: The prompt spec
+
+    Returns:
+        Tuple of (system prompt prefix, rest of the system prompt, user prompt)
+    """
+    plan = _compile_roles(spec.system_prompt_sections, spec.user_prompt_sections, spec.prompt_structure,
+                          spec.prompt_section_order, spec.section_roles)
+    parts: Tuple[List[str], List[str], List[str]] = ([], [], [])
+
+    for target, section, style in plan:
+        parts[target].append(_render_named(spec, section, style))
+
+    return "".join(parts[SYSTEM_PREFIX]), "".join(parts[SYSTEM_REST]), "".join(parts[USER_PROMPT])
+
+
+def render_role_prompts(spec: PromptSpec) -> Tuple[str, str]:
+    """
+    Render the system and user prompts for role-based prompting in one pass
+
+    Args:
+        spec: The prompt spec
+
+    Returns:
+        Tuple of (system prompt, user prompt)
+    """
+    prefix, rest, user_prompt = render_role_prompt_parts(spec)
+    return prefix + rest, user_prompt
+
+
+def render_system_prompt(spec: PromptSpec) -> str:
+    """
+    Render the system prompt for role-based prompting
+
+    Args:
+        spec: The prompt spec
+
+    Returns:
+        str: Formatted system prompt
+    """
+    return render_role_prompts(spec)[0]
+
+
+def render_user_prompt(spec: PromptSpec) -> str:
+    """
+    Render the user prompt for role-based prompting
+
+    Args:
+        spec: The prompt spec
+
+    Returns:
+        str: Formatted user prompt
+    """
+    return render_role_prompts(spec)[1]
+
+
+def render_all(spec: PromptSpec) -> Dict[str, str]:
+    """
+    Render every prompt variant of a spec
+
+    Args:
+        spec: The prompt spec
+
+    Returns:
+        Dict with the combined "prompt", "system_prompt" and "user_prompt"
+    """
+    system_prompt, user_prompt = render_role_prompts(spec)
+    return {"prompt": render_prompt(spec), "system_prompt": system_prompt, "user_prompt": user_prompt}
+
+
+def render_batch(specs: Iterable[PromptSpec], max_workers: Optional[int] = None,
+                 chunksize: int = 64) -> List[Dict[str, str]]:
+    """
+    Render many specs across a process pool
+
+    Specs are sent to the workers in chunks to amortize pickling overhead; each
+    worker keeps its own section cache.
+
+    Args:
+        specs: The prompt specs to render
+        max_workers: Worker processes (None for one per CPU, 1 to render in this process)
+        chunksize: Specs sent to a worker at a time
+
+    Returns:
+        One render_all() result per spec, in input order
+    """
+    if max_workers == 1:
+        return [render_all(spec) for spec in specs]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(render_all, specs, chunksize=chunksize))
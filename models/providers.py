@@ -0,0 +1,468 @@
+import os
+import json
+import logging
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple, Type, Union
+
+logger = logging.getLogger(__name__)
+
+# A system prompt, or its (invariant prefix, per-prompt rest) parts: providers with explicit
+# prompt caching place the cache breakpoint between the two
+SystemPrompt = Union[str, Tuple[str, str]]
+
+
+def split_system_prompt(system_prompt: Optional[SystemPrompt]) -> Tuple[str, str]:
+    """
+    Get the (cacheable prefix, rest) parts of a system prompt
+
+    A plain string is taken as invariant as a whole.
+
+    Args:
+        system_prompt: The system prompt
+
+    Returns:
+        Tuple of (prefix, rest)
+    """
+    if isinstance(system_prompt, tuple):
+        return system_prompt
+    return system_prompt or "", ""
+
+
+class ProviderError(Exception):
+    """Raised when a provider reports an error inside an otherwise successful response"""
+
+
+class ProviderAdapter:
+    """
+    Translates between ContentGenerator and one provider's HTTP API
+
+    Adapters only build request bodies and parse responses; the HTTP transport
+    (pooled sessions, rate limits, retries) is shared and lives in ContentGenerator.
+    Capability flags tell callers which optional features the backend supports.
+    """
+
+    name = "base"
+    default_base_url = ""
+    default_model = ""
+    requires_api_key = True
+
+    # Capability flags
+    supports_streaming = False
+    supports_batching = False
+    supports_prompt_caching = False
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None):
+        """
+        Initialize the adapter
+
+        Args:
+            api_key: API key for the provider
+            base_url: Endpoint URL (defaults to the provider's public endpoint)
+        """
+        self.api_key = api_key
+        self.base_url = base_url or self.default_base_url
+
+    def capabilities(self) -> Dict[str, bool]:
+        """
+        Get the optional features this backend supports
+
+        Returns:
+            Dict of capability flags
+        """
+        return {
+            "streaming": self.supports_streaming,
+            "batching": self.supports_batching,
+            "prompt_caching": self.supports_prompt_caching
+        }
+
+    def build_headers(self) -> Dict[str, str]:
+        """Build the HTTP headers for a request"""
+        raise NotImplementedError
+
+    def build_request(self,
+                      prompt: str,
+                      model: str,
+                      max_tokens: int,
+                      temperature: float,
+                      system_prompt: Optional[SystemPrompt] = None,
+                      additional_params: Optional[Dict[str, Any]] = None,
+                      cache_system_prompt: bool = False) -> Dict[str, Any]:
+        """
+        Build the JSON body for a request
+
+        Args:
+            prompt: The user message
+            model: The model to use
+            max_tokens: Maximum tokens in the response
+            temperature: Temperature parameter for generation
+            system_prompt: Optional system message, or its (invariant prefix, per-prompt rest) parts
+            additional_params: Any additional parameters to pass to the API
+            cache_system_prompt: Mark the system prompt prefix as cacheable
+                (ignored by providers without explicit prompt caching)
+
+        Returns:
+            Dict to send as the request body
+        """
+        raise NotImplementedError
+
+    def enable_streaming(self, data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Turn a request body into its streaming equivalent
+
+        Args:
+            data: Request body from build_request
+
+        Returns:
+            A new request body asking for a server-sent-event stream
+        """
+        return dict(data, stream=True)
+
+    def parse_response(self, result: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """
+        Extract the generated text and normalized usage from a response body
+
+        Args:
+            result: The decoded JSON response
+
+        Returns:
+            Tuple of the generated text and usage with input_tokens/output_tokens keys
+            (plus cache_creation_input_tokens/cache_read_input_tokens when reported)
+        """
+        raise NotImplementedError
+
+    def parse_stream_event(self, event: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Interpret one server-sent event
+
+        Args:
+            event: The SSE event name
+            payload: The decoded event data
+
+        Returns:
+            Dict with any of "text", "usage", "stop_reason" and "done"
+
+        Raises:
+            ProviderError: If the event reports an error
+        """
+        raise NotImplementedError
+
+
+    def batch_url(self) -> str:
+        """Get the endpoint that message-batch jobs are submitted to"""
+        raise NotImplementedError(f"{self.name} does not support message batches")
+
+    def build_batch(self, requests: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        """
+        Pack many request bodies into one batch job submission
+
+        Args:
+            requests: (custom_id, request body from build_request) pairs
+
+        Returns:
+            Dict to send as the batch creation body
+        """
+        raise NotImplementedError(f"{self.name} does not support message batches")
+
+    def parse_batch_status(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Normalize a batch job status response
+
+        Args:
+            result: The decoded JSON status response
+
+        Returns:
+            Dict with "id", "ended", "results_url" and per-outcome "counts"
+        """
+        raise NotImplementedError(f"{self.name} does not support message batches")
+
+    def parse_batch_result(self, record: Dict[str, Any]) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Interpret one line of a batch results file
+
+        Args:
+            record: The decoded JSON line
+
+        Returns:
+            Tuple of the custom_id, the response body on success and an error message on failure
+        """
+        raise NotImplementedError(f"{self.name} does not support message batches")
+
+
+class AnthropicAdapter(ProviderAdapter):
+    """Adapter for the Anthropic Messages API"""
+
+    name = "anthropic"
+    default_base_url = "https://api.anthropic.com/v1/messages"
+    default_model = "claude-3-5-sonnet"
+
+    supports_streaming = True
+    supports_batching = True
+    supports_prompt_caching = True
+
+    def build_headers(self) -> Dict[str, str]:
+        return {
+            "Content-Type": "application/json",
+            "x-api-key": self.api_key,
+            "anthropic-version": "2023-06-01"
+        }
+
+    def build_request(self, prompt, model, max_tokens, temperature, system_prompt=None, additional_params=None,
+                      cache_system_prompt=False):
+        data = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+
+        prefix, rest = split_system_prompt(system_prompt)
+        if prefix and cache_system_prompt:
+            # A cache breakpoint after the invariant prefix lets repeated runs read it
+            # from the provider's cache; the per-prompt rest follows in its own block so
+            # it does not change the cached prefix (prompts below the model's minimum
+            # cacheable length are simply processed uncached)
+            data["system"] = [{"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}}]
+            if rest:
+                data["system"].append({"type": "text", "text": rest})
+        elif prefix or rest:
+            data["system"] = prefix + rest
+
+        # Add any additional parameters
+        if additional_params:
+            data.update(additional_params)
+
+        return data
+
+    def parse_response(self, result):
+        text = result.get("content", [{"text": "No content returned"}])[0]["text"]
+        return text, dict(result.get("usage", {}))
+
+    def parse_stream_event(self, event, payload):
+        if event == "message_start":
+            return {"usage": payload.get("message", {}).get("usage", {})}
+
+        if event == "content_block_delta":
+            return {"text": payload.get("delta", {}).get("text")}
+
+        if event == "message_delta":
+            return {"usage": payload.get("usage", {}), "stop_reason": payload.get("delta", {}).get("stop_reason")}
+
+        if event == "message_stop":
+            return {"done": True}
+
+        if event == "error":
+            raise ProviderError(payload.get("error", {}).get("message", "Stream error"))
+
+        return {}
+
+    def batch_url(self):
+        return self.base_url.rstrip("/") + "/batches"
+
+    def build_batch(self, requests):
+        return {"requests": [{"custom_id": custom_id, "params": params} for custom_id, params in requests]}
+
+    def parse_batch_status(self, result):
+        return {
+            "id": result["id"],
+            "ended": result.get("processing_status") == "ended",
+            "results_url": result.get("results_url"),
+            "counts": dict(result.get("request_counts", {}))
+        }
+
+    def parse_batch_result(self, record):
+        outcome = record.get("result", {})
+
+        if outcome.get("type") == "succeeded":
+            return record["custom_id"], outcome.get("message", {}), None
+
+        if outcome.get("type") == "errored":
+            error = outcome.get("error", {})
+            # The error may be wrapped in an API error envelope
+            error = error.get("error", error)
+            return record["custom_id"], None, error.get("message", "Batch request errored")
+
+        return record["custom_id"], None, f"Batch request {outcome.get('type', 'failed')}"
+
+
+class OpenAICompatibleAdapter(ProviderAdapter):
+    """Adapter for OpenAI's Chat Completions API and servers that mimic it"""
+
+    name = "openai"
+    default_base_url = "https://api.openai.com/v1/chat/completions"
+    default_model = "gpt-4o"
+
+    supports_streaming = True
+
+    def build_headers(self) -> Dict[str, str]:
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["Authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    def build_request(self, prompt, model, max_tokens, temperature, system_prompt=None, additional_params=None,
+                      cache_system_prompt=False):
+        # OpenAI caches shared prompt prefixes automatically, so there is nothing to mark
+        messages: List[Dict[str, Any]] = []
+        system_prompt = "".join(split_system_prompt(system_prompt))
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        data = {
+            "model": model,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+
+        # Add any additional parameters
+        if additional_params:
+            data.update(additional_params)
+
+        return data
+
+    def enable_streaming(self, data):
+        return dict(data, stream=True, stream_options={"include_usage": True})
+
+    @staticmethod
+    def _normalize_usage(usage: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Map prompt/completion token counts onto input/output token keys"""
+        if not usage:
+            return {}
+
+        # prompt_tokens includes cached tokens; report them separately like Anthropic does
+        cached = (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0)
+        normalized = {
+            "input_tokens": usage.get("prompt_tokens", 0) - cached,
+            "output_tokens": usage.get("completion_tokens", 0),
+            "cache_read_input_tokens": cached
+        }
+        if "total_tokens" in usage:
+            normalized["total_tokens"] = usage["total_tokens"]
+
+        return normalized
+
+    def parse_response(self, result):
+        choices = result.get("choices") or [{}]
+        text = choices[0].get("message", {}).get("content") or "No content returned"
+        return text, self._normalize_usage(result.get("usage"))
+
+    def parse_stream_event(self, event, payload):
+        if payload.get("done"):
+            return {"done": True}
+
+        if "error" in payload:
+            error = payload["error"]
+            raise ProviderError(error.get("message", "Stream error") if isinstance(error, dict) else str(error))
+
+        delta: Dict[str, Any] = {}
+        choices = payload.get("choices") or []
+        if choices:
+            delta["text"] = choices[0].get("delta", {}).get("content")
+            if choices[0].get("finish_reason"):
+                delta["stop_reason"] = choices[0]["finish_reason"]
+
+        if payload.get("usage"):
+            delta["usage"] = self._normalize_usage(payload["usage"])
+
+        return delta
+
+
+class LocalHTTPAdapter(OpenAICompatibleAdapter):
+    """
+    Adapter for a self-hosted model server exposing an OpenAI-compatible endpoint
+
+    Works with vLLM, llama.cpp, Ollama and similar servers; no API key is required.
+    """
+
+    name = "local"
+    default_base_url = os.environ.get("LOCAL_LLM_URL", "http://localhost:8000/v1/chat/completions")
+    default_model = "local-model"
+    requires_api_key = False
+
+
+# Registered adapters by provider name
+PROVIDER_ADAPTERS: Dict[str, Type[ProviderAdapter]] = {
+    AnthropicAdapter.name: AnthropicAdapter,
+    OpenAICompatibleAdapter.name: OpenAICompatibleAdapter,
+    LocalHTTPAdapter.name: LocalHTTPAdapter
+}
+
+# Provider choices shown in the UI mapped to adapter names
+PROVIDER_CHOICES = {
+    "Anthropic": AnthropicAdapter.name,
+    "OpenAI": OpenAICompatibleAdapter.name,
+    "Custom": LocalHTTPAdapter.name
+}
+
+
+def get_adapter(provider: str = "anthropic",
+                api_key: Optional[str] = None,
+                base_url: Optional[str] = None) -> ProviderAdapter:
+    """
+    Create the adapter for a provider
+
+    Args:
+        provider: Adapter name ("anthropic", "openai", "local") or UI label ("Anthropic", "OpenAI", "Custom")
+        api_key: API key for the provider
+        base_url: Optional endpoint URL override
+
+    Returns:
+        A ProviderAdapter instance
+
+    Raises:
+        ValueError: If the provider is unknown
+    """
+    name = PROVIDER_CHOICES.get(provider, provider).lower()
+
+    if name not in PROVIDER_ADAPTERS:
+        raise ValueError(f"Unknown provider: {provider}")
+
+    return PROVIDER_ADAPTERS[name](api_key=api_key, base_url=base_url)
+
+
+def iter_sse_events(lines: Iterable[str]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Parse a server-sent-event stream into (event, payload) pairs
+
+    The OpenAI-style "[DONE]" sentinel is reported as {"done": True}.
+
+    Args:
+        lines: Decoded lines of the HTTP response body
+
+    Yields:
+        Tuples of the event name and its JSON-decoded data
+
+    Raises:
+        ProviderError: If an event's data is valid JSON but not an object
+    """
+    event = None
+    data_lines = []
+
+    def dispatch():
+        data = "\n".join(data_lines)
+        if data == "[DONE]":
+            return event or "done", {"done": True}
+        payload = json.loads(data)
+        if not isinstance(payload, dict):
+            raise ProviderError(f"Unexpected stream payload: {data[:100]}")
+        return event or payload.get("type", "message"), payload
+
+    for line in lines:
+        if line is None:
+            continue
+
+        # A blank line dispatches the buffered event
+        if not line:
+            if data_lines:
+                yield dispatch()
+            event = None
+            data_lines = []
+        elif line.startswith(":"):
+            continue
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].lstrip())
+
+    if data_lines:
+        yield dispatch()
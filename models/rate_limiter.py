@@ -0,0 +1,298 @@
+import os
+import time
+import random
+import logging
+import threading
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default per-model budgets (unset means unlimited)
+DEFAULT_REQUESTS_PER_MINUTE = os.environ.get("LLM_REQUESTS_PER_MINUTE")
+DEFAULT_TOKENS_PER_MINUTE = os.environ.get("LLM_TOKENS_PER_MINUTE")
+
+# HTTP statuses worth retrying: rate limited, overloaded or transient server errors
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot get rate-limit capacity without waiting"""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    A thread-safe token bucket that refills continuously up to its capacity
+    """
+
+    def __init__(self, capacity: float, refill_per_second: float):
+        """
+        Initialize the bucket full
+
+        Args:
+            capacity: Maximum number of tokens the bucket holds
+            refill_per_second: Tokens added back per second
+        """
+        self.capacity = float(capacity)
+        self.refill_per_second = float(refill_per_second)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        """Add the tokens accrued since the last update"""
+        elapsed = max(now - self._updated, 0.0)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.refill_per_second)
+        self._updated = now
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take tokens if available, otherwise report how long until they would be
+
+        Args:
+            amount: Number of tokens needed (clamped to the capacity)
+
+        Returns:
+            0 if the tokens were taken, otherwise the seconds to wait before retrying
+        """
+        amount = min(float(amount), self.capacity)
+
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.refill_per_second
+
+    def refund(self, amount: float):
+        """Give back tokens that were reserved but not used"""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + float(amount))
+
+    def drain(self):
+        """Empty the bucket, e.g. after the provider reported a rate limit"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = 0.0
+
+
+class RateLimiter:
+    """
+    Client-side budget for one provider/model: requests and tokens per minute
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Initialize the limiter
+
+        Args:
+            requests_per_minute: Request budget (None for unlimited)
+            tokens_per_minute: Input plus output token budget (None for unlimited)
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+
+        self._requests = TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute else None
+        self._tokens = TokenBucket(tokens_per_minute, tokens_per_minute / 60.0) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self, tokens: int) -> float:
+        """Try to take one request and `tokens` tokens; return the wait if not possible"""
+        with self._lock:
+            pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            return pause
+
+        if self._requests is not None:
+            wait = self._requests.reserve(1)
+            if wait > 0:
+                return wait
+
+        if self._tokens is not None:
+            wait = self._tokens.reserve(tokens)
+            if wait > 0:
+                if self._requests is not None:
+                    self._requests.refund(1)
+                return wait
+
+        return 0.0
+
+    def acquire(self, tokens: int = 0, block: bool = True, timeout: Optional[float] = None) -> float:
+        """
+        Wait for capacity to send one request of about `tokens` tokens
+
+        Args:
+            tokens: Estimated input plus output tokens of the request
+            block: Queue until capacity is available instead of failing
+            timeout: Maximum seconds to queue (None waits indefinitely)
+
+        Returns:
+            Seconds spent waiting for capacity
+
+        Raises:
+            RateLimitExceeded: If block is False (or the timeout expires) and no capacity is available
+        """
+        start = time.monotonic()
+
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return time.monotonic() - start
+
+            waited = time.monotonic() - start
+            if not block or (timeout is not None and waited + wait > timeout):
+                raise RateLimitExceeded(f"Rate limit budget exhausted, retry in {wait:.1f}s", wait)
+
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """
+        Stop handing out capacity for a while after the provider rejected a request
+
+        Args:
+            seconds: How long to pause (usually the provider's Retry-After)
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+        if self._requests is not None:
+            self._requests.drain()
+
+
+class RateLimiterRegistry:
+    """
+    A thread-safe registry of rate limiters keyed by (provider, model)
+    """
+
+    def __init__(self,
+                 default_requests_per_minute: Optional[float] = None,
+                 default_tokens_per_minute: Optional[float] = None,
+                 limits: Optional[Dict[Tuple[str, str], Tuple[Optional[float], Optional[float]]]] = None):
+        """
+        Initialize the registry
+
+        Args:
+            default_requests_per_minute: Request budget for models without an explicit limit
+            default_tokens_per_minute: Token budget for models without an explicit limit
+            limits: Explicit (requests_per_minute, tokens_per_minute) budgets keyed by (provider, model)
+        """
+        self.default_requests_per_minute = default_requests_per_minute
+        self.default_tokens_per_minute = default_tokens_per_minute
+        self.limits = dict(limits or {})
+
+        self._limiters: Dict[Tuple[str, str], RateLimiter] = {}
+        self._lock = threading.Lock()
+
+    def get(self, provider: str, model: str) -> RateLimiter:
+        """
+        Get the limiter for a provider/model, creating it on first use
+
+        Args:
+            provider: Provider name or base URL
+            model: Model name
+
+        Returns:
+            The shared RateLimiter
+        """
+        key = (provider, model)
+
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                rpm, tpm = self.limits.get(key, (self.default_requests_per_minute, self.default_tokens_per_minute))
+                limiter = RateLimiter(rpm, tpm)
+                self._limiters[key] = limiter
+
+        return limiter
+
+    def set_limits(self, provider: str, model: str,
+                   requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        """
+        Set the budgets for a provider/model, replacing any existing limiter
+
+        Args:
+            provider: Provider name or base URL
+            model: Model name
+            requests_per_minute: Request budget (None for unlimited)
+            tokens_per_minute: Token budget (None for unlimited)
+        """
+        with self._lock:
+            self.limits[(provider, model)] = (requests_per_minute, tokens_per_minute)
+            self._limiters.pop((provider, model), None)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header given either in seconds or as an HTTP date
+
+    Args:
+        value: The header value
+
+    Returns:
+        Seconds to wait, or None if the header is missing or invalid
+    """
+    if not value:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def compute_backoff(attempt: int,
+                    base_delay: float = 1.0,
+                    max_delay: float = 60.0,
+                    retry_after: Optional[float] = None) -> float:
+    """
+    Compute the delay before a retry using exponential backoff with full jitter
+
+    Args:
+        attempt: Zero-based retry number
+        base_delay: Delay ceiling for the first retry in seconds
+        max_delay: Upper bound on any delay
+        retry_after: Server-provided minimum delay, honored when present
+
+    Returns:
+        Seconds to sleep before retrying
+    """
+    delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, max_delay))
+    return delay
+
+
+# Process-wide registry shared by all ContentGenerator instances
+_default_registry: Optional[RateLimiterRegistry] = None
+_default_registry_lock = threading.Lock()
+
+
+def get_rate_limiters() -> RateLimiterRegistry:
+    """
+    Get the process-wide rate limiter registry
+
+    Budgets default to the LLM_REQUESTS_PER_MINUTE and LLM_TOKENS_PER_MINUTE
+    environment variables (unlimited when unset).
+
+    Returns:
+        The shared RateLimiterRegistry
+    """
+    global _default_registry
+
+    with _default_registry_lock:
+        if _default_registry is None:
+            _default_registry = RateLimiterRegistry(
+                default_requests_per_minute=float(DEFAULT_REQUESTS_PER_MINUTE) if DEFAULT_REQUESTS_PER_MINUTE else None,
+                default_tokens_per_minute=float(DEFAULT_TOKENS_PER_MINUTE) if DEFAULT_TOKENS_PER_MINUTE else None
+            )
+        return _default_registry
@@ -0,0 +1,228 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default cache settings (overridable through the environment)
+DEFAULT_CACHE_DIR = os.environ.get("LLM_CACHE_DIR", ".cache")
+DEFAULT_MEMORY_ENTRIES = int(os.environ.get("LLM_CACHE_MEMORY_ENTRIES", 256))
+DEFAULT_DISK_ENTRIES = int(os.environ.get("LLM_CACHE_DISK_ENTRIES", 10000))
+DEFAULT_DISK_BYTES = int(os.environ.get("LLM_CACHE_DISK_BYTES", 256 * 1024 * 1024))
+DEFAULT_TTL = float(os.environ.get("LLM_CACHE_TTL", 7 * 24 * 3600))
+
+
+def make_cache_key(request_data: Dict[str, Any], namespace: str = "") -> str:
+    """
+    Build a content-addressed key for a provider request
+
+    The key is a SHA-256 of the canonical JSON of the request body, so it covers
+    the model, messages, temperature, max_tokens and any extra parameters.
+
+    Args:
+        request_data: The JSON body that would be sent to the provider
+        namespace: Optional prefix separating different endpoints or providers
+
+    Returns:
+        Hex digest identifying the request
+    """
+    canonical = json.dumps(request_data, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"{namespace}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    A two-tier cache for LLM responses: an in-memory LRU in front of SQLite
+
+    Entries expire after a TTL; the memory tier is bounded by entry count and
+    the disk tier by both entry count and total payload size, evicting the
+    least recently used entries first.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_entries: int = DEFAULT_DISK_ENTRIES,
+                 max_disk_bytes: int = DEFAULT_DISK_BYTES,
+                 ttl: Optional[float] = DEFAULT_TTL,
+                 cache_sampling: bool = False):
+        """
+        Initialize the response cache
+
+        Args:
+            path: SQLite file for the disk tier (None keeps the cache in memory only)
+            memory_entries: Maximum number of entries held in the memory tier
+            max_disk_entries: Maximum number of entries held on disk
+            max_disk_bytes: Maximum total payload size held on disk
+            ttl: Seconds an entry stays valid (None never expires)
+            cache_sampling: Whether requests with temperature > 0 are cached by default
+        """
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.ttl = ttl
+        self.cache_sampling = cache_sampling
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "writes": 0, "evictions": 0}
+
+        self._db = None
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses(accessed_at)")
+
+    def should_bypass(self, temperature: Optional[float], use_cache: Optional[bool] = None) -> bool:
+        """
+        Decide whether a request should skip the cache
+
+        Args:
+            temperature: Sampling temperature of the request
+            use_cache: True forces caching, False forces a bypass, None applies the
+                default policy (sampled runs with temperature > 0 bypass the cache
+                unless cache_sampling is set)
+
+        Returns:
+            True if the cache should not be consulted or written
+        """
+        if use_cache is not None:
+            return not use_cache
+        return bool(temperature) and not self.cache_sampling
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached response
+
+        Args:
+            key: Key from make_cache_key
+
+        Returns:
+            The cached response, or None on a miss
+        """
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._counters["hits"] += 1
+                    self._counters["memory_hits"] += 1
+                    return json.loads(value)
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, expires_at = row
+                    if expires_at is None or expires_at > now:
+                        self._db.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._remember(key, expires_at, value)
+                        self._counters["hits"] += 1
+                        self._counters["disk_hits"] += 1
+                        return json.loads(value)
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+
+            self._counters["misses"] += 1
+            return None
+
+    def set(self, key: str, value: Dict[str, Any]):
+        """
+        Store a response in both tiers
+
+        Args:
+            key: Key from make_cache_key
+            value: JSON-serializable response to cache
+        """
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl is not None else None
+        payload = json.dumps(value, default=str)
+
+        with self._lock:
+            self._remember(key, expires_at, payload)
+            self._counters["writes"] += 1
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, size, expires_at, accessed_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, payload, len(payload), expires_at, now)
+                )
+                self._evict_disk(now)
+
+    def _remember(self, key: str, expires_at: Optional[float], payload: str):
+        """Insert an entry into the memory tier, evicting the least recently used"""
+        self._memory[key] = (expires_at, payload)
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        """Drop expired entries, then LRU entries until the disk limits hold"""
+        self._db.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+
+        count, total_size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        if count <= self.max_disk_entries and total_size <= self.max_disk_bytes:
+            return
+
+        evicted = 0
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall():
+            if count <= self.max_disk_entries and total_size <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            count -= 1
+            total_size -= size
+            evicted += 1
+
+        self._counters["evictions"] += evicted
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+
+        Returns:
+            Dict with hits, misses, per-tier hits, writes, evictions and entry counts
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_entries"] = (
+                self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0] if self._db is not None else 0
+            )
+
+        return stats
+
+    def clear(self):
+        """Remove every cached response from both tiers"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+
+    def close(self):
+        """Close the disk tier"""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
@@ -0,0 +1,36 @@
+from typing import Dict, Iterable, List
+
+from models.retrieval.chunking import Chunk, chunk_text, DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS
+from models.retrieval.bm25 import BM25Index, SearchResult, analyze
+from models.retrieval.embedding import HashingEmbedder, DEFAULT_EMBEDDING_DIM
+from models.retrieval.fingerprint import (DuplicateFilter, FingerprintIndex, simhash, hamming_distance,
+                                          DEFAULT_DUPLICATE_DISTANCE)
+from models.retrieval.dense import DenseIndex, DenseRetriever
+from models.retrieval.ingest import IngestionJob, create_ingest_pool, extract_text, clean_text, KNOWLEDGE_EXTENSIONS
+
+# Retrieval backends offered by the RAG workflow
+KEYWORD_RETRIEVAL = "Keyword (BM25)"
+EMBEDDING_RETRIEVAL = "Embedding (local hashing)"
+RETRIEVAL_METHODS = [KEYWORD_RETRIEVAL, EMBEDDING_RETRIEVAL]
+
+
+def context_entries(results: Iterable[SearchResult]) -> List[Dict[str, object]]:
+    """
+    Convert search results into the entries of PromptSpec.retrieved_context
+
+    Args:
+        results: Results from BM25Index.search
+
+    Returns:
+        One dict per result with doc_id, source, position, text and relevance
+    """
+    return [{"doc_id": result.doc_id, "source": result.source, "position": result.position,
+             "text": result.text, "relevance": round(result.relevance, 3)} for result in results]
+
+
+__all__ = ["Chunk", "chunk_text", "DEFAULT_CHUNK_TOKENS", "DEFAULT_OVERLAP_TOKENS",
+           "BM25Index", "SearchResult", "analyze", "context_entries",
+           "HashingEmbedder", "DEFAULT_EMBEDDING_DIM", "DenseIndex", "DenseRetriever",
+           "DuplicateFilter", "FingerprintIndex", "simhash", "hamming_distance", "DEFAULT_DUPLICATE_DISTANCE",
+           "IngestionJob", "create_ingest_pool", "extract_text", "clean_text", "KNOWLEDGE_EXTENSIONS",
+           "KEYWORD_RETRIEVAL", "EMBEDDING_RETRIEVAL", "RETRIEVAL_METHODS"]
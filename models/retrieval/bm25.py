@@ -0,0 +1,766 @@
+import os
+import re
+import math
+import time
+import sqlite3
+import logging
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from models.retrieval.chunking import DEFAULT_CHUNK_TOKENS, DEFAULT_OVERLAP_TOKENS, chunk_text
+from models.retrieval.fingerprint import DEFAULT_DUPLICATE_DISTANCE, DuplicateFilter, FingerprintIndex, simhash
+
+logger = logging.getLogger(__name__)
+
+# Default scoring and index settings (overridable through the environment)
+DEFAULT_K1 = float(os.environ.get("BM25_K1", 1.2))
+DEFAULT_B = float(os.environ.get("BM25_B", 0.75))
+DEFAULT_POSTINGS_CACHE = int(os.environ.get("RETRIEVAL_POSTINGS_CACHE", 4096))
+DEFAULT_FLUSH_CHUNKS = int(os.environ.get("RETRIEVAL_FLUSH_CHUNKS", 50000))
+
+# Deleted chunks linger in postings until this share of the index is dead, then postings are rewritten
+COMPACT_RATIO = 0.25
+# New postings are appended as segments; a term's segments are merged once it has this many
+MAX_SEGMENTS = 8
+
+_TERM_RE = re.compile(r"\w+")
+
+# Function words carry almost no BM25 weight but have the longest postings
+STOPWORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between both
+but by can did do does doing down during each few for from further had has have having he her here hers him his
+how i if in into is it its itself just me more most my no nor not now of off on once only or other our ours out
+over own same she should so some such than that the their theirs them then there these they this those through to
+too under until up very was we were what when where which while who whom why will with you your yours
+""".split())
+
+
+def analyze(text: str) -> List[str]:
+    """
+    Split text into index terms: lower-case words, without stopwords
+
+    Args:
+        text: Query or chunk text
+
+    Returns:
+        The terms, in order (repeats kept)
+    """
+    return [term for term in _TERM_RE.findall(text.lower()) if term not in STOPWORDS]
+
+
+@dataclass(frozen=True, slots=True)
+class PreparedChunk:
+    """A chunk ready to be indexed: its text, term frequencies and SimHash fingerprint"""
+
+    position: int
+    text: str
+    terms: Dict[str, int]
+    length: int
+    fingerprint: Optional[int] = None
+
+
+def prepare_document(text: str, chunk_size: int = DEFAULT_CHUNK_TOKENS,
+                     overlap: int = DEFAULT_OVERLAP_TOKENS) -> List[PreparedChunk]:
+    """
+    Chunk and analyze a document for indexing
+
+    This is the CPU-bound part of adding a document and needs no index, so it
+    can run in worker processes while a single writer adds the results.
+
+    Args:
+        text: Document text
+        chunk_size: Tokens per chunk
+        overlap: Tokens shared by consecutive chunks
+
+    Returns:
+        The prepared chunks, in document order
+    """
+    chunks = []
+    for chunk in chunk_text(text, chunk_size, overlap):
+        terms = analyze(chunk.text)
+        chunks.append(PreparedChunk(chunk.position, chunk.text, dict(Counter(terms)), len(terms), simhash(terms)))
+    return chunks
+
+
+@dataclass(frozen=True, slots=True)
+class SearchResult:
+    """A retrieved chunk: BM25 score, and relevance relative to the best match (1.0 for the top hit)"""
+
+    doc_id: str
+    source: str
+    chunk_id: int
+    position: int
+    text: str
+    score: float
+    relevance: float
+
+
+class BM25Index:
+    """
+    A BM25 inverted index over document chunks, persisted in SQLite
+
+    Each term's postings are stored as two packed arrays (chunk ids and term
+    frequencies), so a query loads a few rows per term and scores every matching
+    chunk with vectorized numpy arithmetic. Chunk lengths are held in memory as
+    an array indexed by chunk id, and recently used postings are cached.
+
+    Additions append a new segment to each term they contain instead of
+    rewriting its postings; a term's segments are merged into one once it has
+    MAX_SEGMENTS of them, so indexing cost does not grow with the index.
+
+    Documents can be added and deleted at any time. Deleted chunks are masked
+    out at query time and purged from the postings once they make up a quarter
+    of the index.
+
+    Every chunk has a SimHash fingerprint, stored with it and bucketed by band
+    in memory. A chunk whose fingerprint is within duplicate_distance bits of an
+    indexed chunk (boilerplate repeated across pages and files) is stored as a
+    duplicate of it, without postings or embedding; when the indexed chunk's
+    document is deleted, one of its duplicates takes its place. Search results
+    are filtered for near-duplicates again, which catches those indexed before
+    fingerprints existed or with deduplication disabled.
+    """
+
+    def __init__(self,
+                 path: Optional[str] = None,
+                 k1: float = DEFAULT_K1,
+                 b: float = DEFAULT_B,
+                 chunk_size: int = DEFAULT_CHUNK_TOKENS,
+                 overlap: int = DEFAULT_OVERLAP_TOKENS,
+                 postings_cache: int = DEFAULT_POSTINGS_CACHE,
+                 duplicate_distance: Optional[int] = DEFAULT_DUPLICATE_DISTANCE):
+        """
+        Open (or create) an index
+
+        Args:
+            path: SQLite file holding the index (None keeps it in memory)
+            k1: BM25 term-frequency saturation
+            b: BM25 length normalization
+            chunk_size: Tokens per chunk for added documents
+            overlap: Tokens shared by consecutive chunks
+            postings_cache: Number of terms whose postings are kept in memory
+            duplicate_distance: Largest fingerprint Hamming distance between near-duplicate chunks
+                (None disables deduplication)
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+        self.postings_cache = postings_cache
+        self.duplicate_distance = duplicate_distance
+        self._fingerprints = None if duplicate_distance is None else FingerprintIndex(duplicate_distance)
+
+        self._lock = threading.RLock()
+        # Bumped on every change, so derived indexes know when to resynchronize
+        self._version = 0
+        self._postings: "OrderedDict[str, Tuple[np.ndarray, np.ndarray]]" = OrderedDict()
+
+        if path:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", check_same_thread=False, isolation_level=None)
+        if path:
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "doc_id TEXT PRIMARY KEY, source TEXT NOT NULL, added_at REAL NOT NULL);"
+            # canonical is the indexed chunk a near-duplicate was collapsed into (NULL for indexed chunks)
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "id INTEGER PRIMARY KEY, doc_id TEXT NOT NULL, position INTEGER NOT NULL, "
+            "text TEXT NOT NULL, length INTEGER NOT NULL, fingerprint INTEGER, canonical INTEGER);"
+            "CREATE INDEX IF NOT EXISTS chunks_doc ON chunks(doc_id);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term TEXT NOT NULL, segment INTEGER NOT NULL, ids BLOB NOT NULL, tfs BLOB NOT NULL, "
+            "PRIMARY KEY (term, segment)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+        )
+        self._migrate()
+        self._db.execute("CREATE INDEX IF NOT EXISTS chunks_canonical ON chunks(canonical)")
+        self._load()
+
+    def _migrate(self):
+        """Fingerprint the chunks of an index created before near-duplicate detection"""
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(chunks)")}
+        if "fingerprint" in columns:
+            return
+
+        self._db.execute("BEGIN")
+        try:
+            self._db.execute("ALTER TABLE chunks ADD COLUMN fingerprint INTEGER")
+            self._db.execute("ALTER TABLE chunks ADD COLUMN canonical INTEGER")
+            start = 0
+            while True:
+                batch = self._db.execute("SELECT id, text FROM chunks WHERE id >= ? ORDER BY id LIMIT 10000",
+                                         (start,)).fetchall()
+                if not batch:
+                    break
+                self._db.executemany("UPDATE chunks SET fingerprint = ? WHERE id = ?",
+                                     [(simhash(analyze(text)), chunk_id) for chunk_id, text in batch])
+                start = batch[-1][0] + 1
+            self._db.execute("COMMIT")
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+
+    def _load_fingerprints(self):
+        """Rebuild the in-memory fingerprint bands from the indexed chunks"""
+        if self._fingerprints is None:
+            return
+        rows = self._db.execute(
+            "SELECT id, fingerprint FROM chunks WHERE canonical IS NULL AND fingerprint IS NOT NULL"
+        ).fetchall()
+        ids, fingerprints = np.array(rows, dtype=np.int64).reshape(-1, 2).T
+        self._fingerprints.load(ids, fingerprints)
+
+    def _find_duplicate(self, fingerprint: Optional[int]) -> Optional[int]:
+        """The indexed chunk closest to a fingerprint, if within duplicate_distance"""
+        if fingerprint is None or self._fingerprints is None:
+            return None
+        return self._fingerprints.find(fingerprint)
+
+    def _add_fingerprint(self, chunk_id: int, fingerprint: Optional[int]):
+        """Make an indexed chunk findable as the original of near-duplicates"""
+        if fingerprint is not None and self._fingerprints is not None:
+            self._fingerprints.add(chunk_id, fingerprint)
+
+    def _load(self):
+        """Load chunk lengths and counters from the database"""
+        rows = self._db.execute("SELECT id, length FROM chunks WHERE canonical IS NULL").fetchall()
+        size = self._db.execute("SELECT COALESCE(MAX(id) + 1, 0) FROM chunks").fetchone()[0]
+        next_id = self._meta("next_id", size)
+
+        self._lengths = np.zeros(max(next_id, size), dtype=np.float32)
+        self._alive = np.zeros(len(self._lengths), dtype=bool)
+        if rows:
+            ids, lengths = np.array(rows, dtype=np.int64).T
+            self._lengths[ids] = lengths
+            self._alive[ids] = True
+
+        self._next_id = max(next_id, size)
+        self._count = len(rows)
+        self._total_length = float(self._lengths.sum())
+        self._tombstones = self._meta("tombstones", 0)
+        self._load_fingerprints()
+
+    def _meta(self, key: str, default: int) -> int:
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key: str, value: int):
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def _read_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Postings of a term from the cache or the database (empty arrays if unknown)"""
+        cached = self._postings.get(term)
+        if cached is not None:
+            self._postings.move_to_end(term)
+            return cached
+
+        postings = self._load_postings(term)
+        self._postings[term] = postings
+        while len(self._postings) > self.postings_cache:
+            self._postings.popitem(last=False)
+        return postings
+
+    def _load_postings(self, term: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Concatenate a term's stored segments"""
+        rows = self._db.execute("SELECT ids, tfs FROM postings WHERE term = ? ORDER BY segment", (term,)).fetchall()
+        if len(rows) == 1:
+            return np.frombuffer(rows[0][0], dtype=np.int32), np.frombuffer(rows[0][1], dtype=np.uint16)
+        return (np.frombuffer(b"".join(row[0] for row in rows), dtype=np.int32),
+                np.frombuffer(b"".join(row[1] for row in rows), dtype=np.uint16))
+
+    def _write_postings(self, new_postings: Dict[str, Tuple[List[int], List[int]]]):
+        """Store new postings as a segment (inside the caller's transaction)"""
+        if not new_postings:
+            return
+
+        segment = self._meta("next_segment", 0)
+        self._set_meta("next_segment", segment + 1)
+        rows = []
+
+        for term, (ids, tfs) in new_postings.items():
+            self._postings.pop(term, None)
+            ids_blob = np.asarray(ids, dtype=np.int32).tobytes()
+            tfs_blob = np.minimum(np.asarray(tfs), np.iinfo(np.uint16).max).astype(np.uint16).tobytes()
+
+            segments = self._db.execute("SELECT COUNT(*) FROM postings WHERE term = ?", (term,)).fetchone()[0]
+            if segments + 1 >= MAX_SEGMENTS:
+                stored_ids, stored_tfs = self._load_postings(term)
+                self._db.execute("DELETE FROM postings WHERE term = ?", (term,))
+                ids_blob = stored_ids.tobytes() + ids_blob
+                tfs_blob = stored_tfs.tobytes() + tfs_blob
+
+            rows.append((term, segment, ids_blob, tfs_blob))
+
+        self._db.executemany("INSERT INTO postings (term, segment, ids, tfs) VALUES (?, ?, ?, ?)", rows)
+
+    def _grow(self, size: int):
+        """Extend the per-chunk arrays to hold ids below size"""
+        if size > len(self._lengths):
+            capacity = max(size, int(len(self._lengths) * 1.5) + 1024)
+            self._lengths = np.concatenate([self._lengths, np.zeros(capacity - len(self._lengths), np.float32)])
+            self._alive = np.concatenate([self._alive, np.zeros(capacity - len(self._alive), bool)])
+
+    def add_document(self, doc_id: str, text: str, source: str = "", chunk_size: Optional[int] = None) -> int:
+        """
+        Add (or replace) a document
+
+        Args:
+            doc_id: Unique document id; an existing document with this id is replaced
+            text: Document text
+            source: Label shown with retrieved chunks (e.g. a file name)
+            chunk_size: Tokens per chunk (defaults to the index setting)
+
+        Returns:
+            Number of chunks indexed
+        """
+        return self.add_documents([(doc_id, text, source)], chunk_size=chunk_size)
+
+    def chunk_settings(self, chunk_size: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Resolve the chunking of added documents
+
+        Args:
+            chunk_size: Tokens per chunk (None for the index setting)
+
+        Returns:
+            (chunk_size, overlap), the overlap scaled from the index setting to the chunk size
+        """
+        if chunk_size is None:
+            return self.chunk_size, self.overlap
+        return chunk_size, min(self.overlap * chunk_size // self.chunk_size, chunk_size - 1)
+
+    def add_documents(self, documents: Iterable[Tuple[str, str, str]], chunk_size: Optional[int] = None) -> int:
+        """
+        Add (or replace) documents in a single transaction
+
+        Args:
+            documents: (doc_id, text, source) tuples
+            chunk_size: Tokens per chunk (defaults to the index setting, with the overlap scaled to match)
+
+        Returns:
+            Number of chunks indexed
+        """
+        chunk_size, overlap = self.chunk_settings(chunk_size)
+        return self.add_prepared((doc_id, source, prepare_document(text, chunk_size, overlap))
+                                 for doc_id, text, source in documents)
+
+    def add_prepared(self, documents: Iterable[Tuple[str, str, List[PreparedChunk]]]) -> int:
+        """
+        Add (or replace) documents already chunked by prepare_document, in a single transaction
+
+        Chunks that are near-duplicates of an indexed chunk (including one
+        added earlier in the batch) are stored as its duplicates instead of
+        being indexed.
+
+        Args:
+            documents: (doc_id, source, prepared chunks) tuples
+
+        Returns:
+            Number of chunks stored (indexed or as duplicates)
+        """
+        with self._lock:
+            added: List[Tuple[int, int]] = []
+            deleted_ids: List[int] = []
+            new_postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+            new_documents = {}
+            first_id = self._next_id
+            # Chunks stored per document (a doc_id repeated in the batch keeps its last count)
+            stored: Dict[str, int] = {}
+            pending = 0
+
+            self._db.execute("BEGIN")
+            try:
+                for doc_id, source, chunks in documents:
+                    if doc_id in new_documents or self.has_document(doc_id):
+                        removed, promoted = self._delete_rows(doc_id, new_postings)
+                        deleted_ids.extend(removed)
+                        added.extend(promoted)
+                    new_documents[doc_id] = (doc_id, source or "", time.time())
+
+                    rows = []
+                    for chunk in chunks:
+                        chunk_id = self._next_id
+                        self._next_id += 1
+                        canonical = self._find_duplicate(chunk.fingerprint)
+                        if canonical is None:
+                            for term, tf in chunk.terms.items():
+                                postings = new_postings[term]
+                                postings[0].append(chunk_id)
+                                postings[1].append(tf)
+                            self._add_fingerprint(chunk_id, chunk.fingerprint)
+                            added.append((chunk_id, chunk.length))
+                        rows.append((chunk_id, doc_id, chunk.position, chunk.text, chunk.length, chunk.fingerprint,
+                                     canonical))
+
+                    self._db.executemany(
+                        "INSERT INTO chunks (id, doc_id, position, text, length, fingerprint, canonical) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+                    stored[doc_id] = len(rows)
+
+                    # Bound the memory of large batches by flushing postings periodically
+                    pending += len(rows)
+                    if pending >= DEFAULT_FLUSH_CHUNKS:
+                        self._write_postings(new_postings)
+                        new_postings.clear()
+                        pending = 0
+
+                self._db.executemany("INSERT INTO documents (doc_id, source, added_at) VALUES (?, ?, ?)",
+                                     new_documents.values())
+                self._write_postings(new_postings)
+                self._set_meta("next_id", self._next_id)
+                self._set_meta("tombstones", self._tombstones + len(deleted_ids))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                self._next_id = first_id
+                self._postings.clear()
+                self._load_fingerprints()
+                raise
+
+            self._add_live(added)
+            # After the new chunks are counted, as a doc_id repeated in the batch replaces chunks added above
+            self._mark_deleted(deleted_ids)
+
+            self._maybe_compact()
+            return sum(stored.values())
+
+    def _delete_rows(self, doc_id: str,
+                     new_postings: Dict[str, Tuple[List[int], List[int]]]) -> Tuple[List[int], List[Tuple[int, int]]]:
+        """
+        Delete a document's rows (inside the caller's transaction)
+
+        For each deleted chunk that other documents hold duplicates of, the
+        first duplicate is indexed in its place under a new chunk id (so that
+        embeddings, which only look for ids above those already embedded,
+        pick it up) and the others become its duplicates.
+
+        Args:
+            doc_id: Document id
+            new_postings: Postings of the transaction, receiving those of promoted duplicates
+
+        Returns:
+            The ids of the document's indexed chunks, and (chunk id, length) of each promoted duplicate
+        """
+        chunk_ids = [row[0] for row in self._db.execute(
+            "SELECT id FROM chunks WHERE doc_id = ? AND canonical IS NULL", (doc_id,))]
+
+        promoted = []
+        if chunk_ids:
+            replacements = {}
+            for chunk_id, canonical, text, length, fingerprint in self._db.execute(
+                    "SELECT id, canonical, text, length, fingerprint FROM chunks "
+                    "WHERE canonical IN (SELECT id FROM chunks WHERE doc_id = ?) AND doc_id != ? ORDER BY id",
+                    (doc_id, doc_id)).fetchall():
+                if canonical in replacements:
+                    continue
+
+                new_id = self._next_id
+                self._next_id += 1
+                replacements[canonical] = new_id
+                self._db.execute("UPDATE chunks SET id = ?, canonical = NULL WHERE id = ?", (new_id, chunk_id))
+                for term, tf in Counter(analyze(text)).items():
+                    postings = new_postings[term]
+                    postings[0].append(new_id)
+                    postings[1].append(tf)
+                self._add_fingerprint(new_id, fingerprint)
+                promoted.append((new_id, length))
+
+            self._db.executemany("UPDATE chunks SET canonical = ? WHERE canonical = ?",
+                                 ((new_id, canonical) for canonical, new_id in replacements.items()))
+            if self._fingerprints is not None:
+                self._fingerprints.remove(chunk_ids)
+
+        self._db.execute("DELETE FROM chunks WHERE doc_id = ?", (doc_id,))
+        self._db.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+        return chunk_ids, promoted
+
+    def _add_live(self, added: List[Tuple[int, int]]):
+        """Count newly indexed chunks into scoring"""
+        self._grow(self._next_id)
+        if added:
+            ids, lengths = np.asarray(added, dtype=np.int64).T
+            self._lengths[ids] = lengths
+            self._alive[ids] = True
+            self._total_length += float(lengths.sum())
+        self._count += len(added)
+        self._version += 1
+
+    def _mark_deleted(self, chunk_ids: List[int]):
+        """Mask deleted chunks out of scoring"""
+        if not chunk_ids:
+            return
+        ids = np.asarray(chunk_ids)
+        self._count -= len(ids)
+        self._total_length -= float(self._lengths[ids].sum())
+        self._alive[ids] = False
+        self._lengths[ids] = 0
+        self._tombstones += len(ids)
+
+    def delete_document(self, doc_id: str) -> bool:
+        """
+        Delete a document and its chunks
+
+        Args:
+            doc_id: Document id
+
+        Returns:
+            True if the document existed
+        """
+        with self._lock:
+            new_postings: Dict[str, Tuple[List[int], List[int]]] = defaultdict(lambda: ([], []))
+            first_id = self._next_id
+
+            self._db.execute("BEGIN")
+            try:
+                existed = self.has_document(doc_id)
+                chunk_ids, promoted = self._delete_rows(doc_id, new_postings)
+                self._write_postings(new_postings)
+                self._set_meta("next_id", self._next_id)
+                self._set_meta("tombstones", self._tombstones + len(chunk_ids))
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                self._next_id = first_id
+                self._postings.clear()
+                self._load_fingerprints()
+                raise
+
+            self._add_live(promoted)
+            self._mark_deleted(chunk_ids)
+            self._maybe_compact()
+            return existed
+
+    def _maybe_compact(self):
+        if self._tombstones and self._tombstones >= COMPACT_RATIO * max(self._count, 1):
+            self.compact()
+
+    def compact(self):
+        """Rewrite every posting list as a single segment without deleted chunks"""
+        with self._lock:
+            self._db.execute("BEGIN")
+            try:
+                terms = [row[0] for row in self._db.execute("SELECT DISTINCT term FROM postings")]
+                for term in terms:
+                    ids, tfs = self._load_postings(term)
+                    keep = self._alive[ids]
+                    self._db.execute("DELETE FROM postings WHERE term = ?", (term,))
+                    if keep.any():
+                        self._db.execute("INSERT INTO postings (term, segment, ids, tfs) VALUES (?, 0, ?, ?)",
+                                         (term, ids[keep].tobytes(), tfs[keep].tobytes()))
+                self._set_meta("tombstones", 0)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+            self._postings.clear()
+            self._tombstones = 0
+
+    def has_document(self, doc_id: str) -> bool:
+        """Whether a document is in the index"""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM documents WHERE doc_id = ?", (doc_id,)).fetchone() is not None
+
+    def documents(self) -> List[Dict[str, object]]:
+        """
+        List the indexed documents
+
+        Returns:
+            Dicts with doc_id, source, number of chunks and how many of them are near-duplicates, oldest first
+        """
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT d.doc_id, d.source, COUNT(c.id), COUNT(c.canonical) FROM documents d "
+                "LEFT JOIN chunks c ON c.doc_id = d.doc_id GROUP BY d.doc_id ORDER BY d.added_at"
+            ).fetchall()
+        return [{"doc_id": doc_id, "source": source, "chunks": chunks, "duplicates": duplicates}
+                for doc_id, source, chunks, duplicates in rows]
+
+    def search(self, query: str, k: int = 3, threshold: float = 0.0) -> List[SearchResult]:
+        """
+        Retrieve the chunks best matching a query
+
+        Args:
+            query: Query text
+            k: Maximum number of chunks returned
+            threshold: Minimum relevance (score relative to the best match, 0-1)
+
+        Returns:
+            Results ordered by descending score
+        """
+        terms = list(dict.fromkeys(analyze(query)))
+        if not terms or k <= 0:
+            return []
+
+        with self._lock:
+            if self._count == 0:
+                return []
+
+            count = self._count
+            average_length = self._total_length / count
+            scores = np.zeros(len(self._lengths), dtype=np.float32)
+            matched = []
+
+            for term in terms:
+                ids, tfs = self._read_postings(term)
+                if self._tombstones and len(ids):
+                    keep = self._alive[ids]
+                    ids, tfs = ids[keep], tfs[keep]
+                if not len(ids):
+                    continue
+
+                idf = math.log(1 + (count - len(ids) + 0.5) / (len(ids) + 0.5))
+                tf = tfs.astype(np.float32)
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[ids] / average_length)
+                # A chunk appears at most once per term, so fancy-index addition is safe
+                scores[ids] += idf * tf * (self.k1 + 1) / (tf + norm)
+                matched.append(ids)
+
+            if not matched:
+                return []
+
+            if len(matched) > 1:
+                # Postings are sorted by chunk id, so a stable sort only merges runs; then drop repeats
+                candidates = np.concatenate(matched)
+                candidates.sort(kind="stable")
+                candidates = candidates[np.concatenate(([True], candidates[1:] != candidates[:-1]))]
+            else:
+                candidates = matched[0]
+            candidate_scores = scores[candidates]
+            fetch = self.candidates(k)
+            if len(candidates) > fetch:
+                top = np.argpartition(-candidate_scores, fetch - 1)[:fetch]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-candidate_scores[top], kind="stable")]
+
+            return self.results([(int(candidates[i]), float(candidate_scores[i])) for i in top], threshold, k)
+
+    def candidates(self, k: int) -> int:
+        """Number of hits to rank for k results, leaving room for near-duplicates dropped by results()"""
+        return 2 * k if self._fingerprints is not None else k
+
+    def results(self, hits: List[Tuple[int, float]], threshold: float = 0.0,
+                k: Optional[int] = None) -> List[SearchResult]:
+        """
+        Build search results for scored chunks
+
+        Relevance is each score relative to the first (best) one. Chunks
+        scoring zero or less, below the threshold, since deleted, or
+        near-duplicates of a better hit are dropped.
+
+        Args:
+            hits: (chunk id, score) pairs ordered by descending score
+            threshold: Minimum relevance (0-1)
+            k: Maximum number of results (None keeps all)
+
+        Returns:
+            The results, in the order of hits
+        """
+        if not hits or hits[0][1] <= 0:
+            return []
+
+        best = hits[0][1]
+        hits = [(chunk_id, score) for chunk_id, score in hits if score > 0 and score / best >= threshold]
+
+        with self._lock:
+            placeholders = ",".join("?" * len(hits))
+            rows = {row[0]: row[1:] for row in self._db.execute(
+                f"SELECT c.id, c.doc_id, d.source, c.position, c.text, c.fingerprint FROM chunks c "
+                f"JOIN documents d ON d.doc_id = c.doc_id WHERE c.id IN ({placeholders})",
+                [chunk_id for chunk_id, _ in hits]
+            )}
+
+        results = []
+        duplicates = DuplicateFilter(self.duplicate_distance) if self._fingerprints is not None else None
+        for chunk_id, score in hits:
+            row = rows.get(chunk_id)
+            if row is None or (duplicates is not None and not duplicates.add(row[4])):
+                continue
+            results.append(SearchResult(row[0], row[1], chunk_id, row[2], row[3], score, score / best))
+            if len(results) == k:
+                break
+        return results
+
+    @property
+    def version(self) -> int:
+        """Counter increased by every addition, deletion or clear"""
+        return self._version
+
+    def is_alive(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """
+        Check which chunks are still indexed
+
+        Args:
+            chunk_ids: Chunk ids
+
+        Returns:
+            Boolean array, True for chunks of documents still in the index
+        """
+        with self._lock:
+            chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+            alive = np.zeros(len(chunk_ids), dtype=bool)
+            known = (chunk_ids >= 0) & (chunk_ids < len(self._alive))
+            alive[known] = self._alive[chunk_ids[known]]
+            return alive
+
+    def iter_chunks(self, start: int = 0, batch_size: int = 1000) -> Iterator[List[Tuple[int, str]]]:
+        """
+        Read live chunks in id order, in batches
+
+        Args:
+            start: Smallest chunk id returned
+            batch_size: Chunks per batch
+
+        Returns:
+            Iterator over lists of (chunk id, text)
+        """
+        while True:
+            with self._lock:
+                batch = self._db.execute(
+                    "SELECT id, text FROM chunks WHERE id >= ? AND canonical IS NULL ORDER BY id LIMIT ?",
+                    (start, batch_size)
+                ).fetchall()
+            if not batch:
+                return
+            yield batch
+            start = batch[-1][0] + 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get index counters
+
+        Returns:
+            Dict with documents, live chunks, near-duplicate chunks collapsed into them,
+            distinct terms and deleted chunks awaiting compaction
+        """
+        with self._lock:
+            documents = self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+            duplicates = self._db.execute("SELECT COUNT(*) FROM chunks WHERE canonical IS NOT NULL").fetchone()[0]
+            terms = self._db.execute("SELECT COUNT(DISTINCT term) FROM postings").fetchone()[0]
+            return {"documents": documents, "chunks": self._count, "duplicates": duplicates, "terms": terms,
+                    "tombstones": self._tombstones}
+
+    def clear(self):
+        """Remove every document (chunk ids keep growing, so derived indexes never see an id reused)"""
+        with self._lock:
+            self._db.executescript(
+                "DELETE FROM documents; DELETE FROM chunks; DELETE FROM postings; "
+                "DELETE FROM meta WHERE key != 'next_id';"
+            )
+            self._postings.clear()
+            self._load()
+            self._version += 1
+
+    def close(self):
+        """Close the database"""
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,76 @@
+import os
+from dataclasses import dataclass
+from typing import List
+
+from models.tokenizer import token_offsets
+
+# Default chunking settings (overridable through the environment)
+DEFAULT_CHUNK_TOKENS = int(os.environ.get("RETRIEVAL_CHUNK_TOKENS", 512))
+DEFAULT_OVERLAP_TOKENS = int(os.environ.get("RETRIEVAL_OVERLAP_TOKENS", 64))
+
+# Pieces after which a chunk may end cleanly (sentence ends and line breaks)
+_BOUNDARY_ENDINGS = (".", "!", "?", "\n")
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    """A passage of a document, with its character offsets in the document"""
+
+    text: str
+    start: int
+    end: int
+    position: int
+
+
+def chunk_text(text: str, chunk_size: int = DEFAULT_CHUNK_TOKENS,
+               overlap: int = DEFAULT_OVERLAP_TOKENS) -> List[Chunk]:
+    """
+    Split a document into overlapping chunks of about chunk_size tokens
+
+    Chunks end at the last sentence or line break in their final fifth when
+    there is one, so passages rarely stop mid-sentence; each chunk then starts
+    overlap tokens before the previous one ended.
+
+    Args:
+        text: The document text
+        chunk_size: Tokens per chunk
+        overlap: Tokens shared by consecutive chunks
+
+    Returns:
+        The chunks, in document order
+
+    Raises:
+        ValueError: If overlap is not smaller than chunk_size
+    """
+    if chunk_size <= 0 or not 0 <= overlap < chunk_size:
+        raise ValueError("chunk_size must be positive and overlap smaller than chunk_size")
+
+    text = text or ""
+    ends = token_offsets(text)
+    starts = [0] + ends
+    chunks: List[Chunk] = []
+    first = 0
+
+    while first < len(ends):
+        last = min(first + chunk_size, len(ends))
+
+        if last < len(ends):
+            # Prefer a sentence boundary in the final fifth of the window
+            for candidate in range(last, max(last - chunk_size // 5, first + 1), -1):
+                if text[starts[candidate - 1]:ends[candidate - 1]].rstrip(" \t").endswith(_BOUNDARY_ENDINGS):
+                    last = candidate
+                    break
+
+        start, end = starts[first], ends[last - 1]
+        passage = text[start:end]
+        if passage.strip():
+            stripped = passage.lstrip()
+            start += len(passage) - len(stripped)
+            passage = stripped.rstrip()
+            chunks.append(Chunk(passage, start, start + len(passage), len(chunks)))
+
+        if last >= len(ends):
+            break
+        first = max(last - overlap, first + 1)
+
+    return chunks
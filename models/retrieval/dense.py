@@ -0,0 +1,512 @@
+import os
+import json
+import math
+import logging
+import threading
+from typing import Optional, Tuple, List
+
+import numpy as np
+
+from models.retrieval.bm25 import BM25Index, SearchResult
+from models.retrieval.embedding import DEFAULT_EMBEDDING_DIM, HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+# Default vector store settings (overridable through the environment)
+DEFAULT_VECTOR_DTYPE = os.environ.get("RETRIEVAL_VECTOR_DTYPE", "float32")
+DEFAULT_BLOCK_ROWS = int(os.environ.get("RETRIEVAL_BLOCK_ROWS", 65536))
+# Corpora at least this large get a coarse quantizer, so queries scan a few lists instead of every vector
+DEFAULT_IVF_MIN_VECTORS = int(os.environ.get("RETRIEVAL_IVF_MIN_VECTORS", 200000))
+DEFAULT_NPROBE = int(os.environ.get("RETRIEVAL_NPROBE", 16))
+
+# Deleted rows linger until this share of the store is dead, then the matrix is rewritten
+COMPACT_RATIO = 0.25
+
+# Vector dtypes that can be stored
+VECTOR_DTYPES = ("float32", "float16")
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows (zero rows stay zero)"""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Column indexes of the k largest scores of each row, best first"""
+    if scores.shape[1] > k:
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    else:
+        top = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, top, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(top, order, axis=1)
+
+
+class DenseIndex:
+    """
+    Embedding vectors in a memory-mapped matrix, searched by inner product
+
+    Vectors are L2-normalized on insertion, so scores are cosine similarities.
+    The matrix is an .npy file opened as a memory map: the OS pages blocks in
+    as they are scanned, so the corpus does not have to fit in memory. float16
+    storage halves the file and the page cache it needs, but exact search must
+    convert every block to float32 (several times slower than the multiply
+    itself), so it suits IVF search or batches of queries.
+
+    Exact search multiplies the queries with the matrix one block of rows at
+    a time and keeps a running top-k with argpartition. Once trained, an
+    IVF-style coarse quantizer (spherical k-means centroids) restricts each
+    query to the vectors of its nprobe nearest lists.
+    """
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 dim: int = DEFAULT_EMBEDDING_DIM,
+                 dtype: str = DEFAULT_VECTOR_DTYPE,
+                 block_rows: int = DEFAULT_BLOCK_ROWS,
+                 ivf_min_vectors: int = DEFAULT_IVF_MIN_VECTORS):
+        """
+        Open (or create) a vector store
+
+        Args:
+            directory: Directory holding the matrix files (None keeps the store in memory)
+            dim: Vector size
+            dtype: Storage type, "float32" or "float16"
+            block_rows: Rows multiplied at a time by exact search
+            ivf_min_vectors: Number of vectors from which the coarse quantizer is trained automatically
+
+        Raises:
+            ValueError: If dtype is not supported, or the stored vectors have another size or type
+        """
+        if dtype not in VECTOR_DTYPES:
+            raise ValueError(f"Unsupported vector dtype: {dtype}")
+
+        self.directory = directory
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.block_rows = block_rows
+        self.ivf_min_vectors = ivf_min_vectors
+
+        self._lock = threading.RLock()
+        self._count = 0
+        self._deleted = 0
+        self._vectors = np.zeros((0, dim), dtype=self.dtype)
+        self._ids = np.zeros(0, dtype=np.int64)
+
+        # Coarse quantizer: centroids, the list of each row, and rows grouped by list
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.zeros(0, dtype=np.int32)
+        self._trained_count = 0
+        self._lists: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._load()
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load(self):
+        """Open the stored matrix, if any"""
+        meta_path = self._path("meta.json")
+        if not os.path.exists(meta_path):
+            return
+
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta["dim"] != self.dim or meta["dtype"] != self.dtype.name:
+            raise ValueError(f"Stored vectors are {meta['dtype']} x {meta['dim']}, "
+                             f"not {self.dtype.name} x {self.dim}")
+
+        self._count = meta["count"]
+        self._deleted = meta["deleted"]
+        self._vectors = np.load(self._path("vectors.npy"), mmap_mode="r+")
+        self._ids = np.load(self._path("ids.npy"), mmap_mode="r+")
+
+        if os.path.exists(self._path("ivf.npz")):
+            with np.load(self._path("ivf.npz")) as ivf:
+                self._centroids = ivf["centroids"]
+                self._trained_count = int(ivf["trained_count"])
+            self._assignments = np.load(self._path("assignments.npy"), mmap_mode="r+")
+
+    def _save_meta(self):
+        if not self.directory:
+            return
+        temporary = self._path("meta.json.tmp")
+        with open(temporary, "w") as f:
+            json.dump({"dim": self.dim, "dtype": self.dtype.name, "count": self._count, "deleted": self._deleted}, f)
+        os.replace(temporary, self._path("meta.json"))
+
+    def _allocate(self, name: str, shape: Tuple[int, ...], dtype, fill=0) -> np.ndarray:
+        """A new array, memory-mapped when the store is on disk"""
+        if not self.directory:
+            return np.full(shape, fill, dtype=dtype)
+        array = np.lib.format.open_memmap(self._path(f"{name}.tmp.npy"), mode="w+", dtype=dtype, shape=shape)
+        if fill:
+            array[:] = fill
+        return array
+
+    def _install(self, name: str, array: np.ndarray) -> np.ndarray:
+        """Move a new array over the stored one (the memory map follows the renamed file)"""
+        if self.directory:
+            array.flush()
+            os.replace(self._path(f"{name}.tmp.npy"), self._path(f"{name}.npy"))
+        return array
+
+    def _reserve(self, rows: int):
+        """Grow the matrix to hold rows more vectors, doubling its capacity"""
+        needed = self._count + rows
+        if needed <= len(self._ids):
+            return
+
+        capacity = max(needed, 2 * len(self._ids), 1024)
+        vectors = self._allocate("vectors", (capacity, self.dim), self.dtype)
+        ids = self._allocate("ids", (capacity,), np.int64, fill=-1)
+        vectors[:self._count] = self._vectors[:self._count]
+        ids[:self._count] = self._ids[:self._count]
+
+        self._vectors = self._install("vectors", vectors)
+        self._ids = self._install("ids", ids)
+
+        if self._centroids is not None:
+            assignments = self._allocate("assignments", (capacity,), np.int32)
+            assignments[:self._count] = self._assignments[:self._count]
+            self._assignments = self._install("assignments", assignments)
+
+    def __len__(self) -> int:
+        """Number of live vectors"""
+        return self._count - self._deleted
+
+    def ids(self) -> np.ndarray:
+        """
+        Get the ids of the live vectors
+
+        Returns:
+            int64 array of ids, in insertion order
+        """
+        with self._lock:
+            ids = np.array(self._ids[:self._count])
+        return ids[ids >= 0]
+
+    def add(self, ids: np.ndarray, vectors: np.ndarray):
+        """
+        Append vectors
+
+        Args:
+            ids: Non-negative id of each vector, not already in the store
+            vectors: Matrix with one row per id
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        vectors = _normalize(vectors).reshape(len(ids), self.dim)
+        if not len(ids):
+            return
+
+        with self._lock:
+            self._reserve(len(ids))
+            rows = slice(self._count, self._count + len(ids))
+            self._vectors[rows] = vectors
+            self._ids[rows] = ids
+
+            if self._centroids is not None:
+                self._assignments[rows] = self._assign(vectors)
+                self._lists = None
+
+            self._count += len(ids)
+            self._flush()
+
+            if len(self) >= self.ivf_min_vectors and len(self) >= 2 * self._trained_count:
+                self.train_ivf()
+
+    def remove(self, ids: np.ndarray) -> int:
+        """
+        Delete vectors
+
+        Args:
+            ids: Ids of the vectors to delete
+
+        Returns:
+            Number of vectors deleted
+        """
+        with self._lock:
+            rows = np.flatnonzero(np.isin(self._ids[:self._count], np.asarray(ids, dtype=np.int64)))
+            if not len(rows):
+                return 0
+            self._ids[rows] = -1
+            self._deleted += len(rows)
+            self._flush()
+
+            if self._deleted >= COMPACT_RATIO * max(self._count, 1):
+                self.compact()
+            return len(rows)
+
+    def _flush(self):
+        for array in (self._vectors, self._ids, self._assignments):
+            if isinstance(array, np.memmap):
+                array.flush()
+        self._save_meta()
+
+    def compact(self):
+        """Rewrite the matrix without deleted rows"""
+        with self._lock:
+            keep = np.flatnonzero(self._ids[:self._count] >= 0)
+            capacity = max(len(keep), 1024)
+            vectors = self._allocate("vectors", (capacity, self.dim), self.dtype)
+            ids = self._allocate("ids", (capacity,), np.int64, fill=-1)
+            vectors[:len(keep)] = self._vectors[keep]
+            ids[:len(keep)] = self._ids[keep]
+
+            if self._centroids is not None:
+                assignments = self._allocate("assignments", (capacity,), np.int32)
+                assignments[:len(keep)] = self._assignments[keep]
+                self._assignments = self._install("assignments", assignments)
+                self._lists = None
+
+            self._vectors = self._install("vectors", vectors)
+            self._ids = self._install("ids", ids)
+            self._count = len(keep)
+            self._deleted = 0
+            self._save_meta()
+
+    def _iter_blocks(self):
+        """Yield (start, float32 block) over the stored rows; blocks are only valid until the next one"""
+        # float32 blocks are views of the memory map; float16 ones are converted into one reused buffer
+        buffer = None if self.dtype == np.float32 else np.empty((self.block_rows, self.dim), dtype=np.float32)
+        for start in range(0, self._count, self.block_rows):
+            block = self._vectors[start:min(start + self.block_rows, self._count)]
+            if buffer is not None:
+                block = buffer[:len(block)]
+                np.copyto(block, self._vectors[start:start + len(block)])
+            yield start, block
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        """Nearest centroid of each vector"""
+        return np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+    def train_ivf(self, lists: Optional[int] = None, iterations: int = 10, points_per_list: int = 50,
+                  seed: int = 0):
+        """
+        Train the coarse quantizer with spherical k-means and assign every vector to a list
+
+        Args:
+            lists: Number of lists (defaults to 2 * sqrt(live vectors))
+            iterations: k-means iterations
+            points_per_list: Vectors sampled per list to fit the centroids
+            seed: Random seed
+        """
+        with self._lock:
+            live = np.flatnonzero(self._ids[:self._count] >= 0)
+            if not len(live):
+                return
+
+            lists = min(lists or max(int(2 * math.sqrt(len(live))), 1), len(live))
+            rng = np.random.default_rng(seed)
+            sample = np.sort(rng.choice(live, min(points_per_list * lists, len(live)), replace=False))
+            points = np.asarray(self._vectors[sample], dtype=np.float32)
+            centroids = points[rng.choice(len(points), lists, replace=False)].copy()
+
+            for _ in range(iterations):
+                labels = np.argmax(points @ centroids.T, axis=1)
+                # Sum each cluster's points as contiguous runs of the points sorted by label
+                order = np.argsort(labels, kind="stable")
+                sizes = np.bincount(labels, minlength=lists)
+                used = np.flatnonzero(sizes)
+                sums = np.zeros_like(centroids)
+                sums[used] = np.add.reduceat(points[order], (np.cumsum(sizes) - sizes)[used], axis=0)
+                # Re-seed empty lists from random points so every list stays in use
+                empty = sizes == 0
+                sums[empty] = points[rng.choice(len(points), int(empty.sum()))]
+                centroids = _normalize(sums)
+
+            self._centroids = centroids
+            assignments = self._allocate("assignments", (len(self._ids),), np.int32)
+            for start, block in self._iter_blocks():
+                assignments[start:start + len(block)] = self._assign(block)
+            self._assignments = self._install("assignments", assignments)
+            self._trained_count = len(live)
+            self._lists = None
+
+            if self.directory:
+                np.savez(self._path("ivf.tmp.npz"), centroids=centroids, trained_count=self._trained_count)
+                os.replace(self._path("ivf.tmp.npz"), self._path("ivf.npz"))
+            self._flush()
+
+    @property
+    def trained(self) -> bool:
+        """Whether the coarse quantizer is trained"""
+        return self._centroids is not None
+
+    def _inverted_lists(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows grouped by list (ascending within each list) and the offset of each list"""
+        if self._lists is None:
+            assignments = np.asarray(self._assignments[:self._count])
+            rows = np.argsort(assignments, kind="stable")
+            offsets = np.concatenate(([0], np.cumsum(np.bincount(assignments, minlength=len(self._centroids)))))
+            self._lists = (rows, offsets)
+        return self._lists
+
+    def search(self, queries: np.ndarray, k: int = 10,
+               nprobe: Optional[int] = DEFAULT_NPROBE) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the stored vectors most similar to each query
+
+        Args:
+            queries: One query vector, or a matrix of them
+            k: Results per query
+            nprobe: Lists scanned per query when the quantizer is trained (None for an exact search)
+
+        Returns:
+            (ids, scores) matrices with one row per query, best first; rows are padded
+            with id -1 and score -inf when fewer than k vectors exist
+        """
+        queries = np.atleast_2d(_normalize(queries))
+        with self._lock:
+            if nprobe and self._centroids is not None:
+                return self._search_ivf(queries, k, nprobe)
+            return self._search_exact(queries, k)
+
+    def _search_exact(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        best_scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        best_rows = np.zeros((len(queries), 0), dtype=np.int64)
+
+        for start, block in self._iter_blocks():
+            scores = queries @ block.T
+            scores[:, self._ids[start:start + len(block)] < 0] = -np.inf
+
+            # Merge the block's top-k into the running top-k
+            top = _top_k(scores, k)
+            best_scores = np.concatenate([best_scores, np.take_along_axis(scores, top, axis=1)], axis=1)
+            best_rows = np.concatenate([best_rows, top + start], axis=1)
+            keep = _top_k(best_scores, k)
+            best_scores = np.take_along_axis(best_scores, keep, axis=1)
+            best_rows = np.take_along_axis(best_rows, keep, axis=1)
+
+        return self._finish(best_rows, best_scores, k)
+
+    def _search_ivf(self, queries: np.ndarray, k: int, nprobe: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows_by_list, offsets = self._inverted_lists()
+        probes = _top_k(queries @ self._centroids.T, min(nprobe, len(self._centroids)))
+        ids = np.full((len(queries), k), -1, dtype=np.int64)
+        scores = np.full((len(queries), k), -np.inf, dtype=np.float32)
+
+        for i, query in enumerate(queries):
+            rows = np.concatenate([rows_by_list[offsets[c]:offsets[c + 1]] for c in probes[i]])
+            # Ascending rows read the memory map front to back
+            rows.sort()
+            candidate_scores = np.asarray(self._vectors[rows], dtype=np.float32) @ query
+            candidate_scores[self._ids[rows] < 0] = -np.inf
+            top = _top_k(candidate_scores[None, :], k)[0]
+            found_ids, found_scores = self._finish(rows[top][None, :], candidate_scores[top][None, :], k)
+            ids[i], scores[i] = found_ids[0], found_scores[0]
+
+        return ids, scores
+
+    def _finish(self, rows: np.ndarray, scores: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Map rows to ids and pad to k columns"""
+        ids = np.where(np.isfinite(scores), np.asarray(self._ids)[rows] if rows.size else rows, -1)
+        pad = k - ids.shape[1]
+        if pad > 0:
+            ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+            scores = np.pad(scores, ((0, 0), (0, pad)), constant_values=-np.inf)
+        return ids, scores.astype(np.float32)
+
+    def clear(self):
+        """Remove every vector and the quantizer"""
+        with self._lock:
+            self._count = self._deleted = self._trained_count = 0
+            self._vectors = np.zeros((0, self.dim), dtype=self.dtype)
+            self._ids = np.zeros(0, dtype=np.int64)
+            self._centroids = None
+            self._assignments = np.zeros(0, dtype=np.int32)
+            self._lists = None
+            if self.directory:
+                for name in ("vectors.npy", "ids.npy", "assignments.npy", "ivf.npz", "meta.json"):
+                    if os.path.exists(self._path(name)):
+                        os.remove(self._path(name))
+
+
+class DenseRetriever:
+    """
+    Embedding search over the chunks of a BM25Index
+
+    Chunk text and documents stay in the BM25 index; this class keeps a
+    DenseIndex of their embeddings keyed by chunk id, embedding new chunks and
+    dropping deleted ones before each search, so both backends always cover the
+    same knowledge base and return the same SearchResult objects.
+    """
+
+    def __init__(self, index: BM25Index, vectors: Optional[DenseIndex] = None,
+                 embedder: Optional[HashingEmbedder] = None, nprobe: Optional[int] = DEFAULT_NPROBE):
+        """
+        Initialize the retriever
+
+        Args:
+            index: The BM25 index holding the chunks
+            vectors: Store for the chunk embeddings (defaults to one in memory)
+            embedder: Text embedder (defaults to a HashingEmbedder matching the store size)
+            nprobe: Lists scanned per query once the store has a coarse quantizer (None for exact search)
+        """
+        self.index = index
+        if vectors is None:
+            vectors = DenseIndex(dim=embedder.dim if embedder else DEFAULT_EMBEDDING_DIM)
+        self.vectors = vectors
+        self.embedder = embedder or HashingEmbedder(dim=self.vectors.dim)
+        self.nprobe = nprobe
+
+        self._lock = threading.Lock()
+        self._synced_version = None
+
+        if self.embedder.dim != self.vectors.dim:
+            raise ValueError(f"Embedder size {self.embedder.dim} does not match the vector store ({self.vectors.dim})")
+
+    def sync(self) -> int:
+        """
+        Bring the embeddings up to date with the BM25 index
+
+        Returns:
+            Number of chunks embedded
+        """
+        with self._lock:
+            version = self.index.version
+            if version == self._synced_version:
+                return 0
+
+            stored = self.vectors.ids()
+            stale = stored[~self.index.is_alive(stored)]
+            if len(stale):
+                self.vectors.remove(stale)
+
+            # Chunk ids only grow, so everything after the highest stored id is new
+            embedded = 0
+            start = int(stored.max()) + 1 if len(stored) else 0
+            for batch in self.index.iter_chunks(start, batch_size=4096):
+                ids = np.fromiter((chunk_id for chunk_id, _ in batch), dtype=np.int64, count=len(batch))
+                self.vectors.add(ids, self.embedder.embed(text for _, text in batch))
+                embedded += len(batch)
+
+            self._synced_version = version
+            return embedded
+
+    def search(self, query: str, k: int = 3, threshold: float = 0.0) -> List[SearchResult]:
+        """
+        Retrieve the chunks whose embeddings are closest to the query's
+
+        Args:
+            query: Query text
+            k: Maximum number of chunks returned
+            threshold: Minimum relevance (similarity relative to the best match, 0-1)
+
+        Returns:
+            Results ordered by descending cosine similarity
+        """
+        if k <= 0:
+            return []
+
+        self.sync()
+        query_vector = self.embedder.embed([query])
+        if not query_vector.any():
+            return []
+
+        ids, scores = self.vectors.search(query_vector, self.index.candidates(k), nprobe=self.nprobe)
+        hits = [(int(chunk_id), float(score)) for chunk_id, score in zip(ids[0], scores[0]) if chunk_id >= 0]
+        return self.index.results(hits, threshold, k)
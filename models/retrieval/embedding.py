@@ -0,0 +1,96 @@
+import os
+import zlib
+import math
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from models.retrieval.bm25 import analyze
+
+# Default embedding size (overridable through the environment)
+DEFAULT_EMBEDDING_DIM = int(os.environ.get("RETRIEVAL_EMBEDDING_DIM", 256))
+
+# Terms whose buckets are memoized (vocabularies are Zipfian, so a small table covers most lookups)
+_BUCKET_CACHE_SIZE = 200000
+
+
+class HashingEmbedder:
+    """
+    Embed text offline by hashing its words and word pairs into a fixed-size vector
+
+    Each unigram and adjacent bigram (stopwords removed) adds a log-scaled
+    term frequency to one of dim buckets, with a hash-derived sign so that
+    collisions cancel out on average instead of accumulating. Vectors are
+    L2-normalized, so dot products are cosine similarities.
+
+    Hashes are CRC32 rather than Python's salted hash(), so vectors stored on
+    disk stay valid across processes and restarts. No corpus statistics are
+    involved, so adding documents never invalidates vectors already stored.
+    """
+
+    def __init__(self, dim: int = DEFAULT_EMBEDDING_DIM, bigrams: bool = True):
+        """
+        Initialize the embedder
+
+        Args:
+            dim: Embedding size
+            bigrams: Whether adjacent word pairs are hashed as well as single words
+        """
+        self.dim = dim
+        self.bigrams = bigrams
+        self._buckets: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def name(self) -> str:
+        """Identifier of the embedding space (vectors from different spaces are not comparable)"""
+        return f"hashing-{self.dim}{'-bigrams' if self.bigrams else ''}"
+
+    def _bucket(self, term: str) -> Tuple[int, float]:
+        """The bucket and sign of a term"""
+        bucket = self._buckets.get(term)
+        if bucket is None:
+            digest = zlib.crc32(term.encode("utf-8"))
+            bucket = (digest % self.dim, 1.0 if digest & 0x80000000 else -1.0)
+            if len(self._buckets) < _BUCKET_CACHE_SIZE:
+                self._buckets[term] = bucket
+        return bucket
+
+    def _features(self, text: str) -> Counter:
+        terms = analyze(text)
+        features = Counter(terms)
+        if self.bigrams:
+            features.update(f"{first} {second}" for first, second in zip(terms, terms[1:]))
+        return features
+
+    def embed(self, texts: Iterable[str]) -> np.ndarray:
+        """
+        Embed texts
+
+        Args:
+            texts: The texts
+
+        Returns:
+            float32 matrix with one L2-normalized row per text (all zeros for texts without terms)
+        """
+        rows: List[int] = []
+        columns: List[int] = []
+        values: List[float] = []
+        count = 0
+
+        for row, text in enumerate(texts):
+            count += 1
+            for term, tf in self._features(text).items():
+                column, sign = self._bucket(term)
+                rows.append(row)
+                columns.append(column)
+                values.append(sign * (1.0 + math.log(tf)))
+
+        # Sum colliding features per cell in one pass over the flattened matrix
+        cells = np.asarray(rows, dtype=np.intp) * self.dim + np.asarray(columns, dtype=np.intp)
+        vectors = np.bincount(cells, weights=values, minlength=count * self.dim).astype(np.float32)
+        vectors = vectors.reshape(count, self.dim)
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        np.divide(vectors, norms, out=vectors, where=norms > 0)
+        return vectors
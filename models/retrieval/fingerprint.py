@@ -0,0 +1,297 @@
+import os
+import zlib
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Chunks whose fingerprints differ in at most this many bits are near-duplicates (overridable through the environment)
+DEFAULT_DUPLICATE_DISTANCE = int(os.environ.get("RETRIEVAL_DUPLICATE_BITS", 3))
+
+FINGERPRINT_BITS = 64
+# Shorter chunks have too few terms for the bit votes to estimate similarity, so they only match identical text
+MIN_SIMHASH_TERMS = 32
+
+_MASK = (1 << FINGERPRINT_BITS) - 1
+
+# Terms whose hashes are memoized (vocabularies are Zipfian, so a small table covers most lookups)
+_HASH_CACHE_SIZE = 200000
+_term_hashes: Dict[str, int] = {}
+
+
+def _term_hash(term: str) -> int:
+    """Stable hash of a term (CRC32 rather than the salted hash(), so fingerprints persist)"""
+    value = _term_hashes.get(term)
+    if value is None:
+        data = term.encode("utf-8")
+        value = zlib.crc32(data) | len(data) << 32
+        if len(_term_hashes) < _HASH_CACHE_SIZE:
+            _term_hashes[term] = value
+    return value
+
+
+_MIX_SHIFTS = (np.uint64(30), np.uint64(27), np.uint64(31))
+_MIX_MULTIPLIERS = (np.uint64(0xBF58476D1CE4E5B9), np.uint64(0x94D049BB133111EB))
+
+
+def _mix(hashes: np.ndarray) -> np.ndarray:
+    """SplitMix64 finalizer, spreading the term hashes over all 64 bits (in place)"""
+    hashes ^= hashes >> _MIX_SHIFTS[0]
+    hashes *= _MIX_MULTIPLIERS[0]
+    hashes ^= hashes >> _MIX_SHIFTS[1]
+    hashes *= _MIX_MULTIPLIERS[1]
+    hashes ^= hashes >> _MIX_SHIFTS[2]
+    return hashes
+
+
+def simhash(terms: Sequence[str]) -> Optional[int]:
+    """
+    Compute the 64-bit SimHash fingerprint of a chunk
+
+    Every distinct term votes on each bit with its hash; a bit is set when
+    most terms have it set. Chunks sharing most of their terms get
+    fingerprints differing in few bits, so near-duplicates are found by
+    Hamming distance. Terms vote once however often they occur: weighted by
+    frequency, the few most common words would outvote the rest and make
+    unrelated chunks look alike.
+
+    Chunks with fewer than MIN_SIMHASH_TERMS terms get a hash of their whole
+    term sequence instead, which is only close to the fingerprints of the
+    same sequence.
+
+    Args:
+        terms: Analyzed terms of the chunk
+
+    Returns:
+        The fingerprint as a signed 64-bit integer (as SQLite stores it), or None for chunks without terms
+    """
+    if not terms:
+        return None
+    if len(terms) < MIN_SIMHASH_TERMS:
+        digest = hashlib.blake2b(" ".join(terms).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little", signed=True)
+
+    distinct = set(terms)
+    hashes = _mix(np.fromiter(map(_term_hash, distinct), dtype=np.uint64, count=len(distinct)))
+
+    # Bit i of every hash is column i (little-endian bytes, least significant bit first)
+    bits = np.unpackbits(hashes.view(np.uint8), bitorder="little").reshape(len(distinct), FINGERPRINT_BITS)
+    majority = np.packbits(2 * bits.sum(axis=0) > len(distinct), bitorder="little")
+    return int(majority.view("<i8")[0])
+
+
+def hamming_distance(first: int, second: int) -> int:
+    """Number of bits in which two fingerprints differ"""
+    return ((first ^ second) & _MASK).bit_count()
+
+
+def band_keys(fingerprint: int, bands: int) -> List[int]:
+    """
+    Split a fingerprint into bands
+
+    Fingerprints within distance bands - 1 of each other differ in fewer bits
+    than there are bands, so at least one band is identical: looking up
+    fingerprints sharing a band key finds every near-duplicate.
+
+    Args:
+        fingerprint: The fingerprint
+        bands: Number of bands
+
+    Returns:
+        The key of each band
+    """
+    fingerprint &= _MASK
+    width = FINGERPRINT_BITS // bands
+    keys = [(fingerprint >> (band * width)) & ((1 << width) - 1) for band in range(bands - 1)]
+    keys.append(fingerprint >> ((bands - 1) * width))
+    return keys
+
+
+class DuplicateFilter:
+    """
+    Drop near-duplicates from a stream of fingerprints
+
+    Kept fingerprints are bucketed by band key, so each check only compares
+    against fingerprints sharing a band: filtering k results is O(k).
+    """
+
+    def __init__(self, distance: int = DEFAULT_DUPLICATE_DISTANCE):
+        """
+        Initialize the filter
+
+        Args:
+            distance: Largest Hamming distance between near-duplicates
+        """
+        self.distance = distance
+        self.bands = distance + 1
+        self._buckets: Dict[Tuple[int, int], List[int]] = {}
+
+    def add(self, fingerprint: Optional[int]) -> bool:
+        """
+        Keep a fingerprint unless it is a near-duplicate of one kept before
+
+        Args:
+            fingerprint: The fingerprint (None is always kept)
+
+        Returns:
+            True if the fingerprint was kept
+        """
+        if fingerprint is None:
+            return True
+
+        keys = list(enumerate(band_keys(fingerprint, self.bands)))
+        for key in keys:
+            if any(hamming_distance(fingerprint, other) <= self.distance for other in self._buckets.get(key, ())):
+                return False
+        for key in keys:
+            self._buckets.setdefault(key, []).append(fingerprint)
+        return True
+
+
+# Keys added to a FingerprintIndex are merged into its sorted arrays once they number this many (or an eighth of them)
+_MIN_MERGE = 4096
+# Set bits of every byte value
+_POPCOUNT = np.array([bin(value).count("1") for value in range(256)], dtype=np.uint8)
+
+
+class FingerprintIndex:
+    """
+    Find near-duplicates among the fingerprints of indexed chunks
+
+    Each band keeps its keys in a sorted array (with the chunk ids in the same
+    order) searched by bisection, plus a dict of the keys added since the
+    arrays were last rebuilt. The dict is merged in once it holds an eighth as
+    many entries, so additions cost amortized O(log n) and lookups stay a few
+    binary searches however large the index grows. Candidates sharing a band
+    are checked with one vectorized Hamming distance computation.
+    """
+
+    def __init__(self, distance: int = DEFAULT_DUPLICATE_DISTANCE):
+        """
+        Initialize an empty index
+
+        Args:
+            distance: Largest Hamming distance between near-duplicates
+        """
+        self.distance = distance
+        self.bands = distance + 1
+        self.clear()
+
+    def clear(self):
+        """Remove every fingerprint"""
+        self._fingerprints = np.zeros(0, dtype=np.int64)
+        self._present = np.zeros(0, dtype=bool)
+        self._keys = [np.zeros(0, dtype=np.uint64) for _ in range(self.bands)]
+        self._ids = [np.zeros(0, dtype=np.int64) for _ in range(self.bands)]
+        self._recent: List[Dict[int, List[int]]] = [{} for _ in range(self.bands)]
+        self._recent_count = 0
+
+    def _grow(self, size: int):
+        if size > len(self._present):
+            capacity = max(size, int(len(self._present) * 1.5) + 1024)
+            self._fingerprints = np.concatenate([self._fingerprints,
+                                                 np.zeros(capacity - len(self._fingerprints), np.int64)])
+            self._present = np.concatenate([self._present, np.zeros(capacity - len(self._present), bool)])
+
+    def load(self, chunk_ids: np.ndarray, fingerprints: np.ndarray):
+        """
+        Replace the contents with the fingerprints of indexed chunks
+
+        Args:
+            chunk_ids: Chunk ids
+            fingerprints: Their fingerprints (signed 64-bit)
+        """
+        self.clear()
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        fingerprints = np.asarray(fingerprints, dtype=np.int64)
+        if not len(chunk_ids):
+            return
+
+        self._grow(int(chunk_ids.max()) + 1)
+        self._fingerprints[chunk_ids] = fingerprints
+        self._present[chunk_ids] = True
+
+        unsigned = fingerprints.view(np.uint64)
+        width = FINGERPRINT_BITS // self.bands
+        for band in range(self.bands):
+            keys = unsigned >> np.uint64(band * width)
+            if band < self.bands - 1:
+                keys = keys & np.uint64((1 << width) - 1)
+            order = np.argsort(keys, kind="stable")
+            self._keys[band], self._ids[band] = keys[order], chunk_ids[order]
+
+    def add(self, chunk_id: int, fingerprint: int):
+        """
+        Add the fingerprint of an indexed chunk
+
+        Args:
+            chunk_id: Chunk id
+            fingerprint: Its fingerprint
+        """
+        self._grow(chunk_id + 1)
+        self._fingerprints[chunk_id] = fingerprint
+        self._present[chunk_id] = True
+        for band, key in enumerate(band_keys(fingerprint, self.bands)):
+            self._recent[band].setdefault(key, []).append(chunk_id)
+        self._recent_count += 1
+        if self._recent_count >= max(_MIN_MERGE, len(self._ids[0]) // 8):
+            self._merge()
+
+    def remove(self, chunk_ids: Sequence[int]):
+        """
+        Remove fingerprints (their band entries are dropped at the next merge)
+
+        Args:
+            chunk_ids: Chunk ids
+        """
+        ids = np.asarray(chunk_ids, dtype=np.int64)
+        self._present[ids[ids < len(self._present)]] = False
+
+    def _merge(self):
+        """Rebuild the sorted band arrays with the recent keys, dropping removed chunks"""
+        for band in range(self.bands):
+            recent = self._recent[band]
+            recent_keys = np.fromiter((key for key, ids in recent.items() for _ in ids), dtype=np.uint64,
+                                      count=self._recent_count)
+            recent_ids = np.fromiter((chunk_id for ids in recent.values() for chunk_id in ids), dtype=np.int64,
+                                     count=self._recent_count)
+            keys = np.concatenate([self._keys[band], recent_keys])
+            ids = np.concatenate([self._ids[band], recent_ids])
+            keep = self._present[ids]
+            keys, ids = keys[keep], ids[keep]
+            order = np.argsort(keys, kind="stable")
+            self._keys[band], self._ids[band] = keys[order], ids[order]
+            recent.clear()
+        self._recent_count = 0
+
+    def find(self, fingerprint: int) -> Optional[int]:
+        """
+        Find the closest near-duplicate of a fingerprint
+
+        Args:
+            fingerprint: The fingerprint
+
+        Returns:
+            Id of the chunk with the closest fingerprint within distance bits, or None
+        """
+        candidates = []
+        for band, key in enumerate(band_keys(fingerprint, self.bands)):
+            keys = self._keys[band]
+            start = keys.searchsorted(np.uint64(key), side="left")
+            end = keys.searchsorted(np.uint64(key), side="right")
+            if end > start:
+                candidates.append(self._ids[band][start:end])
+            recent = self._recent[band].get(key)
+            if recent:
+                candidates.append(np.asarray(recent, dtype=np.int64))
+        if not candidates:
+            return None
+
+        ids = np.concatenate(candidates)
+        ids = ids[self._present[ids]]
+        if not len(ids):
+            return None
+        differences = self._fingerprints[ids] ^ np.int64(fingerprint)
+        distances = _POPCOUNT[differences.view(np.uint8)].reshape(len(ids), 8).sum(axis=1)
+        best = int(distances.argmin())
+        return int(ids[best]) if distances[best] <= self.distance else None
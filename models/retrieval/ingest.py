@@ -0,0 +1,319 @@
+import io
+import os
+import re
+import csv
+import json
+import logging
+import threading
+import multiprocessing
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, Executor, ProcessPoolExecutor, wait
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from models.upload_cache import content_key, file_extension
+from models.retrieval.bm25 import BM25Index, PreparedChunk, prepare_document
+
+logger = logging.getLogger(__name__)
+
+# Default ingestion settings (overridable through the environment)
+DEFAULT_INGEST_WORKERS = int(os.environ.get("RAG_INGEST_WORKERS", os.cpu_count() or 1))
+# Documents written per index transaction
+DEFAULT_WRITE_BATCH = int(os.environ.get("RAG_INGEST_WRITE_BATCH", 32))
+
+# File types extract_text understands (PDF and Word files need optional packages)
+KNOWLEDGE_EXTENSIONS = ("txt", "md", "csv", "json", "jsonl", "pdf", "docx")
+
+# Per-file ingestion states
+QUEUED = "queued"
+SKIPPED = "skipped"
+INDEXED = "indexed"
+FAILED = "failed"
+
+_CONTROL_RE = re.compile(r"[\x00-\x08\x0b\x0c\x0e-\x1f\x7f]")
+_TRAILING_SPACE_RE = re.compile(r"[ \t]+\n")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _flatten_json(value: Any, path: str = "") -> Iterator[str]:
+    """Yield "path: value" lines for the leaves of a JSON value"""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _flatten_json(item, f"{path}.{key}" if path else str(key))
+    elif isinstance(value, list):
+        for i, item in enumerate(value):
+            yield from _flatten_json(item, f"{path}[{i}]")
+    elif value is not None:
+        yield f"{path}: {value}" if path else str(value)
+
+
+def _csv_text(text: str) -> str:
+    """One "column: value" line per cell, with a blank line between rows"""
+    rows = csv.reader(io.StringIO(text))
+    header = next(rows, None)
+    if header is None:
+        return ""
+    return "\n\n".join("\n".join(f"{column}: {value}" for column, value in zip(header, row) if value)
+                       for row in rows)
+
+
+def _pdf_text(data: bytes) -> str:
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise ValueError("Reading PDF files requires pypdf")
+    return "\n\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages)
+
+
+def _docx_text(data: bytes) -> str:
+    try:
+        import docx
+    except ImportError:
+        raise ValueError("Reading Word files requires python-docx")
+    return "\n".join(paragraph.text for paragraph in docx.Document(io.BytesIO(data)).paragraphs)
+
+
+def clean_text(text: str) -> str:
+    """
+    Normalize extracted text for chunking
+
+    Line endings become newlines, control characters and trailing spaces are
+    removed, and runs of blank lines collapse to one.
+
+    Args:
+        text: Extracted text
+
+    Returns:
+        The cleaned text
+    """
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _CONTROL_RE.sub("", text)
+    text = _TRAILING_SPACE_RE.sub("\n", text)
+    return _BLANK_LINES_RE.sub("\n\n", text).strip()
+
+
+def extract_text(name: str, data: bytes) -> str:
+    """
+    Extract the text of a knowledge file by its extension
+
+    CSV rows and JSON leaves become "field: value" lines, so every chunk
+    carries the field names its values belong to.
+
+    Args:
+        name: File name
+        data: File content
+
+    Returns:
+        The text (not yet cleaned)
+
+    Raises:
+        ValueError: If the file type is not supported or its optional reader is missing
+    """
+    extension = file_extension(name)
+
+    if extension in ("txt", "md"):
+        return data.decode("utf-8", errors="replace")
+    if extension == "csv":
+        return _csv_text(data.decode("utf-8", errors="replace"))
+    if extension == "json":
+        return "\n".join(_flatten_json(json.loads(data)))
+    if extension == "jsonl":
+        return "\n\n".join("\n".join(_flatten_json(json.loads(line)))
+                           for line in data.decode("utf-8", errors="replace").splitlines() if line.strip())
+    if extension == "pdf":
+        return _pdf_text(data)
+    if extension == "docx":
+        return _docx_text(data)
+
+    raise ValueError(f"Unsupported knowledge file type: {extension}")
+
+
+def prepare_file(name: str, data: bytes, chunk_size: int, overlap: int) -> List[PreparedChunk]:
+    """
+    Extract, clean, chunk and analyze a knowledge file (runs in worker processes)
+
+    Args:
+        name: File name
+        data: File content
+        chunk_size: Tokens per chunk
+        overlap: Tokens shared by consecutive chunks
+
+    Returns:
+        The prepared chunks
+
+    Raises:
+        ValueError: If the file cannot be read
+    """
+    return prepare_document(clean_text(extract_text(name, data)), chunk_size, overlap)
+
+
+def create_ingest_pool(max_workers: int = DEFAULT_INGEST_WORKERS) -> ProcessPoolExecutor:
+    """
+    Create a process pool for preparing knowledge files
+
+    Workers are spawned rather than forked: a fork of the multi-threaded
+    Streamlit server copies its locks in whatever state other threads hold them,
+    which can deadlock the workers.
+
+    Args:
+        max_workers: Worker processes
+
+    Returns:
+        The process pool
+    """
+    return ProcessPoolExecutor(max_workers=max(1, max_workers), mp_context=multiprocessing.get_context("spawn"))
+
+
+class IngestionJob:
+    """
+    Knowledge files ingested into a BM25Index on a background thread
+
+    Files are keyed by content hash: files already in the index (or repeated in
+    the batch) are skipped without being read, so re-uploading an unchanged
+    corpus, or resuming an interrupted ingestion, only processes what is
+    missing. Text extraction, cleaning, chunking and analysis run in a process
+    pool (shared between jobs when one is passed in); this job's thread is the only writer, adding the prepared documents
+    in batched transactions. With a retriever, the new chunks are then embedded
+    in batches.
+
+    Streamlit stores the job in session state and polls its per-file status on
+    reruns.
+    """
+
+    def __init__(self,
+                 index: BM25Index,
+                 files: Sequence[Tuple[str, bytes]],
+                 chunk_size: Optional[int] = None,
+                 retriever=None,
+                 max_workers: int = DEFAULT_INGEST_WORKERS,
+                 write_batch: int = DEFAULT_WRITE_BATCH,
+                 executor: Optional[Executor] = None):
+        """
+        Start the ingestion
+
+        Args:
+            index: Index the files are added to
+            files: (name, content) of each file
+            chunk_size: Tokens per chunk (None for the index setting)
+            retriever: DenseRetriever to embed the new chunks with (None leaves embedding to the first search)
+            max_workers: Worker processes (1 prepares files on the job's thread)
+            write_batch: Documents written per index transaction
+            executor: Pool to prepare files in, left running afterwards (None starts one
+                with max_workers processes for this job)
+        """
+        self.index = index
+        self.retriever = retriever
+        self.chunk_size, self.overlap = index.chunk_settings(chunk_size)
+        self.max_workers = max(1, min(max_workers, len(files)))
+        self.write_batch = write_batch
+        self.executor = executor
+
+        self.files: List[Dict[str, Any]] = [
+            {"name": name, "doc_id": None, "status": QUEUED, "chunks": 0, "error": None} for name, _ in files
+        ]
+        self.phase = "hashing"
+        self.error: Optional[Exception] = None
+        self._done = threading.Event()
+
+        def run():
+            try:
+                self._run(files)
+            except Exception as e:
+                logger.error(f"Knowledge ingestion failed: {e}")
+                self.error = e
+            finally:
+                self.phase = "done"
+                self._done.set()
+
+        threading.Thread(target=run, name="rag-ingestion", daemon=True).start()
+
+    def _run(self, files: Sequence[Tuple[str, bytes]]):
+        pending = []
+        seen = set()
+        for status, (name, data) in zip(self.files, files):
+            doc_id = content_key(name, data)
+            status["doc_id"] = doc_id
+            if doc_id in seen or self.index.has_document(doc_id):
+                status["status"] = SKIPPED
+            else:
+                seen.add(doc_id)
+                pending.append((status, name, data))
+
+        self.phase = "indexing"
+        batch: List[Tuple[Dict[str, Any], List[PreparedChunk]]] = []
+        for status, prepared in self._prepare(pending):
+            if prepared is not None:
+                batch.append((status, prepared))
+            if len(batch) >= self.write_batch:
+                self._write(batch)
+                batch = []
+        self._write(batch)
+
+        if self.retriever is not None and any(status["status"] == INDEXED for status in self.files):
+            self.phase = "embedding"
+            self.retriever.sync()
+
+    def _prepare(self, pending) -> Iterator[Tuple[Dict[str, Any], Optional[List[PreparedChunk]]]]:
+        """Prepare files, in completion order, marking those that fail"""
+        def outcome(status, call):
+            try:
+                return status, call()
+            except Exception as e:
+                status["status"] = FAILED
+                status["error"] = str(e)
+                return status, None
+
+        if self.max_workers == 1 or len(pending) < 2:
+            for status, name, data in pending:
+                yield outcome(status, lambda: prepare_file(name, data, self.chunk_size, self.overlap))
+            return
+
+        # A shared pool is left running for the next job
+        pool = nullcontext(self.executor) if self.executor is not None else create_ingest_pool(self.max_workers)
+        with pool as executor:
+            # A bounded window of submissions keeps at most a few files' contents in flight
+            queue = iter(pending)
+            running = {}
+            while True:
+                while len(running) < 2 * self.max_workers:
+                    item = next(queue, None)
+                    if item is None:
+                        break
+                    status, name, data = item
+                    running[executor.submit(prepare_file, name, data, self.chunk_size, self.overlap)] = status
+                if not running:
+                    return
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    yield outcome(running.pop(future), future.result)
+
+    def _write(self, batch: List[Tuple[Dict[str, Any], List[PreparedChunk]]]):
+        """Add prepared documents in one transaction, then mark them indexed"""
+        if not batch:
+            return
+        self.index.add_prepared((status["doc_id"], status["name"], prepared) for status, prepared in batch)
+        for status, prepared in batch:
+            status["chunks"] = len(prepared)
+            status["status"] = INDEXED
+
+    @property
+    def processed(self) -> int:
+        """Number of files indexed, skipped or failed"""
+        return sum(1 for status in self.files if status["status"] != QUEUED)
+
+    @property
+    def done(self) -> bool:
+        """Whether the ingestion has finished (successfully or not)"""
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the ingestion to finish
+
+        Args:
+            timeout: Seconds to wait (None waits indefinitely)
+
+        Returns:
+            True if the ingestion has finished
+        """
+        return self._done.wait(timeout)
@@ -0,0 +1,196 @@
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Call:
+    """A single in-flight call that followers wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Broadcast:
+    """
+    An in-flight stream whose events are buffered and replayed to every subscriber
+
+    Subscribers that join late first receive the events already produced, then
+    follow the live stream, so every caller sees the complete sequence.
+    """
+
+    def __init__(self):
+        self.events: List[Any] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.condition = threading.Condition()
+
+    def publish(self, event: Any):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+
+    def finish(self, error: Optional[BaseException] = None):
+        with self.condition:
+            self.finished = True
+            self.error = error
+            self.condition.notify_all()
+
+    def subscribe(self) -> Iterator[Any]:
+        index = 0
+        while True:
+            with self.condition:
+                while index >= len(self.events) and not self.finished:
+                    self.condition.wait()
+
+                pending = self.events[index:]
+                finished = self.finished
+                error = self.error
+
+            for event in pending:
+                yield event
+            index += len(pending)
+
+            if finished and index >= len(self.events):
+                if error is not None:
+                    raise error
+                return
+
+
+class SingleFlight:
+    """
+    Process-wide coalescing of identical in-flight requests
+
+    The first caller for a key runs the request; callers arriving with the same
+    key while it is in flight wait for it and share its result instead of sending
+    a duplicate request. Nothing is kept once the call finishes, so this only
+    collapses concurrent duplicates (the response cache handles repeats over time).
+    """
+
+    def __init__(self):
+        """Initialize an empty registry of in-flight calls"""
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "executions": 0, "coalesced": 0}
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """
+        Run fn once for all concurrent callers with the same key
+
+        Args:
+            key: Request hash identifying duplicate calls
+            fn: Function performing the request
+
+        Returns:
+            Tuple of the result and whether it was shared from another caller's request
+
+        Raises:
+            Exception: Whatever fn raised, re-raised in every waiting caller
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats["executions"] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+        return call.result, False
+
+    def stream(self, key: str, factory: Callable[[], Iterable[Any]]) -> Tuple[Iterator[Any], bool]:
+        """
+        Fan one upstream stream out to all concurrent callers with the same key
+
+        The upstream iterable is consumed on a background thread, so it runs to
+        completion even if a subscriber stops reading early.
+
+        Args:
+            key: Request hash identifying duplicate streams
+            factory: Function returning the upstream iterable of events
+
+        Returns:
+            Tuple of an iterator over every event and whether the stream was shared
+            from another caller's request
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            broadcast = self._streams.get(key)
+            if broadcast is not None:
+                self._stats["coalesced"] += 1
+                return broadcast.subscribe(), True
+
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            self._stats["executions"] += 1
+
+        def pump():
+            error = None
+            try:
+                for event in factory():
+                    broadcast.publish(event)
+            except BaseException as e:
+                logger.error(f"Coalesced stream failed: {str(e)}")
+                error = e
+            finally:
+                with self._lock:
+                    self._streams.pop(key, None)
+                broadcast.finish(error)
+
+        threading.Thread(target=pump, name="single-flight-stream", daemon=True).start()
+        return broadcast.subscribe(), False
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get coalescing counters
+
+        Returns:
+            Dict with total calls, upstream executions, coalesced calls and calls in flight
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["in_flight"] = len(self._calls) + len(self._streams)
+        return stats
+
+
+# Process-wide instance shared by all ContentGenerator instances
+_default_single_flight: Optional[SingleFlight] = None
+_default_single_flight_lock = threading.Lock()
+
+
+def get_single_flight() -> SingleFlight:
+    """
+    Get the process-wide single-flight registry
+
+    Returns:
+        The shared SingleFlight
+    """
+    global _default_single_flight
+
+    with _default_single_flight_lock:
+        if _default_single_flight is None:
+            _default_single_flight = SingleFlight()
+        return _default_single_flight
@@ -0,0 +1,149 @@
+import re
+import functools
+from dataclasses import dataclass
+from typing import Any, Callable, List, Mapping, Optional, Tuple
+
+# A {{name}} placeholder; the name is taken verbatim (no trimming), as mappings are matched exactly
+PLACEHOLDER_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+def placeholder(name: str) -> str:
+    """
+    Template text of a placeholder
+
+    Args:
+        name: Placeholder name
+
+    Returns:
+        The {{name}} marker
+    """
+    return f"{{{{{name}}}}}"
+
+
+@dataclass(frozen=True, slots=True)
+class CompiledTemplate:
+    """
+    A template scanned once into literal text and placeholder names
+
+    literals[i] precedes names[i], and the final literal follows the last
+    placeholder, so len(literals) == len(names) + 1. Rendering is a single join
+    over the literals and resolved values; placeholders without a value keep
+    their {{name}} text.
+    """
+
+    literals: Tuple[str, ...]
+    names: Tuple[str, ...]
+
+    @property
+    def placeholders(self) -> Tuple[str, ...]:
+        """Distinct placeholder names in order of first appearance"""
+        return tuple(dict.fromkeys(self.names))
+
+    def render_report(self, values: Mapping[str, Any]) -> Tuple[str, List[str]]:
+        """
+        Render the template and report the placeholders left unresolved
+
+        Args:
+            values: Placeholder name to value (converted with str())
+
+        Returns:
+            Tuple of the rendered text and the distinct unresolved names, in order
+        """
+        parts = [self.literals[0]]
+        unresolved = {}
+
+        for name, literal in zip(self.names, self.literals[1:]):
+            if name in values:
+                parts.append(str(values[name]))
+            else:
+                parts.append(placeholder(name))
+                unresolved[name] = None
+            parts.append(literal)
+
+        return "".join(parts), list(unresolved)
+
+    def render(self, values: Mapping[str, Any]) -> str:
+        """
+        Render the template
+
+        Args:
+            values: Placeholder name to value (converted with str())
+
+        Returns:
+            The rendered text
+        """
+        return self.render_report(values)[0]
+
+    def render_columns(self, columns: Mapping[str, Any], concat: Callable[[Any, Any], Any] = None) -> Any:
+        """
+        Render many rows at once from column vectors
+
+        Literals and columns are concatenated segment by segment, so with pandas
+        Series (or numpy string arrays) each step is vectorized over all rows.
+        Placeholders without a column keep their {{name}} text.
+
+        Args:
+            columns: Placeholder name to a column of string values
+            concat: Function joining two operands (defaults to +)
+
+        Returns:
+            The rendered column, or the rendered text if no placeholder has a column
+        """
+        concat = concat or (lambda left, right: left + right)
+        rendered: Optional[Any] = None
+        literal = self.literals[0]
+
+        for name, next_literal in zip(self.names, self.literals[1:]):
+            column = columns.get(name)
+            if column is None:
+                literal += placeholder(name) + next_literal
+                continue
+
+            piece = concat(literal, column) if literal else column
+            rendered = piece if rendered is None else concat(rendered, piece)
+            literal = next_literal
+
+        if rendered is None:
+            return literal
+        return concat(rendered, literal) if literal else rendered
+
+
+@functools.lru_cache(maxsize=256)
+def compile_template(text: str) -> CompiledTemplate:
+    """
+    Scan a template once for {{name}} placeholders
+
+    Compiled templates are cached, so rendering the same template for many rows
+    or on every rerun only scans it once.
+
+    Args:
+        text: The template text
+
+    Returns:
+        The compiled template
+    """
+    literals = []
+    names = []
+    position = 0
+
+    for match in PLACEHOLDER_RE.finditer(text):
+        literals.append(text[position:match.start()])
+        names.append(match.group(1))
+        position = match.end()
+
+    literals.append(text[position:])
+    return CompiledTemplate(tuple(literals), tuple(names))
+
+
+def render_template(text: str, values: Mapping[str, Any]) -> str:
+    """
+    Substitute {{name}} placeholders in a single pass
+
+    Args:
+        text: The template text
+        values: Placeholder name to value
+
+    Returns:
+        The rendered text (unresolved placeholders are left as-is)
+    """
+    return compile_template(text).render(values)
@@ -0,0 +1,162 @@
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
+
+# Pre-tokenization pattern modelled on the GPT-style BPE splitters: English
+# contractions, words with their leading space, digit groups of up to three,
+# runs of punctuation, single non-ASCII characters and whitespace runs. Each
+# match is roughly one token; long words are charged extra below.
+_PIECE_RE = re.compile(
+    r"'(?:[sdmt]|ll|ve|re)"
+    r"| ?[A-Za-z]+"
+    r"| ?[0-9]{1,3}"
+    r"| ?[^\sA-Za-z0-9\x80-\U0010ffff]+"
+    r"|[\x80-\U0010ffff]"
+    r"|\s*\n"
+    r"|\s+(?!\S)"
+    r"|\s+"
+)
+
+# Words longer than this are usually split into several BPE tokens
+_LONG_WORD_RE = re.compile(r"[A-Za-z]{9,}")
+_LONG_WORD_CHARS_PER_TOKEN = 6
+
+# Texts longer than this are counted section by section so edits only recount what changed
+SECTION_THRESHOLD = 2048
+_SECTION_SPLIT_RE = re.compile(r"(?<=\n\n)")
+
+# Token count relative to the reference (cl100k-style) estimate, by model name prefix
+MODEL_TOKEN_RATIOS: Dict[str, float] = {
+    "gpt-4o": 0.95,
+    "gpt-4.1": 0.95,
+    "o1": 0.95,
+    "o3": 0.95,
+    "gpt-4": 1.0,
+    "gpt-3.5": 1.0,
+    "claude": 1.1,
+    "llama": 1.05,
+    "mistral": 1.1,
+}
+DEFAULT_TOKEN_RATIO = 1.0
+
+_CACHE_SIZE = 8192
+_cache: "OrderedDict[bytes, int]" = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_stats = {"hits": 0, "misses": 0}
+
+
+def token_ratio(model: Optional[str] = None) -> float:
+    """
+    Get the token ratio of a model relative to the reference estimate
+
+    Args:
+        model: Model name (matched by prefix, e.g. "claude-3-5-sonnet" uses "claude")
+
+    Returns:
+        Multiplier applied to the reference token count
+    """
+    if not model:
+        return DEFAULT_TOKEN_RATIO
+
+    model = model.lower()
+    for prefix in sorted(MODEL_TOKEN_RATIOS, key=len, reverse=True):
+        if model.startswith(prefix):
+            return MODEL_TOKEN_RATIOS[prefix]
+    return DEFAULT_TOKEN_RATIO
+
+
+def _count_uncached(text: str) -> int:
+    """Estimate the reference token count of a text"""
+    pieces = len(_PIECE_RE.findall(text))
+    extra = sum((len(word) - 1) // _LONG_WORD_CHARS_PER_TOKEN for word in _LONG_WORD_RE.findall(text))
+    return pieces + extra
+
+
+def _count_section(text: str) -> int:
+    """Count one section, memoized by its content hash"""
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+
+    with _cache_lock:
+        count = _cache.get(key)
+        if count is not None:
+            _cache.move_to_end(key)
+            _cache_stats["hits"] += 1
+            return count
+        _cache_stats["misses"] += 1
+
+    count = _count_uncached(text)
+
+    with _cache_lock:
+        _cache[key] = count
+        if len(_cache) > _CACHE_SIZE:
+            _cache.popitem(last=False)
+
+    return count
+
+
+def token_offsets(text: str) -> List[int]:
+    """
+    Get the end offsets of a text's pre-tokenizer pieces
+
+    The pieces cover the text without gaps, so piece i spans
+    offsets[i - 1]:offsets[i] (from 0 for the first). Each piece is roughly one
+    token (long words excepted), so windows of pieces approximate token budgets
+    without a real tokenizer.
+
+    Args:
+        text: The text to split
+
+    Returns:
+        Ascending end offsets, one per piece (the last is len(text))
+    """
+    return list(accumulate(map(len, _PIECE_RE.findall(text))))
+
+
+def count_tokens(text: Optional[str], model: Optional[str] = None) -> int:
+    """
+    Estimate the number of tokens a model will see for a text
+
+    The estimate mimics BPE pre-tokenization with compiled regular expressions
+    (typically within about 10% of the real tokenizer on English prose and
+    markdown, where word counts are off by 30% or more). Long texts are split at
+    blank lines and each section's count is memoized by its hash, so re-counting a
+    large prompt after a small edit only tokenizes the sections that changed.
+
+    Args:
+        text: The text to count
+        model: Model name used to pick the per-model ratio
+
+    Returns:
+        Estimated token count
+    """
+    if not text:
+        return 0
+
+    if len(text) <= SECTION_THRESHOLD:
+        count = _count_section(text)
+    else:
+        count = sum(_count_section(section) for section in _SECTION_SPLIT_RE.split(text) if section)
+
+    return round(count * token_ratio(model))
+
+
+def token_cache_info() -> Tuple[int, int, int]:
+    """
+    Get memoization counters
+
+    Returns:
+        Tuple of (hits, misses, cached sections)
+    """
+    with _cache_lock:
+        return _cache_stats["hits"], _cache_stats["misses"], len(_cache)
+
+
+def clear_token_cache():
+    """Drop all memoized section counts"""
+    with _cache_lock:
+        _cache.clear()
+        _cache_stats["hits"] = 0
+        _cache_stats["misses"] = 0
@@ -0,0 +1,385 @@
+import io
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import pandas as pd
+
+from models.ingestion import ChunkedUpload, STREAMING_EXTENSIONS
+from models.frame_storage import DEFAULT_SPILL_BYTES, compact_frame, memory_footprint, spill_frame
+
+logger = logging.getLogger(__name__)
+
+# Default cache settings (overridable through the environment)
+DEFAULT_UPLOAD_CACHE_DIR = os.environ.get("UPLOAD_CACHE_DIR", os.path.join(".cache", "uploads"))
+DEFAULT_MEMORY_ENTRIES = int(os.environ.get("UPLOAD_CACHE_MEMORY_ENTRIES", 8))
+DEFAULT_DISK_BYTES = int(os.environ.get("UPLOAD_CACHE_DISK_BYTES", 2 * 1024 * 1024 * 1024))
+# Tabular uploads at least this large are read lazily in chunks instead of parsed whole
+DEFAULT_CHUNKED_BYTES = int(os.environ.get("UPLOAD_CHUNKED_BYTES", 32 * 1024 * 1024))
+
+# File types parse_upload understands
+SUPPORTED_EXTENSIONS = ("csv", "xlsx", "json", "jsonl", "ndjson", "parquet", "arrow", "feather", "txt")
+
+
+def file_extension(name: str) -> str:
+    """
+    Get the lower-case extension of a file name
+
+    Args:
+        name: File name
+
+    Returns:
+        The extension without the dot (the whole name if it has none)
+    """
+    return name.rsplit(".", 1)[-1].lower()
+
+
+def content_key(name: str, data: bytes) -> str:
+    """
+    Build the cache key of an upload from its content
+
+    The extension is part of the key, as the same bytes parse differently as CSV
+    or text.
+
+    Args:
+        name: File name
+        data: File content
+
+    Returns:
+        Hex digest identifying the parsed upload
+    """
+    digest = hashlib.blake2b(data, digest_size=20)
+    digest.update(file_extension(name).encode())
+    return digest.hexdigest()
+
+
+def parse_upload(name: str, data: bytes) -> Any:
+    """
+    Parse an uploaded file by its extension
+
+    Args:
+        name: File name
+        data: File content
+
+    Returns:
+        A DataFrame for CSV, Excel, JSONL, Parquet and Arrow, a dict or list for JSON,
+        a string for text
+
+    Raises:
+        ValueError: If the file type is not supported
+    """
+    extension = file_extension(name)
+
+    if extension == "csv":
+        return pd.read_csv(io.BytesIO(data))
+    if extension == "xlsx":
+        return pd.read_excel(io.BytesIO(data))
+    if extension == "json":
+        return json.loads(data)
+    if extension in ("jsonl", "ndjson"):
+        return pd.read_json(io.BytesIO(data), lines=True)
+    if extension == "parquet":
+        return pd.read_parquet(io.BytesIO(data))
+    if extension in ("arrow", "feather"):
+        return pd.read_feather(io.BytesIO(data))
+    if extension == "txt":
+        return data.decode("utf-8")
+
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+class UploadCache:
+    """
+    Parsed uploads keyed by content hash: an in-memory LRU over a Parquet spill
+
+    Re-attaching or re-reading the same file (on every Streamlit rerun, or from
+    another session) returns the already parsed object instead of parsing it
+    again. Tabular uploads are also written to Parquet, so once they fall out of
+    memory they are reloaded from columnar storage rather than re-parsed from
+    CSV or Excel. Cached objects are shared, so callers must not modify them.
+
+    Tabular uploads of chunked_bytes or more are not parsed whole: they are
+    cached as a ChunkedUpload reading the file lazily, backed by a copy of the
+    raw file in the spill directory when there is one.
+
+    Frames parsed whole are compacted (categoricals, downcast numbers, Arrow
+    strings); those still larger than spill_bytes are written to a
+    memory-mapped Arrow file and cached as a ChunkedUpload handle on it.
+    """
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 memory_entries: int = DEFAULT_MEMORY_ENTRIES,
+                 max_disk_bytes: int = DEFAULT_DISK_BYTES,
+                 chunked_bytes: int = DEFAULT_CHUNKED_BYTES,
+                 spill_bytes: int = DEFAULT_SPILL_BYTES):
+        """
+        Initialize the upload cache
+
+        Args:
+            directory: Directory for the Parquet spill (None keeps the cache in memory only)
+            memory_entries: Maximum number of parsed uploads held in memory
+            max_disk_bytes: Maximum total size of the spill files
+            chunked_bytes: Size from which tabular uploads are read lazily in chunks
+            spill_bytes: In-memory size from which compacted frames are spilled to Arrow
+        """
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self.max_disk_bytes = max_disk_bytes
+        self.chunked_bytes = chunked_bytes
+        self.spill_bytes = spill_bytes
+
+        self._memory: "OrderedDict[str, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        # One lock per key being parsed, so concurrent sessions parse a file once
+        self._parsing: Dict[str, threading.Lock] = {}
+        self._counters = {"hits": 0, "misses": 0, "memory_hits": 0, "disk_hits": 0, "spills": 0, "evictions": 0}
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def _spill_path(self, key: str, extension: str = "parquet") -> Optional[str]:
+        return os.path.join(self.directory, f"{key}.{extension}") if self.directory else None
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Look up a parsed upload
+
+        Args:
+            key: Key from content_key
+
+        Returns:
+            The parsed upload, or None on a miss
+        """
+        with self._lock:
+            value = self._memory.get(key)
+            if isinstance(value, ChunkedUpload) and isinstance(value.source, str):
+                # A lazily read upload is only usable while its copy on disk exists
+                if os.path.exists(value.source):
+                    os.utime(value.source)
+                else:
+                    del self._memory[key]
+                    value = None
+
+            if value is not None:
+                self._memory.move_to_end(key)
+                self._counters["hits"] += 1
+                self._counters["memory_hits"] += 1
+                return value
+
+        arrow_path = self._spill_path(key, "arrow")
+        if arrow_path and os.path.exists(arrow_path):
+            # A frame too large to keep in memory, read through a memory map
+            os.utime(arrow_path)
+            value = ChunkedUpload(os.path.basename(arrow_path), arrow_path)
+            with self._lock:
+                self._remember(key, value)
+                self._counters["hits"] += 1
+                self._counters["disk_hits"] += 1
+            return value
+
+        path = self._spill_path(key)
+        if path and os.path.exists(path):
+            # A Parquet spill of a frame parsed whole
+            try:
+                frame = pd.read_parquet(path)
+            except Exception as e:
+                logger.warning(f"Discarding unreadable upload spill {path}: {e}")
+                self._remove(path)
+            else:
+                os.utime(path)
+                with self._lock:
+                    self._remember(key, frame)
+                    self._counters["hits"] += 1
+                    self._counters["disk_hits"] += 1
+                return frame
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def set(self, key: str, value: Any):
+        """
+        Store a parsed upload, spilling DataFrames to Parquet
+
+        Args:
+            key: Key from content_key
+            value: The parsed upload
+        """
+        with self._lock:
+            self._remember(key, value)
+
+        path = self._spill_path(key)
+        if path and isinstance(value, pd.DataFrame) and not os.path.exists(path):
+            self._spill(path, value)
+
+    def get_or_parse(self, name: str, data: bytes, key: Optional[str] = None) -> Any:
+        """
+        Get a parsed upload, parsing and caching it on a miss
+
+        Args:
+            name: File name
+            data: File content
+            key: Precomputed content_key(name, data), to skip hashing
+
+        Returns:
+            The parsed upload
+
+        Raises:
+            ValueError: If the file type is not supported
+        """
+        key = key or content_key(name, data)
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._lock:
+            parse_lock = self._parsing.setdefault(key, threading.Lock())
+
+        with parse_lock:
+            # Another session may have parsed the file while we waited
+            with self._lock:
+                value = self._memory.get(key)
+
+            if value is None:
+                if self._is_chunked(name, data):
+                    value = self._open_chunked(key, name, data)
+                else:
+                    value = self._store(key, name, parse_upload(name, data))
+                self.set(key, value)
+
+        with self._lock:
+            self._parsing.pop(key, None)
+
+        return value
+
+    def _store(self, key: str, name: str, value: Any) -> Any:
+        """Compact a parsed frame, spilling it to Arrow if it is still too large to hold"""
+        if not isinstance(value, pd.DataFrame):
+            return value
+
+        value = compact_frame(value)
+        path = self._spill_path(key, "arrow")
+        if path is None or memory_footprint(value) < self.spill_bytes:
+            return value
+
+        try:
+            handle = spill_frame(value, path, name=f"{name}.arrow")
+        except Exception as e:
+            logger.info(f"Upload kept in memory, Arrow spill failed: {e}")
+            self._remove(f"{path}.tmp")
+            return value
+
+        self._evict_disk(keep=path)
+        return handle
+
+    def _is_chunked(self, name: str, data: bytes) -> bool:
+        """Whether an upload is read lazily rather than parsed whole"""
+        return len(data) >= self.chunked_bytes and file_extension(name) in STREAMING_EXTENSIONS
+
+    def _open_chunked(self, key: str, name: str, data: bytes) -> ChunkedUpload:
+        """Open a large upload for chunked reading, from a copy on disk when possible"""
+        # Raw copies are named apart from Parquet spills, so they are never loaded whole
+        path = self._spill_path(key, f"raw.{file_extension(name)}")
+        if path is None:
+            return ChunkedUpload(name, data)
+
+        if not os.path.exists(path):
+            temporary = f"{path}.{threading.get_ident()}.tmp"
+            with open(temporary, "wb") as f:
+                f.write(data)
+            os.replace(temporary, path)
+            self._evict_disk(keep=path)
+
+        return ChunkedUpload(name, path)
+
+    def _remember(self, key: str, value: Any):
+        """Insert an entry into memory, evicting the least recently used"""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _spill(self, path: str, frame: pd.DataFrame):
+        """Write a frame to Parquet atomically, then trim the spill directory"""
+        temporary = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            frame.to_parquet(temporary)
+            os.replace(temporary, path)
+        except Exception as e:
+            # Missing Parquet engine, or columns Parquet cannot hold (mixed types)
+            logger.info(f"Upload kept in memory only, Parquet spill failed: {e}")
+            self._remove(temporary)
+            return
+
+        with self._lock:
+            self._counters["spills"] += 1
+        self._evict_disk()
+
+    def _evict_disk(self, keep: Optional[str] = None):
+        """
+        Remove the least recently used spill files until the size limit holds
+
+        Files read lazily by entries still in memory (raw copies and Arrow
+        spills) are kept, like keep itself: the entries have no other copy of
+        their data.
+        """
+        with self._lock:
+            live = {value.source for value in self._memory.values()
+                    if isinstance(value, ChunkedUpload) and isinstance(value.source, str)}
+        if keep:
+            live.add(keep)
+
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                total_size += stat.st_size
+                if entry.path not in live:
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_disk_bytes:
+                break
+            self._remove(path)
+            total_size -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get cache counters
+
+        Returns:
+            Dict with hits, misses, per-tier hits, spills, evictions and entry counts
+        """
+        with self._lock:
+            stats = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+
+        stats["disk_entries"] = (
+            sum(1 for name in os.listdir(self.directory) if not name.endswith(".tmp")) if self.directory else 0
+        )
+        return stats
+
+    def clear(self):
+        """Remove every cached upload from memory and disk"""
+        with self._lock:
+            self._memory.clear()
+
+        if self.directory:
+            for name in os.listdir(self.directory):
+                if not name.endswith(".tmp"):
+                    self._remove(os.path.join(self.directory, name))
@@ -2,6 +2,7 @@ import pytest
 import responses
 import json
 from models.content_generator import ContentGenerator, generate_content
+from models.response_cache import ResponseCache
 
 
 class TestContentGenerator:
@@ -115,6 +116,357 @@ class TestContentGenerator:
             assert "Simulated Response" in result["content"]
 
 
+class TestConcurrentBatchGenerate:
+    """Tests for concurrent batch generation"""
+
+    @staticmethod
+    def _slow_generator(monkeypatch, delay=0.02, fail_on=None):
+        """Create a generator whose generate() sleeps and records concurrency"""
+        import threading
+        import time
+
+        generator = ContentGenerator(api_key=None)
+        state = {"in_flight": 0, "max_in_flight": 0}
+        lock = threading.Lock()
+
+        def fake_generate(prompt, **kwargs):
+            with lock:
+                state["in_flight"] += 1
+                state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            try:
+                time.sleep(delay)
+                if fail_on and prompt in fail_on:
+                    raise ValueError(f"boom: {prompt}")
+                return {"success": True, "content": prompt.upper(), "model": "test"}
+            finally:
+                with lock:
+                    state["in_flight"] -= 1
+
+        monkeypatch.setattr(generator, "generate", fake_generate)
+        return generator, state
+
+    def test_preserves_order(self, monkeypatch):
+        """Test that results come back in prompt order"""
+        generator, _ = self._slow_generator(monkeypatch)
+        prompts = [f"prompt {i}" for i in range(20)]
+
+        results = generator.batch_generate(prompts, max_concurrency=5)
+
+        assert [r["content"] for r in results] == [p.upper() for p in prompts]
+
+    def test_bounded_concurrency(self, monkeypatch):
+        """Test that no more than max_concurrency requests run at once"""
+        generator, state = self._slow_generator(monkeypatch)
+
+        generator.batch_generate([f"p{i}" for i in range(12)], max_concurrency=3)
+
+        assert 1 < state["max_in_flight"] <= 3
+
+    def test_failures_are_isolated(self, monkeypatch):
+        """Test that a failing item does not abort the rest of the batch"""
+        generator, _ = self._slow_generator(monkeypatch, fail_on={"bad"})
+
+        results = generator.batch_generate(["good", "bad", "also good"], max_concurrency=2)
+
+        assert [r["success"] for r in results] == [True, False, True]
+        assert "boom: bad" in results[1]["error"]
+        assert "API Request Failed" in results[1]["content"]
+
+    def test_progress_reported_per_item(self, monkeypatch):
+        """Test that the progress callback fires once per item"""
+        generator, _ = self._slow_generator(monkeypatch)
+        calls = []
+
+        generator.batch_generate(["a", "b", "c"], on_progress=lambda *args: calls.append(args))
+
+        assert [c[0] for c in calls] == [1, 2, 3]
+        assert all(c[1] == 3 for c in calls)
+        assert sorted(c[2] for c in calls) == [0, 1, 2]
+
+    def test_async_variant(self, monkeypatch):
+        """Test the asyncio batch variant"""
+        import asyncio
+
+        generator, state = self._slow_generator(monkeypatch, fail_on={"p3"})
+        prompts = [f"p{i}" for i in range(10)]
+
+        results = asyncio.run(generator.abatch_generate(prompts, max_concurrency=4))
+
+        assert [r["success"] for r in results] == [p != "p3" for p in prompts]
+        assert results[0]["content"] == "P0"
+        assert state["max_in_flight"] <= 4
+
+    def test_async_cancellation_does_not_block(self, monkeypatch):
+        """Test that cancelling the asyncio batch does not wait for the requests in flight"""
+        import asyncio
+        import time
+
+        generator, state = self._slow_generator(monkeypatch, delay=1.0)
+
+        async def cancel_batch():
+            task = asyncio.ensure_future(generator.abatch_generate([f"p{i}" for i in range(8)], max_concurrency=2))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            start = time.monotonic()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            return time.monotonic() - start
+
+        assert asyncio.run(cancel_batch()) < 0.5
+        assert state["in_flight"] <= 2
+
+
+SSE_BODY = """event: message_start
+data: {"type": "message_start", "message": {"usage": {"input_tokens": 12, "output_tokens": 1}}}
+
+event: ping
+data: {"type": "ping"}
+
+event: content_block_delta
+data: {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Hello"}}
+
+event: content_block_delta
+data: {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": ", world"}}
+
+event: message_delta
+data: {"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": 4}}
+
+event: message_stop
+data: {"type": "message_stop"}
+
+"""
+
+
+class TestGenerateStream:
+    """Tests for streaming generation"""
+
+    @responses.activate
+    def test_stream_yields_deltas_and_usage(self):
+        """Test that text deltas arrive in order followed by a final result"""
+        responses.add(
+            responses.POST,
+            "https://api.anthropic.com/v1/messages",
+            body=SSE_BODY,
+            status=200,
+            content_type="text/event-stream"
+        )
+
+        generator = ContentGenerator(api_key="test_api_key")
+        events = list(generator.generate_stream("Say hello"))
+
+        assert [e["text"] for e in events if e["type"] == "text"] == ["Hello", ", world"]
+
+        done = events[-1]
+        assert done["type"] == "done"
+        assert done["success"] is True
+        assert done["content"] == "Hello, world"
+        assert done["metadata"]["prompt_tokens"] == 12
+        assert done["metadata"]["completion_tokens"] == 4
+        assert done["metadata"]["total_tokens"] == 16
+        assert done["metadata"]["stop_reason"] == "end_turn"
+        assert done["metadata"]["time_to_first_token"] is not None
+
+        sent = json.loads(responses.calls[0].request.body)
+        assert sent["stream"] is True
+
+    @responses.activate
+    def test_stream_failure(self):
+        """Test that a failed stream ends with an unsuccessful result"""
+        responses.add(
+            responses.POST,
+            "https://api.anthropic.com/v1/messages",
+            json={"error": "overloaded"},
+            status=529
+        )
+
+        generator = ContentGenerator(api_key="test_api_key", max_retries=0)
+        events = list(generator.generate_stream("Say hello"))
+
+        assert len(events) == 1
+        assert events[0]["type"] == "done"
+        assert events[0]["success"] is False
+        assert "API Request Failed" in events[0]["content"]
+
+    @responses.activate
+    def test_stream_with_malformed_event(self):
+        """Test that an event with invalid JSON ends the stream with an unsuccessful result"""
+        body = SSE_BODY.replace('"text": ", world"}}', '"text": ", world"')
+        responses.add(responses.POST, "https://api.anthropic.com/v1/messages", body=body, status=200,
+                      content_type="text/event-stream")
+
+        events = list(ContentGenerator(api_key="test_api_key").generate_stream("Say hello"))
+
+        assert events[-1]["type"] == "done"
+        assert events[-1]["success"] is False
+        assert events[-1]["content"] == "Hello"
+
+    @responses.activate
+    def test_truncated_stream_is_not_cached(self):
+        """Test that a stream ending without a stop event is not stored in the response cache"""
+        body = SSE_BODY[:SSE_BODY.index("event: message_delta")]
+        responses.add(responses.POST, "https://api.anthropic.com/v1/messages", body=body, status=200,
+                      content_type="text/event-stream")
+        responses.add(responses.POST, "https://api.anthropic.com/v1/messages", body=SSE_BODY, status=200,
+                      content_type="text/event-stream")
+
+        generator = ContentGenerator(api_key="test_api_key", cache=ResponseCache())
+        assert list(generator.generate_stream("Say hello", temperature=0))[-1]["metadata"]["stop_reason"] is None
+        assert list(generator.generate_stream("Say hello", temperature=0))[-1]["metadata"]["stop_reason"] == "end_turn"
+        assert list(generator.generate_stream("Say hello", temperature=0))[-1]["metadata"]["cache_hit"] is True
+        assert len(responses.calls) == 2
+
+    def test_simulated_stream(self):
+        """Test that simulation mode streams the simulated response"""
+        generator = ContentGenerator(api_key=None)
+        generator.api_key = None
+
+        events = list(generator.generate_stream("Test prompt"))
+        text = "".join(e["text"] for e in events if e["type"] == "text")
+
+        assert events[-1]["type"] == "done"
+        assert text == events[-1]["content"]
+        assert "Simulated Response" in text
+
+
+BATCH_URL = "https://api.anthropic.com/v1/messages/batches"
+
+
+def _batch_status(status, results_url=None):
+    """Build a message-batch status body"""
+    return {
+        "id": "msgbatch_1",
+        "processing_status": status,
+        "request_counts": {"processing": 0 if status == "ended" else 3, "succeeded": 0, "errored": 0},
+        "results_url": results_url
+    }
+
+
+class TestMessageBatches:
+    """Tests for the provider message-batch mode"""
+
+    @pytest.fixture
+    def no_sleep(self, monkeypatch):
+        """Record poll delays instead of sleeping"""
+        slept = []
+        monkeypatch.setattr("models.content_generator.time.sleep", slept.append)
+        return slept
+
+    @responses.activate
+    def test_run_batch_round_trip(self, no_sleep):
+        """Test submit, poll with backoff and streamed results in prompt order"""
+        results_url = f"{BATCH_URL}/msgbatch_1/results"
+        responses.add(responses.POST, BATCH_URL, json=_batch_status("in_progress"), status=200)
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_1", json=_batch_status("in_progress"), status=200)
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_1", json=_batch_status("in_progress"), status=200)
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_1", json=_batch_status("ended", results_url), status=200)
+
+        # Results arrive in completion order, not submission order
+        lines = [
+            {"custom_id": "item-2", "result": {"type": "succeeded", "message": {
+                "content": [{"text": "third"}], "usage": {"input_tokens": 3, "output_tokens": 1}}}},
+            {"custom_id": "item-0", "result": {"type": "succeeded", "message": {
+                "content": [{"text": "first"}], "usage": {"input_tokens": 3, "output_tokens": 1}}}},
+            {"custom_id": "item-1", "result": {"type": "errored", "error": {
+                "type": "error", "error": {"type": "invalid_request_error", "message": "bad request"}}}}
+        ]
+        responses.add(responses.GET, results_url, body="\n".join(json.dumps(line) for line in lines), status=200)
+
+        generator = ContentGenerator(api_key="test_key")
+        progress = []
+        results = generator.run_batch(["A", "B", "C"], system_prompt="Sys", poll_interval=1,
+                                      on_progress=lambda done, total, index, result: progress.append(index))
+
+        submitted = json.loads(responses.calls[0].request.body)["requests"]
+        assert [r["custom_id"] for r in submitted] == ["item-0", "item-1", "item-2"]
+        assert submitted[0]["params"]["messages"][0]["content"] == "A"
+
+        assert results[0]["content"] == "first"
+        assert results[0]["metadata"]["batch_id"] == "msgbatch_1"
+        assert results[1]["success"] is False
+        assert results[1]["error"] == "bad request"
+        assert results[2]["content"] == "third"
+        assert progress == [2, 0, 1]
+        assert no_sleep == [1, 2]
+
+    @responses.activate
+    def test_jobs_are_split_by_size(self, no_sleep):
+        """Test that large runs are packed into several jobs"""
+        responses.add(responses.POST, BATCH_URL, json=_batch_status("in_progress"), status=200)
+        responses.add(responses.POST, BATCH_URL, json=dict(_batch_status("in_progress"), id="msgbatch_2"), status=200)
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_1", json=_batch_status("ended", f"{BATCH_URL}/r1"))
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_2",
+                      json=dict(_batch_status("ended", f"{BATCH_URL}/r2"), id="msgbatch_2"))
+        responses.add(responses.GET, f"{BATCH_URL}/r1", body="", status=200)
+        responses.add(responses.GET, f"{BATCH_URL}/r2", body=json.dumps(
+            {"custom_id": "item-2", "result": {"type": "succeeded", "message": {"content": [{"text": "late"}]}}}))
+
+        generator = ContentGenerator(api_key="test_key")
+        results = generator.run_batch(["A", "B", "C"], job_size=2)
+
+        second_job = json.loads(responses.calls[1].request.body)["requests"]
+        assert [r["custom_id"] for r in second_job] == ["item-2"]
+        assert results[2]["content"] == "late"
+        assert results[0]["success"] is False
+
+    @responses.activate
+    def test_malformed_result_lines_and_generate_options(self, no_sleep):
+        """Test that options for concurrent requests are ignored and malformed result lines fail their item"""
+        responses.add(responses.POST, BATCH_URL, json=_batch_status("in_progress"), status=200)
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_1", json=_batch_status("ended", f"{BATCH_URL}/r1"))
+        responses.add(responses.GET, f"{BATCH_URL}/r1", body="\n".join([
+            '{"custom_id": "item-0", "result": {"type": "succeeded", "mess',
+            "not json",
+            json.dumps({"custom_id": "item-1", "result": {"type": "succeeded",
+                                                          "message": {"content": [{"text": "ok"}]}}}),
+        ]))
+
+        generator = ContentGenerator(api_key="test_key")
+        results = generator.run_batch(["A", "B"], use_cache=False, max_concurrency=2, temperature=0)
+
+        assert json.loads(responses.calls[0].request.body)["requests"][0]["params"]["temperature"] == 0
+        assert results[0]["success"] is False
+        assert "Malformed batch result" in results[0]["error"]
+        assert results[1]["content"] == "ok"
+
+    @responses.activate
+    def test_unexpected_custom_ids_are_skipped(self, no_sleep):
+        """Test that foreign, out-of-range and duplicate custom_ids do not lose the batch"""
+        responses.add(responses.POST, BATCH_URL, json=_batch_status("in_progress"), status=200)
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_1", json=_batch_status("ended", f"{BATCH_URL}/r1"))
+        responses.add(responses.GET, f"{BATCH_URL}/r1", body="\n".join(
+            json.dumps({"custom_id": custom_id, "result": {"type": "succeeded",
+                                                           "message": {"content": [{"text": text}]}}})
+            for custom_id, text in [("request-7", "foreign"), ("item-x", "bad index"), ("item-5", "out of range"),
+                                    ("item-0", "ok"), ("item-0", "duplicate")]
+        ))
+
+        generator = ContentGenerator(api_key="test_key")
+        results = generator.run_batch(["A", "B"])
+
+        assert results[0]["content"] == "ok"
+        assert results[1]["success"] is False
+        assert results[1]["error"] == "No result returned for batch item"
+
+    @responses.activate
+    def test_wait_times_out(self, no_sleep):
+        """Test that polling gives up after the timeout"""
+        responses.add(responses.GET, f"{BATCH_URL}/msgbatch_1", json=_batch_status("in_progress"))
+
+        generator = ContentGenerator(api_key="test_key")
+
+        with pytest.raises(TimeoutError):
+            generator.wait_for_batch("msgbatch_1", poll_interval=10, timeout=5)
+
+    def test_falls_back_without_batch_support(self, monkeypatch):
+        """Test that providers without a batch mode use concurrent requests instead"""
+        generator = ContentGenerator(api_key="test_key", provider="openai")
+        monkeypatch.setattr(generator, "generate", lambda prompt, **kwargs: {"success": True, "content": prompt})
+
+        results = generator.run_batch(["A", "B"])
+
+        assert [r["content"] for r in results] == ["A", "B"]
+
+
 class TestContentGeneratorHelpers:
     """Tests for helper functions in the content_generator module"""
     
@@ -0,0 +1,109 @@
+import io
+import json
+import pandas as pd
+import pytest
+from models.data_injection import iter_injected_prompts, write_injected_prompts_jsonl
+from models.prompt_generator import generate_content_with_data_injection, iter_prompts_with_data_injection
+
+MAPPINGS = [{"field": "name", "placeholder": "customer"}, {"field": "product", "placeholder": "product"}]
+TEMPLATE = "Write to {{customer}} about {{product}}. Sign off to {{customer}}."
+
+
+class TestBatchInjection:
+    """Tests for row-wise data injection"""
+
+    @pytest.fixture
+    def frame(self):
+        return pd.DataFrame({"name": ["Ann", "Bob", "Cy"], "product": ["Lamp", "Desk", "Chair"], "age": [30, 41, 52]})
+
+    def test_one_prompt_per_row(self, frame):
+        """Test that every row gets its own values"""
+        prompts = list(iter_injected_prompts(TEMPLATE, frame, MAPPINGS, chunk_size=2))
+
+        assert prompts == [
+            "Write to Ann about Lamp. Sign off to Ann.",
+            "Write to Bob about Desk. Sign off to Bob.",
+            "Write to Cy about Chair. Sign off to Cy.",
+        ]
+
+    def test_json_inputs(self):
+        """Test JSON lists and single JSON objects"""
+        records = [{"name": "Ann", "product": "Lamp"}, {"name": "Bob", "product": "Desk"}]
+
+        assert list(iter_injected_prompts("{{customer}}/{{product}}", records, MAPPINGS)) == ["Ann/Lamp", "Bob/Desk"]
+        assert list(iter_injected_prompts("{{customer}}", records[0], MAPPINGS)) == ["Ann"]
+
+    def test_unknown_fields_keep_placeholder(self, frame):
+        """Test that mappings to missing columns leave the placeholder, as single-row injection does"""
+        mappings = MAPPINGS + [{"field": "missing", "placeholder": "other"}]
+
+        assert next(iter_injected_prompts("{{customer}} {{other}}", frame, mappings)) == "Ann {{other}}"
+
+    def test_missing_values_render_empty(self):
+        """Test that NaN in numeric and text columns renders as empty text rather than nan"""
+        frame = pd.DataFrame({"name": ["Ann", None], "product": ["Lamp", "Desk"], "age": [30, float("nan")]})
+        mappings = MAPPINGS + [{"field": "age", "placeholder": "age"}]
+
+        prompts = list(iter_injected_prompts("{{customer}} ({{age}}) {{product}}", frame, mappings))
+
+        assert prompts == ["Ann (30.0) Lamp", " () Desk"]
+
+    def test_text_data_renders_once(self):
+        """Test that text uploads leave the prompt unchanged"""
+        assert list(iter_injected_prompts(TEMPLATE, "plain text file", MAPPINGS)) == [TEMPLATE]
+
+    def test_chunked_reader_is_consumed_lazily(self, frame):
+        """Test that chunks are only read as prompts are consumed"""
+        read = []
+
+        def reader():
+            for start in range(0, 3):
+                read.append(start)
+                yield frame.iloc[start:start + 1]
+
+        prompts = iter_injected_prompts("{{customer}}", reader(), MAPPINGS, chunk_size=1)
+
+        assert next(prompts) == "Ann"
+        assert read == [0]
+
+    def test_jsonl_output(self, frame):
+        """Test writing prompts as JSONL"""
+        output = io.StringIO()
+
+        count = write_injected_prompts_jsonl("{{customer}}\n\"{{product}}\"", frame, MAPPINGS, output, chunk_size=2)
+
+        lines = [json.loads(line) for line in output.getvalue().splitlines()]
+        assert count == 3
+        assert lines[2] == {"row": 2, "prompt": "Cy\n\"Chair\""}
+
+    def test_first_row_matches_single_injection(self, monkeypatch, mock_session_state, frame):
+        """Test that batch mode agrees with the existing single-prompt injection on row 0"""
+        mock_session_state.update({
+            "file_mappings": MAPPINGS + [{"field": "age", "placeholder": "age"}],
+            "uploaded_file_data": frame,
+            "graphql_mappings": [{"field": "data.store.name", "placeholder": "store"}],
+            "graphql_results": {"data": {"store": {"name": "Main St"}}},
+        })
+        monkeypatch.setattr('streamlit.session_state', mock_session_state)
+        template = TEMPLATE + " Age {{age}} at {{store}}."
+
+        prompts = list(iter_prompts_with_data_injection(template))
+
+        assert prompts[0] == generate_content_with_data_injection(template)
+        assert prompts[1] == "Write to Bob about Desk. Sign off to Bob. Age 41 at Main St."
+
+    def test_graphql_fan_out_renders_one_prompt_per_node(self, monkeypatch, mock_session_state):
+        """Test that a fanned-out GraphQL mapping yields a prompt per list item"""
+        nodes = [{"id": str(i), "name": f"Product {i}"} for i in range(10000)]
+        mock_session_state.update({
+            "file_mappings": [], "uploaded_file_data": None,
+            "graphql_mappings": [{"field": "products[*].name", "placeholder": "product"},
+                                 {"field": "shop.name", "placeholder": "shop"}],
+            "graphql_results": {"data": {"products": nodes, "shop": {"name": "Main St"}}},
+        })
+        monkeypatch.setattr('streamlit.session_state', mock_session_state)
+
+        prompts = list(iter_prompts_with_data_injection("Describe {{product}} for {{shop}}."))
+
+        assert len(prompts) == 10000
+        assert prompts[9999] == "Describe Product 9999 for Main St."
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+import pytest
+from models.frame_storage import compact_frame, spill_frame, memory_footprint, format_bytes
+from models.data_injection import iter_injected_prompts
+from models.ingestion import ChunkedUpload
+from models.upload_cache import UploadCache, content_key
+
+
+def _frame(rows=1000):
+    """A frame mixing low- and high-cardinality text, integers and floats"""
+    return pd.DataFrame({
+        "id": np.arange(rows),
+        "country": pd.Series(["US", "DE", "FR", "JP"] * (rows // 4), dtype=object),
+        "name": pd.Series([f"Customer {i}" for i in range(rows)], dtype=object),
+        "half": np.arange(rows) / 2,
+        "score": np.linspace(0, 1, rows) / 3,
+        "mixed": pd.Series([i if i % 2 else "a" for i in range(rows)], dtype=object),
+    })
+
+
+class TestCompactFrame:
+    """Tests for lossless frame compaction"""
+
+    def test_column_encodings(self):
+        """Test that each column gets its compact representation"""
+        compact = compact_frame(_frame())
+
+        assert isinstance(compact["country"].dtype, pd.CategoricalDtype)
+        assert compact["name"].dtype != object
+        assert compact["id"].dtype == np.int16
+        assert compact["half"].dtype == np.float32
+        assert compact["score"].dtype == np.float64
+        assert compact["mixed"].dtype == object
+
+    def test_values_and_prompts_are_unchanged(self):
+        """Test that compaction does not change a single rendered prompt"""
+        frame = _frame()
+        frame.loc[3, "name"] = None
+        mappings = [{"field": column, "placeholder": column} for column in frame.columns]
+        template = " | ".join("{{" + column + "}}" for column in frame.columns)
+
+        before = list(iter_injected_prompts(template, frame, mappings))
+        after = list(iter_injected_prompts(template, compact_frame(frame), mappings))
+
+        assert before == after
+
+    def test_memory_shrinks(self):
+        """Test that the compacted frame is smaller"""
+        frame = _frame(10000)
+
+        assert memory_footprint(compact_frame(frame)) < memory_footprint(frame) * 0.75
+
+
+class TestSpillFrame:
+    """Tests for spilling frames to memory-mapped Arrow files"""
+
+    def test_spilled_handle_reads_the_same_rows(self, tmp_path):
+        """Test that the handle streams back every row while holding only a preview"""
+        pytest.importorskip("pyarrow")
+        frame = compact_frame(_frame(5000).drop(columns="mixed"))
+
+        handle = spill_frame(frame, str(tmp_path / "frame.arrow"))
+
+        assert isinstance(handle, ChunkedUpload)
+        pd.testing.assert_frame_equal(pd.concat(handle, ignore_index=True), frame)
+        assert memory_footprint(handle) < memory_footprint(frame) / 10
+
+    def test_upload_cache_spills_large_frames(self, tmp_path):
+        """Test that frames above the spill size are cached as a handle and found again after a restart"""
+        pytest.importorskip("pyarrow")
+        data = _frame(2000).drop(columns="mixed").to_csv(index=False).encode()
+
+        handle = UploadCache(directory=str(tmp_path), spill_bytes=1024).get_or_parse("export.csv", data)
+        reopened = UploadCache(directory=str(tmp_path)).get(content_key("export.csv", data))
+
+        assert isinstance(handle, ChunkedUpload) and isinstance(reopened, ChunkedUpload)
+        assert reopened.count_rows() == 2000
+        assert reopened.preview(1)["name"].tolist() == ["Customer 0"]
+
+
+class TestFootprint:
+    """Tests for memory reporting"""
+
+    def test_json_footprint(self):
+        """Test that nested JSON sizes grow with their content"""
+        small = {"data": {"items": [{"id": i} for i in range(10)]}}
+        large = {"data": {"items": [{"id": i} for i in range(1000)]}}
+
+        assert 0 < memory_footprint(small) < memory_footprint(large)
+        assert memory_footprint(None) == 0
+
+    def test_format_bytes(self):
+        """Test human-readable sizes"""
+        assert format_bytes(512) == "512 B"
+        assert format_bytes(1536) == "1.5 KB"
+        assert format_bytes(3 * 1024 ** 3) == "3.0 GB"
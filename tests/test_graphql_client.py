@@ -0,0 +1,155 @@
+import time
+import pytest
+from models.http_pool import SessionPool
+from models.response_cache import ResponseCache
+from models.graphql_client import GraphQLClient, GraphQLError, GraphQLFetchJob, connection_nodes
+from models.graphql_paths import compile_path
+from utils.mock_graphql_server import MockGraphQLServer
+
+QUERY = """query Items($first: Int, $after: String) {
+  items(first: $first, after: $after) {
+    edges { cursor node { id name } }
+    pageInfo { hasNextPage endCursor }
+  }
+}"""
+
+
+def _client(server, cache=None, **kwargs):
+    """Create a client pointed at the mock server"""
+    return GraphQLClient(server.graphql_url, session_pool=SessionPool(), cache=cache, **kwargs)
+
+
+class TestGraphQLClient:
+    """Tests for the pooled GraphQL client"""
+
+    def test_execute_sends_headers(self):
+        """Test that configured headers are sent and missing credentials fail"""
+        with MockGraphQLServer(records=3, required_headers={"Authorization": "Bearer token"}) as server:
+            result = _client(server, headers={"Authorization": "Bearer token"}).execute(QUERY)
+
+            with pytest.raises(GraphQLError):
+                _client(server).execute(QUERY)
+
+        assert [edge["node"]["id"] for edge in result["data"]["items"]["edges"]] == ["1", "2", "3"]
+
+    def test_graphql_errors_raise(self):
+        """Test that a response with errors and no data raises with the server's message"""
+        with MockGraphQLServer(error_message="Field 'items' doesn't exist") as server:
+            with pytest.raises(GraphQLError, match="doesn't exist") as error:
+                _client(server).execute(QUERY)
+
+        assert error.value.errors[0]["message"] == "Field 'items' doesn't exist"
+
+    def test_pagination_follows_cursors(self):
+        """Test that every page is fetched once, in order"""
+        with MockGraphQLServer(records=2500) as server:
+            pages = list(_client(server).iter_pages(QUERY, "items", page_size=1000))
+            requests = server.stats()["requests"]
+
+        assert [len(page) for page in pages] == [1000, 1000, 500]
+        assert pages[0][0]["id"] == "1" and pages[2][-1]["id"] == "2500"
+        assert requests == 3
+
+    def test_max_records(self):
+        """Test that pagination stops at max_records"""
+        with MockGraphQLServer(records=2500) as server:
+            result = _client(server).fetch_all(QUERY, "items", page_size=1000, max_records=1200)
+            served = server.stats()["records_served"]
+
+        assert len(result["data"]["items"]) == 1200
+        assert served == 1200
+
+    def test_fetch_all_shape_supports_fan_out(self):
+        """Test that fetched nodes sit at the connection path, ready for [*] mappings"""
+        with MockGraphQLServer(records=5) as server:
+            result = _client(server).fetch_all(QUERY, "data.items", page_size=2)
+
+        assert compile_path("items[*].name").get_all(result) == [f"Item {i}" for i in range(1, 6)]
+
+    def test_responses_are_cached(self):
+        """Test that repeating a fetch is served from the cache, keyed by variables and headers"""
+        cache = ResponseCache()
+        with MockGraphQLServer(records=300) as server:
+            first = _client(server, cache).fetch_all(QUERY, "items", page_size=100)
+            second = _client(server, cache).fetch_all(QUERY, "items", page_size=100)
+            after_repeat = server.stats()["requests"]
+
+            _client(server, cache).fetch_all(QUERY, "items", page_size=50)
+            _client(server, cache, headers={"X-Tenant": "b"}).fetch_all(QUERY, "items", page_size=100)
+            after_changes = server.stats()["requests"]
+
+        assert first == second
+        assert after_repeat == 3
+        assert after_changes == 3 + 6 + 3
+
+    def test_cache_ttl(self):
+        """Test that expired responses are fetched again"""
+        cache = ResponseCache(ttl=0.05)
+        with MockGraphQLServer(records=3) as server:
+            client = _client(server, cache)
+            client.execute(QUERY)
+            time.sleep(0.1)
+            client.execute(QUERY)
+            requests = server.stats()["requests"]
+
+        assert requests == 2
+
+    def test_streaming_buffer_is_bounded(self):
+        """Test that a slow consumer holds back page fetching to the buffer size"""
+        with MockGraphQLServer(records=10000) as server:
+            nodes = _client(server).iter_nodes(QUERY, "items", page_size=100, buffer_pages=2)
+            first = [next(nodes) for _ in range(10)]
+            time.sleep(0.3)
+            requests = server.stats()["requests"]
+            nodes.close()
+
+        assert [node["id"] for node in first] == [str(i) for i in range(1, 11)]
+        # The page being consumed, the buffered pages and one blocked producer
+        assert requests <= 4
+
+    def test_large_fetch(self):
+        """Test that 100k records are fetched as prompt injection data"""
+        with MockGraphQLServer(records=100000, max_page_size=5000) as server:
+            result = _client(server).fetch_all(QUERY, "items", page_size=5000)
+
+        items = result["data"]["items"]
+        assert len(items) == 100000
+        assert items[-1]["id"] == "100000"
+
+
+class TestGraphQLFetchJob:
+    """Tests for background GraphQL fetches"""
+
+    def test_job_runs_in_background(self):
+        """Test that a job returns immediately and reports its result when done"""
+        with MockGraphQLServer(records=50, latency=0.05) as server:
+            job = GraphQLFetchJob(_client(server), QUERY, connection="items", page_size=10)
+            assert not job.done
+
+            assert job.wait(5)
+
+        assert job.error is None
+        assert job.records == 50
+        assert len(job.result["data"]["items"]) == 50
+
+    def test_job_reports_errors(self):
+        """Test that failures are stored on the job instead of raised"""
+        with MockGraphQLServer(error_message="Boom") as server:
+            job = GraphQLFetchJob(_client(server), QUERY)
+            job.wait(5)
+
+        assert isinstance(job.error, GraphQLError)
+        assert job.result is None
+
+
+class TestConnectionNodes:
+    """Tests for reading connection pages"""
+
+    def test_connection_shapes(self):
+        """Test edges, nodes and plain lists"""
+        assert connection_nodes({"edges": [{"node": 1}, {"node": 2}]}) == [1, 2]
+        assert connection_nodes({"nodes": [1, 2]}) == [1, 2]
+        assert connection_nodes([1, 2]) == [1, 2]
+
+        with pytest.raises(GraphQLError):
+            connection_nodes({"id": 1})
@@ -0,0 +1,70 @@
+import pytest
+from models.graphql_paths import compile_path, graphql_frame
+
+RESULTS = {
+    "data": {
+        "shop": {"name": "Main St"},
+        "products": [
+            {"id": "1", "name": "Lamp", "tags": [{"label": "new"}, {"label": "sale"}]},
+            {"id": "2", "name": "Desk", "tags": []},
+        ]
+    }
+}
+
+
+class TestGraphQLPath:
+    """Tests for compiled GraphQL field paths"""
+
+    def test_dot_paths_from_root_or_data(self):
+        """Test that paths resolve from the response root or from its data object"""
+        assert compile_path("data.shop.name").get(RESULTS) == "Main St"
+        assert compile_path("shop.name").get(RESULTS) == "Main St"
+
+    def test_lists_default_to_first_item(self):
+        """Test that a list without a selector stands for its first item"""
+        assert compile_path("products.name").get(RESULTS) == "Lamp"
+
+    def test_explicit_indexing(self):
+        """Test positive and negative list indexes"""
+        assert compile_path("products[1].name").get(RESULTS) == "Desk"
+        assert compile_path("products[-1].id").get(RESULTS) == "2"
+        assert compile_path("products[5].name").get(RESULTS) is None
+
+    def test_wildcard_fan_out(self):
+        """Test that [*] resolves every list item, keeping misses aligned as None"""
+        assert compile_path("products[*].name").get_all(RESULTS) == ["Lamp", "Desk"]
+        assert compile_path("products[*].tags[0].label").get_all(RESULTS) == ["new", None]
+        assert compile_path("products[*].tags[*].label").get_all(RESULTS) == ["new", "sale"]
+        assert compile_path("products[*].name").fan_out and not compile_path("shop.name").fan_out
+
+    def test_missing_paths(self):
+        """Test that unresolvable paths give None"""
+        assert compile_path("shop.owner.name").get(RESULTS) is None
+        assert compile_path("nothing").get(None) is None
+
+    @pytest.mark.parametrize("path", ["", "a]b", "[x]", "a[1"])
+    def test_invalid_paths(self, path):
+        """Test that malformed paths are rejected when compiled"""
+        with pytest.raises(ValueError):
+            compile_path(path)
+
+    def test_paths_are_compiled_once(self):
+        """Test that compiled paths are reused"""
+        assert compile_path("products[*].id") is compile_path("products[*].id")
+
+
+class TestGraphQLFrame:
+    """Tests for building batch rows from GraphQL results"""
+
+    def test_fan_out_rows_with_shared_values(self):
+        """Test one row per item, with single values repeated and misses left as placeholders"""
+        frame = graphql_frame(RESULTS, [
+            {"field": "products[*].name", "placeholder": "product"},
+            {"field": "shop.name", "placeholder": "shop"},
+            {"field": "products[*].tags[0].label", "placeholder": "tag"},
+        ])
+
+        assert frame.to_dict("records") == [
+            {"product": "Lamp", "shop": "Main St", "tag": "new"},
+            {"product": "Desk", "shop": "Main St", "tag": "{{tag}}"},
+        ]
@@ -0,0 +1,100 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from models.http_pool import SessionPool, get_session_pool
+from models.content_generator import ContentGenerator
+
+
+class _KeepAliveHandler(BaseHTTPRequestHandler):
+    """Minimal HTTP/1.1 handler that answers every POST with a fixed message"""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+
+        body = json.dumps({
+            "content": [{"text": "pooled"}],
+            "usage": {"input_tokens": 1, "output_tokens": 1}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def local_server():
+    """Run a keep-alive HTTP server on a free local port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+
+    server.shutdown()
+    server.server_close()
+
+
+class TestSessionPool:
+    """Tests for the pooled HTTP sessions"""
+
+    def test_one_session_per_base_url(self):
+        """Test that URLs on the same host share a session"""
+        pool = SessionPool()
+
+        first = pool.get_session("https://api.anthropic.com/v1/messages")
+        second = pool.get_session("https://API.anthropic.com/v1/messages/batches")
+        other = pool.get_session("https://api.openai.com/v1/chat/completions")
+
+        assert first is second
+        assert first is not other
+        assert pool.stats()["sessions"] == 2
+
+    def test_default_timeout_applied(self):
+        """Test that configured timeouts are exposed as a (connect, read) pair"""
+        pool = SessionPool(connect_timeout=1.5, read_timeout=30)
+
+        assert pool.timeout == (1.5, 30)
+
+    def test_connections_are_reused(self, local_server):
+        """Test that sequential requests reuse the same keep-alive connection"""
+        pool = SessionPool()
+
+        for _ in range(5):
+            response = pool.post(f"{local_server}/v1/messages", json={"n": 1})
+            assert response.status_code == 200
+
+        stats = pool.stats()
+        assert stats["requests"] == 5
+        assert stats["connections"] == 1
+        assert pool.reused_connections == 4
+
+        pool.close()
+        assert pool.stats()["sessions"] == 0
+
+    def test_generators_share_default_pool(self):
+        """Test that generators without an explicit pool use the process-wide one"""
+        assert ContentGenerator(api_key="a").session_pool is get_session_pool()
+        assert ContentGenerator(api_key="b").session_pool is get_session_pool()
+
+    def test_generator_uses_pool(self, local_server):
+        """Test that ContentGenerator sends requests through its pool"""
+        pool = SessionPool()
+        generator = ContentGenerator(api_key="test_key", session_pool=pool)
+        generator.base_url = f"{local_server}/v1/messages"
+
+        for _ in range(3):
+            result = generator.generate("Hello")
+            assert result["success"] is True
+            assert result["content"] == "pooled"
+
+        assert pool.reused_connections == 2
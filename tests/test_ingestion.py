@@ -0,0 +1,149 @@
+import tracemalloc
+import pandas as pd
+import pytest
+from models.ingestion import ChunkedUpload, iter_chunks, infer_csv_dtypes
+from models.data_injection import iter_injected_prompts
+from models.upload_cache import UploadCache
+
+
+def _csv(rows):
+    """CSV bytes with an id, a score and a name column"""
+    return ("id,score,name\n" + "".join(f"{i},{i / 2},Name {i}\n" for i in range(rows))).encode()
+
+
+class TestIterChunks:
+    """Tests for reading files chunk by chunk"""
+
+    def test_csv_chunks(self, tmp_path):
+        """Test that CSV files are split into chunks from a path or from bytes"""
+        path = tmp_path / "data.csv"
+        path.write_bytes(_csv(25))
+
+        from_path = list(iter_chunks("data.csv", str(path), chunk_size=10))
+        from_bytes = list(iter_chunks("data.csv", _csv(25), chunk_size=10))
+
+        assert [len(chunk) for chunk in from_path] == [10, 10, 5]
+        pd.testing.assert_frame_equal(pd.concat(from_path), pd.concat(from_bytes))
+        assert from_path[2]["name"].iloc[-1] == "Name 24"
+
+    def test_csv_dtypes_follow_the_sample(self):
+        """Test that integer columns stay integers in chunks with missing values"""
+        data = b"id,code\n1,10\n2,20\n3,\n4,40\n"
+
+        chunks = list(iter_chunks("data.csv", data, chunk_size=2, sample_rows=2))
+
+        assert infer_csv_dtypes(data, sample_rows=2)["id"] == "Int64"
+        assert all(chunk["code"].dtype == "Int64" for chunk in chunks)
+        assert chunks[1]["code"].isna().tolist() == [True, False]
+
+    def test_csv_values_that_do_not_fit_the_sample(self):
+        """Test that a column turning into text keeps its values"""
+        data = b"code\n1\n2\nA3\n"
+
+        chunks = list(iter_chunks("data.csv", data, chunk_size=2, sample_rows=2))
+
+        assert chunks[1]["code"].tolist() == ["A3"]
+
+    def test_jsonl_chunks(self):
+        """Test that line-delimited JSON is read in chunks"""
+        data = b"".join(f'{{"id": {i}, "name": "Name {i}"}}\n'.encode() for i in range(7))
+
+        chunks = list(iter_chunks("records.jsonl", data, chunk_size=3))
+
+        assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+        assert chunks[-1]["name"].tolist() == ["Name 6"]
+
+    @pytest.mark.parametrize("name", ["data.parquet", "data.feather"])
+    def test_columnar_chunks(self, tmp_path, name):
+        """Test that Parquet and Arrow files are read in record batches"""
+        pytest.importorskip("pyarrow")
+        frame = pd.DataFrame({"id": range(25), "name": [f"Name {i}" for i in range(25)]})
+        path = str(tmp_path / name)
+        frame.to_parquet(path) if name.endswith("parquet") else frame.to_feather(path)
+
+        chunks = list(iter_chunks(name, path, chunk_size=10))
+
+        assert [len(chunk) for chunk in chunks] == [10, 10, 5]
+        assert pd.concat(chunks, ignore_index=True)["name"].tolist() == frame["name"].tolist()
+
+    def test_unsupported_type(self):
+        """Test that file types without a streaming reader are rejected"""
+        with pytest.raises(ValueError):
+            iter_chunks("notes.txt", b"text")
+
+
+class TestChunkedUpload:
+    """Tests for lazily read uploads"""
+
+    def test_preview_and_reiteration(self):
+        """Test that the preview comes from the first chunk and every iteration restarts"""
+        upload = ChunkedUpload("data.csv", _csv(120), chunk_size=50, preview_rows=10)
+
+        assert upload.columns.tolist() == ["id", "score", "name"]
+        assert upload.preview(3)["id"].tolist() == [0, 1, 2]
+        assert [len(chunk) for chunk in upload] == [50, 50, 20]
+        assert upload.count_rows() == 120
+
+    def test_batch_injection_streams_every_row(self):
+        """Test that batch injection renders one prompt per row of a chunked upload"""
+        upload = ChunkedUpload("data.csv", _csv(1000), chunk_size=300)
+
+        prompts = list(iter_injected_prompts("Hi {{who}}", upload, [{"field": "name", "placeholder": "who"}],
+                                             chunk_size=100))
+
+        assert len(prompts) == 1000
+        assert prompts[999] == "Hi Name 999"
+
+    def test_missing_values_render_empty(self):
+        """Test that missing values in a chunk do not blank out the whole prompt"""
+        upload = ChunkedUpload("data.csv", b"id,code\n1,10\n2,\n", chunk_size=10, sample_rows=1)
+
+        prompts = list(iter_injected_prompts("Code: {{code}}.", upload, [{"field": "code", "placeholder": "code"}]))
+
+        assert prompts == ["Code: 10.", "Code: ."]
+
+    def test_memory_stays_flat(self, tmp_path):
+        """Test that iterating a large file holds one chunk at a time"""
+        path = tmp_path / "large.csv"
+        path.write_bytes(("a,b,c\n" + "".join(f"{i},{i * 2},{i * 3}\n" for i in range(400000))).encode())
+
+        tracemalloc.start()
+        pd.read_csv(str(path))
+        _, eager_peak = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+        rows = sum(len(chunk) for chunk in ChunkedUpload("large.csv", str(path), chunk_size=20000))
+        _, chunked_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert rows == 400000
+        assert chunked_peak < eager_peak / 4
+
+
+class TestChunkedUploadCache:
+    """Tests for large uploads in the upload cache"""
+
+    def test_large_uploads_are_read_lazily(self, tmp_path):
+        """Test that uploads above the size threshold are cached as chunked readers over a raw copy"""
+        cache = UploadCache(directory=str(tmp_path), chunked_bytes=1024)
+
+        small = cache.get_or_parse("small.csv", _csv(3))
+        large = cache.get_or_parse("large.csv", _csv(500))
+
+        assert isinstance(small, pd.DataFrame)
+        assert isinstance(large, ChunkedUpload)
+        assert isinstance(large.source, str) and large.source.endswith(".raw.csv")
+        assert cache.get_or_parse("again.csv", _csv(500)) is large
+
+    def test_first_row_injection_uses_the_preview(self, monkeypatch, mock_session_state):
+        """Test that single-prompt injection reads the first row of a chunked upload"""
+        from models.prompt_generator import generate_content_with_data_injection
+
+        mock_session_state.update({
+            "file_mappings": [{"field": "name", "placeholder": "who"}],
+            "uploaded_file_data": ChunkedUpload("data.csv", _csv(100), chunk_size=10),
+            "graphql_mappings": [], "graphql_results": None,
+        })
+        monkeypatch.setattr('streamlit.session_state', mock_session_state)
+
+        assert generate_content_with_data_injection("Hi {{who}}") == "Hi Name 0"
@@ -0,0 +1,141 @@
+import random
+import pytest
+from models.http_pool import SessionPool
+from models.rate_limiter import RateLimiterRegistry
+from models.content_generator import ContentGenerator
+from models.tokenizer import count_tokens
+from utils.mock_llm_server import MockLLMServer
+
+
+def _generator(server, **kwargs):
+    """Create a generator pointed at the mock server"""
+    return ContentGenerator(api_key="mock", base_url=server.messages_url, session_pool=SessionPool(),
+                            rate_limiters=RateLimiterRegistry(), **kwargs)
+
+
+class TestMockLLMServer:
+    """Tests for the local mock LLM server"""
+
+    def test_deterministic_outputs(self):
+        """Test that the same seed and request always produce the same text"""
+        with MockLLMServer(seed=7, output_tokens=20) as server:
+            generator = _generator(server)
+            first = generator.generate("Same prompt", temperature=0)
+            second = generator.generate("Same prompt", temperature=0)
+            other = generator.generate("Other prompt", temperature=0)
+
+        with MockLLMServer(seed=7, output_tokens=20) as server:
+            restarted = _generator(server).generate("Same prompt", temperature=0)
+
+        assert first["success"] is True
+        assert first["content"] == second["content"] == restarted["content"]
+        assert first["content"] != other["content"]
+        assert first["metadata"]["completion_tokens"] == 20
+
+    def test_streaming_matches_plain_response(self):
+        """Test that the SSE stream carries the same text as the JSON response"""
+        with MockLLMServer(output_tokens=15) as server:
+            generator = _generator(server)
+            plain = generator.generate("Prompt", temperature=0)
+            events = list(generator.generate_stream("Prompt", temperature=0))
+
+            assert server.stats()["streamed"] == 1
+
+        deltas = [e["text"] for e in events if e["type"] == "text"]
+        assert len(deltas) == 15
+        assert "".join(deltas) == plain["content"] == events[-1]["content"]
+        assert events[-1]["metadata"]["stop_reason"] == "end_turn"
+
+    def test_max_tokens_caps_output(self):
+        """Test that max_tokens truncates the output and is reported as the stop reason"""
+        with MockLLMServer(response_text="one two three four five") as server:
+            events = list(_generator(server).generate_stream("Prompt", max_tokens=3))
+
+        assert events[-1]["content"] == "one two three"
+        assert events[-1]["metadata"]["stop_reason"] == "max_tokens"
+
+    def test_rate_limit_injection_is_retried(self):
+        """Test that injected 429s carry Retry-After and the client retries through them"""
+        with MockLLMServer(rate_limit_rate=0.5, seed=3, retry_after=0) as server:
+            generator = _generator(server, max_retries=10)
+            generator.retry_base_delay = 0
+            results = [generator.generate(f"Prompt {i}") for i in range(10)]
+            stats = server.stats()
+
+        assert all(result["success"] for result in results)
+        assert stats["rate_limited"] > 0
+        assert stats["requests"] == 10 + stats["rate_limited"]
+
+    def test_error_injection(self):
+        """Test that injected overload errors surface as failed results"""
+        with MockLLMServer(error_rate=1.0) as server:
+            result = _generator(server, max_retries=0).generate("Prompt")
+
+        assert result["success"] is False
+        assert "529" in result["error"]
+
+    def test_server_side_request_budget(self):
+        """Test that requests beyond the server's budget are rejected with 429"""
+        with MockLLMServer(requests_per_minute=2) as server:
+            generator = _generator(server, max_retries=0)
+            results = [generator.generate(f"Prompt {i}") for i in range(3)]
+
+        assert [r["success"] for r in results] == [True, True, False]
+
+    def test_latency_distributions(self):
+        """Test that sampled latencies follow the configured distribution"""
+        rng = random.Random(0)
+        server = MockLLMServer(latency=0.2)
+
+        try:
+            assert server.sample_latency(rng) == 0.2
+
+            server.latency_distribution = "uniform"
+            assert all(0.1 <= server.sample_latency(rng) <= 0.3 for _ in range(200))
+
+            server.latency_distribution = "lognormal"
+            samples = sorted(server.sample_latency(rng) for _ in range(2000))
+            assert samples[1000] == pytest.approx(0.2, rel=0.15)
+        finally:
+            server.stop()
+
+        with pytest.raises(ValueError):
+            MockLLMServer(latency_distribution="bimodal")
+
+    def test_prompt_cache_emulation(self):
+        """Test that a cached system prompt is written once and read afterwards"""
+        with MockLLMServer(output_tokens=5) as server:
+            generator = _generator(server)
+            system_prompt = "You are a helpful assistant. " * 400
+            first = generator.generate("Question 1", system_prompt=system_prompt)
+            second = generator.generate("Question 2", system_prompt=system_prompt)
+
+        system_tokens = count_tokens(system_prompt, generator.default_model)
+        assert first["metadata"]["cache_creation_input_tokens"] == system_tokens
+        assert second["metadata"]["cache_read_input_tokens"] == system_tokens
+        assert second["metadata"]["prompt_tokens"] == first["metadata"]["prompt_tokens"]
+
+    def test_prompt_cache_covers_only_the_prefix(self):
+        """Test that system blocks after the cache breakpoint neither key nor count as cached"""
+        with MockLLMServer(output_tokens=5) as server:
+            generator = _generator(server)
+            prefix = "You are a helpful assistant. " * 400
+            first = generator.generate("Question", system_prompt=(prefix, "Answer in English."))
+            second = generator.generate("Question", system_prompt=(prefix, "Answer in French."))
+
+        prefix_tokens = count_tokens(prefix, generator.default_model)
+        assert first["metadata"]["cache_creation_input_tokens"] == prefix_tokens
+        assert second["metadata"]["cache_read_input_tokens"] == prefix_tokens
+        assert second["metadata"]["prompt_tokens"] > 0
+
+    def test_message_batches(self, monkeypatch):
+        """Test the batch endpoints with ContentGenerator.run_batch"""
+        monkeypatch.setattr("models.content_generator.time.sleep", lambda seconds: None)
+
+        with MockLLMServer(output_tokens=5) as server:
+            generator = _generator(server)
+            results = generator.run_batch(["A", "B", "C"], poll_interval=0.01)
+            expected = generator.generate("B")
+
+        assert all(result["success"] for result in results)
+        assert results[1]["content"] == expected["content"]
@@ -1,6 +1,8 @@
 import pytest
 import re
-from models.prompt_generator import generate_prompt
+from models.prompt_generator import (generate_prompt, generate_system_prompt, generate_user_prompt,
+                                     section_cache_info, clear_section_cache)
+from models import prompt_spec
 
 
 class TestPromptGenerator:
@@ -103,4 +105,85 @@ class TestPromptContent:
         
         # Check for format and tone
         assert f"Format: {default_session_state['output_format']}" in prompt, "Output format should be specified"
-        assert f"Tone: {default_session_state['output_tone']}" in prompt, "Output tone should be specified"
\ No newline at end of file
+        assert f"Tone: {default_session_state['output_tone']}" in prompt, "Output tone should be specified"
+
+
+class TestSectionCache:
+    """Tests for memoized section rendering"""
+
+    def test_rerun_reuses_every_section(self, monkeypatch, default_session_state):
+        """Test that rendering an unchanged state again is served from the cache"""
+        monkeypatch.setattr('streamlit.session_state', default_session_state)
+        clear_section_cache()
+
+        first = generate_prompt()
+        misses = section_cache_info()["misses"]
+
+        assert generate_prompt() == first
+        assert section_cache_info()["misses"] == misses
+        assert section_cache_info()["hits"] >= misses
+
+    def test_edit_rerenders_only_affected_section(self, monkeypatch, default_session_state):
+        """Test that changing one field only rebuilds the section that reads it"""
+        monkeypatch.setattr('streamlit.session_state', default_session_state)
+        clear_section_cache()
+        generate_prompt()
+        misses = section_cache_info()["misses"]
+
+        default_session_state["task"] = "Write a migration guide."
+        prompt = generate_prompt()
+
+        assert "# Task Definition\nWrite a migration guide.\n\n" in prompt
+        assert section_cache_info()["misses"] == misses + 1
+
+    def test_rerun_does_not_refreeze_collections(self, monkeypatch, default_session_state):
+        """Test that an unchanged list is frozen once, not on every rerun"""
+        default_session_state["examples"] = [{"input": str(i), "output": str(i)} for i in range(50)]
+        monkeypatch.setattr('streamlit.session_state', default_session_state)
+        generate_prompt()
+
+        frozen = []
+        freeze = prompt_spec._freeze
+        monkeypatch.setattr(prompt_spec, '_freeze', lambda value: frozen.append(value) or freeze(value))
+        generate_prompt()
+
+        assert not any(value is default_session_state["examples"] for value in frozen)
+
+    def test_in_place_edit_after_mark_changed(self, monkeypatch, default_session_state):
+        """Test that an edited list is picked up once it is marked as changed"""
+        default_session_state["examples"] = [{"input": "a", "output": "b"}]
+        monkeypatch.setattr('streamlit.session_state', default_session_state)
+        generate_prompt()
+
+        default_session_state["examples"].append({"input": "c", "output": "d"})
+        prompt_spec.mark_changed(default_session_state["examples"])
+        prompt = generate_prompt()
+
+        assert "[Example 2]\nInput: c\nOutput: d\n\n" in prompt
+
+    def test_unhashable_state_values(self, monkeypatch, default_session_state):
+        """Test that list and dict state values can key the cache"""
+        default_session_state["examples"] = [{"input": "a", "output": "b"}, {"input": "", "output": ""}]
+        monkeypatch.setattr('streamlit.session_state', default_session_state)
+
+        prompt = generate_prompt()
+
+        assert "[Example 1]\nInput: a\nOutput: b\n\n" in prompt
+        assert "[Example 2]" not in prompt
+
+    def test_role_based_sections(self, monkeypatch, default_session_state):
+        """Test that sections are split between system and user prompts by role"""
+        default_session_state.update({
+            "system_prompt_sections": {"Persona Definition": True},
+            "user_prompt_sections": {},
+            "prompt_section_order": ["Context & Background", "Task Definition"],
+            "section_roles": {"Context & Background": "System", "Task Definition": "User"},
+        })
+        monkeypatch.setattr('streamlit.session_state', default_session_state)
+
+        system_prompt = generate_system_prompt()
+        user_prompt = generate_user_prompt()
+
+        assert system_prompt.startswith("# Persona Definition\n")
+        assert system_prompt.endswith(f"# Context & Background\n{default_session_state['context']}\n\n")
+        assert user_prompt == f"# Task Definition\n{default_session_state['task']}\n\n"
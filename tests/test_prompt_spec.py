@@ -0,0 +1,174 @@
+import json
+import pickle
+import dataclasses
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from models.providers import AnthropicAdapter
+from models.prompt_generator import generate_prompt, generate_system_prompt, generate_user_prompt
+from models.prompt_spec import (PromptSpec, SECTIONS, render_prompt, render_system_prompt, render_user_prompt,
+                                render_role_prompts, render_role_prompt_parts, render_all, render_batch,
+                                _compile_roles)
+
+
+class TestPromptSpec:
+    """Tests for the headless prompt spec"""
+
+    def test_spec_is_frozen_and_slotted(self, default_session_state):
+        """Test that a spec cannot be modified and has no instance dict"""
+        spec = PromptSpec.from_session_state(default_session_state)
+
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            spec.task = "Something else"
+        assert not hasattr(spec, "__dict__")
+
+    def test_collections_are_frozen(self, default_session_state):
+        """Test that lists and dicts are copied into tuples, detached from the state"""
+        spec = PromptSpec.from_session_state(default_session_state)
+        default_session_state["examples"][0]["input"] = "Changed"
+
+        assert spec.examples == ((("input", "Example input"), ("output", "Example output")),)
+        assert spec.chain_of_thought_steps == ("Analyze requirements", "Research key concepts")
+        assert hash(spec) == hash(PromptSpec.from_mapping(dataclasses.asdict(spec)))
+
+    def test_unknown_keys_are_ignored(self):
+        """Test that session state keys outside the spec are skipped"""
+        spec = PromptSpec.from_mapping({"task": "Write", "api_key": "secret"})
+
+        assert spec.task == "Write"
+        assert spec.context == ""
+
+    def test_pickle_round_trip(self, default_session_state):
+        """Test that specs survive pickling for process pools"""
+        spec = PromptSpec.from_session_state(default_session_state)
+
+        assert pickle.loads(pickle.dumps(spec)) == spec
+
+    def test_from_template(self, tmp_path, default_session_state):
+        """Test loading a spec from a saved template file"""
+        path = tmp_path / "template.json"
+        path.write_text(json.dumps(default_session_state))
+
+        assert PromptSpec.from_template(str(path)) == PromptSpec.from_session_state(default_session_state)
+
+
+class TestRendering:
+    """Tests for the pure render functions"""
+
+    def test_wrappers_match_pure_renderers(self, monkeypatch, default_session_state):
+        """Test that the session state functions render the same text as the spec API"""
+        default_session_state["system_prompt_sections"] = {"Persona Definition": True, "Context & Background": True}
+        default_session_state["user_prompt_sections"] = {"Task Definition": True, "Output Requirements": True}
+        monkeypatch.setattr('streamlit.session_state', default_session_state)
+
+        rendered = render_all(PromptSpec.from_session_state(default_session_state))
+
+        assert rendered == {"prompt": generate_prompt(), "system_prompt": generate_system_prompt(),
+                            "user_prompt": generate_user_prompt()}
+
+    def test_concurrent_rendering(self, default_session_state):
+        """Test that rendering from many threads gives identical output"""
+        spec = PromptSpec.from_session_state(default_session_state)
+        expected = render_prompt(spec)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(lambda _: render_prompt(spec), range(200)))
+
+        assert results == [expected] * 200
+
+    def test_render_batch_in_process_pool(self, default_session_state):
+        """Test rendering specs in worker processes keeps input order"""
+        base = PromptSpec.from_session_state(default_session_state)
+        specs = [dataclasses.replace(base, task=f"Task {i}") for i in range(20)]
+
+        results = render_batch(specs, max_workers=2, chunksize=4)
+
+        assert [r["prompt"] for r in results] == [render_prompt(spec) for spec in specs]
+        assert "# Task Definition\nTask 7\n\n" in results[7]["prompt"]
+
+
+class TestSectionRegistry:
+    """Tests for registry-based section dispatch and layout compilation"""
+
+    @pytest.fixture
+    def structured_state(self, default_session_state):
+        default_session_state.update({
+            "system_prompt_sections": {"Persona Definition": True},
+            "user_prompt_sections": {"Output Requirements": True, "Examples (Few-Shot Learning)": True},
+            "prompt_section_order": list(default_session_state["prompt_structure"]),
+            "section_roles": {"Context & Background": "System", "Task Definition": "User",
+                              "Input Data Format": "User", "Output Requirements": "User",
+                              "Examples (Few-Shot Learning)": "User", "Chain-of-Thought Instructions": "User"},
+        })
+        return default_session_state
+
+    def test_one_pass_matches_single_prompts(self, structured_state):
+        """Test that rendering both prompts at once matches rendering each on its own"""
+        spec = PromptSpec.from_session_state(structured_state)
+
+        assert render_role_prompts(spec) == (render_system_prompt(spec), render_user_prompt(spec))
+
+    def test_sections_are_not_duplicated(self, structured_state):
+        """Test that a section placed by the structure editor and checked in the user layout appears once"""
+        _, user_prompt = render_role_prompts(PromptSpec.from_session_state(structured_state))
+
+        assert user_prompt.count("# Output Requirements") == 1
+        assert user_prompt.count("# Examples & Constraints") == 1
+
+    def test_empty_section_is_omitted(self, structured_state):
+        """Test that an enabled section with no content renders nothing rather than a placeholder"""
+        structured_state["task"] = ""
+
+        _, user_prompt = render_role_prompts(PromptSpec.from_session_state(structured_state))
+
+        assert "Task Definition" not in user_prompt
+
+    def test_registered_sections_render_in_structure_layout(self, structured_state):
+        """Test that built-in sections placed by the structure editor use their real renderer"""
+        structured_state.update({"content_intent": "Inform", "mission_statement": "Help teams",
+                                 "voice_choice": "Technical", "content_rules": ["No jargon"]})
+        structured_state["prompt_structure"]["Content Intent & Guidelines"] = True
+        structured_state["prompt_section_order"].append("Content Intent & Guidelines")
+        structured_state["section_roles"]["Content Intent & Guidelines"] = "System"
+
+        system_prompt, _ = render_role_prompts(PromptSpec.from_session_state(structured_state))
+
+        assert "**Intent:** Inform\n\n" in system_prompt
+        assert "- No jargon\n" in system_prompt
+
+    def test_unknown_sections_render_as_custom(self, structured_state):
+        """Test that names missing from the registry get the custom section text"""
+        structured_state["user_prompt_sections"]["Audience Notes"] = True
+
+        _, user_prompt = render_role_prompts(PromptSpec.from_session_state(structured_state))
+
+        assert user_prompt.endswith("# Audience Notes\nCustom instructions for Audience Notes.\n\n")
+        assert "Audience Notes" not in SECTIONS
+
+    def test_system_prefix_holds_only_invariant_sections(self, structured_state):
+        """Test that the system prompt splits after the last invariant section, before the per-prompt ones"""
+        structured_state["system_prompt_sections"]["Tone & Voice"] = True
+        spec = PromptSpec.from_session_state(structured_state)
+
+        prefix, rest, user_prompt = render_role_prompt_parts(spec)
+        data = AnthropicAdapter("key").build_request(user_prompt, "claude", 100, 0.2, system_prompt=(prefix, rest),
+                                                     cache_system_prompt=True)
+
+        cached, variable = data["system"]
+        assert cached["cache_control"] == {"type": "ephemeral"}
+        assert "cache_control" not in variable
+        assert cached["text"].index("# Persona") < cached["text"].index("# Tone")
+        assert "Context" not in cached["text"]
+        assert variable["text"].startswith("# Context")
+        assert (prefix + rest, user_prompt) == render_role_prompts(spec)
+
+    def test_layout_is_compiled_once_per_change(self, structured_state):
+        """Test that the section plan is reused until the layout changes"""
+        _compile_roles.cache_clear()
+        spec = PromptSpec.from_session_state(structured_state)
+
+        render_role_prompts(spec)
+        render_role_prompts(dataclasses.replace(spec, task="Another task"))
+        assert _compile_roles.cache_info().misses == 1
+
+        render_role_prompts(dataclasses.replace(spec, prompt_section_order=tuple(reversed(spec.prompt_section_order))))
+        assert _compile_roles.cache_info().misses == 2
@@ -0,0 +1,200 @@
+import json
+import pytest
+import responses
+from models.providers import (
+    AnthropicAdapter,
+    OpenAICompatibleAdapter,
+    LocalHTTPAdapter,
+    ProviderError,
+    get_adapter,
+    iter_sse_events
+)
+from models.content_generator import ContentGenerator
+
+
+class TestAdapters:
+    """Tests for provider request building and response parsing"""
+
+    def test_get_adapter_by_name_and_ui_label(self):
+        """Test that both adapter names and UI labels resolve"""
+        assert isinstance(get_adapter("anthropic"), AnthropicAdapter)
+        assert isinstance(get_adapter("Anthropic"), AnthropicAdapter)
+        assert isinstance(get_adapter("OpenAI"), OpenAICompatibleAdapter)
+        assert isinstance(get_adapter("Custom"), LocalHTTPAdapter)
+
+        with pytest.raises(ValueError):
+            get_adapter("carrier-pigeon")
+
+    def test_capability_flags(self):
+        """Test that capability flags differ per backend"""
+        assert get_adapter("anthropic").capabilities() == {
+            "streaming": True, "batching": True, "prompt_caching": True
+        }
+        assert get_adapter("openai").capabilities()["prompt_caching"] is False
+        assert get_adapter("local").requires_api_key is False
+
+    def test_anthropic_system_prompt(self):
+        """Test that Anthropic gets the system prompt as a top-level field"""
+        data = AnthropicAdapter("key").build_request("Hi", "claude", 100, 0.2, system_prompt="Be brief")
+
+        assert data["system"] == "Be brief"
+        assert data["messages"] == [{"role": "user", "content": "Hi"}]
+
+    def test_anthropic_cache_breakpoint(self):
+        """Test that a cacheable system prompt becomes a block with cache_control"""
+        data = AnthropicAdapter("key").build_request("Hi", "claude", 100, 0.2, system_prompt="Be brief",
+                                                     cache_system_prompt=True)
+
+        assert data["system"] == [{"type": "text", "text": "Be brief", "cache_control": {"type": "ephemeral"}}]
+
+    def test_anthropic_cache_breakpoint_before_per_prompt_part(self):
+        """Test that only the invariant prefix of a split system prompt carries the cache breakpoint"""
+        data = AnthropicAdapter("key").build_request("Hi", "claude", 100, 0.2,
+                                                     system_prompt=("Be brief", " Context: refunds"),
+                                                     cache_system_prompt=True)
+
+        assert data["system"] == [{"type": "text", "text": "Be brief", "cache_control": {"type": "ephemeral"}},
+                                  {"type": "text", "text": " Context: refunds"}]
+
+        data = AnthropicAdapter("key").build_request("Hi", "claude", 100, 0.2, system_prompt=("", "Context"),
+                                                     cache_system_prompt=True)
+        assert data["system"] == "Context"
+
+        data = OpenAICompatibleAdapter("key").build_request("Hi", "gpt-4o", 100, 0.2,
+                                                            system_prompt=("Be brief", " Context: refunds"))
+        assert data["messages"][0] == {"role": "system", "content": "Be brief Context: refunds"}
+
+    def test_openai_system_prompt(self):
+        """Test that OpenAI-compatible servers get a system message"""
+        adapter = OpenAICompatibleAdapter("key")
+        data = adapter.build_request("Hi", "gpt-4o", 100, 0.2, system_prompt="Be brief")
+
+        assert data["messages"] == [
+            {"role": "system", "content": "Be brief"},
+            {"role": "user", "content": "Hi"}
+        ]
+        assert adapter.build_headers()["Authorization"] == "Bearer key"
+        assert adapter.enable_streaming(data)["stream_options"] == {"include_usage": True}
+
+    def test_openai_usage_is_normalized(self):
+        """Test that OpenAI usage maps onto input/output tokens"""
+        text, usage = OpenAICompatibleAdapter().parse_response({
+            "choices": [{"message": {"content": "Hello"}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 2, "total_tokens": 7}
+        })
+
+        assert text == "Hello"
+        assert usage == {"input_tokens": 5, "output_tokens": 2, "total_tokens": 7, "cache_read_input_tokens": 0}
+
+    def test_openai_cached_tokens(self):
+        """Test that OpenAI cached prompt tokens are reported separately"""
+        _, usage = OpenAICompatibleAdapter().parse_response({
+            "choices": [{"message": {"content": "Hello"}}],
+            "usage": {"prompt_tokens": 2000, "completion_tokens": 10,
+                      "prompt_tokens_details": {"cached_tokens": 1536}}
+        })
+
+        assert usage["input_tokens"] == 464
+        assert usage["cache_read_input_tokens"] == 1536
+
+    def test_sse_done_sentinel_and_errors(self):
+        """Test the [DONE] sentinel and in-stream errors"""
+        events = list(iter_sse_events(['data: {"choices": []}', "", "data: [DONE]", ""]))
+
+        assert events[-1] == ("done", {"done": True})
+        assert OpenAICompatibleAdapter().parse_stream_event(*events[-1]) == {"done": True}
+
+        with pytest.raises(ProviderError):
+            AnthropicAdapter().parse_stream_event("error", {"error": {"message": "overloaded"}})
+
+    @pytest.mark.parametrize("data", ["[]", '"x"', "1"])
+    def test_sse_non_object_payload(self, data):
+        """Test that valid JSON which is not an object is reported as a provider error"""
+        with pytest.raises(ProviderError):
+            list(iter_sse_events(["event: message_delta", f"data: {data}", ""]))
+
+
+class TestGeneratorProviders:
+    """Tests for routing ContentGenerator traffic through adapters"""
+
+    @responses.activate
+    def test_generate_with_system_prompt(self):
+        """Test that generate() accepts a system prompt"""
+        responses.add(
+            responses.POST,
+            "https://api.anthropic.com/v1/messages",
+            json={"content": [{"text": "ok"}], "usage": {"input_tokens": 1, "output_tokens": 1}},
+            status=200
+        )
+
+        generator = ContentGenerator(api_key="key", prompt_caching=False)
+        result = generator.generate(prompt="User part", system_prompt="System part")
+
+        assert result["success"] is True
+        assert json.loads(responses.calls[0].request.body)["system"] == "System part"
+
+    @responses.activate
+    def test_prompt_cache_usage_in_metadata(self):
+        """Test that the system prompt is marked cacheable and cache usage is recorded"""
+        responses.add(
+            responses.POST,
+            "https://api.anthropic.com/v1/messages",
+            json={
+                "content": [{"text": "ok"}],
+                "usage": {"input_tokens": 20, "output_tokens": 5,
+                          "cache_creation_input_tokens": 0, "cache_read_input_tokens": 1800}
+            },
+            status=200
+        )
+
+        generator = ContentGenerator(api_key="key")
+        result = generator.generate(prompt="User part", system_prompt="System part")
+
+        system = json.loads(responses.calls[0].request.body)["system"]
+        assert system[0]["cache_control"] == {"type": "ephemeral"}
+        assert result["metadata"]["cache_read_input_tokens"] == 1800
+        assert result["metadata"]["cache_creation_input_tokens"] == 0
+        assert result["metadata"]["prompt_tokens"] == 1820
+
+    @responses.activate
+    def test_openai_provider(self):
+        """Test a full request to an OpenAI-compatible endpoint"""
+        responses.add(
+            responses.POST,
+            "https://api.openai.com/v1/chat/completions",
+            json={
+                "choices": [{"message": {"content": "from openai"}}],
+                "usage": {"prompt_tokens": 4, "completion_tokens": 3, "total_tokens": 7}
+            },
+            status=200
+        )
+
+        generator = ContentGenerator(api_key="key", provider="OpenAI")
+        result = generator.generate("Hi", system_prompt="Sys", model="gpt-4o")
+
+        assert result["content"] == "from openai"
+        assert result["metadata"]["total_tokens"] == 7
+        assert responses.calls[0].request.headers["Authorization"] == "Bearer key"
+
+    @responses.activate
+    def test_local_provider_streams_without_api_key(self, monkeypatch):
+        """Test that a local server needs no key and its stream is parsed"""
+        monkeypatch.delenv("LLM_API_KEY", raising=False)
+        url = "http://localhost:9999/v1/chat/completions"
+        body = (
+            'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+            'data: {"choices": [{"delta": {"content": "lo"}, "finish_reason": "stop"}]}\n\n'
+            'data: {"choices": [], "usage": {"prompt_tokens": 3, "completion_tokens": 2}}\n\n'
+            "data: [DONE]\n\n"
+        )
+        responses.add(responses.POST, url, body=body, status=200, content_type="text/event-stream")
+
+        generator = ContentGenerator(provider="local", base_url=url)
+        events = list(generator.generate_stream("Hi", system_prompt="Sys"))
+
+        done = events[-1]
+        assert done["success"] is True
+        assert done["content"] == "Hello"
+        assert done["metadata"]["stop_reason"] == "stop"
+        assert done["metadata"]["total_tokens"] == 5
+        assert "Authorization" not in responses.calls[0].request.headers
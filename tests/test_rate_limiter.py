@@ -0,0 +1,163 @@
+import time
+import pytest
+import responses
+import models.rate_limiter as rate_limiter
+from models.rate_limiter import (
+    TokenBucket,
+    RateLimiter,
+    RateLimiterRegistry,
+    RateLimitExceeded,
+    compute_backoff,
+    parse_retry_after
+)
+from models.content_generator import ContentGenerator
+
+
+@pytest.fixture
+def fake_clock(monkeypatch):
+    """Replace monotonic time and sleep with a controllable clock"""
+    clock = {"now": 100.0, "slept": []}
+
+    def sleep(seconds):
+        clock["slept"].append(seconds)
+        clock["now"] += seconds
+
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(rate_limiter.time, "sleep", sleep)
+    return clock
+
+
+class TestTokenBucket:
+    """Tests for the token bucket"""
+
+    def test_refills_over_time(self, fake_clock):
+        """Test that tokens come back at the refill rate"""
+        bucket = TokenBucket(capacity=10, refill_per_second=2)
+
+        assert bucket.reserve(10) == 0
+        assert bucket.reserve(4) == pytest.approx(2.0)
+
+        fake_clock["now"] += 2
+        assert bucket.reserve(4) == 0
+
+    def test_oversized_request_is_clamped(self, fake_clock):
+        """Test that a request larger than the capacity can still be served"""
+        bucket = TokenBucket(capacity=5, refill_per_second=1)
+
+        assert bucket.reserve(50) == 0
+
+
+class TestRateLimiter:
+    """Tests for per-model request and token budgets"""
+
+    def test_unlimited_by_default(self, fake_clock):
+        """Test that a limiter without budgets never waits"""
+        limiter = RateLimiter()
+
+        for _ in range(100):
+            assert limiter.acquire(tokens=10_000) == 0
+
+    def test_requests_per_minute_queues(self, fake_clock):
+        """Test that callers queue once the request budget is spent"""
+        limiter = RateLimiter(requests_per_minute=60)
+
+        for _ in range(60):
+            limiter.acquire()
+
+        waited = limiter.acquire()
+        assert waited == pytest.approx(1.0)
+
+    def test_tokens_per_minute_queues(self, fake_clock):
+        """Test that the token budget throttles large requests"""
+        limiter = RateLimiter(tokens_per_minute=6000)
+
+        limiter.acquire(tokens=6000)
+        assert limiter.acquire(tokens=3000) == pytest.approx(30.0)
+
+    def test_non_blocking_raises(self, fake_clock):
+        """Test that callers that cannot queue get an error with the wait time"""
+        limiter = RateLimiter(requests_per_minute=1)
+        limiter.acquire()
+
+        with pytest.raises(RateLimitExceeded) as exc_info:
+            limiter.acquire(block=False)
+
+        assert exc_info.value.retry_after == pytest.approx(60.0)
+
+    def test_pause_blocks_everyone(self, fake_clock):
+        """Test that a provider rate-limit signal pauses the limiter"""
+        limiter = RateLimiter()
+        limiter.pause(5)
+
+        assert limiter.acquire() == pytest.approx(5.0)
+
+    def test_registry_keys_by_provider_and_model(self):
+        """Test that each provider/model pair gets its own limiter"""
+        registry = RateLimiterRegistry(default_requests_per_minute=10,
+                                       limits={("anthropic", "opus"): (5, 1000)})
+
+        assert registry.get("anthropic", "sonnet") is registry.get("anthropic", "sonnet")
+        assert registry.get("anthropic", "sonnet") is not registry.get("openai", "sonnet")
+        assert registry.get("anthropic", "opus").requests_per_minute == 5
+        assert registry.get("anthropic", "haiku").requests_per_minute == 10
+
+
+class TestBackoff:
+    """Tests for retry delay helpers"""
+
+    def test_parse_retry_after(self):
+        """Test parsing Retry-After in seconds and as an HTTP date"""
+        assert parse_retry_after("7") == 7.0
+        assert parse_retry_after(None) is None
+        assert parse_retry_after("not a date") is None
+
+        future = time.strftime("%a, %d %b %Y %H:%M:%S GMT", time.gmtime(time.time() + 30))
+        assert 25 < parse_retry_after(future) <= 30
+
+    def test_backoff_is_bounded_and_honors_retry_after(self):
+        """Test the jittered exponential delay"""
+        for attempt in range(6):
+            assert 0 <= compute_backoff(attempt, base_delay=1, max_delay=8) <= 8
+
+        assert compute_backoff(0, base_delay=1, retry_after=12) >= 12
+
+
+class TestGeneratorRetries:
+    """Tests for retries in ContentGenerator"""
+
+    @responses.activate
+    def test_retries_429_then_succeeds(self, fake_clock):
+        """Test that a 429 is retried after the server's Retry-After"""
+        url = "https://api.anthropic.com/v1/messages"
+        responses.add(responses.POST, url, json={"error": "rate"}, status=429, headers={"retry-after": "2"})
+        responses.add(responses.POST, url, json={"content": [{"text": "ok"}], "usage": {}}, status=200)
+
+        generator = ContentGenerator(api_key="test_key", rate_limiters=RateLimiterRegistry())
+        result = generator.generate("Prompt")
+
+        assert result["success"] is True
+        assert result["content"] == "ok"
+        assert len(responses.calls) == 2
+        assert fake_clock["slept"][0] >= 2
+
+    @responses.activate
+    def test_gives_up_after_max_retries(self, fake_clock):
+        """Test that persistent overload eventually returns a failed result"""
+        responses.add(responses.POST, "https://api.anthropic.com/v1/messages", json={}, status=529)
+
+        generator = ContentGenerator(api_key="test_key", rate_limiters=RateLimiterRegistry(), max_retries=2)
+        result = generator.generate("Prompt")
+
+        assert result["success"] is False
+        assert len(responses.calls) == 3
+
+    def test_fail_fast_when_budget_exhausted(self, fake_clock):
+        """Test that callers that do not queue get a failed result instead of waiting"""
+        registry = RateLimiterRegistry(default_requests_per_minute=1)
+        generator = ContentGenerator(api_key="test_key", rate_limiters=registry)
+        registry.get("anthropic", generator.default_model).acquire()
+
+        result = generator.generate("Prompt", wait_for_capacity=False)
+
+        assert result["success"] is False
+        assert "Rate limit budget exhausted" in result["error"]
@@ -0,0 +1,171 @@
+import pytest
+import responses
+from models.response_cache import ResponseCache, make_cache_key
+from models.content_generator import ContentGenerator
+
+
+def _request(prompt="Hello", temperature=0.0, **extra):
+    """Build a request body like ContentGenerator does"""
+    data = {
+        "model": "claude-3-5-sonnet",
+        "messages": [{"role": "user", "content": prompt}],
+        "max_tokens": 100,
+        "temperature": temperature
+    }
+    data.update(extra)
+    return data
+
+
+class TestCacheKey:
+    """Tests for content-addressed cache keys"""
+
+    def test_key_ignores_dict_order(self):
+        """Test that equivalent request bodies hash to the same key"""
+        a = {"model": "m", "max_tokens": 1, "messages": []}
+        b = {"messages": [], "max_tokens": 1, "model": "m"}
+
+        assert make_cache_key(a) == make_cache_key(b)
+
+    def test_key_covers_every_parameter(self):
+        """Test that changing any parameter changes the key"""
+        base = make_cache_key(_request())
+
+        assert make_cache_key(_request(prompt="Other")) != base
+        assert make_cache_key(_request(temperature=0.5)) != base
+        assert make_cache_key(_request(top_p=0.9)) != base
+        assert make_cache_key(_request(), namespace="other-endpoint") != base
+
+
+class TestResponseCache:
+    """Tests for the two-tier response cache"""
+
+    def test_memory_hit_and_miss_counters(self):
+        """Test that hits and misses are counted"""
+        cache = ResponseCache()
+
+        assert cache.get("k") is None
+        cache.set("k", {"content": "cached"})
+        assert cache.get("k") == {"content": "cached"}
+
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["memory_hits"] == 1
+
+    def test_memory_lru_eviction(self):
+        """Test that the least recently used entry is evicted first"""
+        cache = ResponseCache(memory_entries=2)
+
+        cache.set("a", {"v": 1})
+        cache.set("b", {"v": 2})
+        cache.get("a")
+        cache.set("c", {"v": 3})
+
+        assert cache.get("b") is None
+        assert cache.get("a") == {"v": 1}
+        assert cache.get("c") == {"v": 3}
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test that entries expire after the TTL"""
+        import models.response_cache as response_cache
+
+        now = [1000.0]
+        monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+        cache = ResponseCache(ttl=10)
+
+        cache.set("k", {"v": 1})
+        now[0] += 5
+        assert cache.get("k") == {"v": 1}
+        now[0] += 6
+        assert cache.get("k") is None
+
+    def test_disk_tier_survives_restart(self, tmp_path):
+        """Test that a new cache instance reads entries written to disk"""
+        path = str(tmp_path / "responses.sqlite")
+
+        first = ResponseCache(path=path)
+        first.set("k", {"content": "persisted"})
+        first.close()
+
+        second = ResponseCache(path=path)
+        assert second.get("k") == {"content": "persisted"}
+        assert second.stats()["disk_hits"] == 1
+
+    def test_disk_size_eviction(self, tmp_path):
+        """Test that the disk tier stays under its entry and byte limits"""
+        cache = ResponseCache(path=str(tmp_path / "r.sqlite"), memory_entries=1,
+                              max_disk_entries=3, max_disk_bytes=10_000)
+
+        for i in range(6):
+            cache.set(f"k{i}", {"content": "x" * 100})
+
+        assert cache.stats()["disk_entries"] == 3
+        assert cache.get("k0") is None
+        assert cache.get("k5") is not None
+
+    def test_sampling_bypass_policy(self):
+        """Test that sampled runs bypass the cache unless opted in"""
+        cache = ResponseCache()
+
+        assert cache.should_bypass(0.0) is False
+        assert cache.should_bypass(0.7) is True
+        assert cache.should_bypass(0.7, use_cache=True) is False
+        assert cache.should_bypass(0.0, use_cache=False) is True
+        assert ResponseCache(cache_sampling=True).should_bypass(0.7) is False
+
+
+class TestGeneratorCaching:
+    """Tests for the cache in front of ContentGenerator"""
+
+    @responses.activate
+    def test_identical_requests_hit_cache(self):
+        """Test that a repeated deterministic request is served without an API call"""
+        responses.add(
+            responses.POST,
+            "https://api.anthropic.com/v1/messages",
+            json={"content": [{"text": "fresh"}], "usage": {"input_tokens": 3, "output_tokens": 1}},
+            status=200
+        )
+
+        generator = ContentGenerator(api_key="test_key", cache=ResponseCache())
+
+        first = generator.generate("Same prompt", temperature=0)
+        second = generator.generate("Same prompt", temperature=0)
+
+        assert first["metadata"]["cache_hit"] is False
+        assert second["metadata"]["cache_hit"] is True
+        assert second["content"] == "fresh"
+        assert len(responses.calls) == 1
+
+    @responses.activate
+    def test_sampled_requests_bypass_cache(self):
+        """Test that temperature > 0 requests go to the API every time by default"""
+        responses.add(
+            responses.POST,
+            "https://api.anthropic.com/v1/messages",
+            json={"content": [{"text": "sampled"}], "usage": {}},
+            status=200
+        )
+
+        generator = ContentGenerator(api_key="test_key", cache=ResponseCache())
+
+        generator.generate("Same prompt", temperature=0.7)
+        generator.generate("Same prompt", temperature=0.7)
+        generator.generate("Same prompt", temperature=0.7, use_cache=True)
+        generator.generate("Same prompt", temperature=0.7, use_cache=True)
+
+        assert len(responses.calls) == 3
+
+    @responses.activate
+    def test_failures_are_not_cached(self):
+        """Test that failed requests are retried instead of served from cache"""
+        responses.add(responses.POST, "https://api.anthropic.com/v1/messages", json={}, status=500)
+
+        cache = ResponseCache()
+        generator = ContentGenerator(api_key="test_key", cache=cache, max_retries=0)
+
+        generator.generate("Prompt", temperature=0)
+        generator.generate("Prompt", temperature=0)
+
+        assert len(responses.calls) == 2
+        assert cache.stats()["writes"] == 0
@@ -0,0 +1,439 @@
+import time
+import numpy as np
+import pytest
+from models.retrieval import (BM25Index, DenseIndex, DenseRetriever, HashingEmbedder, IngestionJob,
+                              EMBEDDING_RETRIEVAL, chunk_text, analyze, extract_text, simhash, hamming_distance,
+                              create_ingest_pool)
+from models.prompt_generator import generate_prompt, generate_user_prompt
+
+KNOWLEDGE = {
+    "agile": "Scrum teams plan work in sprints. The sprint review shows the increment to stakeholders. "
+             "Retrospectives close every sprint.",
+    "kanban": "Kanban boards visualize the workflow. Limiting work in progress exposes bottlenecks.",
+    "billing": "Invoices are issued monthly. Refunds are processed within ten business days.",
+}
+
+# Pages repeating the same boilerplate, differing only in their page numbers
+BOILERPLATE = " ".join(f"section{i} covers item{i * 7 % 101}." for i in range(120))
+PAGES = [(f"page{n}", f"{BOILERPLATE} Page {n}.", f"page{n}.pdf") for n in range(1, 4)]
+
+
+def _index(**kwargs):
+    """An in-memory index holding the knowledge documents"""
+    index = BM25Index(**kwargs)
+    index.add_documents((doc_id, text, f"{doc_id}.md") for doc_id, text in KNOWLEDGE.items())
+    return index
+
+
+class TestChunking:
+    """Tests for splitting documents into overlapping chunks"""
+
+    def test_chunks_cover_the_document_with_overlap(self):
+        """Test that consecutive chunks overlap and together cover the whole text"""
+        text = " ".join(f"word{i}" for i in range(500))
+        chunks = chunk_text(text, chunk_size=100, overlap=20)
+
+        assert len(chunks) > 5
+        assert chunks[0].start == 0 and chunks[-1].end == len(text)
+        for previous, chunk in zip(chunks, chunks[1:]):
+            assert chunk.start < previous.end
+            assert chunk.position == previous.position + 1
+        assert all(text[chunk.start:chunk.end] == chunk.text for chunk in chunks)
+
+    def test_chunks_end_at_sentences(self):
+        """Test that a chunk ends at a sentence boundary near its size limit"""
+        text = "".join(f"Sentence number {i} is here. " for i in range(100))
+        chunks = chunk_text(text, chunk_size=60, overlap=0)
+
+        assert all(chunk.text.endswith(".") for chunk in chunks)
+
+    def test_invalid_overlap(self):
+        """Test that an overlap as large as the chunk is rejected"""
+        with pytest.raises(ValueError):
+            chunk_text("text", chunk_size=10, overlap=10)
+
+
+class TestBM25Index:
+    """Tests for the BM25 inverted index"""
+
+    def test_analyze_drops_stopwords(self):
+        """Test that terms are lower-cased words without stopwords"""
+        assert analyze("The Sprint, and the REVIEW") == ["sprint", "review"]
+
+    def test_best_match_first(self):
+        """Test that the document sharing the query terms ranks first"""
+        results = _index().search("How are refunds processed?", k=3)
+
+        assert results[0].doc_id == "billing"
+        assert results[0].source == "billing.md"
+        assert results[0].relevance == 1.0
+
+    def test_k_and_threshold(self):
+        """Test that k caps the results and the threshold drops weak matches"""
+        index = _index()
+
+        assert len(index.search("sprint workflow refunds", k=2)) == 2
+        assert len(index.search("sprint workflow refunds", k=10)) == 3
+        assert [r.doc_id for r in index.search("sprint sprints review workflow", k=10, threshold=0.9)] == ["agile"]
+        assert index.search("the and of", k=3) == []
+
+    def test_replace_and_delete(self):
+        """Test that re-adding a document replaces it and deleted documents are no longer found"""
+        index = _index()
+        index.add_document("billing", "Payments are collected by direct debit.", "billing.md")
+
+        assert index.search("refunds") == []
+        assert index.search("direct debit")[0].doc_id == "billing"
+
+        assert index.delete_document("kanban")
+        assert not index.delete_document("kanban")
+        assert index.search("kanban bottlenecks") == []
+        assert index.stats()["documents"] == 2
+
+    def test_repeated_id_in_batch(self):
+        """Test that a doc_id repeated within one batch keeps only its last text"""
+        index = BM25Index()
+        added = index.add_documents([("a", "first version", "a.md"), ("a", "second version", "a.md")])
+
+        assert added == 1
+        assert index.search("first") == []
+        assert index.search("second")[0].doc_id == "a"
+        assert index.stats()["chunks"] == 1
+
+    def test_compaction_removes_deleted_postings(self):
+        """Test that postings of deleted chunks are purged once enough are deleted"""
+        index = _index()
+        index.delete_document("kanban")
+        index.delete_document("billing")
+
+        stats = index.stats()
+        assert stats["tombstones"] == 0
+        assert stats["chunks"] == 1
+        assert index.search("sprint")[0].doc_id == "agile"
+
+    def test_persistence(self, tmp_path):
+        """Test that a reopened index finds the same chunks"""
+        path = str(tmp_path / "knowledge.sqlite")
+        index = _index(path=path)
+        expected = index.search("sprint review", k=3)
+        index.close()
+
+        reopened = BM25Index(path=path)
+        assert reopened.search("sprint review", k=3) == expected
+        reopened.add_document("new", "Sprint goals guide the team.", "new.md")
+        assert {r.doc_id for r in reopened.search("sprint", k=5)} == {"agile", "new"}
+
+    def test_query_speed(self):
+        """Test that a query over many chunks takes milliseconds"""
+        index = BM25Index(chunk_size=64, overlap=0)
+        index.add_documents((f"doc{i}", f"record {i} topic{i % 500} shared words common text {i % 7}", "")
+                            for i in range(50000))
+
+        index.search("topic42 common", k=5)
+        start = time.perf_counter()
+        results = index.search("topic42 common", k=5)
+        elapsed = time.perf_counter() - start
+
+        assert len(results) == 5
+        assert all("topic42" in r.text for r in results)
+        assert elapsed < 0.05
+
+
+class TestNearDuplicates:
+    """Tests for collapsing near-duplicate chunks"""
+
+    def test_fingerprints(self):
+        """Test that long texts differing in a word are close and short ones only match when identical"""
+        page1, page2 = (simhash(analyze(text)) for _, text, _ in PAGES[:2])
+        unrelated = simhash(analyze(" ".join(f"word{i}" for i in range(240))))
+
+        assert hamming_distance(page1, page2) <= 3 < hamming_distance(page1, unrelated)
+        assert simhash(analyze("Refunds take ten days")) == simhash(analyze("refunds take ten days"))
+        assert hamming_distance(simhash(analyze("Refunds take ten days")),
+                                simhash(analyze("Refunds take nine days"))) > 3
+        assert simhash([]) is None
+
+    def test_collapsed_at_ingest(self):
+        """Test that repeated pages are stored as duplicates of one indexed chunk"""
+        index = _index(chunk_size=4096)
+        index.add_documents(PAGES)
+
+        stats = index.stats()
+        assert (stats["documents"], stats["chunks"], stats["duplicates"]) == (6, 4, 2)
+        assert [r.source for r in index.search("section5 item35", k=5)] == ["page1.pdf"]
+        assert index.documents()[-1]["duplicates"] == 1
+
+    def test_duplicate_promoted_on_delete(self):
+        """Test that deleting the indexed copy leaves a duplicate indexed in its place"""
+        index = BM25Index(chunk_size=4096)
+        index.add_documents(PAGES)
+        retriever = DenseRetriever(index)
+        retriever.sync()
+
+        assert index.delete_document("page1")
+        assert (index.stats()["chunks"], index.stats()["duplicates"]) == (1, 1)
+        assert [r.source for r in index.search("section5 item35", k=5)] == ["page2.pdf"]
+        assert [r.source for r in retriever.search("section5 item35", k=5)] == ["page2.pdf"]
+
+        index.delete_document("page2")
+        assert [r.source for r in index.search("section5 item35", k=5)] == ["page3.pdf"]
+
+    def test_filtered_at_query_time(self, tmp_path):
+        """Test that duplicates indexed without deduplication are dropped from results"""
+        path = str(tmp_path / "knowledge.sqlite")
+        index = BM25Index(path=path, chunk_size=4096, duplicate_distance=None)
+        index.add_documents(PAGES)
+        assert len(index.search("section5 item35", k=5)) == 3
+        index.close()
+
+        reopened = BM25Index(path=path, chunk_size=4096)
+        assert reopened.stats()["chunks"] == 3
+        assert len(reopened.search("section5 item35", k=5)) == 1
+        assert len(DenseRetriever(reopened).search("section5 item35", k=5)) == 1
+
+
+class TestHashingEmbedder:
+    """Tests for the offline hashing embedder"""
+
+    def test_similar_texts_are_close(self):
+        """Test that texts sharing words have a higher cosine similarity than unrelated ones"""
+        vectors = HashingEmbedder().embed(["how are refunds processed", "refunds are processed monthly",
+                                           "kanban boards visualize work"])
+
+        assert vectors.dtype == np.float32
+        assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0)
+        assert vectors[0] @ vectors[1] > 0.5 > abs(vectors[0] @ vectors[2])
+
+    def test_stable_and_empty(self):
+        """Test that embeddings do not depend on the instance and texts without terms embed to zeros"""
+        first, second = HashingEmbedder(dim=64), HashingEmbedder(dim=64)
+
+        assert np.array_equal(first.embed(["sprint review"]), second.embed(["sprint review"]))
+        assert not first.embed(["the and of"]).any()
+
+
+class TestDenseIndex:
+    """Tests for the memory-mapped vector store"""
+
+    @staticmethod
+    def _vectors(count, dim=32, seed=0):
+        return np.random.default_rng(seed).standard_normal((count, dim)).astype(np.float32)
+
+    @pytest.mark.parametrize("dtype", ["float32", "float16"])
+    def test_exact_search_across_blocks(self, dtype):
+        """Test that blocked search finds each vector as its own nearest neighbour"""
+        vectors = self._vectors(5000)
+        index = DenseIndex(dim=32, dtype=dtype, block_rows=700)
+        index.add(np.arange(5000) + 100, vectors)
+
+        ids, scores = index.search(vectors[[0, 2500, 4999]], k=5, nprobe=None)
+
+        assert ids[:, 0].tolist() == [100, 2600, 5099]
+        assert np.allclose(scores[:, 0], 1.0, atol=1e-2)
+        assert (np.diff(scores, axis=1) <= 0).all()
+
+    def test_padding_and_removal(self):
+        """Test that removed vectors are not returned and missing results are padded"""
+        vectors = self._vectors(3)
+        index = DenseIndex(dim=32)
+        index.add([1, 2, 3], vectors)
+
+        assert index.remove([2]) == 1
+        ids, scores = index.search(vectors[1], k=4)
+
+        assert sorted(ids[0, :2].tolist()) == [1, 3]
+        assert ids[0, 2:].tolist() == [-1, -1]
+        assert np.isneginf(scores[0, 2:]).all()
+        assert len(index) == 2
+
+    def test_ivf_recall(self):
+        """Test that the coarse quantizer finds nearly the same neighbours as exact search"""
+        rng = np.random.default_rng(1)
+        centres = rng.standard_normal((50, 32)).astype(np.float32)
+        vectors = centres[rng.integers(0, 50, 20000)] + 0.5 * rng.standard_normal((20000, 32)).astype(np.float32)
+        index = DenseIndex(dim=32, ivf_min_vectors=10000)
+        index.add(np.arange(20000), vectors)
+
+        assert index.trained
+        queries = vectors[:50] + 0.05 * rng.standard_normal((50, 32)).astype(np.float32)
+        exact, _ = index.search(queries, k=10, nprobe=None)
+        approximate, _ = index.search(queries, k=10, nprobe=16)
+
+        recall = np.mean([len(np.intersect1d(a, e)) / 10 for a, e in zip(approximate, exact)])
+        assert recall > 0.9
+
+    def test_persistence(self, tmp_path):
+        """Test that a reopened store memory-maps the same vectors and quantizer"""
+        vectors = self._vectors(3000)
+        index = DenseIndex(str(tmp_path), dim=32, dtype="float16", ivf_min_vectors=2000)
+        index.add(np.arange(3000), vectors)
+        index.remove([5])
+        expected = index.search(vectors[:3], k=3)
+
+        reopened = DenseIndex(str(tmp_path), dim=32, dtype="float16")
+        assert isinstance(reopened._vectors, np.memmap)
+        assert reopened.trained and len(reopened) == 2999
+        assert np.array_equal(reopened.search(vectors[:3], k=3)[0], expected[0])
+
+        with pytest.raises(ValueError):
+            DenseIndex(str(tmp_path), dim=32, dtype="float32")
+
+
+class TestDenseRetriever:
+    """Tests for embedding search over the BM25 index chunks"""
+
+    def test_follows_the_index(self):
+        """Test that added and deleted documents are reflected in embedding search"""
+        index = _index()
+        retriever = DenseRetriever(index)
+
+        assert retriever.search("how are refunds processed")[0].doc_id == "billing"
+
+        index.delete_document("billing")
+        index.add_document("returns", "Refunds for returned items are processed by the store.", "returns.md")
+        results = retriever.search("how are refunds processed", k=5)
+
+        assert results[0].doc_id == "returns"
+        assert "billing" not in {r.doc_id for r in results}
+        assert len(retriever.vectors) == index.stats()["chunks"]
+
+    def test_follows_a_cleared_index(self):
+        """Test that chunks added after a clear are embedded and the old ones are gone"""
+        index = _index()
+        retriever = DenseRetriever(index)
+        retriever.sync()
+
+        index.clear()
+        index.add_document("space", "Rockets carry satellites into orbit.", "space.md")
+
+        assert [r.doc_id for r in retriever.search("rockets orbit", k=5)] == ["space"]
+        assert retriever.search("how are refunds processed", k=5, threshold=0.5) == []
+        assert len(retriever.vectors) == 1
+
+
+class TestIngestion:
+    """Tests for ingesting knowledge files in the background"""
+
+    FILES = [(f"{doc_id}.md", text.encode()) for doc_id, text in KNOWLEDGE.items()]
+
+    def test_extract_structured_text(self):
+        """Test that CSV rows and JSON leaves become field: value lines"""
+        assert extract_text("plans.csv", b"plan,price\nbasic,10\npro,\n") == "plan: basic\nprice: 10\n\nplan: pro"
+        assert extract_text("plan.json", b'{"plan": {"name": "pro", "tags": ["a"]}}') == \
+            "plan.name: pro\nplan.tags[0]: a"
+        with pytest.raises(ValueError):
+            extract_text("image.png", b"")
+
+    @pytest.mark.parametrize("max_workers", [1, 2])
+    def test_ingests_files(self, max_workers):
+        """Test that files are indexed in batches, in-thread or in worker processes"""
+        index = BM25Index()
+        job = IngestionJob(index, self.FILES, max_workers=max_workers, write_batch=2)
+
+        assert job.wait(30) and job.error is None
+        assert [status["status"] for status in job.files] == ["indexed"] * 3
+        assert job.processed == 3
+        assert index.stats()["documents"] == 3
+        assert index.search("How are refunds processed?")[0].source == "billing.md"
+
+    def test_jobs_share_a_pool(self):
+        """Test that a pool passed in prepares the files of several jobs and is left running"""
+        with create_ingest_pool(2) as pool:
+            first, second = BM25Index(), BM25Index()
+            for index in (first, second):
+                job = IngestionJob(index, self.FILES, max_workers=2, executor=pool)
+                assert job.wait(30) and job.error is None
+
+            assert first.stats() == second.stats()
+            assert pool.submit(len, "still running").result() == 13
+
+    def test_unchanged_files_are_skipped(self):
+        """Test that files already indexed or repeated in the upload are not processed again"""
+        index = BM25Index()
+        IngestionJob(index, self.FILES[:2], max_workers=1).wait(30)
+
+        job = IngestionJob(index, self.FILES + self.FILES[2:], max_workers=1)
+        job.wait(30)
+
+        assert [status["status"] for status in job.files] == ["skipped", "skipped", "indexed", "skipped"]
+        assert index.stats()["documents"] == 3
+
+    def test_failed_file_does_not_stop_the_job(self):
+        """Test that an unreadable file is reported while the others are indexed"""
+        index = BM25Index()
+        retriever = DenseRetriever(index)
+        job = IngestionJob(index, [("broken.json", b"{not json")] + self.FILES, retriever=retriever, max_workers=2)
+
+        assert job.wait(30) and job.error is None
+        assert job.files[0]["status"] == "failed" and job.files[0]["error"]
+        assert index.stats()["documents"] == 3
+        assert len(retriever.vectors) == index.stats()["chunks"]
+
+
+class TestPromptInjection:
+    """Tests for injecting retrieved chunks into the prompt"""
+
+    def test_retrieved_chunks_in_prompt(self, monkeypatch, default_session_state):
+        """Test that chunks matching the task are added when RAG is enabled"""
+        index = _index()
+        monkeypatch.setattr("utils.shared_resources.get_retrieval_index", lambda: index)
+        monkeypatch.setattr("streamlit.session_state", default_session_state)
+        default_session_state["task"] = "Explain how refunds are processed"
+
+        assert "# Retrieved Context" not in generate_prompt()
+
+        default_session_state["rag_enabled"] = True
+        default_session_state["rag_num_chunks"] = 1
+        prompt = generate_prompt()
+
+        assert "# Retrieved Context" in prompt
+        assert "[1] billing.md (part 1)" in prompt
+        assert "Refunds are processed within ten business days." in prompt
+        assert "Kanban" not in prompt
+        assert "# Retrieved Context" in generate_user_prompt()
+
+    def test_retrieval_is_reused_until_the_index_changes(self, monkeypatch, default_session_state):
+        """Test that rendering again with the same query and settings does not search again"""
+        index = _index()
+        searches = []
+        search = index.search
+        monkeypatch.setattr(index, "search", lambda *args, **kwargs: searches.append(args) or search(*args, **kwargs))
+        monkeypatch.setattr("utils.shared_resources.get_retrieval_index", lambda: index)
+        monkeypatch.setattr("streamlit.session_state", default_session_state)
+        default_session_state["task"] = "Explain how refunds are processed"
+        default_session_state["rag_enabled"] = True
+
+        generate_prompt()
+        generate_user_prompt()
+        assert len(searches) == 1
+
+        default_session_state["rag_num_chunks"] = 1
+        generate_prompt()
+        assert len(searches) == 2
+
+        index.add_document("returns", "Refunds for returned items are issued to the original card.", "returns.md")
+        generate_prompt()
+        assert len(searches) == 3
+
+    def test_embedding_retrieval(self, monkeypatch, default_session_state):
+        """Test that the embedding backend is used when selected"""
+        retriever = DenseRetriever(_index())
+        monkeypatch.setattr("utils.shared_resources.get_dense_retriever", lambda: retriever)
+        monkeypatch.setattr("streamlit.session_state", default_session_state)
+        default_session_state["task"] = "Explain how refunds are processed"
+        default_session_state["rag_enabled"] = True
+        default_session_state["rag_retrieval_method"] = EMBEDDING_RETRIEVAL
+
+        assert "Refunds are processed within ten business days." in generate_prompt()
+
+    def test_section_can_be_excluded(self, monkeypatch, default_session_state):
+        """Test that the prompt structure can leave retrieved chunks out"""
+        index = _index()
+        monkeypatch.setattr("utils.shared_resources.get_retrieval_index", lambda: index)
+        monkeypatch.setattr("streamlit.session_state", default_session_state)
+        default_session_state["task"] = "Explain how refunds are processed"
+        default_session_state["rag_enabled"] = True
+        default_session_state["prompt_structure"] = dict(default_session_state["prompt_structure"],
+                                                         **{"Retrieved Context": False})
+
+        assert "# Retrieved Context" not in generate_prompt()
@@ -0,0 +1,159 @@
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from models.http_pool import SessionPool
+from models.rate_limiter import RateLimiterRegistry
+from models.single_flight import SingleFlight
+from models.content_generator import ContentGenerator
+from utils.mock_llm_server import MockLLMServer
+
+
+def _run_concurrently(fn, count):
+    """Call fn from `count` threads at once and return the results"""
+    barrier = threading.Barrier(count)
+
+    def call(_):
+        barrier.wait()
+        return fn()
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(call, range(count)))
+
+
+class TestSingleFlight:
+    """Tests for in-flight request coalescing"""
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Test that callers arriving while a call is in flight share its result"""
+        flight = SingleFlight()
+        release = threading.Event()
+        executions = []
+
+        def slow_call():
+            executions.append(1)
+            release.wait(5)
+            return {"value": 42}
+
+        leader = threading.Thread(target=lambda: flight.do("k", slow_call))
+        leader.start()
+        while flight.stats()["in_flight"] == 0:
+            pass
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(flight.do, "k", slow_call) for _ in range(3)]
+            while flight.stats()["coalesced"] < 3:
+                pass
+            release.set()
+            results = [f.result() for f in futures]
+        leader.join()
+
+        assert results == [({"value": 42}, True)] * 3
+        assert len(executions) == 1
+        assert flight.stats() == {"calls": 4, "executions": 1, "coalesced": 3, "in_flight": 0}
+
+    def test_finished_calls_are_not_reused(self):
+        """Test that only concurrent duplicates are coalesced"""
+        flight = SingleFlight()
+
+        assert flight.do("k", lambda: 1) == (1, False)
+        assert flight.do("k", lambda: 2) == (2, False)
+
+    def test_errors_reach_every_waiter(self):
+        """Test that a failed call raises in the leader and all followers"""
+        flight = SingleFlight()
+        release = threading.Event()
+
+        def failing_call():
+            release.wait(5)
+            raise ValueError("upstream failed")
+
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [executor.submit(flight.do, "k", failing_call) for _ in range(3)]
+            while flight.stats()["calls"] < 3:
+                pass
+            release.set()
+
+            for future in futures:
+                with pytest.raises(ValueError):
+                    future.result()
+
+    def test_stream_fan_out_replays_for_late_subscribers(self):
+        """Test that a subscriber joining mid-stream still sees every event"""
+        flight = SingleFlight()
+        first_sent = threading.Event()
+        release = threading.Event()
+
+        def upstream():
+            yield "a"
+            first_sent.set()
+            release.wait(5)
+            yield "b"
+            yield "c"
+
+        leader, leader_shared = flight.stream("k", upstream)
+        first_sent.wait(5)
+        follower, follower_shared = flight.stream("k", upstream)
+        release.set()
+
+        assert (list(leader), leader_shared) == (["a", "b", "c"], False)
+        assert (list(follower), follower_shared) == (["a", "b", "c"], True)
+        assert flight.stats()["executions"] == 1
+
+
+class TestGeneratorCoalescing:
+    """Tests for coalescing in ContentGenerator"""
+
+    @pytest.fixture
+    def server(self):
+        with MockLLMServer(latency=0.3, output_tokens=10) as server:
+            yield server
+
+    def _generator(self, server, flight, api_key="mock"):
+        return ContentGenerator(api_key=api_key, base_url=server.messages_url, session_pool=SessionPool(),
+                                rate_limiters=RateLimiterRegistry(), single_flight=flight)
+
+    def test_duplicate_generate_calls_send_one_request(self, server):
+        """Test that identical concurrent generate() calls hit the provider once"""
+        flight = SingleFlight()
+        generator = self._generator(server, flight)
+
+        results = _run_concurrently(lambda: generator.generate("Same prompt", temperature=0), 4)
+
+        assert server.stats()["requests"] == 1
+        assert len({r["content"] for r in results}) == 1
+        assert sorted(r["metadata"]["coalesced"] for r in results) == [False, True, True, True]
+        assert flight.stats()["coalesced"] == 3
+
+    def test_duplicate_streams_fan_out(self, server):
+        """Test that identical concurrent streams share one upstream stream"""
+        generator = self._generator(server, SingleFlight())
+
+        def stream():
+            events = list(generator.generate_stream("Same prompt", temperature=0))
+            return "".join(e["text"] for e in events if e["type"] == "text"), events[-1]
+
+        results = _run_concurrently(stream, 3)
+
+        assert server.stats()["streamed"] == 1
+        for text, done in results:
+            assert text == done["content"] == results[0][0]
+            assert done["metadata"]["time_to_first_token"] is not None
+
+    def test_different_credentials_are_not_coalesced(self, server):
+        """Test that identical requests sent with different API keys are not shared"""
+        flight = SingleFlight()
+        generators = [self._generator(server, flight, api_key=key) for key in ("key-a", "key-b")]
+        turns = iter(generators)
+
+        results = _run_concurrently(lambda: next(turns).generate("Same prompt", temperature=0), 2)
+
+        assert server.stats()["requests"] == 2
+        assert not any(r["metadata"]["coalesced"] for r in results)
+
+    def test_coalescing_can_be_disabled(self, server):
+        """Test that coalesce=False always sends its own request"""
+        generator = self._generator(server, SingleFlight())
+
+        _run_concurrently(lambda: generator.generate("Same prompt", coalesce=False), 3)
+
+        assert server.stats()["requests"] == 3
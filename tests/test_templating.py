@@ -0,0 +1,43 @@
+import pandas as pd
+from models.templating import compile_template, render_template
+
+
+class TestCompiledTemplate:
+    """Tests for single-pass placeholder substitution"""
+
+    def test_compile_splits_literals_and_names(self):
+        """Test that a template compiles into alternating literals and placeholder names"""
+        template = compile_template("Hi {{name}}, your {{item}} ships {{name}}!")
+
+        assert template.literals == ("Hi ", ", your ", " ships ", "!")
+        assert template.names == ("name", "item", "name")
+        assert template.placeholders == ("name", "item")
+
+    def test_compiled_templates_are_cached(self):
+        """Test that the same text is only compiled once"""
+        assert compile_template("{{a}} and {{b}}") is compile_template("{{a}} and {{b}}")
+
+    def test_render_with_unresolved_report(self):
+        """Test that missing values keep their placeholder and are reported once"""
+        text, unresolved = compile_template("{{a}} {{b}} {{c}} {{b}}").render_report({"a": 1})
+
+        assert text == "1 {{b}} {{c}} {{b}}"
+        assert unresolved == ["b", "c"]
+
+    def test_values_are_not_rescanned(self):
+        """Test that substituted values containing placeholders are inserted literally"""
+        assert render_template("{{a}}-{{b}}", {"a": "{{b}}", "b": "x"}) == "{{b}}-x"
+
+    def test_brace_edge_cases(self):
+        """Test extra braces around placeholders and text without placeholders"""
+        assert render_template("{{{a}}}", {"a": "v"}) == "{v}"
+        assert render_template("no placeholders {x}", {"x": 1}) == "no placeholders {x}"
+
+    def test_render_columns(self):
+        """Test vectorized rendering over columns, with missing columns left as placeholders"""
+        columns = {"name": pd.Series(["Ann", "Bob"])}
+
+        rendered = compile_template("Dear {{name}} ({{tier}})").render_columns(columns)
+
+        assert rendered.tolist() == ["Dear Ann ({{tier}})", "Dear Bob ({{tier}})"]
+        assert compile_template("static {{x}}").render_columns({}) == "static {{x}}"
@@ -0,0 +1,79 @@
+import time
+import pytest
+from models.tokenizer import count_tokens, token_ratio, token_cache_info, clear_token_cache, _count_uncached
+
+
+class TestCountTokens:
+    """Tests for the offline token estimator"""
+
+    def test_empty_text(self):
+        """Test that empty input has no tokens"""
+        assert count_tokens("") == 0
+        assert count_tokens(None) == 0
+
+    def test_punctuation_and_numbers_count_separately(self):
+        """Test that punctuation and digit groups are tokens of their own, unlike word counts"""
+        assert count_tokens("Hello, world!") == 4
+        assert count_tokens("It's 2024-05-01.") == 9
+        assert count_tokens("Hello, world!") > len("Hello, world!".split())
+
+    def test_long_words_cost_more(self):
+        """Test that rare long words are charged several tokens"""
+        assert count_tokens("cat") == 1
+        assert count_tokens("internationalization") == 4
+
+    def test_non_ascii_text(self):
+        """Test that non-Latin scripts are counted per character"""
+        assert count_tokens("日本語") == 3
+
+    def test_english_prose_ratio(self):
+        """Test that English prose lands near the usual ~4 characters per token"""
+        text = ("Agile methodologies provide flexibility and efficiency for development teams by "
+                "emphasizing iterative development cycles, continuous feedback and team collaboration. ") * 20
+
+        assert 3.5 < len(text) / count_tokens(text) < 5.5
+
+    def test_model_ratios(self):
+        """Test per-model ratios picked by name prefix"""
+        text = "word " * 1000
+
+        assert token_ratio("claude-3-5-sonnet") == 1.1
+        assert token_ratio("gpt-4o-mini") == 0.95
+        assert token_ratio("gpt-4") == 1.0
+        assert token_ratio("unknown-model") == 1.0
+        assert count_tokens(text, "claude-3-5-sonnet") == round(count_tokens(text) * 1.1)
+
+    def test_sections_are_memoized(self):
+        """Test that long texts are counted per section and unchanged sections are reused"""
+        clear_token_cache()
+        sections = [f"# Section {i}\n" + "Some repeated guidance text. " * 20 + f"{i}\n\n" for i in range(200)]
+        text = "".join(sections)
+
+        first = count_tokens(text)
+        _, misses_after_first, _ = token_cache_info()
+
+        sections[50] = "# Section 50\nEdited.\n\n"
+        count_tokens("".join(sections))
+        _, misses_after_edit, _ = token_cache_info()
+
+        assert misses_after_first == 200
+        assert misses_after_edit == 201
+        assert first == count_tokens(text)
+
+    def test_section_split_matches_whole_count(self):
+        """Test that counting by section gives the same total as counting at once"""
+        clear_token_cache()
+        text = "".join(f"## Heading {i}\nParagraph number {i}, with punctuation.\n\n" for i in range(300))
+
+        assert count_tokens(text) == pytest.approx(_count_uncached(text), rel=0.01)
+
+    def test_large_prompt_is_fast(self):
+        """Test that a 100k-character prompt is counted in milliseconds once warm"""
+        text = "".join(f"# Section {i}\n" + "The quick brown fox jumps over the lazy dog. " * 10 + "\n\n"
+                       for i in range(220))
+        assert len(text) > 100_000
+
+        count_tokens(text)
+        start = time.perf_counter()
+        count_tokens(text)
+        assert time.perf_counter() - start < 0.05
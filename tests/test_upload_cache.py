@@ -0,0 +1,115 @@
+import threading
+import pandas as pd
+import pytest
+from models.upload_cache import UploadCache, content_key, parse_upload
+
+
+def _csv(rows):
+    """CSV bytes with an id and a name column"""
+    return ("id,name\n" + "".join(f"{i},Name {i}\n" for i in range(rows))).encode()
+
+
+class TestParseUpload:
+    """Tests for parsing uploaded files"""
+
+    def test_file_types(self):
+        """Test that each supported type parses to the expected object"""
+        assert parse_upload("data.CSV", _csv(2))["name"].tolist() == ["Name 0", "Name 1"]
+        assert parse_upload("data.json", b'[{"a": 1}]') == [{"a": 1}]
+        assert parse_upload("notes.txt", "héllo".encode()) == "héllo"
+
+        with pytest.raises(ValueError):
+            parse_upload("data.pdf", b"")
+
+    def test_content_key(self):
+        """Test that keys follow the content and the file type, not the name"""
+        assert content_key("a.csv", b"x") == content_key("b.csv", b"x")
+        assert content_key("a.csv", b"x") != content_key("a.csv", b"y")
+        assert content_key("a.csv", b"x") != content_key("a.txt", b"x")
+
+
+class TestUploadCache:
+    """Tests for the parsed-upload cache"""
+
+    def test_same_content_is_parsed_once(self, monkeypatch):
+        """Test that repeated uploads of identical content share one parsed object"""
+        calls = []
+        monkeypatch.setattr("models.upload_cache.parse_upload",
+                            lambda name, data: calls.append(name) or parse_upload(name, data))
+        cache = UploadCache()
+
+        first = cache.get_or_parse("export.csv", _csv(10))
+        second = cache.get_or_parse("renamed.csv", _csv(10))
+
+        assert first is second
+        assert calls == ["export.csv"]
+        assert cache.stats()["memory_hits"] == 1
+
+    def test_concurrent_sessions_parse_once(self, monkeypatch):
+        """Test that sessions uploading the same file at once wait for a single parse"""
+        calls = []
+        monkeypatch.setattr("models.upload_cache.parse_upload",
+                            lambda name, data: calls.append(name) or parse_upload(name, data))
+        cache = UploadCache()
+        data = _csv(50000)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_parse("big.csv", data)))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
+        assert all(result is results[0] for result in results)
+
+    def test_frames_reload_from_parquet(self, tmp_path, monkeypatch):
+        """Test that an evicted frame is read back from its Parquet spill, not re-parsed"""
+        pytest.importorskip("pyarrow")
+        cache = UploadCache(directory=str(tmp_path), memory_entries=1)
+        original = cache.get_or_parse("a.csv", _csv(100))
+        cache.get_or_parse("b.csv", _csv(5))
+
+        monkeypatch.setattr("models.upload_cache.parse_upload",
+                            lambda name, data: pytest.fail("re-parsed a spilled upload"))
+        reloaded = cache.get_or_parse("a.csv", _csv(100))
+
+        pd.testing.assert_frame_equal(reloaded, original)
+        assert cache.stats()["disk_hits"] == 1
+
+    def test_spill_survives_restart(self, tmp_path):
+        """Test that a new cache on the same directory finds earlier spills"""
+        pytest.importorskip("pyarrow")
+        UploadCache(directory=str(tmp_path)).get_or_parse("a.csv", _csv(3))
+
+        key = content_key("a.csv", _csv(3))
+        assert UploadCache(directory=str(tmp_path)).get(key)["id"].tolist() == [0, 1, 2]
+
+    def test_non_tabular_uploads_stay_in_memory(self, tmp_path):
+        """Test that JSON and text uploads are cached without a spill file"""
+        cache = UploadCache(directory=str(tmp_path))
+        cache.get_or_parse("a.json", b'{"a": 1}')
+        cache.get_or_parse("a.txt", b"text")
+
+        assert cache.stats()["disk_entries"] == 0
+        assert cache.stats()["memory_entries"] == 2
+
+    def test_disk_limit(self, tmp_path):
+        """Test that the spill directory is trimmed to its size limit"""
+        pytest.importorskip("pyarrow")
+        cache = UploadCache(directory=str(tmp_path), max_disk_bytes=1)
+        cache.get_or_parse("a.csv", _csv(10))
+        cache.get_or_parse("b.csv", _csv(20))
+
+        assert cache.stats()["disk_entries"] == 0
+
+    def test_disk_limit_keeps_files_of_lazy_entries(self, tmp_path):
+        """Test that eviction spares the raw copies that in-memory chunked uploads read from"""
+        cache = UploadCache(directory=str(tmp_path), max_disk_bytes=1, chunked_bytes=1024)
+        first = cache.get_or_parse("a.csv", _csv(100))
+        second = cache.get_or_parse("b.csv", _csv(200))
+
+        assert cache.stats()["disk_entries"] == 2
+        assert len(pd.concat(first)) == 100
+        assert len(pd.concat(second)) == 200
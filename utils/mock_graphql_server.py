@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+"""
+Deterministic local stand-in for a paginated GraphQL API, for testing data injection.
+
+The server answers every POST with a Relay-style connection over a generated
+list of records, paged by the "first" and "after" query variables. It does not
+parse the query: whatever is asked, each record carries the same fields
+(id, name, description, price). Latency, required headers and GraphQL errors
+are configurable.
+
+Usage:
+    python -m utils.mock_graphql_server --port 8090 --records 100000 --latency 0.05
+
+Then query http://127.0.0.1:8090/graphql with a connection path of "items".
+"""
+
+import json
+import time
+import base64
+import logging
+import argparse
+import threading
+from typing import Dict, Any, Optional, List
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+def encode_cursor(offset: int) -> str:
+    """Opaque cursor for the record at an offset"""
+    return base64.b64encode(f"cursor:{offset}".encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> int:
+    """Offset of the record after a cursor (0 for no cursor)"""
+    if not cursor:
+        return 0
+    return int(base64.b64decode(cursor).decode().split(":", 1)[1]) + 1
+
+
+class MockGraphQLServer:
+    """
+    A threaded HTTP server that imitates a GraphQL API with Relay pagination
+
+    Responses have the shape:
+        {"data": {<connection>: {"totalCount": n,
+                                 "edges": [{"cursor": c, "node": {...}}, ...],
+                                 "pageInfo": {"hasNextPage": bool, "endCursor": c}}}}
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 records: int = 100,
+                 connection: str = "items",
+                 max_page_size: int = 1000,
+                 latency: float = 0.0,
+                 required_headers: Optional[Dict[str, str]] = None,
+                 error_message: Optional[str] = None):
+        """
+        Configure the server (call start() to begin serving)
+
+        Args:
+            host: Interface to bind to
+            port: Port to bind to (0 picks a free port)
+            records: Number of records in the connection
+            connection: Name of the connection field under "data"
+            max_page_size: Largest page served, whatever "first" asks for
+            latency: Seconds to wait before answering each request
+            required_headers: Headers a request must carry, otherwise it gets a 401
+            error_message: If set, every request gets a GraphQL error with this message
+        """
+        self.records = records
+        self.connection = connection
+        self.max_page_size = max_page_size
+        self.latency = latency
+        self.required_headers = required_headers or {}
+        self.error_message = error_message
+
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "unauthorized": 0, "records_served": 0}
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def graphql_url(self) -> str:
+        """URL of the GraphQL endpoint"""
+        return f"{self.url}/graphql"
+
+    def start(self) -> "MockGraphQLServer":
+        """Serve requests on a background thread"""
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name="mock-graphql-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "MockGraphQLServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get request counters
+
+        Returns:
+            Dict with requests served, unauthorized requests and records served
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key: str, amount: int = 1):
+        """Increment a stats counter"""
+        with self._lock:
+            self._stats[key] += amount
+
+    @staticmethod
+    def record(offset: int) -> Dict[str, Any]:
+        """
+        The generated record at an offset
+
+        Args:
+            offset: Position of the record in the connection
+
+        Returns:
+            The record's fields
+        """
+        return {
+            "id": str(offset + 1),
+            "name": f"Item {offset + 1}",
+            "description": f"Description of item {offset + 1}",
+            "price": round(5 + (offset * 7919 % 10000) / 100, 2)
+        }
+
+    def page(self, variables: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Build the connection page selected by the "first" and "after" variables
+
+        Args:
+            variables: The request's GraphQL variables
+
+        Returns:
+            The connection object
+        """
+        start = min(decode_cursor(variables.get("after")), self.records)
+        size = min(int(variables.get("first") or self.max_page_size), self.max_page_size)
+        end = min(start + max(size, 0), self.records)
+
+        edges: List[Dict[str, Any]] = [{"cursor": encode_cursor(offset), "node": self.record(offset)}
+                                       for offset in range(start, end)]
+        self._count("records_served", len(edges))
+
+        return {
+            "totalCount": self.records,
+            "edges": edges,
+            "pageInfo": {
+                "hasNextPage": end < self.records,
+                "endCursor": encode_cursor(end - 1) if edges else None
+            }
+        }
+
+    def _make_handler(self):
+        """Create the request handler class bound to this server"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any]):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                server._count("requests")
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+                for name, value in server.required_headers.items():
+                    if self.headers.get(name) != value:
+                        server._count("unauthorized")
+                        self._send_json(401, {"errors": [{"message": "Unauthorized"}]})
+                        return
+
+                if server.latency > 0:
+                    time.sleep(server.latency)
+
+                if server.error_message or not body.get("query"):
+                    self._send_json(200, {"data": None,
+                                          "errors": [{"message": server.error_message or "No query given"}]})
+                    return
+
+                page = server.page(body.get("variables") or {})
+                self._send_json(200, {"data": {server.connection: page}})
+
+        return Handler
+
+
+def main():
+    """Run the mock server from the command line"""
+    parser = argparse.ArgumentParser(description="Run a deterministic local mock GraphQL server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind to")
+    parser.add_argument("--port", type=int, default=8090, help="Port to listen on")
+    parser.add_argument("--records", type=int, default=100000, help="Number of records in the connection")
+    parser.add_argument("--connection", default="items", help="Name of the connection field")
+    parser.add_argument("--max-page-size", type=int, default=1000, help="Largest page served")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds to wait before each response")
+    args = parser.parse_args()
+
+    server = MockGraphQLServer(
+        host=args.host,
+        port=args.port,
+        records=args.records,
+        connection=args.connection,
+        max_page_size=args.max_page_size,
+        latency=args.latency
+    )
+
+    print(f"Mock GraphQL server listening on {server.graphql_url} (Ctrl+C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
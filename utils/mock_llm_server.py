@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Deterministic local stand-in for an LLM provider, for load and latency testing.
+
+The server speaks the Anthropic Messages API: plain JSON responses, SSE
+streaming, prompt-caching usage fields and message batches. Latency,
+token throughput and error/429 injection are configurable, and generated text
+is derived from a seed and the request body, so the same request always gets
+the same answer.
+
+Usage:
+    python -m utils.mock_llm_server --port 8080 --latency 0.3 --tokens-per-second 80 --rate-limit-rate 0.05
+
+Then point the app at it with LLM_API_KEY=mock and base_url http://127.0.0.1:8080/v1/messages.
+"""
+
+import re
+import json
+import math
+import time
+import random
+import hashlib
+import logging
+import argparse
+import threading
+from urllib.parse import urlparse
+from typing import Dict, Any, Optional, List
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from models.rate_limiter import TokenBucket
+from models.tokenizer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Supported latency distributions
+LATENCY_DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Words the generated text is drawn from (one word counts as one output token)
+_VOCABULARY = (
+    "agile team sprint backlog delivery review feedback customer value iteration "
+    "planning quality process workflow release product feature story estimate velocity "
+    "practice goal scope risk change improve measure deploy test build design plan "
+    "focus clear simple small steady early often together shared open regular practical "
+    "the a and of to in for with on by each every our your their this that is are can will"
+).split()
+
+
+class MockLLMServer:
+    """
+    A threaded HTTP server that imitates an LLM provider's Messages API
+
+    Endpoints:
+        POST /v1/messages                      JSON or SSE ("stream": true) responses
+        POST /v1/messages/batches              Create a message-batch job
+        GET  /v1/messages/batches/<id>         Batch status
+        GET  /v1/messages/batches/<id>/results JSONL results once the job has ended
+    """
+
+    def __init__(self,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 seed: int = 0,
+                 latency: float = 0.0,
+                 latency_distribution: str = "fixed",
+                 latency_spread: float = 0.5,
+                 tokens_per_second: float = 0.0,
+                 output_tokens: int = 200,
+                 response_text: Optional[str] = None,
+                 error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0,
+                 retry_after: float = 1.0,
+                 requests_per_minute: Optional[float] = None,
+                 batch_processing_time: float = 0.0):
+        """
+        Configure the server (call start() to begin serving)
+
+        Args:
+            host: Interface to bind to
+            port: Port to bind to (0 picks a free port)
+            seed: Seed for generated text, latency samples and injected failures
+            latency: Typical time to first token in seconds (mean, or median for lognormal)
+            latency_distribution: One of "fixed", "uniform", "exponential" or "lognormal"
+            latency_spread: Relative spread: half-width for uniform, sigma for lognormal
+            tokens_per_second: Output token rate after the first token (0 for instant)
+            output_tokens: Number of tokens generated per response (capped by max_tokens)
+            response_text: Fixed text to answer every request with instead of seeded words
+            error_rate: Fraction of requests answered with a 529 overloaded error
+            rate_limit_rate: Fraction of requests answered with a 429 and Retry-After
+            retry_after: Retry-After seconds sent with injected and budget 429s
+            requests_per_minute: Server-side request budget; excess requests get a 429
+            batch_processing_time: Seconds before a submitted batch job ends
+        """
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+
+        self.seed = seed
+        self.latency = latency
+        self.latency_distribution = latency_distribution
+        self.latency_spread = latency_spread
+        self.tokens_per_second = tokens_per_second
+        self.output_tokens = output_tokens
+        self.response_text = response_text
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.batch_processing_time = batch_processing_time
+
+        self._budget = TokenBucket(requests_per_minute, requests_per_minute / 60.0) if requests_per_minute else None
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._cached_prefixes = set()
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._stats = {"requests": 0, "streamed": 0, "errors": 0, "rate_limited": 0,
+                       "batches": 0, "in_flight": 0, "peak_in_flight": 0}
+
+        self._server = ThreadingHTTPServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Base URL of the server"""
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def messages_url(self) -> str:
+        """URL of the Messages endpoint, usable as a ContentGenerator base_url"""
+        return f"{self.url}/v1/messages"
+
+    def start(self) -> "MockLLMServer":
+        """Serve requests on a background thread"""
+        # A short poll interval keeps stop() fast
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05},
+                                        name="mock-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and release the port"""
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "MockLLMServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Get request counters
+
+        Returns:
+            Dict with requests served, streamed responses, injected errors,
+            rate-limited requests, batches and the peak number of concurrent requests
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _count(self, key: str, amount: int = 1):
+        """Increment a stats counter"""
+        with self._lock:
+            self._stats[key] += amount
+            if key == "in_flight":
+                self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._stats["in_flight"])
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """
+        Draw a time-to-first-token from the configured distribution
+
+        Args:
+            rng: Random generator to draw from
+
+        Returns:
+            Latency in seconds
+        """
+        if self.latency <= 0:
+            return 0.0
+
+        if self.latency_distribution == "uniform":
+            low, high = self.latency * (1 - self.latency_spread), self.latency * (1 + self.latency_spread)
+            return max(0.0, rng.uniform(low, high))
+        if self.latency_distribution == "exponential":
+            return rng.expovariate(1.0 / self.latency)
+        if self.latency_distribution == "lognormal":
+            return rng.lognormvariate(math.log(self.latency), self.latency_spread)
+        return self.latency
+
+    def _inject_failure(self) -> Optional[int]:
+        """Decide whether the next request fails; returns the status code or None"""
+        if self._budget is not None and self._budget.reserve(1) > 0:
+            return 429
+
+        with self._lock:
+            roll = self._rng.random()
+
+        if roll < self.rate_limit_rate:
+            return 429
+        if roll < self.rate_limit_rate + self.error_rate:
+            return 529
+        return None
+
+    def generate_text(self, request: Dict[str, Any]) -> List[str]:
+        """
+        Generate the deterministic output tokens for a request
+
+        Args:
+            request: The Messages API request body
+
+        Returns:
+            List of text pieces, one per output token
+        """
+        if self.response_text is not None:
+            # One whitespace-prefixed word per token, so the joined pieces equal the text
+            pieces = re.findall(r"\s*\S+", self.response_text)
+            return pieces[:int(request.get("max_tokens") or len(pieces))]
+
+        canonical = json.dumps({k: v for k, v in request.items() if k != "stream"}, sort_keys=True)
+        digest = hashlib.sha256(f"{self.seed}:{canonical}".encode()).digest()
+        rng = random.Random(int.from_bytes(digest[:8], "big"))
+
+        count = min(self.output_tokens, int(request.get("max_tokens", self.output_tokens)))
+        words = [rng.choice(_VOCABULARY) for _ in range(max(count, 1))]
+        words[0] = words[0].capitalize()
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def _usage(self, request: Dict[str, Any], output_tokens: int) -> Dict[str, int]:
+        """
+        Compute usage, emulating prompt caching for system prompts with a cache breakpoint
+        """
+        model = request.get("model")
+        system = request.get("system", "")
+        cached_tokens = 0
+        cache_key = None
+
+        if isinstance(system, list):
+            # Only the blocks up to and including the last breakpoint are cached
+            breakpoints = [i for i, block in enumerate(system) if block.get("cache_control")]
+            if breakpoints:
+                prefix = system[:breakpoints[-1] + 1]
+                cache_key = json.dumps([model, prefix], sort_keys=True)
+                cached_tokens = count_tokens("".join(block.get("text", "") for block in prefix), model)
+            system = "".join(block.get("text", "") for block in system)
+
+        input_tokens = count_tokens(system, model)
+        input_tokens += sum(count_tokens(str(m.get("content", "")), model) for m in request.get("messages", []))
+        usage = {
+            "input_tokens": input_tokens - cached_tokens,
+            "output_tokens": output_tokens,
+            "cache_creation_input_tokens": 0,
+            "cache_read_input_tokens": 0
+        }
+
+        if cache_key is not None:
+            with self._lock:
+                hit = cache_key in self._cached_prefixes
+                self._cached_prefixes.add(cache_key)
+            usage["cache_read_input_tokens" if hit else "cache_creation_input_tokens"] = cached_tokens
+
+        return usage
+
+    def _message(self, request: Dict[str, Any], pieces: List[str], usage: Dict[str, int]) -> Dict[str, Any]:
+        """Build a Messages API response body"""
+        return {
+            "id": "msg_mock_" + hashlib.sha256("".join(pieces).encode()).hexdigest()[:16],
+            "type": "message",
+            "role": "assistant",
+            "model": request.get("model", "mock-model"),
+            "content": [{"type": "text", "text": "".join(pieces)}],
+            "stop_reason": self._stop_reason(request, pieces),
+            "usage": usage
+        }
+
+    @staticmethod
+    def _stop_reason(request: Dict[str, Any], pieces: List[str]) -> str:
+        """Report max_tokens when the output was cut off by the request's limit"""
+        max_tokens = int(request.get("max_tokens") or 0)
+        return "max_tokens" if 0 < max_tokens <= len(pieces) else "end_turn"
+
+    def _create_batch(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        """Register a batch job, computing its results up front"""
+        results = []
+        for item in body.get("requests", []):
+            params = item.get("params", {})
+            pieces = self.generate_text(params)
+            message = self._message(params, pieces, self._usage(params, len(pieces)))
+            results.append({"custom_id": item.get("custom_id"), "result": {"type": "succeeded", "message": message}})
+
+        with self._lock:
+            self._stats["batches"] += 1
+            batch_id = f"msgbatch_mock_{self._stats['batches']}"
+            self._batches[batch_id] = {"created": time.monotonic(), "results": results}
+
+        return self._batch_status(batch_id)
+
+    def _batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Build the status body of a batch job"""
+        batch = self._batches.get(batch_id)
+        if batch is None:
+            return None
+
+        ended = time.monotonic() - batch["created"] >= self.batch_processing_time
+        count = len(batch["results"])
+        return {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {"processing": 0 if ended else count, "succeeded": count if ended else 0,
+                               "errored": 0, "canceled": 0, "expired": 0},
+            "results_url": f"{self.url}/v1/messages/batches/{batch_id}/results" if ended else None
+        }
+
+    def _make_handler(self):
+        """Create the request handler class bound to this server"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_error(self, status: int):
+                if status == 429:
+                    server._count("rate_limited")
+                    self._send_json(429, {"type": "error", "error": {"type": "rate_limit_error",
+                                                                     "message": "Mock rate limit"}},
+                                    {"retry-after": str(server.retry_after)})
+                else:
+                    server._count("errors")
+                    self._send_json(status, {"type": "error", "error": {"type": "overloaded_error",
+                                                                        "message": "Mock overload"}})
+
+            def _write_chunk(self, data: bytes):
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+
+            def _stream(self, request: Dict[str, Any], pieces: List[str], delay: float):
+                server._count("streamed")
+                usage = server._usage(request, len(pieces))
+                message = server._message(request, [], dict(usage, output_tokens=0))
+
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def event(name: str, payload: Dict[str, Any]):
+                    payload = dict(payload, type=name)
+                    self._write_chunk(f"event: {name}\ndata: {json.dumps(payload)}\n\n".encode())
+
+                time.sleep(delay)
+                event("message_start", {"message": message})
+                event("content_block_start", {"index": 0, "content_block": {"type": "text", "text": ""}})
+
+                for piece in pieces:
+                    event("content_block_delta", {"index": 0, "delta": {"type": "text_delta", "text": piece}})
+                    if server.tokens_per_second > 0:
+                        time.sleep(1.0 / server.tokens_per_second)
+
+                event("content_block_stop", {"index": 0})
+                event("message_delta", {"delta": {"stop_reason": server._stop_reason(request, pieces)},
+                                        "usage": {"output_tokens": len(pieces)}})
+                event("message_stop", {})
+                self._write_chunk(b"")
+
+            def do_POST(self):
+                server._count("requests")
+                server._count("in_flight")
+                try:
+                    body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                    path = urlparse(self.path).path.rstrip("/")
+
+                    if path == "/v1/messages/batches":
+                        self._send_json(200, server._create_batch(body))
+                        return
+
+                    if path != "/v1/messages":
+                        self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": path}})
+                        return
+
+                    failure = server._inject_failure()
+                    if failure:
+                        self._send_error(failure)
+                        return
+
+                    with server._lock:
+                        delay = server.sample_latency(server._rng)
+                    pieces = server.generate_text(body)
+
+                    if body.get("stream"):
+                        self._stream(body, pieces, delay)
+                        return
+
+                    if server.tokens_per_second > 0:
+                        delay += len(pieces) / server.tokens_per_second
+                    time.sleep(delay)
+                    self._send_json(200, server._message(body, pieces, server._usage(body, len(pieces))))
+                finally:
+                    server._count("in_flight", -1)
+
+            def do_GET(self):
+                server._count("requests")
+                parts = urlparse(self.path).path.strip("/").split("/")
+
+                # /v1/messages/batches/<id>[/results]
+                if len(parts) in (4, 5) and parts[:3] == ["v1", "messages", "batches"]:
+                    status = server._batch_status(parts[3])
+                    if status is not None and len(parts) == 4:
+                        self._send_json(200, status)
+                        return
+
+                    if status is not None and status["processing_status"] == "ended":
+                        data = "\n".join(json.dumps(r) for r in server._batches[parts[3]]["results"]).encode()
+                        self.send_response(200)
+                        self.send_header("Content-Type", "application/x-jsonl")
+                        self.send_header("Content-Length", str(len(data)))
+                        self.end_headers()
+                        self.wfile.write(data)
+                        return
+
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+        return Handler
+
+
+def main():
+    """Run the mock server from the command line"""
+    parser = argparse.ArgumentParser(description="Run a deterministic local mock LLM server")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind to")
+    parser.add_argument("--port", type=int, default=8080, help="Port to listen on")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for outputs and injected failures")
+    parser.add_argument("--latency", type=float, default=0.3, help="Typical time to first token in seconds")
+    parser.add_argument("--latency-distribution", choices=LATENCY_DISTRIBUTIONS, default="lognormal",
+                        help="Distribution of the time to first token")
+    parser.add_argument("--latency-spread", type=float, default=0.5, help="Relative spread of the latency")
+    parser.add_argument("--tokens-per-second", type=float, default=80, help="Output token rate (0 for instant)")
+    parser.add_argument("--output-tokens", type=int, default=200, help="Tokens generated per response")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests failing with 529")
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0, help="Fraction of requests failing with 429")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--requests-per-minute", type=float, default=None, help="Server-side request budget")
+    parser.add_argument("--batch-processing-time", type=float, default=5.0, help="Seconds until batch jobs end")
+    args = parser.parse_args()
+
+    server = MockLLMServer(
+        host=args.host,
+        port=args.port,
+        seed=args.seed,
+        latency=args.latency,
+        latency_distribution=args.latency_distribution,
+        latency_spread=args.latency_spread,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after=args.retry_after,
+        requests_per_minute=args.requests_per_minute,
+        batch_processing_time=args.batch_processing_time
+    )
+
+    print(f"Mock LLM server listening on {server.messages_url} (Ctrl+C to stop)")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
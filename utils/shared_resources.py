@@ -0,0 +1,131 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import streamlit as st
+from models.http_pool import SessionPool, configure_session_pool
+from models.response_cache import ResponseCache, DEFAULT_CACHE_DIR
+from models.upload_cache import UploadCache, DEFAULT_UPLOAD_CACHE_DIR
+from models.graphql_client import DEFAULT_CACHE_TTL as DEFAULT_GRAPHQL_CACHE_TTL
+from models.retrieval import BM25Index, DenseIndex, DenseRetriever, DEFAULT_EMBEDDING_DIM, create_ingest_pool
+from utils.mock_llm_server import MockLLMServer
+
+
+@st.cache_resource
+def get_http_session_pool() -> SessionPool:
+    """
+    Get the HTTP session pool shared by every Streamlit session
+
+    The pool is created once per server process (settings come from the
+    LLM_POOL_* and LLM_*_TIMEOUT environment variables) and reused across reruns
+    and browser sessions so keep-alive connections survive between requests.
+
+    Returns:
+        The shared SessionPool
+    """
+    return configure_session_pool()
+
+
+@st.cache_resource
+def get_response_cache() -> ResponseCache:
+    """
+    Get the LLM response cache shared by every Streamlit session
+
+    Returns:
+        A ResponseCache backed by SQLite in the LLM_CACHE_DIR directory
+    """
+    return ResponseCache(path=os.path.join(DEFAULT_CACHE_DIR, "llm_responses.sqlite"))
+
+
+@st.cache_resource
+def get_graphql_cache() -> ResponseCache:
+    """
+    Get the GraphQL response cache shared by every Streamlit session
+
+    Entries expire after GRAPHQL_CACHE_TTL seconds, so data sources are re-read
+    periodically while reruns and repeated queries within the TTL are free.
+
+    Returns:
+        A ResponseCache backed by SQLite in the LLM_CACHE_DIR directory
+    """
+    return ResponseCache(path=os.path.join(DEFAULT_CACHE_DIR, "graphql_responses.sqlite"),
+                         ttl=DEFAULT_GRAPHQL_CACHE_TTL)
+
+
+@st.cache_resource
+def get_upload_cache() -> UploadCache:
+    """
+    Get the parsed-upload cache shared by every Streamlit session
+
+    Identical files uploaded by different sessions share one parsed copy.
+
+    Returns:
+        An UploadCache spilling tabular uploads to Parquet in UPLOAD_CACHE_DIR
+    """
+    return UploadCache(directory=DEFAULT_UPLOAD_CACHE_DIR)
+
+
+@st.cache_resource
+def get_retrieval_index() -> BM25Index:
+    """
+    Get the knowledge-base index used by the RAG workflow
+
+    Documents indexed by any session are searchable by every session, and the
+    index persists across server restarts.
+
+    Returns:
+        A BM25Index backed by SQLite in the LLM_CACHE_DIR directory
+    """
+    return BM25Index(path=os.path.join(DEFAULT_CACHE_DIR, "knowledge.sqlite"))
+
+
+@st.cache_resource
+def get_dense_retriever() -> DenseRetriever:
+    """
+    Get the embedding search over the knowledge-base chunks
+
+    Embeddings are computed offline by a hashing embedder and kept in a
+    memory-mapped matrix next to the knowledge index; chunks added or deleted
+    through get_retrieval_index() are picked up before each search.
+
+    Returns:
+        A DenseRetriever storing RETRIEVAL_VECTOR_DTYPE vectors in the LLM_CACHE_DIR directory
+    """
+    vectors = DenseIndex(os.path.join(DEFAULT_CACHE_DIR, "knowledge_vectors"), dim=DEFAULT_EMBEDDING_DIM)
+    return DenseRetriever(get_retrieval_index(), vectors)
+
+
+@st.cache_resource
+def get_ingest_pool() -> ProcessPoolExecutor:
+    """
+    Get the worker processes that prepare knowledge files
+
+    Every session's ingestion jobs share the pool, so concurrent uploads queue
+    for RAG_INGEST_WORKERS processes instead of each starting its own.
+
+    Returns:
+        A ProcessPoolExecutor with spawned workers
+    """
+    return create_ingest_pool()
+
+
+@st.cache_resource
+def get_mock_llm_server(response_text: Optional[str] = None) -> MockLLMServer:
+    """
+    Get a local mock LLM server used when executing prompts without an API key
+
+    The server is started once per Streamlit process on a free local port. Its
+    latency and token rate come from the MOCK_LLM_LATENCY and
+    MOCK_LLM_TOKENS_PER_SECOND environment variables.
+
+    Args:
+        response_text: Text the server streams back for every request
+
+    Returns:
+        The running MockLLMServer
+    """
+    return MockLLMServer(
+        latency=float(os.environ.get("MOCK_LLM_LATENCY", 0.4)),
+        latency_distribution="lognormal",
+        tokens_per_second=float(os.environ.get("MOCK_LLM_TOKENS_PER_SECOND", 120)),
+        response_text=response_text
+    ).start()
@@ -68,6 +68,14 @@ def initialize_session_state():
     # RAG
     if 'rag_enabled' not in st.session_state:
         st.session_state.rag_enabled = False
+    if 'rag_num_chunks' not in st.session_state:
+        st.session_state.rag_num_chunks = 3
+    if 'rag_chunk_size' not in st.session_state:
+        st.session_state.rag_chunk_size = 512
+    if 'rag_relevance_threshold' not in st.session_state:
+        st.session_state.rag_relevance_threshold = 0.75
+    if 'rag_retrieval_method' not in st.session_state:
+        st.session_state.rag_retrieval_method = "Keyword (BM25)"
 
     # Self-consistency
     if 'self_consistency_enabled' not in st.session_state:
@@ -169,4 +169,28 @@ def step_input(index, value, on_delete=None):
             on_delete(index)
             # No need to return here as rerun will happen
 
-    return new_value
\ No newline at end of file
+    return new_value
+
+def render_token_stream(events, placeholder):
+    """
+    Render streamed generation events into a placeholder as tokens arrive
+
+    Args:
+        events: Iterator of events from ContentGenerator.generate_stream
+        placeholder: A Streamlit placeholder (e.g. st.empty()) to render into
+
+    Returns:
+        dict: The final "done" event with the complete content and metadata
+    """
+    text = ""
+    result = {"success": False, "content": "", "metadata": {}}
+
+    for event in events:
+        if event["type"] == "text":
+            text += event["text"]
+            placeholder.markdown(text + "▌")
+        elif event["type"] == "done":
+            result = event
+
+    placeholder.markdown(result.get("content") or text)
+    return result